@@ -0,0 +1,7 @@
+"""
+Benchmarks del laboratorio P2P.
+Se ejecutan desde la raíz del repositorio, por ejemplo:
+    python -m bench.bench_server_modes
+    python -m bench loadgen --clients 16 --json run.json
+    python -m bench compare base.json run.json
+"""
@@ -0,0 +1,98 @@
+"""
+Punto de entrada de los benchmarks:
+    python -m bench list
+    python -m bench <benchmark> [opciones]     p. ej. python -m bench loadgen --clients 16
+    python -m bench compare base.json nuevo.json
+
+compare empareja las filas de dos JSON (de write_results) por sus columnas de
+configuración y muestra el cambio de throughput y de p99 entre ambos commits.
+"""
+import importlib
+import json
+import sys
+from typing import Any, Dict, List, Tuple
+
+from bench.common import print_table
+
+BENCHMARKS = {
+    "loadgen": "bench.loadgen",
+    "server_modes": "bench.bench_server_modes",
+    "framing": "bench.bench_framing",
+    "tracing": "bench.bench_tracing",
+    "ring": "bench.bench_ring",
+    "sim": "bench.bench_sim",
+    "codec": "bench.bench_codec",
+    "routing": "bench.bench_routing",
+}
+
+# Columnas que identifican una fila (el resto son mediciones)
+KEY_COLUMNS = ("pattern", "size", "clients", "mode", "connections", "reader", "case", "nodes")
+THROUGHPUT_COLUMNS = ("msgs_per_sec", "mb_per_sec", "frames_per_sec", "calls_per_sec", "int_per_sec")
+
+
+def _rows(report: Dict[str, Any]) -> List[Dict[str, Any]]:
+    results = report["results"]
+    if isinstance(results, dict):
+        # loadgen: {"config", "scenarios"}; tracing: {"micro", "server"}
+        rows = []
+        for name, value in results.items():
+            if isinstance(value, list):
+                rows.extend({"section": name, **r} for r in value)
+        return rows
+    return results
+
+
+def _key(row: Dict[str, Any]) -> Tuple:
+    return tuple((c, row[c]) for c in ("section",) + KEY_COLUMNS if c in row)
+
+
+def compare(base_path: str, new_path: str) -> List[Dict[str, Any]]:
+    with open(base_path, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    base_rows = {_key(r): r for r in _rows(base)}
+    table = []
+    for row in _rows(new):
+        old = base_rows.get(_key(row))
+        if old is None:
+            continue
+        entry = {"row": " ".join(f"{k}={v}" for k, v in _key(row))}
+        for col in THROUGHPUT_COLUMNS:
+            if col in row and old.get(col):
+                entry["throughput"] = f"{old[col]} -> {row[col]} ({(row[col] / old[col] - 1) * 100:+.1f}%)"
+                break
+        if "p99_ms" in row and "p99_ms" in old:
+            entry["p99_ms"] = f"{old['p99_ms']} -> {row['p99_ms']}"
+        table.append(entry)
+    print(f"base: {base.get('commit')}  nuevo: {new.get('commit')}")
+    if table:
+        print_table(table, ["row", "throughput", "p99_ms"])
+    else:
+        print("Sin filas comparables")
+    return table
+
+
+def main(argv: List[str]) -> int:
+    if not argv or argv[0] in ("-h", "--help", "list"):
+        print(__doc__)
+        print("Benchmarks: " + ", ".join(sorted(BENCHMARKS)))
+        return 0
+    name, rest = argv[0], argv[1:]
+    if name == "compare":
+        if len(rest) != 2:
+            print("Uso: python -m bench compare base.json nuevo.json")
+            return 2
+        compare(*rest)
+        return 0
+    if name not in BENCHMARKS:
+        print(f"Benchmark desconocido: {name}. Disponibles: {', '.join(sorted(BENCHMARKS))}")
+        return 2
+    module = importlib.import_module(BENCHMARKS[name])
+    sys.argv = [f"python -m bench {name}"] + rest
+    module.main()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
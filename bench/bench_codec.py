@@ -0,0 +1,83 @@
+"""
+Microbenchmark del codec de mensajes (src/codec.py).
+
+Para mensajes representativos del protocolo (FIND_SUCCESSOR, SUCCESSOR_RESPONSE,
+UPDATE_PREDECESSOR, NOTIFY, PUT de protocol.Message, RESULT de un GET) compara el
+camino JSON actual (json.dumps/json.loads, y serializeMessage para el PUT) con el
+codec binario: bytes en el cable por mensaje, y µs por encode y por decode.
+
+Uso:
+    python -m bench.bench_codec --iterations 20000 --json codec.json
+"""
+import argparse
+import timeit
+
+from bench.common import print_table, write_results
+from src.codec import BINARY, JSON
+from src.protocol import Message, MessageType, serializeMessage
+
+NODE_A = "5f1c0a9e" * 5
+NODE_B = "e0c4b1d2" * 5
+
+
+def cases():
+    put = Message(MessageType.PUT, NODE_A[:8], {"key": "usuario:42", "value": "x" * 64})
+    return {
+        "find_successor": {"type": "CHORD_FIND_SUCCESSOR", "key_id": NODE_A, "requester_id": NODE_B,
+                           "corr_id": "7f3a9c2b10-1842"},
+        "successor_response": {"type": "SUCCESSOR_RESPONSE", "key_id": NODE_A, "successor_ip": "192.168.1.20",
+                               "successor_port": 5000, "successor_id": NODE_B, "hops": 4,
+                               "corr_id": "7f3a9c2b10-1842"},
+        "update_predecessor": {"type": "CHORD_UPDATE_PREDECESSOR", "new_predecessor_ip": "192.168.1.20",
+                               "new_predecessor_port": 5000, "new_predecessor_id": NODE_B,
+                               "leaving_node_id": NODE_A, "timestamp": 1712345678.123456},
+        "notify": {"type": "CHORD_NOTIFY", "node_id": NODE_A, "ip": "192.168.1.21", "port": 5001,
+                   "timestamp": 1712345678.123456, "current_predecessor": NODE_B},
+        "put_message": put,
+        "get_result": {"type": "RESULT", "request_id": f"GET_{NODE_A[:8]}_1712345678",
+                       "sender_id": NODE_B[:8],
+                       "data": {"key": "usuario:42", "value": "x" * 64, "found": True, "node": NODE_B[:8],
+                                "timestamp": 1712345678.123456}},
+    }
+
+
+def _us(fn, iterations: int) -> float:
+    return round(min(timeit.repeat(fn, number=iterations, repeat=3)) / iterations * 1e6, 2)
+
+
+def run_case(name: str, msg, iterations: int) -> dict:
+    if isinstance(msg, Message):
+        as_dict = msg.to_dict()
+        json_encode = lambda: serializeMessage(msg).encode("utf-8")
+    else:
+        as_dict = msg
+        json_encode = lambda: JSON.encode(as_dict)
+    json_frame = json_encode()
+    binary_frame = BINARY.encode(as_dict)
+    assert BINARY.decode(binary_frame) == JSON.decode(json_frame)
+    return {
+        "case": name,
+        "json_bytes": len(json_frame),
+        "binary_bytes": len(binary_frame),
+        "bytes_saved_pct": round((1 - len(binary_frame) / len(json_frame)) * 100, 1),
+        "json_encode_us": _us(json_encode, iterations),
+        "binary_encode_us": _us(lambda: BINARY.encode(as_dict), iterations),
+        "json_decode_us": _us(lambda: JSON.decode(json_frame), iterations),
+        "binary_decode_us": _us(lambda: BINARY.decode(binary_frame), iterations),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--json", default=None)
+    args = parser.parse_args()
+
+    rows = [run_case(name, msg, args.iterations) for name, msg in cases().items()]
+    print_table(rows, ["case", "json_bytes", "binary_bytes", "bytes_saved_pct", "json_encode_us",
+                       "binary_encode_us", "json_decode_us", "binary_decode_us"])
+    write_results(args.json, "codec", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Microbenchmark de la capa de framing (src/framing.py).
+
+Compara, sobre un socketpair, el bucle de recepción original (recv de 4096 bytes,
+decode + concatenación de str + split) con FrameReader en modo newline y en modo
+length-prefixed, para valores de 1 KB a 16 MB. Reporta MB/s y frames/s.
+
+El bucle original es cuadrático para valores grandes; por defecto solo se mide
+hasta --legacy-max bytes.
+
+Uso:
+    python -m bench.bench_framing --json framing.json
+"""
+import argparse
+import socket
+import threading
+import time
+
+from bench.common import print_table, write_results
+from src.framing import FRAME_LENGTH, FRAME_NEWLINE, FrameReader, connection_preamble, encode_frame
+
+SIZES = [1024, 16 * 1024, 256 * 1024, 1024 * 1024, 4 * 1024 * 1024, 16 * 1024 * 1024]
+
+
+def _legacy_reader(sock: socket.socket) -> int:
+    """Copia del bucle original de TCPServer._handle_client (sin json.loads)."""
+    frames = 0
+    buffer = ""
+    while True:
+        data = sock.recv(4096)
+        if not data:
+            return frames
+        buffer += data.decode("utf-8")
+        while "\n" in buffer:
+            line, buffer = buffer.split("\n", 1)
+            if line.strip():
+                frames += 1
+
+
+def _frame_reader(sock: socket.socket) -> int:
+    frames = 0
+    reader = FrameReader(sock)
+    while True:
+        frame = reader.read_frame()
+        if frame is None:
+            return frames
+        # decodificar como lo hace el servidor antes de json.loads
+        if str(frame, "utf-8"):
+            frames += 1
+
+
+def _run(kind: str, size: int, count: int) -> dict:
+    payload = b'{"type": "PUT", "value": "' + b"x" * max(0, size - 30) + b'"}'
+    mode = FRAME_LENGTH if kind == "length" else FRAME_NEWLINE
+    frame = encode_frame(payload, mode)
+    a, b = socket.socketpair()
+
+    def writer():
+        a.sendall(connection_preamble(mode))
+        for _ in range(count):
+            a.sendall(frame)
+        a.close()
+
+    t = threading.Thread(target=writer)
+    t0 = time.perf_counter()
+    t.start()
+    frames = _legacy_reader(b) if kind == "legacy_str" else _frame_reader(b)
+    elapsed = time.perf_counter() - t0
+    t.join()
+    b.close()
+    assert frames == count, f"{kind}: {frames} != {count}"
+    total_mb = len(payload) * count / (1024 * 1024)
+    return {
+        "reader": kind,
+        "size": size,
+        "frames": count,
+        "mb_per_sec": round(total_mb / elapsed, 1),
+        "frames_per_sec": round(count / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--total-mb", type=int, default=64, help="MB transferidos por caso")
+    parser.add_argument("--legacy-max", type=int, default=4 * 1024 * 1024)
+    parser.add_argument("--json", default=None)
+    args = parser.parse_args()
+
+    rows = []
+    for size in SIZES:
+        count = max(2, args.total_mb * 1024 * 1024 // size)
+        for kind in ("legacy_str", "newline", "length"):
+            if kind == "legacy_str" and size > args.legacy_max:
+                continue
+            rows.append(_run(kind, size, count))
+
+    print_table(rows, ["reader", "size", "frames", "mb_per_sec", "frames_per_sec"])
+    write_results(args.json, "framing", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Experimento de anillo grande sobre el transporte en memoria (src/loopback.py).
+
+Arma un anillo de N nodos ChordNode sin sockets, corre stabilize hasta que los
+successors/predecessors formen el anillo ordenado, refresca las finger tables y
+mide lookups desde nodos al azar: hops (p50/p99/max, a comparar con log2(N)),
+lookups correctos contra la referencia y mensajes enviados por fase. Con
+--modes recursive,iterative mide ambos modos de lookup sobre el mismo anillo.
+
+Uso:
+    python -m bench.bench_ring --nodes 500 --lookups 2000 --json ring.json
+    python -m bench.bench_ring --nodes 500 --modes recursive,iterative --latency 0.001
+"""
+import argparse
+import logging
+import math
+import random
+import time
+
+from bench.common import percentile, print_table, write_results
+from src.loopback import LoopbackNetwork, LoopbackRing
+
+
+def run(nodes: int, lookups: int, latency: float, seed: int, modes=("recursive",)) -> list:
+    random.seed(seed)
+    network = LoopbackNetwork(latency=latency, seed=seed)
+    ring = LoopbackRing(network, storage=False)
+
+    t0 = time.perf_counter()
+    ring.build(nodes)
+    build_s = time.perf_counter() - t0
+    sent0 = network.get_stats()["sent"]
+
+    t0 = time.perf_counter()
+    rounds = ring.stabilize_until_converged(max_rounds=10 * nodes)
+    converge_s = time.perf_counter() - t0
+    sent1 = network.get_stats()["sent"]
+
+    t0 = time.perf_counter()
+    ring.fix_fingers()
+    fingers_s = time.perf_counter() - t0
+    sent2 = network.get_stats()["sent"]
+
+    setup = {
+        "nodes": nodes,
+        "build_s": round(build_s, 3),
+        "converge_rounds": rounds,
+        "converge_s": round(converge_s, 3),
+        "converge_msgs": sent1 - sent0,
+        "fingers_s": round(fingers_s, 3),
+        "fingers_msgs": sent2 - sent1,
+    }
+    rows = []
+    for mode in modes:
+        # mismos orígenes y claves en cada modo
+        rng = random.Random(seed)
+        hops, correct = [], 0
+        t0 = time.perf_counter()
+        for i in range(lookups):
+            key = f"clave-{i}"
+            succ, h = ring.lookup(key, rng.choice(ring.nodes), iterative=mode == "iterative")
+            hops.append(h)
+            correct += bool(succ) and succ[2] == ring.responsible_for(key).node_id
+        lookup_s = time.perf_counter() - t0
+        sent3 = network.get_stats()["sent"]
+        rows.append({
+            **setup,
+            "mode": mode,
+            "lookups": lookups,
+            "lookup_correct": correct,
+            "log2_n": round(math.log2(nodes), 2),
+            "hops_mean": round(sum(hops) / len(hops), 2) if hops else 0.0,
+            "hops_p50": percentile(hops, 50),
+            "hops_p99": percentile(hops, 99),
+            "hops_max": max(hops) if hops else 0,
+            "lookup_msgs_per_op": round((sent3 - sent2) / max(1, lookups), 2),
+            "lookup_us_per_op": round(lookup_s / max(1, lookups) * 1e6, 1),
+        })
+        sent2 = sent3
+    ring.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", default="100,500", help="tamaños de anillo separados por coma")
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.0, help="latencia por tramo en segundos")
+    parser.add_argument("--modes", default="recursive", help="modos de lookup separados por coma (recursive, iterative)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    modes = tuple(args.modes.split(","))
+    rows = [row for n in args.nodes.split(",") for row in run(int(n), args.lookups, args.latency, args.seed, modes)]
+    print_table(rows, ["nodes", "mode", "converge_rounds", "converge_s", "fingers_msgs", "lookup_correct", "log2_n",
+                       "hops_mean", "hops_p50", "hops_p99", "hops_max", "lookup_msgs_per_op"])
+    write_results(args.json, "ring", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Microbenchmark de las decisiones de ruteo de ChordNode (src/ring.py).
+
+Compara la aritmética con IDs hex (int(x, 16) en cada comparación, como hacía
+_is_between) con la de src/ring.py (IDs como int precalculados en NodeRef):
+- is_between: una verificación de intervalo.
+- closest_preceding: recorrer la finger table buscando el finger más cercano.
+- known_scan / known_index: el mismo closest_preceding sobre todos los nodos conocidos
+  (--known), con recorrido lineal o con el bisect de RoutingIndex.
+- segment_check: between_many de un lote de claves contra (yo, successor].
+- find_successor_local: _find_successor_hops de un nodo real, sin red (la clave
+  cae en su segmento o no hay finger que la preceda).
+Reporta decisiones por segundo.
+
+Uso:
+    python -m bench.bench_routing --iterations 20000 --json routing.json
+"""
+import argparse
+import hashlib
+import logging
+import random
+import timeit
+
+from bench.common import print_table, write_results
+from src.overlay import ChordNode
+from src.ring import NodeRef, RoutingIndex, between, between_many, closest_preceding, distance, to_int
+
+
+def _hex_between(key: str, start: str, end: str, inclusive: bool = True) -> bool:
+    """La versión anterior de ChordNode._is_between (parsea los tres hex)."""
+    key_int, start_int, end_int = int(key, 16), int(start, 16), int(end, 16)
+    if start_int < end_int:
+        return start_int < key_int <= end_int if inclusive else start_int < key_int < end_int
+    if start_int > end_int:
+        return start_int < key_int or key_int <= end_int if inclusive else start_int < key_int or key_int < end_int
+    return inclusive and key_int == start_int
+
+
+def _hex_closest(fingers, node_id: str, key_id: str):
+    for node in reversed(fingers):
+        if _hex_between(node[2], node_id, key_id, inclusive=False):
+            return node
+    return None
+
+
+def _ids(n: int, seed: int):
+    rng = random.Random(seed)
+    return [hashlib.sha1(str(rng.random()).encode()).hexdigest() for _ in range(n)]
+
+
+def _rate(fn, iterations: int, decisions: int = 1) -> float:
+    best = min(timeit.repeat(fn, number=iterations, repeat=3))
+    return round(iterations * decisions / best, 1)
+
+
+def run(iterations: int, fingers: int, batch: int, seed: int, known: int = 256):
+    node_id, succ_id, *others = _ids(2 + fingers + batch + known, seed)
+    node_int = to_int(node_id)
+    finger_ids = sorted(others[:fingers], key=lambda x: (to_int(x) - node_int) % (1 << 160))
+    keys = others[fingers:fingers + batch]
+    hex_fingers = [("10.0.0.1", 5000, f) for f in finger_ids]
+    refs = [NodeRef(*f) for f in hex_fingers]
+    key_ints = [to_int(k) for k in keys]
+    succ_int = to_int(succ_id)
+    known_refs = sorted((NodeRef("10.0.0.2", 5000, k) for k in others[fingers + batch:]),
+                        key=lambda ref: distance(node_int, ref.id_int))
+    index = RoutingIndex(node_int)
+    for ref in known_refs:
+        index.add(ref)
+    key, key_int = keys[0], key_ints[0]
+
+    node = ChordNode("127.0.0.1", 5000, maintenance=False)
+    node.successor = ("127.0.0.1", 5001, succ_id)
+    node.finger_table = []  # sin fingers: la decisión se toma localmente, sin red
+
+    rows = [
+        {"case": "is_between",
+         "hex_per_sec": _rate(lambda: _hex_between(key, node_id, succ_id), iterations),
+         "int_per_sec": _rate(lambda: between(key_int, node_int, succ_int), iterations)},
+        {"case": "closest_preceding",
+         "hex_per_sec": _rate(lambda: _hex_closest(hex_fingers, node_id, key), iterations),
+         "int_per_sec": _rate(lambda: closest_preceding(refs, node_int, key_int), iterations)},
+        {"case": "segment_check",
+         "hex_per_sec": _rate(lambda: [_hex_between(k, node_id, succ_id) for k in keys], iterations // 10, batch),
+         "int_per_sec": _rate(lambda: between_many(key_ints, node_int, succ_int), iterations // 10, batch)},
+        {"case": "known_scan",
+         "hex_per_sec": None,
+         "int_per_sec": _rate(lambda: closest_preceding(known_refs, node_int, key_int), iterations)},
+        {"case": "known_index",
+         "hex_per_sec": None,
+         "int_per_sec": _rate(lambda: index.closest_preceding(key_int), iterations)},
+        {"case": "find_successor_local",
+         "hex_per_sec": None,
+         "int_per_sec": _rate(lambda: node._find_successor_hops(key), iterations)},
+    ]
+    for row in rows:
+        if row["hex_per_sec"]:
+            row["speedup"] = round(row["int_per_sec"] / row["hex_per_sec"], 2)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--fingers", type=int, default=16, help="tamaño de la finger table")
+    parser.add_argument("--batch", type=int, default=64, help="claves por segment_check")
+    parser.add_argument("--known", type=int, default=256, help="nodos conocidos para known_scan/known_index")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    rows = run(args.iterations, args.fingers, args.batch, args.seed, args.known)
+    print_table(rows, ["case", "hex_per_sec", "int_per_sec", "speedup"])
+    write_results(args.json, "routing", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark: TCPServer modo "thread" vs modo "asyncio".
+
+El servidor corre en un proceso aparte (para que el cliente no compita por el GIL)
+con un handler de eco. El cliente abre C conexiones concurrentes desde un solo
+event loop y en cada una envía M mensajes request/response, midiendo la latencia
+de ida y vuelta. Se reporta msgs/seg, p50/p99 y el máximo de hilos vivos en el
+servidor durante la corrida.
+
+Uso:
+    python -m bench.bench_server_modes --connections 200 --messages 50 --json out.json
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import socket
+import threading
+import time
+
+from bench.common import print_table, summarize, write_results
+from src.networking import MODE_ASYNCIO, MODE_THREAD, TCPServer
+
+
+def _echo_handler(msg, addr):
+    return {"type": "ECHO", "seq": msg.get("seq"), "threads": threading.active_count()}
+
+
+def _serve(mode: str, port: int, stop_event):
+    import logging
+    logging.disable(logging.CRITICAL)
+    server = TCPServer("127.0.0.1", port, _echo_handler, mode=mode)
+    server.start()
+    stop_event.wait()
+    server.stop()
+
+
+def _wait_port(port: int, timeout: float = 10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"El servidor no levantó en el puerto {port}")
+
+
+async def _client(port: int, messages: int, payload: str, latencies: list, peak: list):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port, limit=2 ** 26)
+    try:
+        for seq in range(messages):
+            data = (json.dumps({"type": "BENCH", "seq": seq, "payload": payload}) + "\n").encode()
+            t0 = time.perf_counter()
+            writer.write(data)
+            await writer.drain()
+            line = await reader.readline()
+            latencies.append(time.perf_counter() - t0)
+            peak[0] = max(peak[0], json.loads(line).get("threads", 0))
+    finally:
+        writer.close()
+
+
+async def _drive(port: int, connections: int, messages: int, payload: str):
+    latencies, peak = [], [0]
+    t0 = time.perf_counter()
+    await asyncio.gather(*(
+        _client(port, messages, payload, latencies, peak) for _ in range(connections)
+    ))
+    return latencies, time.perf_counter() - t0, peak[0]
+
+
+def run_mode(mode: str, port: int, connections: int, messages: int, size: int) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    stop_event = ctx.Event()
+    proc = ctx.Process(target=_serve, args=(mode, port, stop_event), daemon=True)
+    proc.start()
+    try:
+        _wait_port(port)
+        latencies, elapsed, peak_threads = asyncio.run(
+            _drive(port, connections, messages, "x" * size)
+        )
+    finally:
+        stop_event.set()
+        proc.join(timeout=5)
+        if proc.is_alive():
+            proc.terminate()
+    row = {"mode": mode, "connections": connections, "size": size}
+    row.update(summarize(latencies, elapsed))
+    row["peak_server_threads"] = peak_threads
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=50, help="mensajes por conexión")
+    parser.add_argument("--size", type=int, default=64, help="bytes de payload")
+    parser.add_argument("--port", type=int, default=19500)
+    parser.add_argument("--json", default=None, help="archivo de salida JSON")
+    args = parser.parse_args()
+
+    rows = []
+    for i, mode in enumerate((MODE_THREAD, MODE_ASYNCIO)):
+        rows.append(run_mode(mode, args.port + i, args.connections, args.messages, args.size))
+
+    print_table(rows, ["mode", "connections", "messages", "msgs_per_sec", "p50_ms", "p99_ms", "peak_server_threads"])
+    write_results(args.json, "server_modes", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Estudio de escala con el simulador de eventos discretos (src/simulator.py).
+
+Arma un anillo convergido de N nodos simulados, agrega lookups, PUT/GET y un
+evento de churn (joins y/o caídas), y corre hasta --until segundos virtuales.
+Reporta latencias de lookup y GET en tiempo virtual, hops, mensajes por nodo y
+el tiempo hasta volver a converger. Misma --seed, mismo resultado.
+
+Uso:
+    python -m bench.bench_sim --nodes 10000 --until 30 --json sim.json
+"""
+import argparse
+import logging
+import time
+
+from bench.common import print_table, write_results
+from src.simulator import Simulator
+
+
+def run(args, nodes: int) -> dict:
+    t0 = time.perf_counter()
+    sim = Simulator(seed=args.seed, latency=args.latency, jitter=args.jitter, loss=args.loss)
+    sim.bootstrap(nodes)
+    sim.add_lookups(args.lookups, start=1, duration=args.until / 3)
+    sim.add_storage_ops(args.puts, args.gets, start=1, duration=args.until / 3)
+    if args.joins or args.failures:
+        sim.add_churn(joins=args.joins, failures=args.failures, at=args.until / 3)
+    sim.run(until=args.until)
+    report = sim.report()
+    report["wall_s"] = round(time.perf_counter() - t0, 2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", default="1000,10000", help="tamaños de anillo separados por coma")
+    parser.add_argument("--until", type=float, default=30.0, help="segundos virtuales")
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--puts", type=int, default=100)
+    parser.add_argument("--gets", type=int, default=100)
+    parser.add_argument("--joins", type=int, default=10)
+    parser.add_argument("--failures", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.02, help="latencia por tramo (s)")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--loss", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    reports = [run(args, int(n)) for n in args.nodes.split(",")]
+    rows = [{
+        "nodes": r["nodes"],
+        "events": r["events"],
+        "wall_s": r["wall_s"],
+        "lookup_p50_ms": r["lookup_latency_ms"]["p50"],
+        "lookup_p99_ms": r["lookup_latency_ms"]["p99"],
+        "hops_p50": r["lookup_hops"]["p50"],
+        "hops_p99": r["lookup_hops"]["p99"],
+        "get_p99_ms": r["get_latency_ms"]["p99"],
+        "msgs_per_node_p99": r["messages"]["per_node"]["p99"],
+        "converge_s": r["convergence"][0]["time_to_converge"] if r["convergence"] else None,
+    } for r in reports]
+    print_table(rows, list(rows[0]))
+    write_results(args.json, "sim", reports)
+
+
+if __name__ == "__main__":
+    main()
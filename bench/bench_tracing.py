@@ -0,0 +1,122 @@
+"""
+Benchmark del costo de loguear por mensaje (src/tracing.py).
+
+1. Micro: costo por llamada de la línea de log del camino caliente:
+   - legacy:  logging.info(f"Mensaje recibido de {addr}: {msg}") a un handler de archivo
+   - off:     trace.debug("msg_in", ...) con el subsistema apagado (por defecto)
+   - sampled: trace.debug con nivel debug y sample=0.01
+   - async:   trace.debug con nivel debug hacia AsyncFileSink
+2. Throughput: TCPServer con un handler de eco, request/response secuencial por
+   una conexión, con trazas tcp=debug (equivalente al logging.info original)
+   y con la configuración por defecto.
+
+El log va a un archivo temporal; con --console va a stderr como en el nodo real
+(ahí la diferencia es mucho mayor).
+
+Uso:
+    python -m bench.bench_tracing --messages 20000 --json tracing.json
+"""
+import argparse
+import json
+import logging
+import os
+import socket
+import sys
+import tempfile
+import time
+
+from bench.common import print_table, summarize, write_results
+from src import tracing
+from src.networking import TCPServer
+
+MSG = {"type": "PUT", "sender_id": "a1b2c3d4", "request_id": "PUT_a1b2c3d4_1700000000",
+       "data": {"key": "usuario:1234", "value": "x" * 64}}
+ADDR = ("127.0.0.1", 50123)
+
+
+def _redirect_logging(path, console: bool):
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    handler = logging.StreamHandler(sys.stderr) if console else logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+
+def _micro(kind: str, count: int, tmpdir: str) -> dict:
+    tracing.reset()
+    tracer = tracing.get_tracer("tcp")
+    sink = None
+    if kind == "sampled":
+        tracing.configure(levels={"tcp": "debug"}, sample={"tcp": 0.01})
+    elif kind == "async":
+        sink = tracing.AsyncFileSink(os.path.join(tmpdir, "trace.jsonl"), max_queue=count + 1)
+        tracing.configure(levels={"tcp": "debug"}, sink=sink)
+
+    t0 = time.perf_counter()
+    if kind == "legacy":
+        for _ in range(count):
+            logging.info(f"Mensaje recibido de {ADDR}: {MSG}")
+    else:
+        for _ in range(count):
+            tracer.debug("msg_in", peer=ADDR, msg=MSG)
+    elapsed = time.perf_counter() - t0
+    if sink is not None:
+        sink.flush(timeout=30)
+    tracing.reset()
+    return {"case": kind, "calls": count, "us_per_call": round(elapsed / count * 1e6, 3),
+            "calls_per_sec": round(count / elapsed, 1)}
+
+
+def _throughput(kind: str, port: int, count: int) -> dict:
+    tracing.reset()
+    if kind == "tcp_debug":
+        # mismo volumen de salida que los logging.info por mensaje originales
+        tracing.configure(levels={"tcp": "debug"})
+
+    server = TCPServer("127.0.0.1", port, lambda m, a: {"type": "ECHO", "seq": m.get("seq")})
+    server.start()
+    time.sleep(0.2)
+    latencies = []
+    try:
+        with socket.create_connection(("127.0.0.1", port)) as sock:
+            reader = sock.makefile("rb")
+            t0 = time.perf_counter()
+            for seq in range(count):
+                data = (json.dumps({**MSG, "seq": seq}) + "\n").encode()
+                t1 = time.perf_counter()
+                sock.sendall(data)
+                reader.readline()
+                latencies.append(time.perf_counter() - t1)
+            elapsed = time.perf_counter() - t0
+    finally:
+        server.stop()
+        tracing.reset()
+    row = {"case": kind}
+    row.update(summarize(latencies, elapsed))
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000, help="mensajes/llamadas por caso")
+    parser.add_argument("--port", type=int, default=19600)
+    parser.add_argument("--console", action="store_true", help="loguear a stderr en vez de a un archivo")
+    parser.add_argument("--json", default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _redirect_logging(os.path.join(tmpdir, "log.txt"), args.console)
+        micro = [_micro(kind, args.messages, tmpdir) for kind in ("legacy", "off", "sampled", "async")]
+        server = [_throughput(kind, args.port + i, args.messages)
+                  for i, kind in enumerate(("tcp_debug", "default"))]
+
+    print_table(micro, ["case", "calls", "us_per_call", "calls_per_sec"])
+    print()
+    print_table(server, ["case", "messages", "msgs_per_sec", "p50_ms", "p99_ms", "p999_ms"])
+    write_results(args.json, "tracing", {"micro": micro, "server": server})
+
+
+if __name__ == "__main__":
+    main()
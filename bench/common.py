@@ -0,0 +1,69 @@
+"""
+Utilidades compartidas por los benchmarks: percentiles, resúmenes y salida JSON.
+"""
+import json
+import math
+import os
+import platform
+import subprocess
+import time
+from typing import Any, Dict, List, Optional
+
+
+def percentile(samples: List[float], p: float) -> float:
+    """Percentil p (0-100) por el método nearest-rank. Lista vacía -> 0.0"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(p / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies: List[float], elapsed: float, count: Optional[int] = None) -> Dict[str, float]:
+    """Resume latencias (en segundos) y throughput de una corrida."""
+    count = len(latencies) if count is None else count
+    ordered = sorted(latencies)
+    return {
+        "messages": count,
+        "elapsed_s": round(elapsed, 4),
+        "msgs_per_sec": round(count / elapsed, 1) if elapsed > 0 else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "p999_ms": round(percentile(ordered, 99.9) * 1000, 3),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5,
+        )
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def write_results(path: Optional[str], name: str, results: Any) -> Dict[str, Any]:
+    """Agrega metadatos (commit, máquina, fecha) y guarda el resultado en JSON si hay path."""
+    report = {
+        "benchmark": name,
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.time(),
+        "results": results,
+    }
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def print_table(rows: List[Dict[str, Any]], columns: List[str]):
+    """Imprime filas de resultados como una tabla simple."""
+    widths = {c: max(len(c), *(len(str(r.get(c, ""))) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for r in rows:
+        print("  ".join(str(r.get(c, "")).ljust(widths[c]) for c in columns))
@@ -0,0 +1,244 @@
+"""
+Generador de carga para la capa de red (TCPServer).
+
+Levanta un TCPServer en un proceso aparte y lo ataca con N clientes concurrentes
+(cada uno con su propio TCPServer cliente, como si fueran N nodos). Cada
+escenario combina:
+- patrón: "send" (send_message, fire-and-forget), "request" (request_response)
+  o una mezcla ponderada, p. ej. "send:70,request:30"
+- tamaño de payload: de bytes a varios MB
+
+Reporta por escenario throughput, latencias p50/p99/p999 (ida y vuelta para
+request; tiempo de la llamada para send) y CPU por mensaje de cliente y de
+servidor. Para send, el tiempo total incluye esperar a que el servidor haya
+recibido todos los mensajes.
+
+Uso:
+    python -m bench.loadgen --clients 8 --messages 2000 --json run.json
+    python -m bench.loadgen --pattern send:70,request:30 --sizes 64,1048576
+    python -m bench compare base.json run.json
+"""
+import argparse
+import logging
+import multiprocessing
+import random
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from bench.common import print_table, summarize, write_results
+from src.networking import SERVER_MODES, TCPServer
+
+SEND = "send"
+REQUEST = "request"
+PATTERNS = (SEND, REQUEST)
+
+DEFAULT_SIZES = "64,4096,65536,1048576,8388608"
+DEFAULT_PATTERNS = "send;request;send:70,request:30"
+
+# Tipos de mensaje del generador
+LG_SEND = "LG_SEND"
+LG_REQUEST = "LG_REQUEST"
+LG_STATS = "LG_STATS"
+
+
+def parse_mix(spec: str) -> List[Tuple[str, int]]:
+    """'send:70,request:30' -> [("send", 70), ("request", 30)]; 'send' -> [("send", 1)]"""
+    mix = []
+    for item in spec.split(","):
+        name, _, weight = item.strip().partition(":")
+        if name not in PATTERNS:
+            raise ValueError(f"Patrón desconocido: {name} (usar {', '.join(PATTERNS)})")
+        mix.append((name, int(weight) if weight else 1))
+    return mix
+
+
+# ---------------- servidor ----------------
+
+def _serve(port: int, server_kwargs: Dict[str, Any], ready, stop_event):
+    logging.disable(logging.CRITICAL)
+    lock = threading.Lock()
+    received = [0]
+
+    def handler(msg, addr):
+        msg_type = msg.get("type")
+        if msg_type == LG_SEND:
+            with lock:
+                received[0] += 1
+            return None
+        if msg_type == LG_REQUEST:
+            with lock:
+                received[0] += 1
+            return {"type": "LG_ACK", "seq": msg.get("seq")}
+        if msg_type == LG_STATS:
+            with lock:
+                count = received[0]
+            return {"type": "LG_STATS_RESPONSE", "received": count, "cpu": time.process_time()}
+        return None
+
+    server = TCPServer("127.0.0.1", port, handler, **server_kwargs)
+    server.start()
+    ready.set()
+    stop_event.wait()
+    server.stop()
+
+
+def _wait_port(port: int, timeout: float = 10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"El servidor no levantó en el puerto {port}")
+
+
+# ---------------- clientes ----------------
+
+def _client(client: TCPServer, port: int, ops: List[str], payload: str, timeout: float,
+            latencies: List[float], errors: List[int], start: threading.Barrier):
+    local_lat = []
+    failed = 0
+    start.wait()
+    for seq, op in enumerate(ops):
+        t0 = time.perf_counter()
+        if op == SEND:
+            ok = client.send_message("127.0.0.1", port, {"type": LG_SEND, "seq": seq, "payload": payload},
+                                     timeout=timeout)
+        else:
+            response = client.request_response("127.0.0.1", port,
+                                               {"type": LG_REQUEST, "seq": seq, "payload": payload},
+                                               timeout=timeout)
+            ok = response is not None and response.get("seq") == seq
+        local_lat.append(time.perf_counter() - t0)
+        if not ok:
+            failed += 1
+    latencies.extend(local_lat)
+    errors.append(failed)
+
+
+def _server_stats(probe: TCPServer, port: int) -> Dict[str, Any]:
+    return probe.request_response("127.0.0.1", port, {"type": LG_STATS}, timeout=10) or {}
+
+
+def run_scenario(port: int, pattern: str, size: int, clients: int, messages: int,
+                 timeout: float = 30.0, seed: int = 0, client_kwargs: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Corre un escenario contra un servidor ya levantado en port y retorna la fila de resultados."""
+    mix = parse_mix(pattern)
+    rng = random.Random(seed)
+    names = [name for name, _ in mix]
+    weights = [w for _, w in mix]
+    plans = [rng.choices(names, weights, k=messages) for _ in range(clients)]
+    payload = "x" * size
+    client_kwargs = client_kwargs or {}
+
+    nodes = [TCPServer("127.0.0.1", 0, lambda m, a: None, **client_kwargs) for _ in range(clients)]
+    probe = TCPServer("127.0.0.1", 0, lambda m, a: None)
+    before = _server_stats(probe, port)
+
+    latencies: List[float] = []
+    errors: List[int] = []
+    start = threading.Barrier(clients + 1)
+    threads = [
+        threading.Thread(target=_client, args=(node, port, ops, payload, timeout, latencies, errors, start))
+        for node, ops in zip(nodes, plans)
+    ]
+    for t in threads:
+        t.start()
+    cpu0 = time.process_time()
+    start.wait()
+    t0 = time.perf_counter()
+    for t in threads:
+        t.join()
+    for node in nodes:
+        node.flush(timeout=timeout)
+
+    # los send_message terminan cuando el servidor los recibió
+    expected = before.get("received", 0) + clients * messages - sum(errors)
+    deadline = time.monotonic() + timeout
+    after = _server_stats(probe, port)
+    while after.get("received", 0) < expected and time.monotonic() < deadline:
+        time.sleep(0.01)
+        after = _server_stats(probe, port)
+    elapsed = time.perf_counter() - t0
+    client_cpu = time.process_time() - cpu0
+
+    for node in nodes + [probe]:
+        node.stop()
+
+    total = clients * messages
+    delivered = after.get("received", 0) - before.get("received", 0)
+    row = {"pattern": pattern, "size": size, "clients": clients}
+    row.update(summarize(latencies, elapsed, count=total))
+    row["errors"] = sum(errors)
+    row["lost"] = max(0, total - sum(errors) - delivered)
+    row["mb_per_sec"] = round(total * size / (1024 * 1024) / elapsed, 1) if elapsed > 0 else 0.0
+    row["client_cpu_us_per_msg"] = round(client_cpu / total * 1e6, 1)
+    row["server_cpu_us_per_msg"] = round((after.get("cpu", 0) - before.get("cpu", 0)) / max(1, delivered) * 1e6, 1)
+    return row
+
+
+def messages_for_size(size: int, messages: int, clients: int, total_mb: int) -> int:
+    """Limita los mensajes por cliente para que un escenario no mueva más de total_mb."""
+    budget = total_mb * 1024 * 1024 // max(1, size * clients)
+    return max(1, min(messages, budget))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m bench.loadgen", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=8, help="clientes concurrentes")
+    parser.add_argument("--messages", type=int, default=1000, help="mensajes por cliente")
+    parser.add_argument("--pattern", default=DEFAULT_PATTERNS,
+                        help="patrones separados por ';' (cada uno: send, request o mezcla send:70,request:30)")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="tamaños de payload en bytes, separados por coma")
+    parser.add_argument("--total-mb", type=int, default=256, help="tope de MB por escenario (recorta --messages)")
+    parser.add_argument("--mode", choices=SERVER_MODES, default="thread", help="motor del servidor")
+    parser.add_argument("--workers", type=int, default=0, help="WorkerPool del servidor (0 = sin pool)")
+    parser.add_argument("--coalesce-window", type=float, default=0.0, help="coalescing de send_message en clientes")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--port", type=int, default=19700)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="archivo de salida JSON")
+    args = parser.parse_args(argv)
+    # los TCPServer de los clientes loguean al detenerse; solo interesa la tabla
+    logging.getLogger().setLevel(logging.WARNING)
+
+    server_kwargs: Dict[str, Any] = {"mode": args.mode}
+    if args.workers:
+        server_kwargs["workers"] = args.workers
+    client_kwargs: Dict[str, Any] = {}
+    if args.coalesce_window:
+        client_kwargs["coalesce_window"] = args.coalesce_window
+
+    ctx = multiprocessing.get_context("spawn")
+    ready, stop_event = ctx.Event(), ctx.Event()
+    proc = ctx.Process(target=_serve, args=(args.port, server_kwargs, ready, stop_event), daemon=True)
+    proc.start()
+    rows = []
+    try:
+        ready.wait(timeout=10)
+        _wait_port(args.port)
+        for pattern in args.pattern.split(";"):
+            for size in (int(s) for s in args.sizes.split(",")):
+                count = messages_for_size(size, args.messages, args.clients, args.total_mb)
+                rows.append(run_scenario(args.port, pattern, size, args.clients, count,
+                                         timeout=args.timeout, seed=args.seed, client_kwargs=client_kwargs))
+    finally:
+        stop_event.set()
+        proc.join(timeout=5)
+        if proc.is_alive():
+            proc.terminate()
+
+    print_table(rows, ["pattern", "size", "clients", "messages", "msgs_per_sec", "mb_per_sec",
+                       "p50_ms", "p99_ms", "p999_ms", "client_cpu_us_per_msg", "server_cpu_us_per_msg",
+                       "errors", "lost"])
+    config = {k: v for k, v in vars(args).items() if k != "json"}
+    write_results(args.json, "loadgen", {"config": config, "scenarios": rows})
+    return rows
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ MAIN.PY COMPLETO - Con menú interactivo + Módulo 4 Storage
 SIN logs spam + NOMBRES ÚNICOS + GET/PUT funcionando
 """
 import time
+from src import tracing
+from src.metrics import format_snapshot, stats_response
 from src.networking import TCPServer
 from src.overlay import ChordNode
 from src.protocol import Message, MessageType
@@ -26,21 +28,26 @@ def handle_incoming_message(msg: dict, addr: tuple):
         "CHORD_GET_PRED", "CHORD_NOTIFY", "CHORD_GET_PREDECESSOR",
         "JOIN_REQUEST", "FIND_SUCCESSOR"
     ]:
-        response = chord.handle_message(msg)
-        if response:
-            server.send_message(addr[0], addr[1], response)
-        return
+        # la respuesta vuelve por el mismo socket (request_response del otro nodo)
+        return chord.handle_message(msg)
     
     # STORAGE MESSAGES (PUT/GET/REPLICATE/RESULT)
     if msg_type in ["PUT", "REPLICATE", "RESULT", "GET"]:
         response = storage.handle_storage_message(msg)
         if response:
-            # Responder al ORIGEN (sender_ip/port) o addr
+            # Sin dirección de origen (request/response): responder por el mismo socket
+            if "sender_ip" not in msg:
+                return response
+            # Responder al ORIGEN (sender_ip/port)
             sender_ip = msg.get("sender_ip", addr[0])
             sender_port = msg.get("sender_port", addr[1])
             server.send_message(sender_ip, sender_port, response)
         return
     
+    # MÉTRICAS DEL NODO
+    if msg_type == "STATS":
+        return stats_response(node_id=chord.node_id)
+    
     # MENSAJES DE APLICACIÓN
     print(f"\n{'='*60}")
     print(f"MENSAJE RECIBIDO [{msg_type}]")
@@ -86,7 +93,9 @@ def mostrar_menu():
     print("  get <clave>                  - GET distribuido (usa Chord)")
     print("  storage                      - Ver storage local")
     print("  status                       - Estado Chord")
+    print("  stats [ip puerto]            - Métricas (local o de otro nodo)")
     print("  maintenance [on/off]         - Control spam")
+    print("  trace <subsistema> <nivel>   - Trazas (tcp/storage: debug, info, warning)")
     print("  help                         - Este menú")
     print("  quit                         - Salir")
     print(f"{'='*60}\n")
@@ -101,6 +110,9 @@ def main():
 ╚══════════════════════════════════════════════════════════╝
     """)
     
+    # Trazas: CHORD_TRACE="tcp=debug", CHORD_TRACE_SAMPLE, CHORD_TRACE_FILE
+    tracing.configure_from_env()
+
     # Configuración
     print("Configuración del nodo:")
     mi_ip = input("Tu IP (0.0.0.0 para todas): ").strip() or "0.0.0.0"
@@ -112,16 +124,26 @@ def main():
     nombre_nodo = f"Nodo-{ultimo_octeto}-{mi_puerto_str}"
     
     # Módulos
-    server = TCPServer(mi_ip, mi_puerto, handle_incoming_message)
+    # coalesce_window: los mensajes de mantenimiento al mismo peer salen juntos
+    # udp: heartbeats y NOTIFY por datagramas; storage sigue por TCP
+    # control_workers: stabilize/heartbeats no esperan detrás de ráfagas de PUT/REPLICATE
+    # codec binario: se negocia por conexión; con nodos viejos se sigue en JSON
+    server = TCPServer(mi_ip, mi_puerto, handle_incoming_message, coalesce_window=0.002, udp=True,
+                       workers=8, control_workers=2, codec="binary")
     server.start()
     print(f"📡 TCP {mi_ip}:{mi_puerto} [{nombre_nodo}]")
     
     chord = ChordNode(mi_ip, mi_puerto)
     chord.mi_ip = mi_ip
     chord.mi_puerto = mi_puerto
+    # ambos callbacks usan el pool de conexiones del servidor
     chord.set_send_callback(server.send_message)
+    chord.set_request_callback(server.request_response)
+    chord.set_request_async_callback(server.request_async)
+    chord.set_control_callbacks(server.send_control, server.request_control)
     
     storage = DistributedStorage(chord.node_id, server.send_message, chord)
+    storage.set_request_async_callback(server.request_async)
     chord.maintenance_paused = True  # SIN SPAM
     print(f"✅ ID: {chord.node_id[:8]}  [PAUSADO]  R={storage.replication_factor}")
     
@@ -185,12 +207,8 @@ def main():
                 
                 if responsible:
                     print(f"📤 PUT {key} → {responsible[2][:8]} ({responsible[0]}:{responsible[1]})")
-                    mensaje = Message(
-                        msg_type=MessageType.PUT,
-                        sender_id=chord.node_id[:8],
-                        data={"key": key, "value": value}
-                    )
-                    server.send_message(responsible[0], responsible[1], mensaje.to_dict())
+                    # storage.put agrega la dirección de respuesta: un responsable viejo reenvía y avisa
+                    storage.put(key, value)
                 else:
                     print("❌ No hay nodo responsable")
             
@@ -251,6 +269,23 @@ def main():
                 print(f"Storage: {len(storage.local_storage)} claves")
                 print(f"{'='*60}\n")
             
+            # ==================== STATS ====================
+            elif comando == "stats":
+                if len(cmd) >= 3:
+                    response = server.request_response(cmd[1], int(cmd[2]), {"type": "STATS"})
+                    if not response or "metrics" not in response:
+                        print("❌ Sin respuesta STATS")
+                        continue
+                    origen = f"{cmd[1]}:{cmd[2]}"
+                else:
+                    response = stats_response(node_id=chord.node_id)
+                    origen = nombre_nodo
+                print(f"\n{'='*60}")
+                print(f"MÉTRICAS [{origen}]")
+                print(f"{'='*60}")
+                print(format_snapshot(response["metrics"]))
+                print(f"{'='*60}\n")
+            
             # ==================== MAINTENANCE ====================
             elif comando == "maintenance":
                 if len(cmd) > 1 and cmd[1] == "on":
@@ -260,6 +295,18 @@ def main():
                     chord.maintenance_paused = True
                     print("⏸️ Mantenimiento PAUSADO (SIN SPAM)")
             
+            # ==================== TRACE ====================
+            elif comando == "trace":
+                if len(cmd) < 3:
+                    for nombre, st in tracing.get_stats().items():
+                        print(f"  {nombre}: {st['level']} (emitidas={st['emitted']})")
+                    continue
+                try:
+                    tracing.configure(levels={cmd[1]: cmd[2]})
+                    print(f"🔎 Trazas {cmd[1]} = {cmd[2].upper()}")
+                except ValueError as e:
+                    print(f"❌ {e}")
+            
             elif comando == "help":
                 mostrar_menu()
             
@@ -268,7 +315,7 @@ def main():
                 break
             
             else:
-                print("❓ put/get/storage/status/join/maintenance/quit")
+                print("❓ put/get/storage/status/stats/join/maintenance/trace/quit")
     
     except KeyboardInterrupt:
         print("\n\nCtrl+C detectado...")
@@ -276,6 +323,8 @@ def main():
     finally:
         if chord: 
             chord.leave_network()
+        if storage:
+            storage.stop()
         if server: 
             server.stop()
         print("✅ Nodo cerrado correctamente")
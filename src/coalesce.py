@@ -0,0 +1,282 @@
+"""
+Coalescing de escrituras salientes por peer.
+
+El mantenimiento de Chord y la replicación envían muchos mensajes chicos al mismo
+peer en poco tiempo; con send_message directo cada uno es un sendall propio.
+Aquí cada peer tiene un PeerWriter (un hilo + una conexión) que acumula los frames
+encolados durante flush_window segundos y los escribe con un solo sendmsg
+(writev). Se mide cuántos frames salen por syscall.
+
+- El orden de los frames hacia un mismo peer se mantiene.
+- send() solo encola: retorna False si la cola del peer está llena. Los errores
+  de conexión se registran en el log y en el contador "dropped".
+- Un PeerWriter sin tráfico durante idle_timeout devuelve su conexión al pool
+  y termina su hilo.
+"""
+import logging
+import socket
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.pool import ConnectionPool, PooledConnection
+
+Peer = Tuple[str, int]
+
+# Máximo de buffers por sendmsg (IOV_MAX en Linux)
+MAX_IOV = 1024
+# Cada cuánto se drenan las respuestas que nadie lee en la conexión del writer
+_DRAIN_INTERVAL = 1.0
+
+
+def sendv(sock: socket.socket, frames: List[bytes]) -> int:
+    """
+    Escribe todos los frames con sendmsg (scatter/gather) reanudando las escrituras
+    parciales. Retorna la cantidad de syscalls usadas.
+    """
+    if not hasattr(sock, "sendmsg"):
+        # plataformas sin sendmsg (Windows): un solo sendall con los frames unidos
+        sock.sendall(b"".join(frames))
+        return 1
+    views = [memoryview(f) for f in frames]
+    syscalls = 0
+    i = 0
+    while i < len(views):
+        sent = sock.sendmsg(views[i:i + MAX_IOV])
+        syscalls += 1
+        while sent:
+            n = len(views[i])
+            if sent >= n:
+                sent -= n
+                i += 1
+            else:
+                views[i] = views[i][sent:]
+                sent = 0
+    return syscalls
+
+
+class PeerWriter:
+    """Cola de frames y hilo escritor hacia un peer."""
+
+    def __init__(self, sender: "CoalescingSender", peer: Peer):
+        self.sender = sender
+        self.peer = peer
+        self._frames: List[bytes] = []
+        self._first_at = 0.0       # cuándo se encoló el primer frame del lote actual
+        self._in_flight = False
+        self._retired = False
+        self._cv = threading.Condition()
+        self._conn: Optional[PooledConnection] = None
+        self._conn_used = False    # la conexión actual ya escribió al menos un lote
+        self._last_drain = 0.0
+        self._thread = threading.Thread(target=self._run, name=f"coalesce-{peer[0]}:{peer[1]}", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, data: bytes) -> Optional[bool]:
+        """True si se encoló, False si la cola está llena, None si el writer ya terminó."""
+        with self._cv:
+            if self._retired:
+                return None
+            if len(self._frames) >= self.sender.max_pending:
+                return False
+            if not self._frames:
+                self._first_at = time.monotonic()
+            self._frames.append(data)
+            self._cv.notify()
+            return True
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que la cola quede vacía y no haya un lote escribiéndose."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cv:
+            while self._frames or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cv.wait(remaining)
+        return True
+
+    def close(self):
+        with self._cv:
+            self._retired = True
+            self._cv.notify_all()
+        self._thread.join(timeout=1)
+
+    # ---------------- internos ----------------
+
+    def _run(self):
+        sender = self.sender
+        while True:
+            with self._cv:
+                idle_deadline = time.monotonic() + sender.idle_timeout
+                while not self._frames and not self._retired:
+                    remaining = idle_deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._retired = True
+                        break
+                    self._cv.wait(remaining)
+                if not self._frames:
+                    break
+                # ventana de flush: esperar más frames salvo que el lote ya esté lleno
+                flush_at = self._first_at + sender.flush_window
+                while not self._retired and len(self._frames) < sender.max_batch:
+                    remaining = flush_at - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cv.wait(remaining)
+                batch = self._frames[:sender.max_batch]
+                del self._frames[:sender.max_batch]
+                self._first_at = time.monotonic()
+                self._in_flight = True
+            try:
+                self._write(batch)
+            finally:
+                with self._cv:
+                    self._in_flight = False
+                    self._cv.notify_all()
+
+        sender._writer_done(self)
+        if self._conn is not None:
+            sender._release(self._conn)
+            self._conn = None
+
+    def _connection(self) -> PooledConnection:
+        conn = self._conn
+        now = time.monotonic()
+        if conn is not None and now - self._last_drain >= _DRAIN_INTERVAL:
+            # descartar respuestas acumuladas y detectar si el peer cerró
+            self._last_drain = now
+            healthy = ConnectionPool._is_healthy(conn)
+            conn.sock.settimeout(self.sender.timeout)
+            if not healthy:
+                self.sender._discard(conn)
+                conn = self._conn = None
+        if conn is None:
+            conn = self._conn = self.sender._connect(*self.peer)
+            self._conn_used = conn.reused
+            self._last_drain = now
+        return conn
+
+    def _write(self, batch: List[bytes]):
+        sender = self.sender
+        for _attempt in range(2):
+            try:
+                conn = self._connection()
+            except OSError as e:
+                logging.error(f"No se pudo conectar con {self.peer[0]}:{self.peer[1]}: {e}")
+                sender._record(dropped=len(batch))
+                return
+            try:
+                syscalls = sendv(conn.sock, batch)
+            except OSError as e:
+                sender._discard(conn)
+                self._conn = None
+                if self._conn_used and _attempt == 0:
+                    # conexión vieja rota: reintentar una vez con una nueva
+                    logging.debug(f"Conexión con {self.peer[0]}:{self.peer[1]} rota ({e}); reconectando")
+                    continue
+                logging.error(f"No se pudo enviar lote a {self.peer[0]}:{self.peer[1]}: {e}")
+                sender._record(dropped=len(batch))
+                return
+            self._conn_used = True
+            sender._record(frames=len(batch), syscalls=syscalls, batches=1,
+                           nbytes=sum(len(f) for f in batch))
+            return
+
+
+class CoalescingSender:
+    """
+    Un PeerWriter por peer. connect/release/discard son los del dueño de las
+    conexiones (TCPServer los conecta a su ConnectionPool).
+    - flush_window: segundos que se espera para juntar frames antes de escribir.
+    - max_batch: frames máximos por lote.
+    - max_pending: frames encolados máximos por peer (send() retorna False si se excede).
+    """
+
+    def __init__(self, connect: Callable[[str, int], PooledConnection],
+                 release: Callable[[PooledConnection], None],
+                 discard: Callable[[PooledConnection], None],
+                 flush_window: float = 0.002, max_batch: int = MAX_IOV,
+                 max_pending: int = 10000, idle_timeout: float = 30.0, timeout: float = 5.0):
+        self._connect = connect
+        self._release = release
+        self._discard = discard
+        self.flush_window = flush_window
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._writers: Dict[Peer, PeerWriter] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # contadores
+        self.frames = 0
+        self.syscalls = 0
+        self.batches = 0
+        self.bytes = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    def send(self, ip: str, port: int, data: bytes) -> bool:
+        """Encola un frame ya codificado hacia (ip, port)."""
+        peer = (ip, port)
+        while True:
+            with self._lock:
+                if self._closed:
+                    return False
+                writer = self._writers.get(peer)
+                if writer is None:
+                    writer = self._writers[peer] = PeerWriter(self, peer)
+            queued = writer.enqueue(data)
+            if queued is None:
+                # el writer se retiró por inactividad justo ahora: crear otro
+                self._writer_done(writer)
+                continue
+            if not queued:
+                with self._lock:
+                    self.rejected += 1
+            return queued
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que todos los frames encolados se hayan escrito."""
+        with self._lock:
+            writers = list(self._writers.values())
+        return all(w.wait_idle(timeout) for w in writers)
+
+    def close(self):
+        """Escribe lo pendiente, cierra los writers y devuelve sus conexiones."""
+        with self._lock:
+            self._closed = True
+            writers = list(self._writers.values())
+        for writer in writers:
+            writer.close()
+
+    def get_stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "frames": self.frames,
+                "syscalls": self.syscalls,
+                "batches": self.batches,
+                "bytes": self.bytes,
+                "dropped": self.dropped,
+                "rejected": self.rejected,
+                "writers": len(self._writers),
+                "frames_per_syscall": round(self.frames / self.syscalls, 2) if self.syscalls else 0.0,
+            }
+
+    # ---------------- internos ----------------
+
+    def _writer_done(self, writer: PeerWriter):
+        with self._lock:
+            if self._writers.get(writer.peer) is writer:
+                del self._writers[writer.peer]
+
+    def _record(self, frames: int = 0, syscalls: int = 0, batches: int = 0,
+                nbytes: int = 0, dropped: int = 0):
+        with self._lock:
+            self.frames += frames
+            self.syscalls += syscalls
+            self.batches += batches
+            self.bytes += nbytes
+            self.dropped += dropped
@@ -0,0 +1,433 @@
+"""
+Codecs de mensajes para el transporte TCP: JSON (formato original) y un formato
+binario compacto, negociado por conexión.
+
+Formato binario (versión CODEC_VERSION):
+- varint con el código del tipo de mensaje (posición en MESSAGE_TYPES + 1), o 0
+  si el tipo no tiene schema (entonces "type" viaja como un campo más).
+- Para tipos con schema: un varint con el bitmap de campos presentes y luego los
+  valores de esos campos en el orden del schema, sin nombres.
+- Un varint con la cantidad de campos extra (no previstos en el schema) y cada
+  uno como (clave, valor).
+- Cada valor lleva un byte de tag: None/False/True, entero (varint zigzag),
+  float64, string (varint de largo + UTF-8), ID (un hex de 40 caracteres viaja
+  como sus 20 bytes), lista o dict.
+- Las claves conocidas (KEYS) viajan como un varint con su índice; el resto como
+  largo + UTF-8.
+
+Los schemas y las tablas solo pueden crecer agregando al final: cambiar el orden
+requiere subir CODEC_VERSION.
+
+Negociación: el cliente que prefiere binario abre la conexión con
+CODEC_HELLO_MAGIC + versión (implica frames length-prefixed) y espera un byte: la
+versión aceptada, o 0 si el servidor no habla esa versión. Si la rechaza o no
+contesta (un nodo sin este codec) la conexión se descarta, se reconecta en JSON y
+el peer queda marcado para no volver a intentarlo (ver CodecNegotiator).
+"""
+import json
+import socket
+import struct
+import threading
+from typing import Any, Dict, Optional, Set, Tuple
+
+from src.framing import CODEC_HELLO_MAGIC, FRAME_LENGTH, connection_preamble
+
+CODEC_JSON = "json"
+CODEC_BINARY = "binary"
+CODECS = (CODEC_JSON, CODEC_BINARY)
+
+# Versión del formato binario que habla este nodo
+CODEC_VERSION = 1
+SUPPORTED_VERSIONS = (1,)
+
+Peer = Tuple[str, int]
+
+# Tipos de mensaje con schema: nombre -> campos en orden de bitmap
+SCHEMAS: Dict[str, Tuple[str, ...]] = {
+    "CHORD_FIND_SUCCESSOR": ("key_id", "requester_id", "corr_id"),
+    "SUCCESSOR_RESPONSE": ("key_id", "successor_ip", "successor_port", "successor_id", "hops", "corr_id"),
+    "JOIN_RESPONSE": ("successor_ip", "successor_port", "successor_id", "corr_id"),
+    "CHORD_GET_PREDECESSOR": ("requester_id", "requester_ip", "requester_port", "timestamp", "corr_id"),
+    "PREDECESSOR_RESPONSE": ("predecessor_ip", "predecessor_port", "predecessor_id", "node_id",
+                             "timestamp", "corr_id"),
+    "CHORD_NOTIFY": ("node_id", "ip", "port", "timestamp", "current_predecessor", "corr_id"),
+    "CHORD_UPDATE_SUCCESSOR": ("new_successor_ip", "new_successor_port", "new_successor_id",
+                               "leaving_node_id", "timestamp", "corr_id"),
+    "CHORD_UPDATE_PREDECESSOR": ("new_predecessor_ip", "new_predecessor_port", "new_predecessor_id",
+                                 "leaving_node_id", "timestamp", "corr_id"),
+    "CHORD_HEARTBEAT": ("node_id", "timestamp", "corr_id"),
+    "HEARTBEAT": ("node_id", "timestamp", "corr_id"),
+    "HEARTBEAT_ACK": ("timestamp", "corr_id"),
+    "ACK": ("request_id", "sender_id", "data", "error", "corr_id"),
+    "NO_REPLY": ("corr_id",),
+    "BUSY": ("error", "queue_depth", "corr_id"),
+    "PUT": ("request_id", "sender_id", "data", "timestamp", "corr_id"),
+    "GET": ("request_id", "sender_id", "sender_ip", "sender_port", "data", "timestamp", "corr_id"),
+    "RESULT": ("request_id", "sender_id", "data", "corr_id"),
+    "REPLICATE": ("request_id", "sender_id", "data", "timestamp", "corr_id"),
+    "LOOKUP": ("request_id", "sender_id", "data", "corr_id"),
+    "ERROR": ("request_id", "sender_id", "error", "data", "corr_id"),
+    "JOIN": ("sender_id", "data", "timestamp", "corr_id"),
+    "UPDATE": ("sender_id", "data", "timestamp", "corr_id"),
+    "STATS": ("corr_id",),
+    "STATS_RESPONSE": ("node_id", "metrics", "corr_id"),
+    "BATCH": ("messages", "sender_id", "corr_id"),
+    "BATCH_RESPONSE": ("results", "corr_id"),
+    "CHORD_NEXT_HOP": ("key_id", "requester_id", "count", "corr_id"),
+    "NEXT_HOP_RESPONSE": ("key_id", "final", "successor_ip", "successor_port", "successor_id", "nodes",
+                          "corr_id"),
+}
+MESSAGE_TYPES: Tuple[str, ...] = tuple(SCHEMAS)
+
+# Claves frecuentes fuera de schema (contenido de "data", extras, dicts anidados)
+KEYS: Tuple[str, ...] = (
+    "type", "key", "value", "found", "node", "status", "replicas", "final", "timestamp",
+    "error", "request_id", "sender_id", "data", "corr_id", "node_id", "ip", "port", "hops",
+    "key_id", "successor_id", "successor_ip", "successor_port", "count", "sum", "buckets",
+)
+
+# tags de valores
+_T_NONE, _T_FALSE, _T_TRUE, _T_INT, _T_FLOAT, _T_STR, _T_ID, _T_LIST, _T_DICT = range(9)
+
+_F64 = struct.Struct(">d")
+_TYPE_CODES = {name: i + 1 for i, name in enumerate(MESSAGE_TYPES)}
+_FIELD_INDEX = {name: {field: i for i, field in enumerate(fields)} for name, fields in SCHEMAS.items()}
+_KEY_INDEX = {key: i for i, key in enumerate(KEYS)}
+
+
+class CodecError(ValueError):
+    """Frame binario mal formado o valor que el codec no sabe representar."""
+
+
+class JsonCodec:
+    """Codec original: un objeto JSON en UTF-8 por frame."""
+
+    name = CODEC_JSON
+
+    def encode(self, msg: Any) -> bytes:
+        return json.dumps(msg).encode("utf-8")
+
+    def decode(self, frame) -> Any:
+        """None si el frame está vacío (línea en blanco); ValueError si no es JSON válido."""
+        text = str(frame, "utf-8").strip()
+        if not text:
+            return None
+        return json.loads(text)
+
+
+class BinaryCodec:
+    """Codec binario con schema por tipo de mensaje (ver el docstring del módulo)."""
+
+    name = CODEC_BINARY
+
+    def encode(self, msg: Dict[str, Any]) -> bytes:
+        if not isinstance(msg, dict):
+            raise CodecError(f"Solo se codifican dicts, no {type(msg).__name__}")
+        out = bytearray()
+        msg_type = msg.get("type")
+        code = _TYPE_CODES.get(msg_type) if type(msg_type) is str else None
+        if code is None:
+            out.append(0)
+            _put_varint(out, len(msg))
+            for key, value in msg.items():
+                _put_key(out, key)
+                _put_value(out, value)
+            return bytes(out)
+
+        index = _FIELD_INDEX[msg_type]
+        slots: Dict[int, Any] = {}
+        extras = []
+        for key, value in msg.items():
+            i = index.get(key)
+            if i is not None:
+                slots[i] = value
+            elif key != "type":
+                extras.append((key, value))
+        _put_varint(out, code)
+        bitmap = 0
+        for i in slots:
+            bitmap |= 1 << i
+        _put_varint(out, bitmap)
+        for i in sorted(slots):
+            _put_value(out, slots[i])
+        _put_varint(out, len(extras))
+        for key, value in extras:
+            _put_key(out, key)
+            _put_value(out, value)
+        return bytes(out)
+
+    def decode(self, frame) -> Dict[str, Any]:
+        data = bytes(frame)
+        if not data:
+            return None
+        try:
+            code, pos = _get_varint(data, 0)
+            msg: Dict[str, Any] = {}
+            if code:
+                msg_type = MESSAGE_TYPES[code - 1]
+                msg["type"] = msg_type
+                bitmap, pos = _get_varint(data, pos)
+                for i, field in enumerate(SCHEMAS[msg_type]):
+                    if bitmap >> i & 1:
+                        msg[field], pos = _get_value(data, pos)
+            count, pos = _get_varint(data, pos)
+            for _ in range(count):
+                key, pos = _get_key(data, pos)
+                msg[key], pos = _get_value(data, pos)
+        except CodecError:
+            raise
+        except (IndexError, struct.error, UnicodeDecodeError) as e:
+            raise CodecError(f"Frame binario truncado o inválido: {e}") from None
+        if pos != len(data):
+            raise CodecError(f"{len(data) - pos} bytes sobrantes en el frame binario")
+        return msg
+
+
+JSON = JsonCodec()
+BINARY = BinaryCodec()
+_BY_NAME = {CODEC_JSON: JSON, CODEC_BINARY: BINARY}
+
+
+def get_codec(name: str):
+    """Instancia compartida del codec por nombre ("json" o "binary")."""
+    try:
+        return _BY_NAME[name]
+    except KeyError:
+        raise ValueError(f"Codec inválido: {name}") from None
+
+
+def accept_hello(version: int) -> Tuple[int, Any]:
+    """
+    Lado servidor de la negociación: dada la versión que pidió el cliente retorna
+    (byte de respuesta, codec de la conexión). 0 significa que se sigue en JSON.
+    """
+    if version in SUPPORTED_VERSIONS:
+        return version, BINARY
+    return 0, JSON
+
+
+class CodecNegotiator:
+    """
+    Lado cliente de la negociación. Prepara cada conexión saliente nueva con el
+    hello binario (si se prefiere binario y el peer no quedó marcado como solo
+    JSON) o con el preámbulo de framing de siempre.
+    """
+
+    def __init__(self, preferred: str = CODEC_JSON, timeout: float = 1.0):
+        get_codec(preferred)  # valida el nombre
+        self.preferred = preferred
+        self.timeout = timeout
+        self._json_peers: Set[Peer] = set()
+        self._binary_peers: Set[Peer] = set()
+        self._lock = threading.Lock()
+
+        # contadores para diagnóstico
+        self.negotiated = 0
+        self.refused = 0
+        self.fallbacks = 0
+
+    def wants_binary(self, peer: Peer) -> bool:
+        return self.preferred == CODEC_BINARY and peer not in self._json_peers
+
+    def known_codec(self, peer: Peer):
+        """Codec que se usará con el peer, o None si todavía no se negoció."""
+        if not self.wants_binary(peer):
+            return JSON
+        return BINARY if peer in self._binary_peers else None
+
+    def setup(self, sock: socket.socket, peer: Peer, framing: str) -> Optional[Tuple[Any, str]]:
+        """
+        Envía lo que va al inicio de una conexión nueva y retorna (codec, framing)
+        de esa conexión. None si el peer rechazó o no contestó el hello: la
+        conexión quedó inservible y hay que abrir otra (que ya irá en JSON).
+        """
+        if self.wants_binary(peer):
+            codec = self._handshake(sock, peer)
+            if codec is None:
+                return None
+            return codec, FRAME_LENGTH
+        preamble = connection_preamble(framing)
+        if preamble:
+            sock.sendall(preamble)
+        return JSON, framing
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "preferred": self.preferred,
+                "negotiated": self.negotiated,
+                "refused": self.refused,
+                "fallbacks": self.fallbacks,
+                "json_peers": len(self._json_peers),
+            }
+
+    def _handshake(self, sock: socket.socket, peer: Peer):
+        previous = sock.gettimeout()
+        sock.settimeout(self.timeout)
+        try:
+            sock.sendall(CODEC_HELLO_MAGIC + bytes([CODEC_VERSION]))
+            reply = sock.recv(1)
+        except socket.timeout:
+            reply = b""
+        finally:
+            sock.settimeout(previous)
+        with self._lock:
+            if reply and reply[0] in SUPPORTED_VERSIONS:
+                self.negotiated += 1
+                self._binary_peers.add(peer)
+                return BINARY
+            self._binary_peers.discard(peer)
+            self._json_peers.add(peer)
+            if reply:
+                self.refused += 1  # conoce el hello pero no esta versión
+            else:
+                self.fallbacks += 1  # no contestó: nodo sin codec binario
+            return None
+
+
+# ---------------- codificación de valores ----------------
+
+def _put_varint(out: bytearray, n: int):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _get_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    b = data[pos]
+    if b < 0x80:
+        return b, pos + 1
+    result = b & 0x7F
+    shift = 7
+    while True:
+        pos += 1
+        b = data[pos]
+        result |= (b & 0x7F) << shift
+        if b < 0x80:
+            return result, pos + 1
+        shift += 7
+
+
+def _put_str(out: bytearray, s: str):
+    raw = s.encode("utf-8")
+    _put_varint(out, len(raw))
+    out += raw
+
+
+def _put_key(out: bytearray, key: Any):
+    if type(key) is not str:
+        if isinstance(key, (int, float)) and not isinstance(key, bool):
+            key = str(key)  # igual que json.dumps
+        else:
+            raise TypeError(f"Las claves deben ser str, no {type(key).__name__}")
+    i = _KEY_INDEX.get(key)
+    if i is not None:
+        _put_varint(out, i << 1)
+        return
+    raw = key.encode("utf-8")
+    _put_varint(out, len(raw) << 1 | 1)
+    out += raw
+
+
+def _get_key(data: bytes, pos: int) -> Tuple[str, int]:
+    n, pos = _get_varint(data, pos)
+    if not n & 1:
+        return KEYS[n >> 1], pos
+    end = pos + (n >> 1)
+    if end > len(data):
+        raise CodecError("Clave truncada")
+    return data[pos:end].decode("utf-8"), end
+
+
+def _put_value(out: bytearray, v: Any):
+    t = type(v)
+    if t is str:
+        if len(v) == 40:
+            try:
+                raw = bytes.fromhex(v)
+            except ValueError:
+                raw = None
+            if raw is not None and len(raw) == 20 and raw.hex() == v:
+                out.append(_T_ID)
+                out += raw
+                return
+        out.append(_T_STR)
+        _put_str(out, v)
+    elif v is None:
+        out.append(_T_NONE)
+    elif t is bool:
+        out.append(_T_TRUE if v else _T_FALSE)
+    elif t is int:
+        out.append(_T_INT)
+        _put_varint(out, v << 1 if v >= 0 else ((-v) << 1) - 1)
+    elif t is float:
+        out.append(_T_FLOAT)
+        out += _F64.pack(v)
+    elif t is dict:
+        out.append(_T_DICT)
+        _put_varint(out, len(v))
+        for key, value in v.items():
+            _put_key(out, key)
+            _put_value(out, value)
+    elif t is list or t is tuple:
+        out.append(_T_LIST)
+        _put_varint(out, len(v))
+        for item in v:
+            _put_value(out, item)
+    elif isinstance(v, bool):
+        out.append(_T_TRUE if v else _T_FALSE)
+    elif isinstance(v, int):
+        _put_value(out, int(v))
+    elif isinstance(v, float):
+        _put_value(out, float(v))
+    elif isinstance(v, str):
+        _put_value(out, str(v))
+    elif isinstance(v, dict):
+        _put_value(out, dict(v))
+    elif isinstance(v, (list, tuple)):
+        _put_value(out, list(v))
+    else:
+        raise TypeError(f"Objeto de tipo {type(v).__name__} no es serializable")
+
+
+def _get_value(data: bytes, pos: int) -> Tuple[Any, int]:
+    tag = data[pos]
+    pos += 1
+    if tag == _T_STR:
+        n, pos = _get_varint(data, pos)
+        end = pos + n
+        if end > len(data):
+            raise CodecError("String truncado")
+        return data[pos:end].decode("utf-8"), end
+    if tag == _T_ID:
+        end = pos + 20
+        if end > len(data):
+            raise CodecError("ID truncado")
+        return data[pos:end].hex(), end
+    if tag == _T_INT:
+        z, pos = _get_varint(data, pos)
+        return (-((z + 1) >> 1) if z & 1 else z >> 1), pos
+    if tag == _T_NONE:
+        return None, pos
+    if tag == _T_FLOAT:
+        return _F64.unpack_from(data, pos)[0], pos + 8
+    if tag == _T_TRUE:
+        return True, pos
+    if tag == _T_FALSE:
+        return False, pos
+    if tag == _T_DICT:
+        n, pos = _get_varint(data, pos)
+        d = {}
+        for _ in range(n):
+            key, pos = _get_key(data, pos)
+            d[key], pos = _get_value(data, pos)
+        return d, pos
+    if tag == _T_LIST:
+        n, pos = _get_varint(data, pos)
+        items = []
+        for _ in range(n):
+            item, pos = _get_value(data, pos)
+            items.append(item)
+        return items, pos
+    raise CodecError(f"Tag de valor desconocido: {tag}")
@@ -0,0 +1,281 @@
+"""
+Canal UDP para mensajes de control chicos (heartbeats y NOTIFY de Chord).
+
+Estos mensajes se envían cada pocos segundos a cada vecino; por TCP cada uno
+cuesta una conexión (o al menos un frame con su ACK de TCP). Por UDP va un solo
+datagrama en cada sentido:
+- Cada datagrama lleva "udp_src" (id aleatorio del canal que lo envía) y
+  "udp_seq" (número de secuencia creciente). El receptor descarta duplicados y
+  datagramas viejos llegados fuera de orden por (dirección, udp_src).
+- El receptor responde con la respuesta del handler más "udp_ack", o con un
+  UDP_ACK vacío si el handler no retorna nada. Si el handler retorna un Future
+  (p. ej. lo encoló en un WorkerPool) el ACK sale cuando se resuelve.
+- Solo se aceptan los tipos de accept_types (CONTROL_TYPES por defecto); el
+  resto se descarta sin respuesta y el emisor lo ve como una pérdida.
+- No hay retransmisión: un datagrama sin ACK dentro del timeout cuenta como
+  perdido y su Future falla con TimeoutError. Quien lo usa decide qué hacer
+  (un heartbeat perdido es solo un fallo más para el detector).
+- Un peer "soporta UDP" después de su primer ACK; tras max_losses pérdidas
+  seguidas deja de considerarse así (ver TCPServer.send_control).
+"""
+import itertools
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+UDP_SEQ = "udp_seq"
+UDP_SRC = "udp_src"
+UDP_ACK = "udp_ack"
+# Respuesta cuando el handler no retorna nada
+ACK_TYPE = "UDP_ACK"
+# Tamaño máximo de un datagrama (evita fragmentación IP en un MTU típico)
+MAX_DATAGRAM = 1400
+# Mensajes que viajan por el canal UDP cuando está activo
+CONTROL_TYPES = frozenset({"CHORD_HEARTBEAT", "HEARTBEAT", "CHORD_NOTIFY"})
+
+Peer = Tuple[str, int]
+_MAX_TRACKED_SOURCES = 4096
+
+
+class _PeerState:
+    """Contadores de ACK de un peer."""
+    __slots__ = ("acked", "lost", "consecutive_losses", "supported")
+
+    def __init__(self):
+        self.acked = 0
+        self.lost = 0
+        self.consecutive_losses = 0
+        self.supported = False
+
+
+class DatagramChannel:
+    """
+    Socket UDP ligado a (host, port) con un hilo receptor. handler(msg, addr)
+    procesa los datagramas entrantes igual que el message_handler de TCPServer;
+    puede retornar un Future con la respuesta para no bloquear al receptor.
+    """
+
+    def __init__(self, host: str, port: int, handler: Callable[[Dict[str, Any], tuple], Any],
+                 max_losses: int = 3, accept_types: frozenset = CONTROL_TYPES):
+        self.host = host
+        self.port = port
+        self.handler = handler
+        self.max_losses = max_losses
+        self.accept_types = accept_types
+        self._sock: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._src = os.urandom(4).hex()
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+        # seq -> (deadline, peer, future)
+        self._pending: Dict[int, Tuple[float, Peer, Future]] = {}
+        self._peers: Dict[Peer, _PeerState] = {}
+        # (addr, udp_src) -> último seq recibido
+        self._last_seen: "OrderedDict[Tuple[tuple, str], int]" = OrderedDict()
+        self._last_expire = 0.0
+
+        # contadores
+        self.sent = 0
+        self.received = 0
+        self.acked = 0
+        self.lost = 0
+        self.duplicates = 0
+        self.rejected = 0
+
+    def start(self):
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind((self.host, self.port))
+        # el timeout permite vencer los pendientes aunque no llegue nada
+        self._sock.settimeout(0.1)
+        self._running = True
+        self._thread = threading.Thread(target=self._recv_loop, name=f"udp-{self.port}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        if self._sock is not None:
+            self._sock.close()
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for _deadline, _peer, future in pending:
+            if not future.done():
+                future.set_exception(ConnectionError("Canal UDP detenido"))
+
+    def send(self, ip: str, port: int, msg: Dict[str, Any], timeout: float = 1.0) -> Future:
+        """
+        Envía msg en un datagrama. El Future se resuelve con la respuesta (None si
+        fue un UDP_ACK vacío) o falla con TimeoutError si no llegó ACK a tiempo.
+        ValueError si el mensaje no cabe en MAX_DATAGRAM.
+        """
+        seq = next(self._seq)
+        data = json.dumps({**msg, UDP_SRC: self._src, UDP_SEQ: seq}).encode("utf-8")
+        if len(data) > MAX_DATAGRAM:
+            raise ValueError(f"Mensaje de {len(data)} bytes no cabe en un datagrama")
+        future: Future = Future()
+        peer = (ip, port)
+        with self._lock:
+            self._pending[seq] = (time.monotonic() + timeout, peer, future)
+            self.sent += 1
+        try:
+            self._sock.sendto(data, peer)
+        except OSError as e:
+            with self._lock:
+                self._pending.pop(seq, None)
+            future.set_exception(e)
+        return future
+
+    def supports(self, ip: str, port: int) -> bool:
+        """True si el peer respondió por UDP y no acumula max_losses pérdidas seguidas."""
+        with self._lock:
+            state = self._peers.get((ip, port))
+            return state is not None and state.supported
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "sent": self.sent,
+                "received": self.received,
+                "acked": self.acked,
+                "lost": self.lost,
+                "duplicates": self.duplicates,
+                "rejected": self.rejected,
+                "pending": len(self._pending),
+                "udp_peers": sum(1 for s in self._peers.values() if s.supported),
+            }
+
+    def get_peer_stats(self, ip: str, port: int) -> Dict[str, int]:
+        with self._lock:
+            state = self._peers.get((ip, port)) or _PeerState()
+            return {"acked": state.acked, "lost": state.lost,
+                    "consecutive_losses": state.consecutive_losses, "supported": state.supported}
+
+    # ---------------- internos ----------------
+
+    def _recv_loop(self):
+        while self._running:
+            try:
+                data, addr = self._sock.recvfrom(65535)
+            except socket.timeout:
+                self._expire()
+                continue
+            except OSError:
+                break
+            try:
+                msg = json.loads(data)
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                logging.error(f"Datagrama inválido desde {addr}: {e}")
+                continue
+            # un datagrama mal formado no puede terminar el hilo receptor
+            try:
+                if not isinstance(msg, dict):
+                    continue
+                if UDP_ACK in msg:
+                    self._on_ack(msg)
+                elif UDP_SEQ in msg:
+                    self._on_request(msg, addr)
+            except Exception as e:
+                logging.exception(f"Error procesando datagrama de {addr}: {e}")
+            self._expire()
+
+    def _on_request(self, msg: Dict[str, Any], addr: tuple):
+        seq = msg.pop(UDP_SEQ)
+        src = msg.pop(UDP_SRC, "")
+        if not _is_seq(seq) or not isinstance(src, str):
+            logging.debug(f"Datagrama con {UDP_SEQ}/{UDP_SRC} inválidos desde {addr}: descartado")
+            return
+        key = (addr, src)
+        with self._lock:
+            self.received += 1
+            msg_type = msg.get("type")
+            if not isinstance(msg_type, str) or msg_type not in self.accept_types:
+                # el canal es solo para control: el resto va por TCP (workers, BUSY, carriles)
+                self.rejected += 1
+                return
+            last = self._last_seen.get(key, 0)
+            if seq <= last:
+                # duplicado o llegó después de uno más nuevo
+                self.duplicates += 1
+                return
+            self._last_seen[key] = seq
+            self._last_seen.move_to_end(key)
+            if len(self._last_seen) > _MAX_TRACKED_SOURCES:
+                self._last_seen.popitem(last=False)
+        try:
+            response = self.handler(msg, addr)
+        except Exception as e:
+            logging.exception(f"Error procesando datagrama de {addr}: {e}")
+            response = None
+        if isinstance(response, Future):
+            response.add_done_callback(lambda f: self._reply(addr, seq, _future_response(f, addr)))
+        else:
+            self._reply(addr, seq, response)
+
+    def _reply(self, addr: tuple, seq: int, response: Optional[Dict[str, Any]]):
+        reply = {"type": ACK_TYPE} if response is None else dict(response)
+        reply[UDP_ACK] = seq
+        try:
+            self._sock.sendto(json.dumps(reply).encode("utf-8"), addr)
+        except OSError as e:
+            logging.debug(f"No se pudo enviar ACK UDP a {addr}: {e}")
+
+    def _on_ack(self, msg: Dict[str, Any]):
+        seq = msg.pop(UDP_ACK)
+        if not _is_seq(seq):
+            return
+        with self._lock:
+            entry = self._pending.pop(seq, None)
+            if entry is None:
+                # ACK tardío de un datagrama ya contado como perdido
+                return
+            _deadline, peer, future = entry
+            state = self._peers.setdefault(peer, _PeerState())
+            state.acked += 1
+            state.consecutive_losses = 0
+            state.supported = True
+            self.acked += 1
+        if not future.done():
+            future.set_result(None if msg.get("type") == ACK_TYPE else msg)
+
+    def _expire(self):
+        now = time.monotonic()
+        if now - self._last_expire < 0.05:
+            return
+        self._last_expire = now
+        expired = []
+        with self._lock:
+            for seq, (deadline, peer, future) in list(self._pending.items()):
+                if deadline <= now:
+                    del self._pending[seq]
+                    state = self._peers.setdefault(peer, _PeerState())
+                    state.lost += 1
+                    state.consecutive_losses += 1
+                    if state.consecutive_losses >= self.max_losses:
+                        state.supported = False
+                    self.lost += 1
+                    expired.append((peer, future))
+        for peer, future in expired:
+            if not future.done():
+                future.set_exception(TimeoutError(f"Sin ACK UDP de {peer[0]}:{peer[1]}"))
+
+
+def _future_response(future: Future, addr: tuple) -> Optional[Dict[str, Any]]:
+    try:
+        return future.result()
+    except Exception as e:
+        logging.error(f"Error procesando datagrama de {addr}: {e}")
+        return None
+
+
+def _is_seq(value: Any) -> bool:
+    """Los números de secuencia son int (bool no cuenta, aunque sea subclase)."""
+    return isinstance(value, int) and not isinstance(value, bool)
@@ -0,0 +1,92 @@
+"""
+Cache de idempotencia: suprime el re-procesamiento de requests duplicados.
+
+Un request reintentado por el cliente (o enviado a la vez por dos caminos, como un
+request "hedged") llega con el mismo request_id. DedupCache.run ejecuta el handler
+solo la primera vez y a los duplicados les retorna la misma respuesta:
+- Las entradas viven ttl segundos y hay a lo sumo max_entries (se descartan las
+  más viejas); la ventana acota la memoria y el tiempo en que un reintento se
+  reconoce como duplicado.
+- Si el duplicado llega mientras el original se está procesando, espera su
+  respuesta (hasta wait_timeout) en vez de ejecutar el handler otra vez.
+- Si el handler lanza una excepción la entrada se borra: el reintento se procesa.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+
+class _Entry:
+    __slots__ = ("expires", "response", "done")
+
+    def __init__(self, expires: float):
+        self.expires = expires
+        self.response = None
+        self.done = threading.Event()
+
+
+class DedupCache:
+    """Respuestas por clave de request con ventana de tiempo y tamaño acotados."""
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 10000, wait_timeout: float = 5.0):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # contadores para diagnóstico
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def run(self, key: str, fn: Callable[[], Any], now: Optional[float] = None) -> Any:
+        """Retorna fn() la primera vez que se ve key y la misma respuesta en los duplicados."""
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= now:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                entry = _Entry(now + self.ttl)
+                self._entries[key] = entry
+                self.misses += 1
+                self._evict(now)
+                owner = True
+            else:
+                self.hits += 1
+                owner = False
+
+        if not owner:
+            entry.done.wait(self.wait_timeout)
+            return entry.response
+
+        try:
+            entry.response = fn()
+        except BaseException:
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            entry.done.set()
+            raise
+        entry.done.set()
+        return entry.response
+
+    def _evict(self, now: float):
+        """Descarta (con el lock tomado) las entradas vencidas y las que exceden max_entries."""
+        entries = self._entries
+        while entries:
+            key, entry = next(iter(entries.items()))
+            if entry.expires > now and len(entries) <= self.max_entries:
+                break
+            del entries[key]
+            self.evicted += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "evicted": self.evicted}
@@ -0,0 +1,188 @@
+"""
+Detectores de fallas para los vecinos de un nodo.
+
+check_predecessor_once daba por caído al predecessor tras 3 heartbeats sin ACK
+seguidos, con un timeout y un período fijos: ~20 s para detectar una caída real
+y falsos positivos en enlaces lentos. Aquí un detector recibe las llegadas de
+cada peer (ACKs de heartbeat y cualquier otro mensaje suyo) y entrega un nivel de
+sospecha continuo, que cada parte del nodo compara con el umbral:
+- FailureDetector define la interfaz: heartbeat / watch / remove registran
+  llegadas y peers, suspicion / is_available las consultan.
+- PhiAccrualDetector (el de ChordNode por defecto) aprende la distribución de
+  los intervalos entre llegadas de cada peer (los últimos window, como normal con
+  media y desvío) y retorna phi = -log10(P(un intervalo dure más que el tiempo
+  que lleva sin noticias)). phi 1 es un 10 % de probabilidad de equivocarse al
+  darlo por caído, phi 8 una en 1e8. Un peer lento aprende intervalos largos y no
+  se lo sospecha antes de tiempo; uno regular se detecta poco después de su
+  intervalo habitual.
+- TimeoutDetector es el criterio fijo: sospecha = tiempo sin noticias / timeout.
+
+El reloj es configurable (clock) para usar tiempo virtual (src/loopback.py,
+src/simulator.py).
+"""
+import abc
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+
+class _PeerHistory:
+    """Llegadas de un peer: la última y los intervalos recientes (con suma y suma de cuadrados)."""
+
+    __slots__ = ("last", "intervals", "total", "squares")
+
+    def __init__(self, now: float, window: int):
+        self.last = now
+        self.intervals = deque(maxlen=window)
+        self.total = 0.0
+        self.squares = 0.0
+
+    def add_interval(self, interval: float):
+        if len(self.intervals) == self.intervals.maxlen:
+            old = self.intervals[0]
+            self.total -= old
+            self.squares -= old * old
+        self.intervals.append(interval)
+        self.total += interval
+        self.squares += interval * interval
+
+
+class FailureDetector(abc.ABC):
+    """
+    Interfaz de los detectores: un nivel de sospecha por peer (0 = sin dudas) y un
+    umbral a partir del cual se lo considera caído. Un peer sin llegadas registradas
+    (ni watch) no se sospecha: no hay con qué compararlo.
+    """
+
+    def __init__(self, threshold: float, window: int = 1, clock: Optional[Callable[[], float]] = None):
+        self.threshold = threshold
+        self.window = window
+        self.clock = clock or time.monotonic
+        self._peers: Dict[str, _PeerHistory] = {}
+        self._lock = threading.Lock()
+
+    def heartbeat(self, peer: str, now: Optional[float] = None):
+        """Registra una llegada de peer (heartbeat, respuesta o cualquier mensaje suyo)."""
+        now = self.clock() if now is None else now
+        with self._lock:
+            history = self._peers.get(peer)
+            if history is None:
+                self._peers[peer] = _PeerHistory(now, self.window)
+            else:
+                self._record(history, now)
+
+    def watch(self, peer: str, now: Optional[float] = None):
+        """Empieza a vigilar peer como si acabara de llegar algo suyo (no hace nada si ya se vigila)."""
+        now = self.clock() if now is None else now
+        with self._lock:
+            if peer not in self._peers:
+                self._peers[peer] = _PeerHistory(now, self.window)
+
+    def remove(self, peer: str) -> bool:
+        """Deja de vigilar peer y olvida su historia. Retorna si estaba."""
+        with self._lock:
+            return self._peers.pop(peer, None) is not None
+
+    def suspicion(self, peer: str, now: Optional[float] = None) -> float:
+        """Nivel de sospecha de peer ahora (0.0 si no se lo vigila)."""
+        history = self._peers.get(peer)
+        if history is None:
+            return 0.0
+        now = self.clock() if now is None else now
+        return self._suspicion(history, max(0.0, now - history.last))
+
+    def is_available(self, peer: str, now: Optional[float] = None) -> bool:
+        """False si la sospecha de peer llegó al umbral."""
+        return self.suspicion(peer, now) < self.threshold
+
+    def suspected(self, now: Optional[float] = None) -> List[str]:
+        """Los peers vigilados cuya sospecha llegó al umbral."""
+        now = self.clock() if now is None else now
+        return [peer for peer in list(self._peers) if not self.is_available(peer, now)]
+
+    def _record(self, history: _PeerHistory, now: float):
+        """(con el lock tomado) una llegada de un peer ya vigilado."""
+        history.last = max(history.last, now)
+
+    @abc.abstractmethod
+    def _suspicion(self, history: _PeerHistory, elapsed: float) -> float:
+        """Sospecha sobre un peer que lleva elapsed segundos sin noticias (la define cada detector)."""
+
+    def __contains__(self, peer: str) -> bool:
+        return peer in self._peers
+
+    def __len__(self) -> int:
+        return len(self._peers)
+
+    def get_stats(self) -> Dict[str, float]:
+        return {"peers": len(self._peers), "suspected": len(self.suspected()), "threshold": self.threshold}
+
+
+class PhiAccrualDetector(FailureDetector):
+    """
+    Detector phi accrual (Hayashibara et al.). Parámetros:
+    - threshold: phi a partir del cual el peer se da por caído.
+    - window: intervalos recientes por peer con los que se estima media y desvío.
+    - min_std: desvío mínimo (un peer muy regular no se sospecha por unos ms de atraso).
+    - acceptable_pause: tiempo que se suma a la media, p. ej. el período de los heartbeats:
+      tolera que se corte otro tráfico más frecuente y queden solo los heartbeats.
+    - first_interval: intervalo supuesto mientras un peer no tiene intervalos medidos.
+    - min_interval: llegadas más juntas que esto solo renuevan la última (una ráfaga de
+      mensajes no llena la ventana de intervalos casi nulos).
+    """
+
+    def __init__(self, threshold: float = 8.0, window: int = 100, min_std: float = 0.5,
+                 acceptable_pause: float = 0.0, first_interval: float = 1.0, min_interval: float = 0.1,
+                 clock: Optional[Callable[[], float]] = None):
+        super().__init__(threshold, window, clock)
+        self.min_std = min_std
+        self.acceptable_pause = acceptable_pause
+        self.first_interval = first_interval
+        self.min_interval = min_interval
+
+    def _record(self, history: _PeerHistory, now: float):
+        interval = now - history.last
+        if interval >= self.min_interval:
+            history.add_interval(interval)
+        history.last = max(history.last, now)
+
+    def _suspicion(self, history: _PeerHistory, elapsed: float) -> float:
+        count = len(history.intervals)
+        if count:
+            mean = history.total / count
+            std = math.sqrt(max(0.0, history.squares / count - mean * mean))
+        else:
+            mean, std = self.first_interval, self.first_interval / 4
+        return phi(elapsed, mean + self.acceptable_pause, max(std, self.min_std))
+
+    def get_stats(self) -> Dict[str, float]:
+        stats = super().get_stats()
+        stats["samples"] = sum(len(history.intervals) for history in list(self._peers.values()))
+        return stats
+
+
+class TimeoutDetector(FailureDetector):
+    """Criterio fijo: sospecha = tiempo sin noticias / timeout, caído a partir de 1."""
+
+    def __init__(self, timeout: float = 5.0, clock: Optional[Callable[[], float]] = None):
+        super().__init__(1.0, clock=clock)
+        self.timeout = timeout
+
+    def _suspicion(self, history: _PeerHistory, elapsed: float) -> float:
+        return elapsed / self.timeout
+
+
+def phi(elapsed: float, mean: float, std: float) -> float:
+    """
+    -log10 de la probabilidad de que un intervalo normal(mean, std) supere elapsed, con la
+    aproximación logística de la CDF normal (la de Akka y Cassandra). inf si es despreciable.
+    """
+    y = (elapsed - mean) / std
+    exponent = -y * (1.5976 + 0.070566 * y * y)
+    if exponent > 700:
+        return 0.0  # elapsed muy por debajo de la media: la probabilidad es ~1
+    e = math.exp(exponent)
+    p = e / (1.0 + e) if elapsed > mean else 1.0 - 1.0 / (1.0 + e)
+    return -math.log10(p) if p > 0.0 else math.inf
@@ -0,0 +1,224 @@
+"""
+Capa de framing a nivel de bytes para los sockets del laboratorio.
+
+Reemplaza el patrón `buffer += data.decode(); buffer.split("\n", 1)` (cuadrático
+para valores grandes) por un buffer bytearray reutilizable que se llena con
+recv_into y se recorre con memoryview, sin copiar los bytes recibidos.
+
+Modos de frame:
+- FRAME_NEWLINE: una línea JSON terminada en '\n' (formato original).
+- FRAME_LENGTH: cabecera de 4 bytes big-endian con el largo + payload. El cliente
+  anuncia este modo enviando LENGTH_PREFIX_MAGIC como primer byte de la conexión;
+  el servidor detecta el modo con ese primer byte (un JSON nunca empieza con 0xB1).
+
+Un cliente que quiere el codec binario abre con CODEC_HELLO_MAGIC + un byte de
+versión (ver src/codec.py); eso también implica FRAME_LENGTH. El lector se lo
+pasa a on_hello para que el servidor responda antes del primer frame.
+
+Ambos modos aplican un tamaño máximo de frame (FrameTooLarge si se excede).
+"""
+import asyncio
+import socket
+import struct
+from typing import Callable, Optional
+
+FRAME_NEWLINE = "newline"
+FRAME_LENGTH = "length"
+FRAME_MODES = (FRAME_NEWLINE, FRAME_LENGTH)
+
+# Primer byte de una conexión en modo length-prefixed
+LENGTH_PREFIX_MAGIC = b"\xb1"
+# Primer byte de una conexión que negocia el codec binario (seguido de la versión)
+CODEC_HELLO_MAGIC = b"\xb2"
+# Tamaño máximo por defecto de un frame (payload)
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+_HEADER = struct.Struct(">I")
+
+
+class FrameTooLarge(ValueError):
+    """El peer envió un frame más grande que max_frame_size."""
+
+
+def encode_frame(payload: bytes, mode: str = FRAME_NEWLINE) -> bytes:
+    """Arma el frame listo para sendall() según el modo."""
+    if mode == FRAME_LENGTH:
+        return _HEADER.pack(len(payload)) + payload
+    return payload + b"\n"
+
+
+def connection_preamble(mode: str) -> bytes:
+    """Bytes que el cliente debe enviar al abrir la conexión para anunciar el modo."""
+    return LENGTH_PREFIX_MAGIC if mode == FRAME_LENGTH else b""
+
+
+class FrameReader:
+    """
+    Lee frames de un socket sobre un único bytearray.
+    - mode=None detecta el modo con el primer byte de la conexión.
+    - on_hello(version) se llama si la conexión abre con CODEC_HELLO_MAGIC; sin
+      on_hello ese byte no se reconoce (se lee como una línea más).
+    - read_frame() retorna un memoryview del payload (válido hasta la siguiente
+      llamada) o None si el peer cerró la conexión.
+    """
+
+    def __init__(self, sock: socket.socket, mode: Optional[str] = None,
+                 max_frame_size: int = MAX_FRAME_SIZE, initial_size: int = 64 * 1024,
+                 on_hello: Optional[Callable[[int], None]] = None):
+        self.sock = sock
+        self.mode = mode
+        self.on_hello = on_hello
+        self.max_frame_size = max_frame_size
+        self._initial_size = initial_size
+        self._buf = bytearray(initial_size)
+        self._view = memoryview(self._buf)
+        self._start = 0  # primer byte sin consumir
+        self._end = 0    # fin de los datos válidos
+        self._scan = 0   # desde dónde seguir buscando '\n' (evita re-escanear)
+        self._need = 0   # bytes que necesita el frame length-prefixed en curso
+
+    def read_frame(self) -> Optional[memoryview]:
+        while True:
+            frame = self._next_frame()
+            if frame is not None:
+                return frame
+            if not self._fill():
+                return None
+
+    def pending(self) -> int:
+        """Bytes recibidos que aún no forman un frame completo."""
+        return self._end - self._start
+
+    # ---------------- internos ----------------
+
+    def _next_frame(self) -> Optional[memoryview]:
+        if self.mode is None:
+            if self._end == self._start:
+                return None
+            first = self._buf[self._start:self._start + 1]
+            if first == LENGTH_PREFIX_MAGIC:
+                self.mode = FRAME_LENGTH
+                self._start += 1
+            elif first == CODEC_HELLO_MAGIC and self.on_hello is not None:
+                if self._end - self._start < 2:
+                    return None  # falta el byte de versión
+                version = self._buf[self._start + 1]
+                self.mode = FRAME_LENGTH
+                self._start += 2
+                self.on_hello(version)
+            else:
+                self.mode = FRAME_NEWLINE
+            self._scan = self._start
+
+        if self.mode == FRAME_NEWLINE:
+            idx = self._buf.find(b"\n", max(self._scan, self._start), self._end)
+            if idx < 0:
+                self._scan = self._end
+                if self._end - self._start > self.max_frame_size:
+                    raise FrameTooLarge(f"Línea de más de {self.max_frame_size} bytes")
+                return None
+            if idx - self._start > self.max_frame_size:
+                raise FrameTooLarge(f"Línea de {idx - self._start} bytes (máximo {self.max_frame_size})")
+            frame = self._view[self._start:idx]
+            self._start = self._scan = idx + 1
+            return frame
+
+        available = self._end - self._start
+        if available < _HEADER.size:
+            self._need = _HEADER.size
+            return None
+        (length,) = _HEADER.unpack_from(self._buf, self._start)
+        if length > self.max_frame_size:
+            raise FrameTooLarge(f"Frame de {length} bytes (máximo {self.max_frame_size})")
+        if available < _HEADER.size + length:
+            self._need = _HEADER.size + length
+            return None
+        begin = self._start + _HEADER.size
+        self._start = begin + length
+        self._need = 0
+        return self._view[begin:self._start]
+
+    def _fill(self) -> bool:
+        """Lee más bytes del socket con recv_into. False si el peer cerró."""
+        if self._start == self._end:
+            # todo consumido: volver al inicio sin copiar nada
+            self._start = self._end = self._scan = 0
+            if len(self._buf) > 4 * self._initial_size and self._need <= self._initial_size:
+                # liberar el buffer grande que dejó un frame de varios MB
+                self._buf = bytearray(self._initial_size)
+                self._view = memoryview(self._buf)
+        if self._end == len(self._buf) or self._start + self._need > len(self._buf):
+            self._make_room()
+        n = self.sock.recv_into(self._view[self._end:])
+        if n == 0:
+            return False
+        self._end += n
+        return True
+
+    def _make_room(self):
+        """Compacta los bytes pendientes al inicio o pasa a un buffer más grande."""
+        pending = self._end - self._start
+        needed = max(self._need, pending + 1)
+        if needed <= len(self._buf) and pending <= self._start:
+            # las regiones no se solapan: se puede mover en el mismo buffer
+            self._buf[:pending] = self._view[self._start:self._end]
+        else:
+            size = len(self._buf)
+            while size < needed:
+                size *= 2
+            new_buf = bytearray(size)
+            new_buf[:pending] = self._view[self._start:self._end]
+            self._buf = new_buf
+            self._view = memoryview(new_buf)
+        self._scan -= self._start
+        self._start, self._end = 0, pending
+
+
+class AsyncFrameReader:
+    """
+    Equivalente de FrameReader sobre un asyncio.StreamReader (modo asyncio del
+    servidor). El StreamReader ya acumula en un bytearray interno, así que aquí
+    solo se detecta el modo y se aplica el tamaño máximo.
+    """
+
+    def __init__(self, reader, mode: Optional[str] = None, max_frame_size: int = MAX_FRAME_SIZE,
+                 on_hello: Optional[Callable[[int], None]] = None):
+        self.reader = reader
+        self.mode = mode
+        self.on_hello = on_hello
+        self.max_frame_size = max_frame_size
+        self._prefix = b""
+
+    async def read_frame(self) -> Optional[bytes]:
+        try:
+            if self.mode is None:
+                first = await self.reader.read(1)
+                if not first:
+                    return None
+                if first == LENGTH_PREFIX_MAGIC:
+                    self.mode = FRAME_LENGTH
+                elif first == CODEC_HELLO_MAGIC and self.on_hello is not None:
+                    version = (await self.reader.readexactly(1))[0]
+                    self.mode = FRAME_LENGTH
+                    self.on_hello(version)
+                else:
+                    self.mode = FRAME_NEWLINE
+                    self._prefix = first
+
+            if self.mode == FRAME_NEWLINE:
+                try:
+                    line = await self.reader.readuntil(b"\n")
+                except asyncio.LimitOverrunError:
+                    raise FrameTooLarge(f"Línea de más de {self.max_frame_size} bytes")
+                if self._prefix:
+                    line, self._prefix = self._prefix + line, b""
+                if len(line) - 1 > self.max_frame_size:
+                    raise FrameTooLarge(f"Línea de más de {self.max_frame_size} bytes")
+                return line[:-1]
+
+            (length,) = _HEADER.unpack(await self.reader.readexactly(_HEADER.size))
+            if length > self.max_frame_size:
+                raise FrameTooLarge(f"Frame de {length} bytes (máximo {self.max_frame_size})")
+            return await self.reader.readexactly(length)
+        except asyncio.IncompleteReadError:
+            return None
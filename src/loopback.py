@@ -0,0 +1,448 @@
+"""
+Transporte en memoria para correr muchos nodos Chord en un solo proceso.
+
+LoopbackNetwork reemplaza a los sockets: cada nodo registra un endpoint con su
+(ip, port) y su handler (el mismo message_handler que recibiría TCPServer), y
+el endpoint expone send_message / request_response / request_async /
+send_control / request_control con las mismas firmas que TCPServer, así que se
+conecta directo a los callbacks de ChordNode y DistributedStorage.
+
+- Los mensajes se copian por JSON (como por la red): nadie comparte dicts.
+- latency (+ jitter aleatorio) en segundos por tramo. Con latency=0 los
+  mensajes se entregan en el hilo que llama (rápido y determinista); con
+  latencia, send_message se entrega desde un hilo planificador y request_*
+  esperan ida y vuelta.
+- loss: probabilidad de perder cada tramo. Un request perdido retorna None de
+  inmediato (no se espera el timeout real).
+- set_down(ip, port) simula un nodo caído: sus mensajes no llegan.
+
+LoopbackRing arma un anillo de N nodos (ChordNode + DistributedStorage) sobre la
+red, sin hilos de mantenimiento: stabilize(rounds) corre las rondas a mano, así
+los experimentos de convergencia o de hops con cientos de nodos tardan segundos.
+Los detectores de fallas de sus nodos usan el reloj del anillo (clock): por
+defecto un tiempo virtual que solo avanza con advance(seconds).
+"""
+import hashlib
+import heapq
+import itertools
+import json
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.metrics import MetricsRegistry
+from src.overlay import ChordNode
+from src.protocol import run_batch
+from src.storage import DistributedStorage
+
+Address = Tuple[str, int]
+Handler = Callable[[Dict[str, Any], tuple], Optional[Dict[str, Any]]]
+
+CHORD_TYPES = frozenset({"JOIN_REQUEST", "FIND_SUCCESSOR", "UPDATE_PREDECESSOR", "UPDATE_SUCCESSOR",
+                         "HEARTBEAT", "GET_PREDECESSOR"})
+STORAGE_TYPES = frozenset({"PUT", "REPLICATE", "RESULT", "GET"})
+# Handlers anidados (hops de un lookup recursivo) antes de pasar a otro hilo
+MAX_INLINE_DEPTH = 32
+# Resultado de _deliver cuando se perdió el request o la respuesta
+_LOST = object()
+
+
+class _Scheduler:
+    """Hilo que ejecuta funciones a un instante dado (entregas con latencia)."""
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Callable[[], None]]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="loopback-scheduler", daemon=True)
+        self._thread.start()
+
+    def call_at(self, when: float, fn: Callable[[], None]):
+        with self._cond:
+            heapq.heappush(self._heap, (when, next(self._seq), fn))
+            self._cond.notify()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join(timeout=1)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and (not self._heap or self._heap[0][0] > time.monotonic()):
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._cond.wait(timeout)
+                if not self._running:
+                    return
+                _when, _seq, fn = heapq.heappop(self._heap)
+            fn()
+
+
+class LoopbackNetwork:
+    """Red simulada entre endpoints registrados en el mismo proceso."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, loss: float = 0.0,
+                 seed: Optional[int] = None, async_workers: int = 32):
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._endpoints: Dict[Address, "LoopbackEndpoint"] = {}
+        self._down: set = set()
+        self._async_workers = async_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._scheduler: Optional[_Scheduler] = None
+        self._lock = threading.Lock()
+        self._local = threading.local()  # profundidad de handlers anidados en este hilo
+        # contadores
+        self.sent = 0
+        self.delivered = 0
+        self.lost = 0
+        self.unreachable = 0
+        self.by_type: Counter = Counter()
+
+    def register(self, ip: str, port: int, handler: Handler) -> "LoopbackEndpoint":
+        endpoint = LoopbackEndpoint(self, ip, port, handler)
+        with self._lock:
+            self._endpoints[(ip, port)] = endpoint
+        return endpoint
+
+    def unregister(self, ip: str, port: int):
+        with self._lock:
+            self._endpoints.pop((ip, port), None)
+            self._down.discard((ip, port))
+
+    def set_down(self, ip: str, port: int, down: bool = True):
+        """Marca un nodo como caído (o lo levanta de nuevo con down=False)."""
+        with self._lock:
+            if down:
+                self._down.add((ip, port))
+            else:
+                self._down.discard((ip, port))
+
+    def close(self):
+        if self._scheduler is not None:
+            self._scheduler.stop()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "endpoints": len(self._endpoints),
+                "down": len(self._down),
+                "sent": self.sent,
+                "delivered": self.delivered,
+                "lost": self.lost,
+                "unreachable": self.unreachable,
+                "in_flight": self._scheduler.pending() if self._scheduler else 0,
+                "by_type": dict(self.by_type),
+            }
+
+    # ---------------- internos ----------------
+
+    def _delay(self) -> float:
+        if not self.jitter:
+            return self.latency
+        with self._rng_lock:
+            return self.latency + self._rng.uniform(0, self.jitter)
+
+    def _dropped(self) -> bool:
+        if not self.loss:
+            return False
+        with self._rng_lock:
+            return self._rng.random() < self.loss
+
+    def _route(self, src: Address, dst: Address, msg: Dict[str, Any]) -> Optional["LoopbackEndpoint"]:
+        """Cuenta el envío y retorna el endpoint destino, o None si no existe o está caído."""
+        with self._lock:
+            self.sent += 1
+            self.by_type[msg.get("type")] += 1
+            endpoint = self._endpoints.get(dst)
+            if endpoint is None or dst in self._down or src in self._down:
+                self.unreachable += 1
+                return None
+        return endpoint
+
+    def _deliver(self, endpoint: "LoopbackEndpoint", data: str, src: Address):
+        """Entrega y retorna la respuesta del handler (copiada), None si no hubo, o _LOST."""
+        if self._dropped():
+            with self._lock:
+                self.lost += 1
+            return _LOST
+        with self._lock:
+            self.delivered += 1
+        endpoint.received += 1
+        response = self._call_handler(endpoint, json.loads(data), src)
+        if response is None:
+            return None
+        if self._dropped():
+            with self._lock:
+                self.lost += 1
+            return _LOST
+        return json.loads(json.dumps(response))
+
+    def _call_handler(self, endpoint: "LoopbackEndpoint", msg: Dict[str, Any], src: Address):
+        """
+        Ejecuta el handler en el hilo que llama. Un lookup recursivo anida un
+        handler por hop; pasado MAX_INLINE_DEPTH se sigue en un hilo nuevo para
+        no chocar con el límite de recursión (por TCP cada hop es otro hilo).
+        """
+        depth = getattr(self._local, "depth", 0)
+        if depth >= MAX_INLINE_DEPTH:
+            result: List[Any] = [None]
+
+            def run():
+                result[0] = self._call_handler(endpoint, msg, src)
+
+            thread = threading.Thread(target=run, daemon=True)
+            thread.start()
+            thread.join()
+            return result[0]
+        self._local.depth = depth + 1
+        try:
+            return endpoint.handler(msg, src)
+        finally:
+            self._local.depth = depth
+
+    # Puntos de extensión del paso del tiempo (src/simulator.py los redefine con un reloj virtual)
+
+    def _wait(self, delay: float):
+        """Un tramo de un request/response."""
+        if delay > 0:
+            time.sleep(delay)
+
+    def _wait_timeout(self, timeout: float):
+        """Request sin respuesta: en memoria no se espera el timeout real."""
+
+    def _concurrent_async(self) -> bool:
+        """True si request_async debe correr en el executor (hay latencia que esperar)."""
+        return self.latency > 0 or self.jitter > 0
+
+    def _schedule(self, delay: float, fn: Callable[[], None]):
+        with self._lock:
+            if self._scheduler is None:
+                self._scheduler = _Scheduler()
+        self._scheduler.call_at(time.monotonic() + delay, fn)
+
+    def _submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self._async_workers, thread_name_prefix="loopback")
+        return self._executor.submit(fn, *args)
+
+
+class LoopbackEndpoint:
+    """Lado de un nodo: mismas firmas que los métodos de envío de TCPServer."""
+
+    def __init__(self, network: LoopbackNetwork, ip: str, port: int, handler: Handler):
+        self.network = network
+        self.ip = ip
+        self.port = port
+        self.handler = handler
+        self.sent = 0
+        self.received = 0
+
+    def send_message(self, ip: str, port: int, msg: Dict[str, Any], timeout: float = 5.0) -> bool:
+        """False si el destino no existe o está caído (como un connect rechazado)."""
+        net = self.network
+        endpoint = net._route((self.ip, self.port), (ip, port), msg)
+        self.sent += 1
+        if endpoint is None:
+            return False
+        data = json.dumps(msg)
+        delay = net._delay()
+        if delay > 0:
+            net._schedule(delay, lambda: net._deliver(endpoint, data, (self.ip, self.port)))
+        else:
+            net._deliver(endpoint, data, (self.ip, self.port))
+        return True
+
+    def request_response(self, ip: str, port: int, msg: Dict[str, Any], timeout: float = 5.0) -> Optional[Dict[str, Any]]:
+        net = self.network
+        endpoint = net._route((self.ip, self.port), (ip, port), msg)
+        self.sent += 1
+        if endpoint is None:
+            net._wait_timeout(timeout)
+            return None
+        net._wait(net._delay())
+        response = net._deliver(endpoint, json.dumps(msg), (self.ip, self.port))
+        if response is _LOST:
+            net._wait_timeout(timeout)
+            return None
+        if response is not None:
+            net._wait(net._delay())
+        return response
+
+    def request_async(self, ip: str, port: int, msg: Dict[str, Any], timeout: float = 5.0) -> Future:
+        if self.network._concurrent_async():
+            return self.network._submit(self.request_response, ip, port, msg, timeout)
+        future: Future = Future()
+        future.set_result(self.request_response(ip, port, msg, timeout))
+        return future
+
+    # el canal de control es el mismo: no hay diferencia entre UDP y TCP en memoria
+    send_control = send_message
+    request_control = request_response
+
+
+class LoopbackRing:
+    """
+    Anillo de nodos ChordNode + DistributedStorage sobre una LoopbackNetwork, sin
+    hilos de mantenimiento. Los nodos usan direcciones 10.x.y.z:port y comparten
+    un MetricsRegistry (p. ej. el histograma chord.lookup_hops de todo el anillo).
+    """
+
+    def __init__(self, network: Optional[LoopbackNetwork] = None, port: int = 5000, storage: bool = True,
+                 metrics: Optional[MetricsRegistry] = None, clock: Optional[Callable[[], float]] = None):
+        self.network = network or LoopbackNetwork()
+        self.port = port
+        self.with_storage = storage
+        self.metrics = metrics or MetricsRegistry()
+        self.now = 0.0
+        self.clock = clock or (lambda: self.now)
+        self.nodes: List[ChordNode] = []
+        self.storages: Dict[str, DistributedStorage] = {}
+        self.endpoints: Dict[str, LoopbackEndpoint] = {}
+
+    def add_node(self, join: bool = True, via: Optional[ChordNode] = None) -> ChordNode:
+        """Crea un nodo y lo une al anillo a través de via (por defecto el primero)."""
+        i = len(self.nodes) + 1
+        ip = f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+        chord = ChordNode(ip, self.port, metrics=self.metrics, maintenance=False)
+        # DistributedStorage.get toma de acá la dirección de respuesta (como en main.py)
+        chord.mi_ip, chord.mi_puerto = ip, self.port
+        chord.failure_detector.clock = self.clock
+        storage = (DistributedStorage(chord.node_id, None, chord, metrics=self.metrics, timeout_checker=False)
+                   if self.with_storage else None)
+
+        def handler(msg, addr, chord=chord, storage=storage):
+            return _dispatch(chord, storage, msg, addr)
+
+        endpoint = self.network.register(ip, self.port, handler)
+        chord.set_send_callback(endpoint.send_message)
+        chord.set_request_callback(endpoint.request_response)
+        chord.set_request_async_callback(endpoint.request_async)
+        chord.set_control_callbacks(endpoint.send_control, endpoint.request_control)
+        if storage is not None:
+            storage.send_callback = endpoint.send_message
+            storage.set_request_async_callback(endpoint.request_async)
+            self.storages[chord.node_id] = storage
+        self.endpoints[chord.node_id] = endpoint
+
+        if join and self.nodes:
+            via = via or self.nodes[0]
+            chord.join_network((via.ip, via.port))
+        self.nodes.append(chord)
+        return chord
+
+    def build(self, n: int, rounds_per_join: int = 0) -> "LoopbackRing":
+        """Agrega n nodos; opcionalmente corre rondas de stabilize después de cada unión."""
+        for _ in range(n):
+            self.add_node()
+            if rounds_per_join:
+                self.stabilize(rounds_per_join, fix_fingers=False)
+        return self
+
+    def stabilize(self, rounds: int = 1, fix_fingers: bool = True):
+        for _ in range(rounds):
+            for node in self.live_nodes():
+                node.stabilize_once()
+        if fix_fingers:
+            self.fix_fingers()
+
+    def fix_fingers(self):
+        """Recalcula las finger tables completas (el refresco incremental lo hacen los timers del simulador)."""
+        for node in self.live_nodes():
+            node.fix_fingers_once(full=True)
+
+    def advance(self, seconds: float):
+        """Avanza el reloj virtual del anillo (el que ven los detectores de fallas)."""
+        self.now += seconds
+
+    def check_predecessors(self):
+        for node in self.live_nodes():
+            node.check_predecessor_once()
+
+    def stabilize_until_converged(self, max_rounds: int = 1000) -> int:
+        """Corre rondas de stabilize hasta que los successors formen el anillo ordenado. Retorna las rondas usadas."""
+        for rounds in range(max_rounds + 1):
+            if self.is_converged():
+                return rounds
+            self.stabilize(1, fix_fingers=False)
+        raise RuntimeError(f"El anillo no convergió en {max_rounds} rondas")
+
+    def fail_node(self, node: ChordNode):
+        """Simula la caída de un nodo (deja de recibir y de enviar)."""
+        node.running = False
+        self.network.set_down(node.ip, node.port)
+
+    def live_nodes(self) -> List[ChordNode]:
+        return [n for n in self.nodes if n.running]
+
+    def is_converged(self) -> bool:
+        """True si el successor y el predecessor de cada nodo vivo son sus vecinos en el orden del anillo."""
+        ordered = sorted(self.live_nodes(), key=lambda n: n.node_int)
+        if len(ordered) == 1:
+            return True
+        for i, node in enumerate(ordered):
+            succ = ordered[(i + 1) % len(ordered)]
+            pred = ordered[i - 1]
+            if not node.successor or node.successor[2] != succ.node_id:
+                return False
+            if not node.predecessor or node.predecessor[2] != pred.node_id:
+                return False
+        return True
+
+    def responsible_for(self, key: str) -> ChordNode:
+        """Nodo que debería ser responsable de la clave según el anillo ordenado (la referencia)."""
+        key_id = int(hashlib.sha1(key.encode()).hexdigest(), 16)
+        ordered = sorted(self.live_nodes(), key=lambda n: n.node_int)
+        for node in ordered:
+            if node.node_int >= key_id:
+                return node
+        return ordered[0]
+
+    def lookup(self, key: str, origin: Optional[ChordNode] = None,
+               iterative: bool = False) -> Tuple[Optional[Tuple[str, int, str]], int]:
+        """find_successor de la clave desde origin (o un nodo al azar), recursivo o iterativo. Retorna (successor, hops)."""
+        origin = origin or random.choice(self.live_nodes())
+        key_id = hashlib.sha1(key.encode()).hexdigest()
+        if iterative:
+            succ, hops = origin._find_successor_iterative_hops(key_id)
+        else:
+            succ, hops = origin._find_successor_hops(key_id)
+        if succ:
+            origin._lookup_hops.observe(hops)
+        return succ, hops
+
+    def close(self):
+        self.network.close()
+
+
+def _dispatch(chord: ChordNode, storage: Optional[DistributedStorage], msg: Dict[str, Any], addr: tuple):
+    """Ruteo de mensajes de un nodo del anillo (como handle_incoming_message en main.py)."""
+    msg_type = msg.get("type", "")
+    if msg_type == "BATCH":
+        # como TCPServer: cada sub-mensaje se rutea por separado, una sola respuesta
+        return run_batch(msg, lambda item: _dispatch(chord, storage, item, addr))
+    if msg_type.startswith("CHORD_") or msg_type in CHORD_TYPES:
+        return chord.handle_message(msg)
+    if storage is not None and msg_type in STORAGE_TYPES:
+        response = storage.handle_storage_message(msg)
+        if response and "sender_ip" in msg:
+            storage.send_callback(msg["sender_ip"], msg.get("sender_port", addr[1]), response)
+            return None
+        return response
+    return None
@@ -0,0 +1,243 @@
+"""
+Registro de métricas en proceso: contadores, gauges e histogramas de latencia.
+
+Lo alimentan TCPServer (bytes, conexiones, tiempo de handler por tipo de mensaje),
+ChordNode (hops de lookup, duración de stabilize y de refresco de fingers) y
+DistributedStorage (hits/misses, claves, requests pendientes). Se consulta con
+snapshot(), con el mensaje STATS o con el comando `stats` de main.py.
+
+Pensado para el camino caliente:
+- Los componentes guardan la referencia a sus métricas; actualizar una es una
+  operación con un lock sin contención.
+- Los gauges pueden ser funciones que se evalúan solo al pedir el snapshot. Cada
+  instancia registra los suyos con una etiqueta propia (port o node) y los quita
+  con remove() al detenerse: varias en el mismo registro no se pisan.
+- Los histogramas usan buckets fijos (no guardan muestras).
+- Las etiquetas tienen cardinalidad acotada (MAX_LABEL_SETS por métrica); el
+  exceso se agrupa en la etiqueta "other".
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+# Buckets por defecto para latencias (segundos)
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+# Buckets para conteos chicos (p. ej. hops de un lookup)
+COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 7, 8, 10, 12, 16, 20, 32)
+# Combinaciones de etiquetas distintas por nombre de métrica
+MAX_LABEL_SETS = 64
+OTHER = "other"
+
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class Counter:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1):
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    """Valor puntual: se fija con set()/inc() o se calcula con fn al leerlo."""
+    __slots__ = ("_value", "fn", "_lock")
+
+    def __init__(self, fn: Optional[Callable[[], Any]] = None):
+        self._value = 0
+        self.fn = fn
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        self._value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    @property
+    def value(self):
+        if self.fn is None:
+            return self._value
+        try:
+            return self.fn()
+        except Exception:
+            return None
+
+
+class Histogram:
+    """Histograma de buckets fijos; los percentiles se estiman con el límite del bucket."""
+    __slots__ = ("bounds", "counts", "count", "sum", "max", "_lock")
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)  # el último es el overflow
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    @contextmanager
+    def time(self):
+        """Mide en segundos el bloque with."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def percentile(self, p: float) -> float:
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = p / 100.0 * self.count
+            seen = 0
+            for i, n in enumerate(self.counts):
+                seen += n
+                if seen >= rank and n:
+                    return self.bounds[i] if i < len(self.bounds) else self.max
+            return self.max
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            count, total, peak = self.count, self.sum, self.max
+        return {
+            "count": count,
+            "sum": round(total, 6),
+            "mean": round(total / count, 6) if count else 0.0,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "max": round(peak, 6),
+        }
+
+
+class MetricsRegistry:
+    """Métricas identificadas por nombre + etiquetas, p. ej. counter("tcp.messages_in", type="PUT")."""
+
+    def __init__(self):
+        self._metrics: Dict[MetricKey, Any] = {}
+        self._label_sets: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, **labels) -> Counter:
+        return self._get(Counter, name, labels)
+
+    def gauge(self, name: str, fn: Optional[Callable[[], Any]] = None, **labels) -> Gauge:
+        gauge = self._get(Gauge, name, labels)
+        if fn is not None:
+            gauge.fn = fn
+        return gauge
+
+    def histogram(self, name: str, buckets: Sequence[float] = LATENCY_BUCKETS, **labels) -> Histogram:
+        return self._get(Histogram, name, labels, buckets)
+
+    def remove(self, name: str, **labels) -> bool:
+        """Quita una métrica (p. ej. los gauges de un componente que se detiene). Retorna si estaba."""
+        key = _key(name, labels)
+        with self._lock:
+            if self._metrics.pop(key, None) is None:
+                return False
+            if labels and any(v != OTHER for _, v in key[1]):
+                remaining = self._label_sets.get(name, 0) - 1
+                if remaining > 0:
+                    self._label_sets[name] = remaining
+                else:
+                    self._label_sets.pop(name, None)
+            return True
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Todas las métricas como dicts JSON-serializables por tipo."""
+        with self._lock:
+            items = list(self._metrics.items())
+        result = {"counters": {}, "gauges": {}, "histograms": {}}
+        for (name, labels), metric in sorted(items, key=lambda kv: kv[0]):
+            key = _format_key(name, labels)
+            if isinstance(metric, Counter):
+                result["counters"][key] = metric.value
+            elif isinstance(metric, Gauge):
+                result["gauges"][key] = metric.value
+            else:
+                result["histograms"][key] = metric.snapshot()
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+            self._label_sets.clear()
+
+    # ---------------- internos ----------------
+
+    def _get(self, cls, name: str, labels: Dict[str, Any], *args):
+        key = _key(name, labels)
+        metric = self._metrics.get(key)
+        if metric is not None:
+            return metric
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is not None:
+                return metric
+            if labels:
+                if self._label_sets.get(name, 0) >= MAX_LABEL_SETS:
+                    key = (name, tuple((k, OTHER) for k, _ in key[1]))
+                    metric = self._metrics.get(key)
+                    if metric is not None:
+                        return metric
+                else:
+                    self._label_sets[name] = self._label_sets.get(name, 0) + 1
+            metric = cls(*args)
+            self._metrics[key] = metric
+            return metric
+
+
+def stats_response(registry: Optional[MetricsRegistry] = None, **extra) -> Dict[str, Any]:
+    """Respuesta al mensaje STATS: el snapshot del registro más campos extra (p. ej. node_id)."""
+    registry = registry if registry is not None else REGISTRY
+    return {"type": "STATS_RESPONSE", **extra, "metrics": registry.snapshot()}
+
+
+def format_snapshot(snapshot: Dict[str, Dict[str, Any]]) -> str:
+    """Texto legible de un snapshot (comando `stats` de main.py)."""
+    lines = []
+    for name, value in snapshot.get("counters", {}).items():
+        lines.append(f"  {name} = {value}")
+    for name, value in snapshot.get("gauges", {}).items():
+        lines.append(f"  {name} = {value}")
+    for name, h in snapshot.get("histograms", {}).items():
+        if h["count"]:
+            lines.append(f"  {name}: n={h['count']} mean={h['mean']} p50={h['p50']} p99={h['p99']} max={h['max']}")
+    return "\n".join(lines)
+
+
+def _key(name: str, labels: Dict[str, Any]) -> MetricKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_key(name: str, labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in labels) + "}"
+
+
+# Registro por defecto del proceso
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,299 @@
+"""
+Transporte request/response multiplexado.
+
+Muchos requests en vuelo comparten una sola conexión TCP por peer:
+- Cada request lleva un campo "corr_id" y el servidor lo copia en la respuesta.
+- Un hilo lector por conexión entrega cada respuesta al Future de su corr_id,
+  sin importar el orden en que lleguen.
+- Cada request tiene su propio timeout y puede cancelarse con future.cancel().
+- Si la conexión se cae, todos los requests pendientes fallan con ConnectionError
+  y el siguiente request abre una conexión nueva.
+- Con un CodecNegotiator cada conexión nueva negocia el codec (ver src/codec.py).
+"""
+import heapq
+import itertools
+import logging
+import socket
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Dict, Optional, Tuple
+
+from src.codec import JSON, CodecNegotiator
+from src.framing import (
+    FRAME_NEWLINE, MAX_FRAME_SIZE, FrameReader, FrameTooLarge, connection_preamble, encode_frame,
+)
+from src.metrics import MetricsRegistry
+
+def _resolve(future: Future, result: Any = None, error: Optional[BaseException] = None) -> bool:
+    """
+    Resuelve future con result (o error). Retorna False si ya estaba resuelto o cancelado: un
+    future.cancel() puede llegar entre el done() y el set_result, y no debe tirar al hilo lector.
+    """
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+        return True
+    except InvalidStateError:
+        return False
+
+
+# Campo de correlación que viaja en el request y vuelve en la respuesta
+CORR_FIELD = "corr_id"
+# Tipo de respuesta que envía el servidor cuando el handler no retorna nada
+NO_REPLY = "NO_REPLY"
+
+Peer = Tuple[str, int]
+
+
+class MultiplexedConnection:
+    """Una conexión a un peer con muchos requests pendientes identificados por corr_id."""
+
+    def __init__(self, client: "MultiplexClient", peer: Peer, sock: socket.socket,
+                 codec=JSON, framing: str = FRAME_NEWLINE):
+        self.client = client
+        self.peer = peer
+        self.sock = sock
+        self.codec = codec
+        self.framing = framing
+        self.pending: Dict[str, Future] = {}
+        self.closed = False
+        self._write_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+
+    def submit(self, corr_id: str, data: bytes, future: Future):
+        """Registra el future y escribe el request; si la escritura falla se propaga."""
+        with self._lock:
+            if self.closed:
+                raise ConnectionError(f"Conexión con {self.peer} cerrada")
+            self.pending[corr_id] = future
+        try:
+            with self._write_lock:
+                self.sock.sendall(data)
+        except OSError:
+            with self._lock:
+                self.pending.pop(corr_id, None)
+            self.close()
+            raise
+
+    def forget(self, corr_id: str) -> Optional[Future]:
+        with self._lock:
+            return self.pending.pop(corr_id, None)
+
+    def close(self, error: Optional[Exception] = None):
+        """Cierra la conexión y falla los requests pendientes."""
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            pending = list(self.pending.values())
+            self.pending.clear()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+        self.client._connection_closed(self)
+        error = error or ConnectionError(f"Conexión con {self.peer} cerrada")
+        for future in pending:
+            _resolve(future, error=error)
+
+    def _read_loop(self):
+        reader = FrameReader(self.sock, mode=self.framing, max_frame_size=self.client.max_frame_size)
+        try:
+            while True:
+                frame = reader.read_frame()
+                if frame is None:
+                    break
+                if self.client._bytes_in is not None:
+                    self.client._bytes_in.inc(len(frame))
+                self._deliver(frame)
+        except FrameTooLarge as e:
+            logging.error(f"Respuesta demasiado grande desde {self.peer}: {e}")
+        except OSError as e:
+            if not self.closed:
+                logging.debug(f"Lector multiplexado de {self.peer} terminó: {e}")
+        self.close()
+
+    def _deliver(self, frame):
+        try:
+            response = self.codec.decode(frame)
+        except ValueError as e:
+            logging.error(f"Respuesta multiplexada inválida desde {self.peer}: {e} | data={bytes(frame[:200])!r}")
+            return
+        if response is None:
+            return
+        corr_id = response.pop(CORR_FIELD, None) if isinstance(response, dict) else None
+        future = self.forget(corr_id) if corr_id is not None else None
+        if future is None:
+            # respuesta tardía de un request cancelado o expirado
+            logging.debug(f"Respuesta sin request pendiente desde {self.peer}: {corr_id}")
+            return
+        if response.get("type") == NO_REPLY:
+            response = None
+        _resolve(future, response)
+
+
+class MultiplexClient:
+    """
+    Administra una MultiplexedConnection por peer y los timeouts de cada request.
+    request() retorna un concurrent.futures.Future con el dict de respuesta
+    (None si el handler remoto no respondió nada).
+    """
+
+    def __init__(self, connect_timeout: float = 5.0, framing: str = FRAME_NEWLINE,
+                 max_frame_size: int = MAX_FRAME_SIZE, metrics: Optional[MetricsRegistry] = None,
+                 negotiator: Optional[CodecNegotiator] = None):
+        self.connect_timeout = connect_timeout
+        self.framing = framing
+        self.negotiator = negotiator
+        self.max_frame_size = max_frame_size
+        self._connections: Dict[Peer, MultiplexedConnection] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._prefix = f"{id(self):x}-"
+        # timeouts: heap de (deadline, corr_id, conexión)
+        self._deadlines = []
+        self._timer_cv = threading.Condition()
+        self._timer_thread: Optional[threading.Thread] = None
+        self._closed = False
+
+        # contadores para diagnóstico
+        self.requests = 0
+        self.timeouts = 0
+        self.connections_opened = 0
+        self._bytes_in = metrics.counter("tcp.bytes_in") if metrics is not None else None
+        self._bytes_out = metrics.counter("tcp.bytes_out") if metrics is not None else None
+
+    def request(self, ip: str, port: int, msg: Dict[str, Any], timeout: float = 5.0) -> Future:
+        """Envía msg con un corr_id nuevo y retorna el Future de su respuesta."""
+        future: Future = Future()
+        corr_id = f"{self._prefix}{next(self._ids)}"
+        request = {**msg, CORR_FIELD: corr_id}
+        self.requests += 1
+
+        for _attempt in range(2):
+            try:
+                conn = self._get_connection((ip, port))
+                data = encode_frame(conn.codec.encode(request), conn.framing)
+            except OSError as e:
+                future.set_exception(e)
+                return future
+            if self._bytes_out is not None:
+                self._bytes_out.inc(len(data))
+            try:
+                conn.submit(corr_id, data, future)
+            except OSError:
+                # la conexión compartida estaba rota: reintentar con una nueva
+                continue
+            future.add_done_callback(lambda f, c=conn, cid=corr_id: c.forget(cid) if f.cancelled() else None)
+            self._schedule_timeout(time.monotonic() + timeout, corr_id, conn)
+            return future
+
+        future.set_exception(ConnectionError(f"No se pudo enviar request a {ip}:{port}"))
+        return future
+
+    def close(self):
+        """Cierra todas las conexiones (falla los requests pendientes) y el timer."""
+        with self._lock:
+            self._closed = True
+            conns = list(self._connections.values())
+            self._connections.clear()
+        for conn in conns:
+            conn.close()
+        with self._timer_cv:
+            self._timer_cv.notify_all()
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(len(c.pending) for c in self._connections.values())
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            connections = len(self._connections)
+        return {
+            "requests": self.requests,
+            "timeouts": self.timeouts,
+            "connections": connections,
+            "connections_opened": self.connections_opened,
+            "pending": self.pending_count(),
+        }
+
+    # ---------------- internos ----------------
+
+    def _get_connection(self, peer: Peer) -> MultiplexedConnection:
+        with self._lock:
+            conn = self._connections.get(peer)
+            if conn is not None and not conn.closed:
+                return conn
+        sock, codec, framing = self._connect(peer)
+        with self._lock:
+            existing = self._connections.get(peer)
+            if existing is not None and not existing.closed:
+                # otro hilo conectó primero; usar la suya
+                sock.close()
+                return existing
+            conn = MultiplexedConnection(self, peer, sock, codec, framing)
+            self._connections[peer] = conn
+            self.connections_opened += 1
+            return conn
+
+    def _connect(self, peer: Peer) -> Tuple[socket.socket, Any, str]:
+        """Abre el socket y envía el preámbulo o negocia el codec; reconecta una vez si el hello no tuvo respuesta."""
+        for _attempt in range(2):
+            sock = socket.create_connection(peer, timeout=self.connect_timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            try:
+                if self.negotiator is not None:
+                    opened = self.negotiator.setup(sock, peer, self.framing)
+                else:
+                    preamble = connection_preamble(self.framing)
+                    if preamble:
+                        sock.sendall(preamble)
+                    opened = (JSON, self.framing)
+            except Exception:
+                sock.close()
+                raise
+            if opened is not None:
+                sock.settimeout(None)
+                return (sock,) + opened
+            sock.close()
+        raise ConnectionError(f"No se pudo negociar el codec con {peer[0]}:{peer[1]}")
+
+    def _connection_closed(self, conn: MultiplexedConnection):
+        with self._lock:
+            if self._connections.get(conn.peer) is conn:
+                del self._connections[conn.peer]
+
+    def _schedule_timeout(self, deadline: float, corr_id: str, conn: MultiplexedConnection):
+        with self._timer_cv:
+            heapq.heappush(self._deadlines, (deadline, corr_id, conn))
+            if self._timer_thread is None:
+                self._timer_thread = threading.Thread(target=self._timer_loop, daemon=True)
+                self._timer_thread.start()
+            self._timer_cv.notify()
+
+    def _timer_loop(self):
+        """Un solo hilo vence los requests cuyo deadline pasó."""
+        with self._timer_cv:
+            while not self._closed:
+                if not self._deadlines:
+                    self._timer_cv.wait()
+                    continue
+                deadline, corr_id, conn = self._deadlines[0]
+                now = time.monotonic()
+                if deadline > now:
+                    self._timer_cv.wait(deadline - now)
+                    continue
+                heapq.heappop(self._deadlines)
+                future = conn.forget(corr_id)
+                if future is not None and _resolve(
+                        future, error=TimeoutError(f"Timeout esperando respuesta de {conn.peer}")):
+                    self.timeouts += 1
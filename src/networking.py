@@ -1,46 +1,263 @@
 # src/networking.py
+import asyncio
+import inspect
 import socket
 import threading
-import json
+import time
 import logging
-from typing import Callable, Dict, Any, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional
+
+from src.codec import BINARY, CODEC_JSON, JSON, CodecNegotiator, accept_hello
+from src.coalesce import CoalescingSender
+from src.datagram import CONTROL_TYPES, DatagramChannel
+from src.framing import (
+    FRAME_LENGTH, FRAME_MODES, FRAME_NEWLINE, MAX_FRAME_SIZE, AsyncFrameReader, FrameReader,
+    FrameTooLarge, encode_frame,
+)
+from src.metrics import REGISTRY, Counter, MetricsRegistry
+from src.multiplex import CORR_FIELD, NO_REPLY, MultiplexClient
+from src.pool import ConnectionPool, PooledConnection
+from src.protocol import MessageType, batch_message, run_batch
+from src.tracing import get_tracer
+from src.workers import BUSY, LANE_CONTROL, LANE_DATA, PriorityWorkerPool, WorkerPool
 
 # Configuración básica de logging con timestamp
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(message)s",
 )
+# Trazas por mensaje (apagadas por defecto, ver src/tracing.py)
+_trace = get_tracer("tcp")
 
 # Tipo de callback: función que recibe el dict del mensaje y la dirección del cliente
 # y devuelve opcionalmente una respuesta (dict) que será enviada por el mismo socket.
+# El handler puede ser síncrono o una corrutina (async def); en modo asyncio los
+# handlers síncronos se ejecutan en un executor para no bloquear el event loop.
 MessageHandler = Callable[[Dict[str, Any], tuple], Optional[Dict[str, Any]]]
 
+# Motores de servidor disponibles
+MODE_THREAD = "thread"    # un hilo por conexión (comportamiento original)
+MODE_ASYNCIO = "asyncio"  # un solo event loop para todas las conexiones
+SERVER_MODES = (MODE_THREAD, MODE_ASYNCIO)
+
+# Un BATCH se desarma en el servidor: el handler recibe cada sub-mensaje por separado
+_BATCH = MessageType.BATCH.value
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+
+class _ClientConnection:
+    """Conexión aceptada: socket, lector de frames, codec y lock para escribir respuestas."""
+
+    def __init__(self, sock: socket.socket, addr: tuple, max_frame_size: int, bytes_out: Counter):
+        self.sock = sock
+        self.addr = addr
+        self.bytes_out = bytes_out
+        self.codec = JSON
+        self.reader = FrameReader(sock, max_frame_size=max_frame_size, on_hello=self._on_hello)
+        # las respuestas a requests multiplexados se escriben desde otros hilos
+        self.write_lock = threading.Lock()
+
+    def send(self, response: Dict[str, Any]):
+        """Responde con el codec y el modo de framing que usó el cliente."""
+        data = encode_frame(self.codec.encode(response), self.reader.mode or FRAME_NEWLINE)
+        with self.write_lock:
+            self.sock.sendall(data)
+        self.bytes_out.inc(len(data))
+
+    def _on_hello(self, version: int):
+        reply, self.codec = accept_hello(version)
+        with self.write_lock:
+            self.sock.sendall(bytes([reply]))
+
+
+class _AsyncClientConnection:
+    """Conexión aceptada en modo asyncio: writer, lector de frames y codec negociado."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, max_frame_size: int):
+        self.writer = writer
+        self.addr = writer.get_extra_info("peername")
+        self.codec = JSON
+        self.frames = AsyncFrameReader(reader, max_frame_size=max_frame_size, on_hello=self._on_hello)
+
+    def encode(self, response: Dict[str, Any]) -> bytes:
+        return encode_frame(self.codec.encode(response), self.frames.mode or FRAME_NEWLINE)
+
+    def _on_hello(self, version: int):
+        reply, self.codec = accept_hello(version)
+        self.writer.write(bytes([reply]))
+
 
 class TCPServer:
     """
-    Servidor TCP multi-thread simple para el laboratorio P2P.
+    Servidor TCP simple para el laboratorio P2P.
     - Escucha conexiones entrantes.
     - Recibe mensajes en formato JSON (una línea por mensaje).
     - Llama a un handler para procesar cada mensaje.
+
+    mode="thread" usa un hilo por conexión; mode="asyncio" atiende todas las
+    conexiones desde un único event loop (handlers síncronos en un executor
+    de executor_workers hilos, handlers async se esperan directamente).
+
+    Los envíos salientes (send_message/request_response) reutilizan conexiones
+    de un ConnectionPool por peer; pool_size=0 vuelve a una conexión por mensaje.
+    Con multiplex=True los request/response comparten una conexión por peer y se
+    correlacionan por corr_id (ver request_async).
+
+    Con workers=N los mensajes leídos se encolan en un WorkerPool de N hilos y
+    cola de queue_size; si la cola está llena se responde BUSY (admission control).
+    En ese caso el orden de procesamiento dentro de una conexión no está garantizado.
+    Con control_workers=M además se separan carriles de prioridad: los mensajes de
+    control (CHORD_*, heartbeats) tienen M workers y cola propios, y los de datos
+    (PUT/GET/REPLICATE, aplicación) usan los N workers restantes (ver get_worker_stats).
+
+    framing elige cómo se envían los mensajes salientes: "newline" (una línea JSON,
+    por defecto) o "length" (cabecera de 4 bytes). Las conexiones entrantes detectan
+    el modo solas y se rechazan frames de más de max_frame_size bytes.
+
+    codec="binary" negocia el codec binario compacto en cada conexión saliente
+    (siempre length-prefixed); los peers que no contestan el hello en codec_timeout
+    segundos quedan en JSON. Las conexiones entrantes aceptan ambos codecs.
+
+    Con coalesce_window=segundos, send_message solo encola el frame y un writer por
+    peer junta los frames de esa ventana en un único sendmsg (ver src/coalesce.py).
+
+    Con udp=True también se escucha UDP en el mismo puerto y send_control /
+    request_control mandan los mensajes de control (heartbeats, NOTIFY) como
+    datagramas a los peers que ya respondieron por UDP (ver src/datagram.py).
+    El tráfico de storage sigue por TCP.
+
+    reuse_port=True activa SO_REUSEPORT en el listener para que varios procesos
+    compartan el puerto (ver src/sharding.py).
+
+    Las métricas (bytes, conexiones, tiempo de handler por tipo) se registran en
+    metrics (por defecto el REGISTRY del proceso, ver src/metrics.py).
     """
 
-    def __init__(self, host: str, port: int, message_handler: MessageHandler):
+    def __init__(self, host: str, port: int, message_handler: MessageHandler,
+                 mode: str = MODE_THREAD, executor_workers: Optional[int] = None,
+                 pool_size: int = 4, pool_idle_timeout: float = 30.0,
+                 multiplex: bool = True, workers: Optional[int] = None,
+                 queue_size: int = 1000, control_workers: Optional[int] = None,
+                 framing: str = FRAME_NEWLINE,
+                 max_frame_size: int = MAX_FRAME_SIZE,
+                 coalesce_window: Optional[float] = None, udp: bool = False,
+                 udp_probe_timeout: float = 0.5, reuse_port: bool = False,
+                 metrics: Optional[MetricsRegistry] = None,
+                 codec: str = CODEC_JSON, codec_timeout: float = 1.0):
+        if mode not in SERVER_MODES:
+            raise ValueError(f"Modo de servidor inválido: {mode}")
+        if framing not in FRAME_MODES:
+            raise ValueError(f"Modo de framing inválido: {framing}")
+        self.negotiator = CodecNegotiator(preferred=codec, timeout=codec_timeout)
         self.host = host
         self.port = port
         self.message_handler = message_handler
+        self.mode = mode
+        self.executor_workers = executor_workers
+        self.framing = framing
+        self.max_frame_size = max_frame_size
+        self.reuse_port = reuse_port
         self._server_socket = None
         self._running = False
+        self._client_sockets = set()
+
+        # métricas: se guardan las referencias para no buscarlas en cada mensaje
+        self.metrics = metrics if metrics is not None else REGISTRY
+        self._bytes_in = self.metrics.counter("tcp.bytes_in")
+        self._bytes_out = self.metrics.counter("tcp.bytes_out")
+        self._accepted = self.metrics.counter("tcp.connections_accepted")
+        self._batch_size = self.metrics.histogram("tcp.batch_size", buckets=BATCH_SIZE_BUCKETS)
+
+        # pool de conexiones salientes
+        self.pool: Optional[ConnectionPool] = (
+            ConnectionPool(max_size=pool_size, idle_timeout=pool_idle_timeout)
+            if pool_size > 0 else None
+        )
+
+        # request/response multiplexado
+        self._mux_client: Optional[MultiplexClient] = (
+            MultiplexClient(framing=framing, max_frame_size=max_frame_size, metrics=self.metrics,
+                            negotiator=self.negotiator)
+            if multiplex else None
+        )
+        self._mux_executor: Optional[ThreadPoolExecutor] = None
+
+        # coalescing de send_message por peer (opcional)
+        self._coalescer: Optional[CoalescingSender] = (
+            CoalescingSender(
+                connect=lambda ip, port: self._acquire(ip, port, 5.0, channel="send"),
+                release=self._release, discard=self._discard,
+                flush_window=coalesce_window, idle_timeout=pool_idle_timeout,
+            )
+            if coalesce_window is not None else None
+        )
+
+        # canal UDP para mensajes de control (opcional)
+        self.udp: Optional[DatagramChannel] = DatagramChannel(host, port, self._handle_datagram) if udp else None
+        self.udp_probe_timeout = udp_probe_timeout
+
+        # pool de workers con cola acotada (opcional)
+        if control_workers:
+            self.workers = PriorityWorkerPool({
+                LANE_CONTROL: (control_workers, queue_size),
+                LANE_DATA: (workers or 8, queue_size),
+            })
+        elif workers:
+            self.workers = WorkerPool(num_workers=workers, queue_size=queue_size)
+        else:
+            self.workers = None
+
+        # estado del motor asyncio
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._aio_server = None
+        self._aio_writers = set()
+        self._aio_tasks = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        # gauges con el puerto como etiqueta: otro servidor en el mismo registro no los pisa; stop() los quita
+        self._gauges = ["tcp.connections_open"]
+        self.metrics.gauge("tcp.connections_open", fn=lambda: len(self._client_sockets) + len(self._aio_writers),
+                           port=self.port)
+        for name, component, stats in (
+            ("tcp.pool", self.pool, self.get_pool_stats),
+            ("tcp.multiplex", self._mux_client, self.get_multiplex_stats),
+            ("tcp.workers", self.workers, self.get_worker_stats),
+            ("tcp.coalesce", self._coalescer, self.get_coalesce_stats),
+            ("udp", self.udp, self.get_udp_stats),
+            ("tcp.codec", self.negotiator, self.negotiator.get_stats),
+        ):
+            if component is not None:
+                self.metrics.gauge(name, fn=stats, port=self.port)
+                self._gauges.append(name)
 
     def start(self):
         """Inicia el servidor en un hilo separado."""
         self._server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         # Reusar dirección para reiniciar rápido el servidor
         self._server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.reuse_port:
+            # varios procesos escuchan el mismo puerto; el kernel reparte las conexiones
+            self._server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         self._server_socket.bind((self.host, self.port))
         self._server_socket.listen()
 
         self._running = True
-        logging.info(f"Servidor TCP escuchando en {self.host}:{self.port}")
+        logging.info(f"Servidor TCP escuchando en {self.host}:{self.port} (modo {self.mode})")
+        if self.workers is not None:
+            self.workers.start()
+        if self.udp is not None:
+            self.udp.start()
+
+        if self.mode == MODE_ASYNCIO:
+            self._start_asyncio()
+            return
+
+        self._mux_executor = ThreadPoolExecutor(
+            max_workers=self.executor_workers, thread_name_prefix="tcp-mux"
+        )
 
         thread = threading.Thread(target=self._accept_loop, daemon=True)
         thread.start()
@@ -48,13 +265,82 @@ class TCPServer:
     def stop(self):
         """Detiene el servidor."""
         self._running = False
+        for name in self._gauges:
+            self.metrics.remove(name, port=self.port)
+        if self.mode == MODE_ASYNCIO:
+            self._stop_asyncio()
+        if self._coalescer is not None:
+            self._coalescer.close()
+        if self.udp is not None:
+            self.udp.stop()
+        if self.pool is not None:
+            self.pool.close_all()
+        if self._mux_client is not None:
+            self._mux_client.close()
+        if self._mux_executor is not None:
+            self._mux_executor.shutdown(wait=False)
+        if self.workers is not None:
+            self.workers.stop()
         if self._server_socket:
+            try:
+                # shutdown despierta al accept() bloqueado en el hilo de accept
+                self._server_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
             try:
                 self._server_socket.close()
             except OSError:
                 pass
+        # cerrar las conexiones aceptadas que siguen abiertas (modo thread)
+        for client_socket in list(self._client_sockets):
+            try:
+                client_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
         logging.info("Servidor TCP detenido")
 
+    def _call_handler(self, msg: Dict[str, Any], client_addr: tuple) -> Optional[Dict[str, Any]]:
+        """Llama al handler desde un hilo; si es una corrutina la ejecuta hasta terminar."""
+        if msg.get("type") == _BATCH:
+            return self._handle_batch(msg, client_addr)
+        started = time.perf_counter()
+        try:
+            result = self.message_handler(msg, client_addr)
+            if inspect.isawaitable(result):
+                result = asyncio.run(_await(result))
+            return result
+        finally:
+            self._observe_handler(msg, time.perf_counter() - started)
+
+    def _handle_datagram(self, msg: Dict[str, Any], client_addr: tuple):
+        """Handler del canal UDP: con WorkerPool el mensaje pasa por la cola (y su carril) como uno de TCP."""
+        if self.workers is None:
+            return self._call_handler(msg, client_addr)
+        future = self.workers.submit_message(msg, self._call_handler, msg, client_addr)
+        if future is None:
+            logging.warning(f"Servidor sobrecargado: datagrama de {client_addr} rechazado")
+            return self._busy_response()
+        return future
+
+    def _handle_batch(self, msg: Dict[str, Any], client_addr: tuple) -> Dict[str, Any]:
+        """Pasa cada sub-mensaje del BATCH al handler y responde un solo BATCH_RESPONSE."""
+        messages = msg.get("messages")
+        if isinstance(messages, list):
+            self._batch_size.observe(len(messages))
+        started = time.perf_counter()
+        try:
+            return run_batch(msg, lambda item: self._call_handler(item, client_addr))
+        finally:
+            self._observe_handler(msg, time.perf_counter() - started)
+
+    def _record_message(self, msg: Any, nbytes: int):
+        """Cuenta un mensaje entrante: bytes y mensajes por tipo."""
+        self._bytes_in.inc(nbytes)
+        self.metrics.counter("tcp.messages_in", type=_msg_type(msg)).inc()
+
+    def _observe_handler(self, msg: Any, elapsed: float):
+        self.metrics.histogram("tcp.handler_seconds", type=_msg_type(msg)).observe(elapsed)
+
     def _accept_loop(self):
         """Bucle principal para aceptar conexiones."""
         while self._running:
@@ -64,7 +350,8 @@ class TCPServer:
                 # El socket fue cerrado
                 break
 
-            logging.info(f"Nueva conexión desde {client_addr}")
+            _trace.debug("conn_open", peer=client_addr)
+            self._accepted.inc()
             client_thread = threading.Thread(
                 target=self._handle_client,
                 args=(client_socket, client_addr),
@@ -74,109 +361,517 @@ class TCPServer:
 
     def _handle_client(self, client_socket: socket.socket, client_addr: tuple):
         """Maneja una conexión con un cliente (en un hilo separado)."""
+        self._client_sockets.add(client_socket)
+        conn = _ClientConnection(client_socket, client_addr, self.max_frame_size, self._bytes_out)
         with client_socket:
             try:
-                # Se asume que cada mensaje es una línea JSON terminada en '\n'
-                buffer = ""
+                # Cada frame es un mensaje JSON (línea terminada en '\n' o length-prefixed)
                 while True:
-                    data = client_socket.recv(4096)
-                    if not data:
-                        logging.info(f"Conexión cerrada por {client_addr}")
+                    frame = conn.reader.read_frame()
+                    if frame is None:
+                        _trace.debug("conn_closed", peer=client_addr)
                         break
-                    buffer += data.decode("utf-8")
-
-                    # Procesar líneas completas
-                    while "\n" in buffer:
-                        line, buffer = buffer.split("\n", 1)
-                        line = line.strip()
-                        if not line:
-                            continue
-                        try:
-                            msg = json.loads(line)
-                            logging.info(f"Mensaje recibido de {client_addr}: {msg}")
-                            # Llamar al handler para que otro módulo procese el mensaje
-                            response = self.message_handler(msg, client_addr)
-                            # Si el handler retorna una respuesta, enviarla por el mismo socket
-                            if response is not None:
-                                try:
-                                    json_str = json.dumps(response)
-                                    client_socket.sendall((json_str + "\n").encode("utf-8"))
-                                    logging.info(f"Respuesta enviada a {client_addr}: {response}")
-                                except Exception as e:
-                                    logging.error(f"Error enviando respuesta a {client_addr}: {e}")
-                        except json.JSONDecodeError as e:
-                            logging.error(
-                                f"Error al parsear JSON desde {client_addr}: {e} | data={line}"
-                            )
+                    try:
+                        msg = conn.codec.decode(frame)
+                    except ValueError as e:
+                        logging.error(
+                            f"Error al decodificar mensaje desde {client_addr}: {e} | data={bytes(frame[:200])!r}"
+                        )
+                        continue
+                    if msg is None:
+                        continue
+                    self._record_message(msg, len(frame))
+                    _trace.debug("msg_in", peer=client_addr, msg=msg)
+                    if self.workers is not None:
+                        # el hilo lector solo encola; un worker ejecuta el handler
+                        self._submit_to_workers(msg, conn)
+                        continue
+                    if isinstance(msg, dict) and CORR_FIELD in msg:
+                        # request multiplexado: se atiende en paralelo y la
+                        # respuesta puede salir en cualquier orden
+                        self._mux_executor.submit(self._process_correlated, msg, conn)
+                        continue
+                    # Llamar al handler para que otro módulo procese el mensaje
+                    response = self._call_handler(msg, client_addr)
+                    # Si el handler retorna una respuesta, enviarla por el mismo socket
+                    if response is not None:
+                        self._send_response(conn, response)
+            except FrameTooLarge as e:
+                logging.error(f"Frame demasiado grande desde {client_addr}: {e}; cerrando conexión")
             except ConnectionResetError:
                 logging.warning(f"Conexión reseteada por el cliente {client_addr}")
             except Exception as e:
                 logging.exception(f"Error manejando conexión con {client_addr}: {e}")
+            finally:
+                self._client_sockets.discard(client_socket)
+
+    def _process_correlated(self, msg: Dict[str, Any], conn: _ClientConnection):
+        """Atiende un request con corr_id y responde siempre (NO_REPLY si no hay respuesta)."""
+        corr_id = msg.pop(CORR_FIELD)
+        try:
+            response = self._call_handler(msg, conn.addr)
+        except Exception as e:
+            logging.exception(f"Error en handler para {conn.addr}: {e}")
+            response = None
+        self._send_response(conn, _correlate(response, corr_id))
 
+    def _submit_to_workers(self, msg: Dict[str, Any], conn: _ClientConnection):
+        """Encola el mensaje en el WorkerPool; si la cola está llena responde BUSY."""
+        corr_id = msg.pop(CORR_FIELD, None) if isinstance(msg, dict) else None
+        future = self.workers.submit_message(msg, self._call_handler, msg, conn.addr)
+        if future is None:
+            logging.warning(f"Servidor sobrecargado: mensaje de {conn.addr} rechazado")
+            response = self._busy_response()
+            if corr_id is not None:
+                response = _correlate(response, corr_id)
+            self._send_response(conn, response)
+            return
+
+        def _done(f: Future):
+            try:
+                response = f.result()
+            except Exception as e:
+                logging.error(f"Error en handler para {conn.addr}: {e}")
+                response = None
+            if corr_id is not None:
+                response = _correlate(response, corr_id)
+            if response is not None:
+                self._send_response(conn, response)
+
+        future.add_done_callback(_done)
+
+    def _busy_response(self) -> Dict[str, Any]:
+        return {
+            "type": BUSY,
+            "error": "overloaded",
+            "queue_depth": self.workers.queue_depth() if self.workers else 0,
+        }
+
+    def get_worker_stats(self) -> Dict[str, int]:
+        """Profundidad de la cola, rechazos y latencias del pool (por carril en "lanes")."""
+        return self.workers.get_stats() if self.workers is not None else {}
+
+    @staticmethod
+    def _send_response(conn: _ClientConnection, response: Dict[str, Any]):
+        try:
+            conn.send(response)
+            _trace.debug("response_out", peer=conn.addr, msg=response)
+        except Exception as e:
+            logging.error(f"Error enviando respuesta a {conn.addr}: {e}")
+
+
+    # ---------------- Motor asyncio ----------------
+
+    def _start_asyncio(self):
+        """Levanta el event loop en un hilo propio y registra el servidor asyncio."""
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.executor_workers, thread_name_prefix="tcp-handler"
+        )
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        self._loop_thread = threading.Thread(
+            target=self._run_loop, args=(ready,), daemon=True
+        )
+        self._loop_thread.start()
+        ready.wait()
+
+    def _run_loop(self, ready: threading.Event):
+        asyncio.set_event_loop(self._loop)
+        self._aio_server = self._loop.run_until_complete(
+            asyncio.start_server(
+                self._handle_client_async, sock=self._server_socket,
+                limit=self.max_frame_size + 1
+            )
+        )
+        ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    def _stop_asyncio(self):
+        """Cierra el servidor asyncio, las conexiones abiertas y el executor."""
+        if not self._loop or not self._loop.is_running():
+            return
+        future = asyncio.run_coroutine_threadsafe(self._shutdown_async(), self._loop)
+        try:
+            future.result(timeout=5)
+        except Exception as e:
+            logging.warning(f"Error cerrando servidor asyncio: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._loop_thread:
+            self._loop_thread.join(timeout=5)
+        if self._executor:
+            self._executor.shutdown(wait=False)
+
+    async def _shutdown_async(self):
+        if self._aio_server:
+            self._aio_server.close()
+        for writer in list(self._aio_writers):
+            writer.close()
+        if self._aio_server:
+            await self._aio_server.wait_closed()
+
+    async def _dispatch_async(self, msg: Dict[str, Any], client_addr: tuple) -> Optional[Dict[str, Any]]:
+        """Ejecuta el handler: las corrutinas se esperan, las funciones van al executor."""
+        if self.workers is None and msg.get("type") == _BATCH:
+            # el lote entero se procesa en un hilo del executor (ver _handle_batch)
+            return await self._loop.run_in_executor(self._executor, self._handle_batch, msg, client_addr)
+        if self.workers is not None:
+            # con WorkerPool todo handler pasa por la cola acotada
+            future = self.workers.submit_message(msg, self._call_handler, msg, client_addr)
+            if future is None:
+                logging.warning(f"Servidor sobrecargado: mensaje de {client_addr} rechazado")
+                return self._busy_response()
+            return await asyncio.wrap_future(future)
+        started = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(self.message_handler):
+                return await self.message_handler(msg, client_addr)
+            result = await self._loop.run_in_executor(
+                self._executor, self.message_handler, msg, client_addr
+            )
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+        finally:
+            self._observe_handler(msg, time.perf_counter() - started)
+
+    async def _process_correlated_async(self, msg: Dict[str, Any], conn: _AsyncClientConnection):
+        corr_id = msg.pop(CORR_FIELD)
+        try:
+            response = await self._dispatch_async(msg, conn.addr)
+        except Exception as e:
+            logging.exception(f"Error en handler para {conn.addr}: {e}")
+            response = None
+        await self._write_async(conn, _correlate(response, corr_id))
+
+    async def _write_async(self, conn: _AsyncClientConnection, response: Dict[str, Any]):
+        try:
+            data = conn.encode(response)
+            conn.writer.write(data)
+            self._bytes_out.inc(len(data))
+            await conn.writer.drain()
+            _trace.debug("response_out", peer=conn.addr, msg=response)
+        except Exception as e:
+            logging.error(f"Error enviando respuesta a {conn.addr}: {e}")
+
+    async def _handle_client_async(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Maneja una conexión dentro del event loop (equivalente a _handle_client)."""
+        conn = _AsyncClientConnection(reader, writer, self.max_frame_size)
+        client_addr = conn.addr
+        _trace.debug("conn_open", peer=client_addr)
+        self._accepted.inc()
+        self._aio_writers.add(writer)
+        try:
+            while True:
+                frame = await conn.frames.read_frame()
+                if frame is None:
+                    _trace.debug("conn_closed", peer=client_addr)
+                    break
+                try:
+                    msg = conn.codec.decode(frame)
+                except ValueError as e:
+                    logging.error(f"Error al decodificar mensaje desde {client_addr}: {e} | data={frame[:200]!r}")
+                    continue
+                if msg is None:
+                    continue
+                self._record_message(msg, len(frame))
+                _trace.debug("msg_in", peer=client_addr, msg=msg)
+                if isinstance(msg, dict) and CORR_FIELD in msg:
+                    # request multiplexado: no bloquea la lectura de los siguientes
+                    task = asyncio.ensure_future(self._process_correlated_async(msg, conn))
+                    self._aio_tasks.add(task)
+                    task.add_done_callback(self._aio_tasks.discard)
+                    continue
+                response = await self._dispatch_async(msg, client_addr)
+                if response is not None:
+                    await self._write_async(conn, response)
+        except FrameTooLarge as e:
+            logging.error(f"Frame demasiado grande desde {client_addr}: {e}; cerrando conexión")
+        except ConnectionResetError:
+            logging.warning(f"Conexión reseteada por el cliente {client_addr}")
+        except Exception as e:
+            logging.exception(f"Error manejando conexión con {client_addr}: {e}")
+        finally:
+            self._aio_writers.discard(writer)
+            writer.close()
+
+    # ---------------- Envío (conexiones salientes) ----------------
+
+    def _acquire(self, ip: str, port: int, timeout: float, channel: str) -> PooledConnection:
+        """
+        Obtiene una conexión desde el pool, o una nueva si el pool está desactivado.
+        En conexiones nuevas envía el preámbulo del modo de framing o negocia el
+        codec (conn.codec / conn.framing); si el peer no contesta el hello se
+        reconecta una vez en JSON.
+        """
+        for _attempt in range(2):
+            if self.pool is not None:
+                conn = self.pool.acquire(ip, port, timeout=timeout, channel=channel)
+            else:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                sock.settimeout(timeout)
+                try:
+                    sock.connect((ip, port))
+                except Exception:
+                    sock.close()
+                    raise
+                conn = PooledConnection((ip, port, channel), sock)
+            if conn.reused:
+                return conn
+            try:
+                opened = self.negotiator.setup(conn.sock, (ip, port), self.framing)
+            except Exception:
+                self._discard(conn)
+                raise
+            if opened is not None:
+                conn.codec, conn.framing = opened
+                return conn
+            self._discard(conn)
+        raise ConnectionError(f"No se pudo negociar el codec con {ip}:{port}")
+
+    def _encode(self, msg: Dict[str, Any], codec, framing: str) -> bytes:
+        data = encode_frame(codec.encode(msg), framing)
+        self._bytes_out.inc(len(data))
+        return data
+
+    def _peer_codec(self, ip: str, port: int):
+        """
+        Codec y framing para frames que se codifican antes de tener conexión
+        (coalescing). Si el codec del peer no se conoce se negocia abriendo una
+        conexión del canal "send", que queda en el pool para el writer.
+        """
+        codec = self.negotiator.known_codec((ip, port))
+        if codec is None:
+            conn = self._acquire(ip, port, 5.0, channel="send")
+            self._release(conn)
+            codec = conn.codec
+        return codec, (FRAME_LENGTH if codec is BINARY else self.framing)
+
+    def _release(self, conn: PooledConnection):
+        if self.pool is not None:
+            self.pool.release(conn)
+        else:
+            conn.close()
+
+    def _discard(self, conn: PooledConnection):
+        if self.pool is not None:
+            self.pool.discard(conn)
+        else:
+            conn.close()
 
     def send_message(self, ip: str, port: int, msg: Dict[str, Any], timeout: float = 5.0) -> bool:
         """
         Envía un mensaje JSON a (ip, port) usando TCP.
         - msg debe ser un dict serializable a JSON.
-        - Se envía como una línea de texto terminada en '\n'.
+        - Se envía como un frame del modo self.framing (por defecto una línea
+          de texto terminada en '\n').
+        - Reutiliza conexiones del pool; si una conexión reutilizada está rota
+          se reintenta una vez con una conexión nueva.
+        - Con coalescing activo solo encola el frame: True significa encolado.
         """
-        json_str = json.dumps(msg)
-        data = (json_str + "\n").encode("utf-8")
-        logging.info(f"Enviando mensaje a {ip}:{port}: {msg}")
+        _trace.debug("send", peer=(ip, port), msg=msg)
+        if self._coalescer is not None:
+            try:
+                codec, framing = self._peer_codec(ip, port)
+            except (ConnectionRefusedError, ConnectionError, socket.timeout) as e:
+                logging.error(f"No se pudo enviar mensaje a {ip}:{port}: {e}")
+                return False
+            return self._coalescer.send(ip, port, self._encode(msg, codec, framing))
 
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(timeout)
-        try:
-            sock.connect((ip, port))
-            sock.sendall(data)
+        for _attempt in range(2):
+            try:
+                conn = self._acquire(ip, port, timeout, channel="send")
+            except (ConnectionRefusedError, ConnectionError, socket.timeout) as e:
+                logging.error(f"No se pudo enviar mensaje a {ip}:{port}: {e}")
+                return False
+            try:
+                conn.sock.sendall(self._encode(msg, conn.codec, conn.framing))
+            except (ConnectionRefusedError, socket.timeout) as e:
+                self._discard(conn)
+                logging.error(f"No se pudo enviar mensaje a {ip}:{port}: {e}")
+                return False
+            except OSError as e:
+                self._discard(conn)
+                if conn.reused:
+                    logging.debug(f"Conexión reutilizada con {ip}:{port} rota ({e}); reconectando")
+                    continue
+                raise
+            self._release(conn)
             return True
-        except (ConnectionRefusedError, socket.timeout) as e:
-            logging.error(f"No se pudo enviar mensaje a {ip}:{port}: {e}")
-            return False
-        finally:
-            sock.close()
+        return False
 
     def request_response(self, ip: str, port: int, msg: Dict[str, Any], timeout: float = 5.0) -> Optional[Dict[str, Any]]:
         """
         Envía un mensaje JSON a (ip, port) y espera una respuesta JSON en la
         misma conexión. Retorna el dict de la respuesta o None si falla.
+        La conexión vuelve al pool solo si el intercambio terminó completo.
         """
-        json_str = json.dumps(msg)
-        data = (json_str + "\n").encode("utf-8")
-        logging.info(f"Solicitando (request/response) a {ip}:{port}: {msg}")
+        if self._mux_client is not None:
+            _trace.debug("request", peer=(ip, port), msg=msg)
+            try:
+                response = self.request_async(ip, port, msg, timeout).result()
+                _trace.debug("response_in", peer=(ip, port), msg=response)
+                return response
+            except (ConnectionRefusedError, TimeoutError, socket.timeout) as e:
+                logging.error(f"Fallo request/response con {ip}:{port}: {e}")
+            except Exception as e:
+                logging.error(f"Error en request/response con {ip}:{port}: {e}")
+            return None
 
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(timeout)
-        try:
-            sock.connect((ip, port))
-            sock.sendall(data)
+        _trace.debug("request", peer=(ip, port), msg=msg)
 
-            buffer = ""
-            # Esperar una sola línea de respuesta
-            while True:
-                chunk = sock.recv(4096)
-                if not chunk:
-                    break
-                buffer += chunk.decode("utf-8")
-                if "\n" in buffer:
-                    line, _rest = buffer.split("\n", 1)
-                    line = line.strip()
-                    if not line:
-                        return None
-                    try:
-                        response = json.loads(line)
-                        logging.info(f"Respuesta recibida desde {ip}:{port}: {response}")
-                        return response
-                    except json.JSONDecodeError as e:
-                        logging.error(f"Error parseando respuesta desde {ip}:{port}: {e} | data={line}")
-                        return None
-        except (ConnectionRefusedError, socket.timeout) as e:
-            logging.error(f"Fallo request/response con {ip}:{port}: {e}")
-        except Exception as e:
-            logging.exception(f"Error en request/response con {ip}:{port}: {e}")
-        finally:
+        for _attempt in range(2):
+            conn = None
             try:
-                sock.close()
-            except Exception:
-                pass
+                conn = self._acquire(ip, port, timeout, channel="request")
+                if conn.reader is None:
+                    conn.reader = FrameReader(conn.sock, mode=conn.framing,
+                                              max_frame_size=self.max_frame_size)
+                conn.sock.sendall(self._encode(msg, conn.codec, conn.framing))
+                frame = conn.reader.read_frame()
+                if frame is None:
+                    # el peer cerró la conexión sin responder
+                    self._discard(conn)
+                    if conn.reused:
+                        logging.debug(f"Conexión reutilizada con {ip}:{port} cerrada; reconectando")
+                        continue
+                    return None
+                self._bytes_in.inc(len(frame))
+                try:
+                    response = conn.codec.decode(frame)
+                except ValueError as e:
+                    self._release(conn)
+                    logging.error(f"Error parseando respuesta desde {ip}:{port}: {e} | data={bytes(frame[:200])!r}")
+                    return None
+                self._release(conn)
+                _trace.debug("response_in", peer=(ip, port), msg=response)
+                return response
+            except (ConnectionRefusedError, socket.timeout) as e:
+                if conn:
+                    self._discard(conn)
+                logging.error(f"Fallo request/response con {ip}:{port}: {e}")
+                return None
+            except OSError as e:
+                if conn:
+                    self._discard(conn)
+                    if conn.reused:
+                        logging.debug(f"Conexión reutilizada con {ip}:{port} rota ({e}); reconectando")
+                        continue
+                logging.exception(f"Error en request/response con {ip}:{port}: {e}")
+                return None
+            except Exception as e:
+                if conn:
+                    self._discard(conn)
+                logging.exception(f"Error en request/response con {ip}:{port}: {e}")
+                return None
         return None
+
+    def request_async(self, ip: str, port: int, msg: Dict[str, Any], timeout: float = 5.0) -> Future:
+        """
+        Envía un request sin bloquear y retorna un Future con la respuesta (dict, o
+        None si el handler remoto no respondió). El Future falla con TimeoutError
+        si vence el timeout y puede cancelarse con future.cancel().
+        """
+        if self._mux_client is not None:
+            return self._mux_client.request(ip, port, msg, timeout=timeout)
+        # sin multiplexación: request/response bloqueante envuelto en un Future ya resuelto
+        future: Future = Future()
+        future.set_result(self.request_response(ip, port, msg, timeout))
+        return future
+
+    def request_batch(self, ip: str, port: int, messages: List[Dict[str, Any]],
+                      timeout: float = 5.0) -> Optional[List[Optional[Dict[str, Any]]]]:
+        """
+        Envía varios mensajes en un solo BATCH (un frame, un viaje) y retorna la
+        respuesta de cada uno en el mismo orden (None si el handler no respondió,
+        un ERROR si ese mensaje falló), o None si no hubo respuesta del lote.
+        """
+        response = self.request_response(ip, port, batch_message(messages), timeout)
+        if not response or response.get("type") != MessageType.BATCH_RESPONSE.value:
+            if response:
+                logging.error(f"Respuesta inesperada a BATCH desde {ip}:{port}: {response.get('type')}")
+            return None
+        return response.get("results")
+
+    def send_control(self, ip: str, port: int, msg: Dict[str, Any], timeout: float = 5.0) -> bool:
+        """
+        Envía un mensaje de control fire-and-forget (solo los tipos de CONTROL_TYPES
+        usan UDP; el resto va por send_message). A peers que ya respondieron
+        por UDP va como datagrama (si se pierde no se reenvía); al resto se le
+        prueba por UDP y, si no llega el ACK en udp_probe_timeout, se reenvía por TCP.
+        """
+        if self.udp is None or msg.get("type") not in CONTROL_TYPES:
+            return self.send_message(ip, port, msg, timeout)
+        supported = self.udp.supports(ip, port)
+        try:
+            future = self.udp.send(ip, port, msg, timeout if supported else self.udp_probe_timeout)
+        except ValueError:
+            return self.send_message(ip, port, msg, timeout)
+        if not supported:
+            def _fallback(f: Future):
+                if f.exception() is not None:
+                    self.send_message(ip, port, msg, timeout)
+            future.add_done_callback(_fallback)
+        return True
+
+    def request_control(self, ip: str, port: int, msg: Dict[str, Any], timeout: float = 5.0) -> Optional[Dict[str, Any]]:
+        """
+        Request/response de control (p. ej. CHORD_HEARTBEAT -> HEARTBEAT_ACK) por UDP.
+        Un datagrama perdido hacia un peer UDP retorna None (un fallo tolerado por
+        quien llama); si el peer nunca respondió por UDP se usa request_response.
+        """
+        if self.udp is None or msg.get("type") not in CONTROL_TYPES:
+            return self.request_response(ip, port, msg, timeout)
+        supported = self.udp.supports(ip, port)
+        try:
+            future = self.udp.send(ip, port, msg, timeout if supported else min(timeout, self.udp_probe_timeout))
+            return future.result()
+        except ValueError:
+            pass
+        except (TimeoutError, OSError) as e:
+            if supported:
+                logging.debug(f"Datagrama de control a {ip}:{port} perdido: {e}")
+                return None
+        return self.request_response(ip, port, msg, timeout)
+
+    def get_udp_stats(self) -> Dict[str, int]:
+        """Contadores del canal UDP de control."""
+        return self.udp.get_stats() if self.udp is not None else {}
+
+    def get_pool_stats(self) -> Dict[str, int]:
+        """Contadores del pool de conexiones salientes."""
+        return self.pool.get_stats() if self.pool is not None else {}
+
+    def get_multiplex_stats(self) -> Dict[str, int]:
+        """Contadores del transporte request/response multiplexado."""
+        return self._mux_client.get_stats() if self._mux_client is not None else {}
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que se escriban los send_message encolados (solo con coalescing)."""
+        return self._coalescer.flush(timeout) if self._coalescer is not None else True
+
+    def get_coalesce_stats(self) -> Dict[str, float]:
+        """Contadores del coalescing de escrituras (incluye frames_per_syscall)."""
+        return self._coalescer.get_stats() if self._coalescer is not None else {}
+
+
+def _msg_type(msg: Any) -> str:
+    """Etiqueta "type" para las métricas (acotada para no explotar la cardinalidad)."""
+    msg_type = msg.get("type") if isinstance(msg, dict) else None
+    if isinstance(msg_type, str) and 0 < len(msg_type) <= 40:
+        return msg_type
+    return "unknown"
+
+
+def _correlate(response: Optional[Dict[str, Any]], corr_id: str) -> Dict[str, Any]:
+    """Copia la respuesta agregando el corr_id del request (NO_REPLY si no hay respuesta)."""
+    if response is None:
+        return {"type": NO_REPLY, CORR_FIELD: corr_id}
+    return {**response, CORR_FIELD: corr_id}
+
+
+async def _await(awaitable):
+    """Envuelve un awaitable cualquiera para poder pasarlo a asyncio.run()."""
+    return await awaitable
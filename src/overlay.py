@@ -4,13 +4,21 @@ import json
 import socket
 import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
 from typing import Optional, Dict, List, Tuple, Any
 from enum import Enum
 import logging
 
+from src.failure_detector import FailureDetector, PhiAccrualDetector
+from src.metrics import COUNT_BUCKETS, REGISTRY
+from src.range_cache import RangeCache
+from src.ring import (
+    M, RING_SIZE, NodeRef, RoutingIndex, between, between_many, distance, finger_starts, to_hex, to_int,
+)
+
 #importar protocol.py para obtener los mensajes disponibles
 try:
-    from src.protocol import MessageType, Message, serializeMessage, deserialize_message
+    from src.protocol import MessageType, Message, serializeMessage, deserialize_message, run_batch
     PROTOCOL_AVAILABLE = True
 except ImportError:
     #print("protocol.py no disponible.")
@@ -26,31 +34,94 @@ logger = logging.getLogger(__name__)
 #clase chordnode para importar
 class ChordNode:
 
+    # períodos de mantenimiento en segundos (hilos de mantenimiento y src/simulator.py)
+    STABILIZE_INTERVAL = 2
+    FIX_FINGERS_INTERVAL = 5
+    FINGERS_PER_TICK = 2  # búsquedas remotas por fix_fingers_once (refresco incremental)
+    CHECK_PREDECESSOR_INTERVAL = 2
+    LOOKUP_ATTEMPTS = 3  # saltos alternativos que prueba un lookup si el más cercano no responde
+    SUCCESSOR_LIST_SIZE = 4  # r: successors conocidos (el primero es successor) para el failover y las réplicas
+
+    # lookup iterativo: consultas en paralelo por salto, espera máxima por salto antes de pasar a los
+    # siguientes candidatos, y nodos que devuelve como máximo una respuesta NEXT_HOP
+    LOOKUP_ALPHA = 3
+    HOP_TIMEOUT = 1.0
+    MAX_NEXT_HOP_NODES = 8
+
+    # rangos (predecessor, nodo] de nodos responsables ya resueltos (ver get_responsible_node)
+    OWNER_CACHE_SIZE = 1024
+
     """ __init__
     descripcion: Inicializa un nuevo nodo Chord
     entrada: ip Dirección IP del nodo, port Puerto del nodo, 
-    existing_node (ip, port) de un nodo existente para unirse al anillo
+    existing_node (ip, port) de un nodo existente para unirse al anillo,
+    maintenance False para no lanzar los hilos de mantenimiento (se manejan a mano, p. ej. en src/loopback.py),
+    failure_detector detector de fallas de los vecinos (por defecto PhiAccrualDetector, ver src/failure_detector.py)
     salida: - """
-    def __init__(self, ip: str, port: int, existing_node:  Tuple[str, int] = None, send_callback = None):
+    def __init__(self, ip: str, port: int, existing_node:  Tuple[str, int] = None, send_callback = None, metrics = None,
+                 maintenance: bool = True, failure_detector: Optional[FailureDetector] = None):
         self.ip = ip # Dirección IP del nodo
         self.port = port # Puerto del nodo
         self.send_callback = send_callback  # Función callback para enviar mensajes
         self.request_callback = None # Función callback sincrono
+        self.request_async_callback = None # Función callback que retorna un Future (varias consultas en vuelo)
+        self.control_callback = None # envío de mensajes de control (NOTIFY, heartbeat), p. ej. por UDP
+        self.control_request_callback = None # request/response de control (heartbeat -> ACK)
+        self.iterative_lookup = False # True: find_successor maneja los saltos desde aquí (ver find_successor_iterative)
 
         # mapa de vecinos conocidos
         self.neighbors: Dict[str, Tuple[str, int]] = {}
+
+        # métricas (hops de lookup, duración de stabilize y de refresco de fingers)
+        self.metrics = metrics if metrics is not None else REGISTRY
+        self._lookup_hops = self.metrics.histogram("chord.lookup_hops", buckets=COUNT_BUCKETS)
+        self._stabilize_seconds = self.metrics.histogram("chord.stabilize_seconds")
+        self._finger_refresh_seconds = self.metrics.histogram("chord.finger_refresh_seconds")
+        self._lookup_failovers = self.metrics.counter("chord.lookup_failovers")
+        self._failures_detected = self.metrics.counter("chord.failures_detected")
+        self._lookup_state = threading.local()  # hops del último lookup remoto de cada hilo
         
         # paso 1: calcular ID del nodo usando SHA-1
         node_string = f"{ip}:{port}"
         self.node_id = self._calculate_hash(node_string)
+        self.node_int = to_int(self.node_id)  # el ID como int para las decisiones de ruteo (src/ring.py)
+        # todos los nodos conocidos (fingers, successor, predecessor, vecinos) ordenados por distancia:
+        # el siguiente salto de un lookup es un bisect sobre este índice
+        self._routing = RoutingIndex(self.node_int)
+        # nodo responsable por rango del anillo: get_responsible_node no repite lookups sobre un anillo estable.
+        # Se invalida cuando cambian successor/predecessor o llega un CHORD_UPDATE_*
+        self._owner_cache = RangeCache(self.OWNER_CACHE_SIZE)
+        # sospecha sobre successor y predecessor: aprende de los heartbeats y de cualquier mensaje suyo.
+        # La pausa aceptable es el período de los heartbeats (lo que queda si se corta el resto del tráfico)
+        self.failure_detector = (failure_detector if failure_detector is not None
+                                 else PhiAccrualDetector(acceptable_pause=self.CHECK_PREDECESSOR_INTERVAL))
         logger.info(f"Nodo creado: ID={self.node_id[:8]}... ({ip}:{port})")
+
+        # gauges del nodo, con su ID corto como etiqueta (varios nodos comparten registro en LoopbackRing);
+        # leave_network los quita
+        self._gauges = {
+            "chord.fingers": lambda: len(self.finger_table),
+            "chord.neighbors": lambda: len(self.neighbors),
+            "chord.routing_nodes": lambda: len(self._routing),
+            "chord.owner_cache_entries": lambda: len(self._owner_cache),
+            "chord.owner_cache_hits": lambda: self._owner_cache.hits,
+            "chord.suspected_peers": lambda: len(self.failure_detector.suspected()),
+        }
+        for name, fn in self._gauges.items():
+            self.metrics.gauge(name, fn=fn, node=self.node_id[:8])
         
         # paso 2_ inicializar successor y predecessor
-        self.successor: Optional[Tuple[str, int, str]] = None  # ambso tienen estructura (ip, port, node_id)
-        self.predecessor: Optional[Tuple[str, int, str]] = None 
+        # ambos tienen estructura (ip, port, node_id); se guardan como NodeRef (ver las propiedades).
+        # _next_successors son los que siguen al successor (los informa él en cada stabilize)
+        self._next_successors: List[NodeRef] = []
+        self.successor: Optional[NodeRef] = None
+        self.predecessor: Optional[NodeRef] = None 
         
-        # paso 3: inicializar finger table
-        self.finger_table: List[Tuple[str, int, str]] = []  # Lista de (ip, port, node_id)
+        # paso 3: inicializar finger table: finger[i] = successor(node_id + 2^i) para i < M, y
+        # finger_table la lista de nodos distintos entre ellos (la que recorre el ruteo)
+        self._finger_starts: List[int] = finger_starts(self.node_int)
+        self._next_finger = 0  # próximo finger que refresca fix_fingers_once (round-robin)
+        self.finger_table: List[NodeRef] = []  # Lista de (ip, port, node_id)
         
         # paso 4: almacen local de datos clave-valor
         self.local_store: Dict[str, Any] = {}
@@ -59,11 +130,34 @@ class ChordNode:
         self.is_joined = False
         self.running = True
         
-        # paso 6: hilos para operaciones periódicas de mantenimiento
+        # paso 6: hilos para operaciones periódicas de mantenimiento. Con maintenance=False no se lanzan
+        # y quien crea el nodo llama stabilize_once / fix_fingers_once / check_predecessor_once
+        self.maintenance = maintenance
         self.stabilize_thread = None
         self.fix_fingers_thread = None
         self.check_predecessor_thread = None
         
+        # tabla de despacho de handle_message (se arma una sola vez)
+        self._handlers = {
+            "CHORD_JOIN_REQUEST": self._handle_join_request,
+            "CHORD_FIND_SUCCESSOR": self._handle_find_successor,
+            "CHORD_NOTIFY": self._handle_notify,
+            "CHORD_UPDATE_PREDECESSOR": self._handle_update_predecessor,
+            "CHORD_UPDATE_SUCCESSOR": self._handle_update_successor,
+            "CHORD_HEARTBEAT": self._handle_heartbeat,
+            "CHORD_GET_PREDECESSOR": self._handle_get_predecessor,
+            "CHORD_NEXT_HOP": self._handle_next_hop,
+
+            "JOIN_REQUEST": self._handle_join_request,
+            "FIND_SUCCESSOR": self._handle_find_successor,
+            "UPDATE_PREDECESSOR": self._handle_update_predecessor,
+            "UPDATE_SUCCESSOR": self._handle_update_successor,
+            "HEARTBEAT": self._handle_heartbeat,
+            "GET_PREDECESSOR": self._handle_get_predecessor,
+        }
+        if PROTOCOL_AVAILABLE:
+            self._handlers["BATCH"] = self._handle_batch
+
         # paso 7: unirse al anillo 
         if existing_node:
             self.join_network(existing_node)
@@ -74,6 +168,60 @@ class ChordNode:
             self.is_joined = True
 
     
+    #  REFERENCIAS A NODOS
+    # successor, predecessor y fingers aceptan tuplas (ip, port, node_id) y las guardan como
+    # NodeRef, con el ID ya convertido a int: el ruteo no vuelve a parsear el hex. Cada nodo
+    # asignado entra también al índice de ruteo (_routing); si successor o predecessor cambian,
+    # los rangos cacheados de nodos responsables se invalidan y el detector de fallas pasa a vigilar
+    # a los nuevos (y olvida al que dejó de ser vecino).
+
+    @property
+    def successor(self) -> Optional[NodeRef]:
+        return self._successor
+
+    @successor.setter
+    def successor(self, value):
+        old = getattr(self, "_successor", None)
+        self._successor = NodeRef.of(value)
+        self._routing.add(self._successor)
+        if old != self._successor:
+            self._owner_cache.invalidate()
+            self._watch_neighbor(old, self._successor)
+
+    @property
+    def successor_list(self) -> List[NodeRef]:
+        """Hasta SUCCESSOR_LIST_SIZE successors en orden del anillo, empezando por successor (sin este nodo)."""
+        successor = self._successor
+        if not successor or successor[2] == self.node_id:
+            return []
+        return [successor] + self._next_successors
+
+    @property
+    def predecessor(self) -> Optional[NodeRef]:
+        return self._predecessor
+
+    @predecessor.setter
+    def predecessor(self, value):
+        old = getattr(self, "_predecessor", None)
+        self._predecessor = NodeRef.of(value)
+        self._routing.add(self._predecessor)
+        if old != self._predecessor:
+            self._owner_cache.invalidate()
+            self._watch_neighbor(old, self._predecessor)
+
+    @property
+    def finger_table(self) -> List[NodeRef]:
+        return self._finger_table
+
+    @finger_table.setter
+    def finger_table(self, value):
+        # asignar la lista reemplaza la vista de ruteo; los M fingers se vuelven a llenar al refrescar
+        self._fingers = [None] * M
+        self._finger_table = [NodeRef.of(node) for node in value]
+        for node in self._finger_table:
+            self._routing.add(node)
+
+
     #  FUNCIONES HASH 
     """_calculate_hash
     descripcion: calcula el hash SHA-1 de una cadena. Convierte el string a bytes, hashlib calcula el SHA-1 y hexdigest convierte el resultado
@@ -85,31 +233,22 @@ class ChordNode:
     
     
     """is_between
-    descripcion: Verifica si una clave está en cierto intervalo en el anillo.
+    descripcion: Verifica si una clave está en cierto intervalo en el anillo. Versión con IDs hex;
+    el ruteo interno usa ring.between con los IDs ya convertidos a int.
     entrada: key hash a verificar, start inicio del intervalo, end fin del intervalo, inclusive si end es inclusivo
     salida: booleano indicando si key está en el intervalo"""  
     def _is_between(self, key: str, start: str, end: str, inclusive: bool = True) -> bool:
-        key_int = int(key, 16)
-        start_int = int(start, 16)
-        end_int = int(end, 16)
-        
-        #Caso en el que no damos la vuelta el anillo, no vamos a 0
-        if start_int < end_int:
-            #inclusive, end está incluido en el intervalo, valor necesario para evitar duplicados
-            if inclusive:
-                return start_int < key_int <= end_int
-            return start_int < key_int < end_int
-        
-        #Caso en el que damos la vuelta al anillo, Por ejemplo estamos en 50 y queremos llegar a 10, pasamos por el 0
-        elif start_int > end_int:
-            if inclusive:
-                return start_int < key_int or key_int <= end_int
-            return start_int < key_int or key_int < end_int
-        
-        else:  # start == end
-            if inclusive:
-                return key_int == start_int
-            return False
+        return between(to_int(key), to_int(start), to_int(end), inclusive)
+
+    """_in_successor_interval / _in_predecessor_interval
+    descripcion: key_id (hex recibido de la red) en (yo, successor] o (predecessor, yo]; solo se parsea key_id.
+    entrada: key_id hash a verificar, inclusive si el extremo final es inclusivo
+    salida: booleano indicando si key_id está en el intervalo"""
+    def _in_successor_interval(self, key_id: str, inclusive: bool = True) -> bool:
+        return between(to_int(key_id), self.node_int, self._successor.id_int, inclusive)
+
+    def _in_predecessor_interval(self, key_id: str, inclusive: bool = True) -> bool:
+        return between(to_int(key_id), self._predecessor.id_int, self.node_int, inclusive)
             
 
     """set_send_callback
@@ -129,6 +268,24 @@ class ChordNode:
         self.request_callback = callback
 
 
+    """set_request_async_callback
+    descripcion: Configura el callback asíncrono para request/response. Permite tener varias consultas en vuelo a la vez.
+    entrada: callback función (ip, port, message) -> Future que resuelve al dict de respuesta
+    salida: -"""
+    def set_request_async_callback(self, callback):
+        self.request_async_callback = callback
+
+
+    """set_control_callbacks
+    descripcion: Configura los callbacks para mensajes de control (CHORD_NOTIFY y heartbeats). Permite usar un canal más
+    liviano que TCP (TCPServer.send_control / request_control). Sin ellos se usan send_callback y request_callback.
+    entrada: send_callback (ip, port, message) -> bool, request_callback (ip, port, message) -> response dict
+    salida: -"""
+    def set_control_callbacks(self, send_callback, request_callback=None):
+        self.control_callback = send_callback
+        self.control_request_callback = request_callback
+
+
     """_remember_node
     descripcion: Guarda en el mapa de vecinos si hay datos suficientes.
     entrada: node_id ID del nodo, ip Dirección IP del nodo, port Puerto del nodo
@@ -137,9 +294,67 @@ class ChordNode:
         try:
             if node_id and ip and port is not None:
                 self.neighbors[node_id] = (ip, int(port))
+                self._routing.add(NodeRef(ip, int(port), node_id))
         except Exception:
             pass
-    
+
+
+    """_forget_node
+    descripcion: Olvida un nodo que no respondió: sale del índice de ruteo, de los vecinos, de los fingers y de la
+    lista de successors,
+    para que los próximos lookups no lo elijan como siguiente salto (el refresco de fingers lo reemplaza).
+    entrada: node_id ID del nodo
+    salida: -"""
+    def _forget_node(self, node_id: Optional[str]):
+        if not node_id:
+            return
+        self._owner_cache.discard(node_id)
+        if any(node[2] == node_id for node in self._next_successors):
+            self._next_successors = [node for node in self._next_successors if node[2] != node_id]
+        if not self._routing.remove(node_id):
+            return
+        self.neighbors.pop(node_id, None)
+        if any(node is not None and node[2] == node_id for node in self._fingers):
+            self._fingers = [None if node is not None and node[2] == node_id else node for node in self._fingers]
+            self._rebuild_finger_view()
+        logger.debug(f"Nodo {node_id[:8]} olvidado por no responder")
+
+
+    """_watch_neighbor
+    descripcion: Successor o predecessor cambió: el detector de fallas vigila al nuevo desde ahora y olvida al
+    anterior si ya no es ninguno de los dos.
+    entrada: old el vecino anterior (o None), new el nuevo (o None)
+    salida: -"""
+    def _watch_neighbor(self, old: Optional[NodeRef], new: Optional[NodeRef]):
+        if new is not None and new[2] != self.node_id:
+            self.failure_detector.watch(new[2])
+        if old is not None:
+            successor, predecessor = self._successor, getattr(self, "_predecessor", None)
+            if (not successor or successor[2] != old[2]) and (not predecessor or predecessor[2] != old[2]):
+                self.failure_detector.remove(old[2])
+
+
+    """_saw
+    descripcion: Llegó algo de un nodo (un mensaje suyo o su respuesta a un request): si es un vecino vigilado,
+    cuenta como heartbeat para el detector de fallas.
+    entrada: node_id ID del nodo
+    salida: -"""
+    def _saw(self, node_id: Optional[str]):
+        if node_id in self.failure_detector:
+            self.failure_detector.heartbeat(node_id)
+
+
+    """suspicion / is_suspected
+    descripcion: Nivel de sospecha del detector de fallas sobre un nodo (phi con el detector por defecto; 0 si no
+    es un vecino vigilado) y si llegó al umbral. Stabilize, el ruteo y las réplicas evitan a los sospechosos.
+    entrada: node_id ID del nodo
+    salida: float / bool"""
+    def suspicion(self, node_id: str) -> float:
+        return self.failure_detector.suspicion(node_id)
+
+    def is_suspected(self, node_id: str) -> bool:
+        return not self.failure_detector.is_available(node_id)
+
 
     #  OPERACIONES DEL ANILLO 
     """join_network
@@ -175,7 +390,8 @@ class ChordNode:
                 self.is_joined = True
                 
                 # inciia el mantenimiento periódico del anillo para reconstruir finger table, estabilizar, etc
-                self._start_maintenance_threads()
+                if self.maintenance:
+                    self._start_maintenance_threads()
                 
                 # informacion para debug 
                 logger.info(f"Unión exitosa. Successor: {succ_id[:8]}... ({succ_ip}:{succ_port})")
@@ -189,9 +405,11 @@ class ChordNode:
 
     """_find_successor_remote
     descripcion: Encuentra el successor de una clave contactando un nodo remoto.
-    entrada: key_id hash de la clave, target_ip IP del nodo remoto, target_port puerto del nodo remoto
+    entrada: key_id hash de la clave, target_ip IP del nodo remoto, target_port puerto del nodo remoto,
+    target_id ID del nodo remoto si se conoce (si no responde se olvida, ver _forget_node)
     salida: (ip, port, node_id) del successor o None""" 
-    def _find_successor_remote(self, key_id: str, target_ip: str, target_port: int) -> Optional[Tuple[str, int, str]]:
+    def _find_successor_remote(self, key_id: str, target_ip: str, target_port: int,
+                               target_id: Optional[str] = None) -> Optional[Tuple[str, int, str]]:
         # información para debug de envío de mensajes
         logger.debug(f"Buscando successor para clave {key_id[:8]} en {target_ip}:{target_port}")
 
@@ -206,17 +424,23 @@ class ChordNode:
         if self.request_callback:
             try:
                 response = self.request_callback(target_ip, target_port, message)
-                if response and response.get("type") == "SUCCESSOR_RESPONSE":
-                    ip = response.get("successor_ip")
-                    port = response.get("successor_port")
-                    node_id = response.get("successor_id")
-                    if ip and port and node_id:
-                        self._remember_node(node_id, ip, port)
-                        return (ip, port, node_id)
+                succ = self._parse_successor_response(response)
+                if succ:
+                    self._saw(target_id)
+                    # el nodo remoto informa cuántos saltos dio él y dónde empieza el rango del responsable
+                    self._lookup_state.hops = 1 + int(response.get("hops") or 0)
+                    self._lookup_state.range_start = response.get("range_start")
+                    return succ
+                if response is None:
+                    self._forget_node(target_id)  # sin respuesta: no volver a elegirlo como salto
                 # en caso de que la respuesta no es válida
                 logger.warning("Respuesta inválida o incompleta al buscar successor remoto")
             except Exception as e:
                 logger.error(f"Error en request/response con {target_ip}:{target_port}: {e}")
+                self._forget_node(target_id)
+            if target_id:
+                # salto elegido del índice de ruteo: quien llama prueba con el siguiente candidato
+                return None
 
         # envío asíncrono, asumir el target como candidato
         if self.send_callback:
@@ -226,7 +450,31 @@ class ChordNode:
                 logger.error(f"Error contactando {target_ip}:{target_port}: {e}")
                 return None
 
-        return (target_ip, target_port, self._calculate_hash(f"{target_ip}:{target_port}"))
+        return NodeRef(target_ip, target_port, self._calculate_hash(f"{target_ip}:{target_port}"))
+
+
+    """_parse_successor_response
+    descripcion: Extrae el successor de una respuesta SUCCESSOR_RESPONSE y lo recuerda como vecino.
+    entrada: response diccionario de respuesta (o None)
+    salida: (ip, port, node_id) del successor o None si la respuesta no es válida"""
+    def _parse_successor_response(self, response: Optional[Dict[str, Any]]) -> Optional[Tuple[str, int, str]]:
+        if response and response.get("type") == "SUCCESSOR_RESPONSE":
+            return self._parse_successor_fields(response)
+        return None
+
+
+    """_parse_successor_fields
+    descripcion: Lee successor_ip/port/id de una respuesta (SUCCESSOR_RESPONSE o NEXT_HOP_RESPONSE final).
+    entrada: response diccionario de respuesta
+    salida: NodeRef del successor o None si faltan campos"""
+    def _parse_successor_fields(self, response: Dict[str, Any]) -> Optional[NodeRef]:
+        ip = response.get("successor_ip")
+        port = response.get("successor_port")
+        node_id = response.get("successor_id")
+        if ip and port and node_id:
+            self._remember_node(node_id, ip, port)
+            return NodeRef(ip, port, node_id)
+        return None
 
 
     """_notify_successor
@@ -252,7 +500,7 @@ class ChordNode:
         }
         
         try: 
-            self.send_callback(succ_ip, succ_port, message)
+            (self.control_callback or self.send_callback)(succ_ip, succ_port, message)
             logger.debug(f"NOTIFY enviado a {succ_ip}:{succ_port}")
         except Exception as e:
             logger.error(f"Error notificando a {succ_ip}:{succ_port}: {e}")
@@ -263,49 +511,241 @@ class ChordNode:
     entrada: key_id hash de la clave a buscar
     salida: (ip, port, node_id) del nodo responsable, o None"""
     def find_successor(self, key_id: str) -> Optional[Tuple[str, int, str]]:
+        if self.iterative_lookup:
+            succ, hops = self._find_successor_iterative_hops(key_id)
+        else:
+            succ, hops = self._find_successor_hops(key_id)
+        if succ:
+            self._lookup_hops.observe(hops)
+        return succ
+
+
+    """find_successor_iterative
+    descripcion: find_successor iterativo: este nodo pregunta a cada salto cuál es el siguiente (CHORD_NEXT_HOP)
+    en vez de encadenar la consulta de nodo en nodo, así ningún nodo intermedio queda bloqueado esperando al resto.
+    Cada salto consulta a los alpha candidatos más cercanos a la clave a la vez y usa la primera respuesta válida;
+    si ninguno responde en hop_timeout sigue con los siguientes candidatos.
+    entrada: key_id hash de la clave, alpha consultas en paralelo por salto, hop_timeout espera máxima por salto
+    salida: (ip, port, node_id) del nodo responsable, o None"""
+    def find_successor_iterative(self, key_id: str, alpha: Optional[int] = None,
+                                 hop_timeout: Optional[float] = None) -> Optional[Tuple[str, int, str]]:
+        succ, hops = self._find_successor_iterative_hops(key_id, alpha, hop_timeout)
+        if succ:
+            self._lookup_hops.observe(hops)
+        return succ
+
+
+    """_find_successor_iterative_hops
+    descripcion: Lookup iterativo que además cuenta los saltos (rondas de consultas) que hicieron falta.
+    entrada: key_id hash de la clave, alpha consultas en paralelo por salto, hop_timeout espera máxima por salto
+    salida: ((ip, port, node_id) o None, cantidad de hops)"""
+    def _find_successor_iterative_hops(self, key_id: str, alpha: Optional[int] = None,
+                                       hop_timeout: Optional[float] = None) -> Tuple[Optional[Tuple[str, int, str]], int]:
+        alpha = alpha or self.LOOKUP_ALPHA
+        hop_timeout = self.HOP_TIMEOUT if hop_timeout is None else hop_timeout
+        key_int = to_int(key_id)
+        successor = self._successor
+        self._lookup_state.range_start = None
+        if not successor or successor.id_int == self.node_int or between(key_int, self.node_int, successor.id_int):
+            self._lookup_state.range_start = self.node_id
+            return successor or NodeRef(self.ip, self.port, self.node_id, self.node_int), 0
+        if not (self.request_async_callback or self.request_callback):
+            return successor, 0
+
+        # candidatos: nodos que preceden a la clave (fuera de nuestro segmento el successor también la precede)
+        candidates = {ref[2]: ref for ref in self._routing.preceding(key_int, alpha)}
+        candidates.setdefault(successor[2], successor)
+        tried = set()
+        hops = 0
+        while hops < M:
+            # primero los que el detector de fallas no sospecha, y entre ellos los más cercanos a la clave
+            batch = sorted((ref for ref in candidates.values() if ref[2] not in tried),
+                           key=lambda ref: (self.is_suspected(ref[2]), distance(ref.id_int, key_int)))[:alpha]
+            if not batch:
+                break
+            hops += 1
+            tried.update(ref[2] for ref in batch)
+            responder, response, unused = self._query_next_hop(batch, key_id, key_int, alpha, hop_timeout)
+            # los que no llegaron a responder porque otro respondió antes pueden consultarse en otra ronda
+            tried.difference_update(ref[2] for ref in unused)
+            if response is None:
+                # ninguno respondió a tiempo: la próxima ronda sigue con los candidatos que quedan
+                self._lookup_failovers.inc()
+                continue
+            if response.get("final"):
+                succ = self._parse_successor_fields(response)
+                if succ:
+                    self._lookup_state.range_start = responder[2]
+                    return succ, hops
+                continue
+            # solo se aceptan nodos más cercanos a la clave que el que respondió (cada ronda avanza)
+            limit = distance(responder.id_int, key_int)
+            for item in response.get("nodes") or ():
+                try:
+                    ref = NodeRef(item[0], int(item[1]), item[2])
+                except (TypeError, ValueError, IndexError):
+                    continue
+                if ref.id_int is not None and ref.id_int != self.node_int and 0 < distance(ref.id_int, key_int) < limit:
+                    candidates.setdefault(ref[2], ref)
+
+        # sin candidatos que respondan: se intenta por el camino recursivo
+        logger.warning(f"Lookup iterativo de {key_id[:8]} sin respuesta final tras {hops} saltos")
+        succ, more = self._find_successor_hops(key_id)
+        return succ, hops + more
+
+
+    """_query_next_hop
+    descripcion: Una ronda del lookup iterativo: envía CHORD_NEXT_HOP a todos los nodos de batch a la vez y retorna
+    la primera respuesta válida (si llegan varias juntas, la del nodo más cercano a la clave). Los nodos que fallan
+    se olvidan (_forget_node); los que siguen sin responder al vencer timeout solo se dejan de esperar.
+    entrada: batch lista de NodeRef, key_id/key_int la clave (hex e int), count nodos a pedir, timeout espera máxima
+    salida: (NodeRef que respondió, respuesta, nodos que quedaron sin usar porque otro respondió antes);
+    (None, None, []) si nadie respondió a tiempo"""
+    def _query_next_hop(self, batch: List[NodeRef], key_id: str, key_int: int, count: int,
+                        timeout: float) -> Tuple[Optional[NodeRef], Optional[Dict[str, Any]], List[NodeRef]]:
+        message = {
+            "type": "CHORD_NEXT_HOP",
+            "key_id": key_id,
+            "requester_id": self.node_id,
+            "count": count,
+        }
+        pending: Dict[Future, NodeRef] = {}
+        for ref in batch:
+            try:
+                pending[self._request_future(ref[0], ref[1], message)] = ref
+            except Exception as e:
+                logger.debug(f"Error enviando NEXT_HOP a {ref[0]}:{ref[1]}: {e}")
+                self._forget_node(ref[2])
+
+        deadline = time.monotonic() + timeout
+        while pending:
+            done, _ = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            best = None
+            for future in done:
+                ref = pending.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    logger.debug(f"NEXT_HOP a {ref[0]}:{ref[1]} falló: {e}")
+                    response = None
+                if response is None:
+                    self._forget_node(ref[2])
+                elif response.get("type") == "NEXT_HOP_RESPONSE":
+                    if best is None or distance(ref.id_int, key_int) < distance(best[0].id_int, key_int):
+                        best = (ref, response)
+            if best is not None:
+                for future in pending:
+                    future.cancel()
+                return best[0], best[1], list(pending.values())
+        for future in pending:
+            future.cancel()
+        return None, None, []
+
+
+    """_request_future
+    descripcion: Request a un nodo como Future: con request_async_callback queda en vuelo; con solo el callback
+    síncrono se resuelve antes de retornar.
+    entrada: ip, port del nodo, message mensaje a enviar
+    salida: Future con la respuesta"""
+    def _request_future(self, ip: str, port: int, message: Dict[str, Any]) -> Future:
+        if self.request_async_callback:
+            return self.request_async_callback(ip, port, message)
+        future: Future = Future()
+        try:
+            future.set_result(self.request_callback(ip, port, message))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+    """_find_successor_hops
+    descripcion: find_successor que además cuenta los saltos remotos que hicieron falta.
+    entrada: key_id hash de la clave a buscar
+    salida: ((ip, port, node_id) o None, cantidad de hops)"""
+    def _find_successor_hops(self, key_id: str) -> Tuple[Optional[Tuple[str, int, str]], int]:
         # si aún no está unido
         if not self.is_joined:
             logger.warning("Nodo no unido al anillo")
-            return None
+            return None, 0
+        
+        # el hex de la clave se parsea una sola vez; el resto de las comparaciones son con ints
+        key_int = to_int(key_id)
+        successor = self._successor
+        # inicio del rango del responsable (el nodo que lo resolvió en su segmento), si se conoce
+        self._lookup_state.range_start = None
         
         # verificamos si la clave está entre nosotros (nodo actual) y nuestro successor
-        if self.successor and self._is_between(
-            key_id, 
-            self.node_id,  #mi id
-            self.successor[2],  # id del successor
+        if successor and successor.id_int is not None and between(
+            key_int, 
+            self.node_int,  #mi id
+            successor.id_int,  # id del successor
             inclusive=True  # incluir al successor
         ):
             logger.debug(f"Clave {key_id[:8]}... está en mi segmento")
-            return self.successor #indicar que el successor es el responsable por lo tanto nodo actual es predecesor
-        
-        # buscamos en la finger table el nodo mas cercano que sea menor a la llave que buscamos
-        closest = self._closest_preceding_node(key_id)
+            self._lookup_state.range_start = self.node_id
+            return successor, 0 #indicar que el successor es el responsable por lo tanto nodo actual es predecesor
         
-        if closest:
+        # buscamos entre los nodos conocidos el mas cercano que sea menor a la llave que buscamos
+        # (si ninguno la precede, la consulta sigue por el successor). Si no responde se olvida y
+        # se prueba con el siguiente más cercano
+        for _attempt in range(self.LOOKUP_ATTEMPTS):
+            closest = self._next_hop(key_int)
+            if not closest:
+                break
             #intento de buscar el successor contactando al nodo más cercano
-            result = self._find_successor_remote(key_id, closest[0], closest[1])
+            self._lookup_state.hops = 1
+            result = self._find_successor_remote(key_id, closest[0], closest[1], target_id=closest[2])
             if result:
-                return result
+                return result, self._lookup_state.hops
+            if closest[2] in self._routing:
+                break  # respondió pero sin un successor válido: no insistir
                 
-            #si no se encuentra, retornar el successor actual
+        #si no se encuentra, retornar el successor actual
         if self.successor:
-            return self.successor
+            if self.successor[2] == self.node_id:
+                self._lookup_state.range_start = self.node_id  # anillo de un nodo: responsable de todo
+            return self.successor, 0
                     
 
-        return (self.ip, self.port, self.node_id)
+        return NodeRef(self.ip, self.port, self.node_id, self.node_int), 0
     
 
+    """_next_hop
+    descripcion: Siguiente salto hacia una clave: el nodo conocido más cercano que la precede, salteando los que el
+    detector de fallas sospecha caídos (si todos lo son, el más cercano igual).
+    entrada: key_int la clave como int
+    salida: NodeRef o None si no hay a quién preguntar"""
+    def _next_hop(self, key_int: int) -> Optional[NodeRef]:
+        closest = self._routing.closest_preceding(key_int) or self._next_hop_fallback()
+        if closest is None or not self.is_suspected(closest[2]):
+            return closest
+        for ref in self._routing.preceding(key_int, self.MAX_NEXT_HOP_NODES)[1:]:
+            if not self.is_suspected(ref[2]):
+                return ref
+        return closest
+
+
+    """_next_hop_fallback
+    descripcion: Siguiente salto cuando ningún finger precede a la clave (p. ej. antes del primer refresco):
+    el successor, si no es este mismo nodo.
+    entrada: -
+    salida: (ip, port, node_id) del successor o None"""
+    def _next_hop_fallback(self) -> Optional[NodeRef]:
+        successor = self._successor
+        if successor and successor.id_int is not None and successor.id_int != self.node_int:
+            return successor
+        return None
+
+
     """_closest_preceding_node 
-    descripcion: Encuentra en la finger table el nodo con ID más grande pero menor que key_id. 
+    descripcion: Encuentra entre los nodos conocidos el de ID más grande pero menor que key_id. 
     entrada: key_id hash de la clave
      salida: (ip, port, node_id) del nodo encontrado o None"""
     def _closest_preceding_node(self, key_id: str) -> Optional[Tuple[str, int, str]]:
-        for node in reversed(self.finger_table):  # empieza por los más lejanos
-            if self._is_between(node[2], self.node_id, key_id, inclusive=False): #verifica si el nodo está entre nosotros y la clave
-                #si es asi retornar el nodo
-                return node
-        #si no se encuentra ninguno, retornar none
-        return None
+        # bisect en el índice de ruteo (ordenado por distancia desde este nodo)
+        return self._routing.closest_preceding(to_int(key_id))
     
 
 
@@ -352,108 +792,178 @@ class ChordNode:
     salida: -"""
     def _stabilize_loop(self):
         while self.running and self.is_joined:
-            try:
-                # verificar si hay successor
-                if not self.successor: 
-                    logger.warning("No hay successor. Intentando recuperar conexión...")
+            self.stabilize_once()
+            time.sleep(self.STABILIZE_INTERVAL)
+
+    """stabilize_once
+    descripcion: Una ronda de estabilización: corrige el successor con el predecessor de éste y le envía NOTIFY.
+    La usan el hilo de mantenimiento (cada 2 s) y los experimentos que manejan el reloj (src/loopback.py).
+    entrada: -
+    salida: -"""
+    def stabilize_once(self):
+        try:
+            started = time.perf_counter()
+            # verificar si hay successor
+            if not self.successor: 
+                logger.warning("No hay successor. Intentando recuperar conexión...")
                             
-                # usar predecesor si no hay successor
-                    if self.predecessor:
-                        logger.info(f"Recuperando usando predecesor {self.predecessor[2][:8]}...")
-                        self.successor = self.predecessor
+            # usar predecesor si no hay successor
+                if self.predecessor:
+                    logger.info(f"Recuperando usando predecesor {self.predecessor[2][:8]}...")
+                    self.successor = self.predecessor
                             
-                #usar vecino conocido
-                    elif self.neighbors:
-                        nid, (nip, nport) = next(iter(self.neighbors.items()))
-                        logger.info(f"Recuperando usando vecino conocido {nid[:8]}...")
-                        self.successor = (nip, nport, nid)
+            #usar vecino conocido
+                elif self.neighbors:
+                    nid, (nip, nport) = next(iter(self.neighbors.items()))
+                    logger.info(f"Recuperando usando vecino conocido {nid[:8]}...")
+                    self.successor = (nip, nport, nid)
                             
-                    else:
-                        #esperar
-                        time.sleep(2)
-                        continue
+                else:
+                    #esperar
+                    return
                 
-                succ_ip, succ_port, succ_id = self.successor
+            succ_ip, succ_port, succ_id = self.successor
                 
-                # si el successor es uno mismo y verificar si hay otro nodo en el anillo
-                if succ_id == self.node_id:
-                    # buscar si hay otro nodo en el anillo
-                    if self.predecessor and self.predecessor[2] != self.node_id:
-                        # si hay otro nodo actualizar successor
-                        logger.info(f"Stabilize: Cambiando successor de mí mismo a {self.predecessor[2][:8]}...")
-                        self.successor = self.predecessor
-                        time.sleep(2)
-                        continue
-                    else:
-                        #cuado no haya nadie más
-                        logger.debug("Stabilize: Anillo de 1 nodo")
-                        time.sleep(2)
-                        continue
+            # si el successor es uno mismo y verificar si hay otro nodo en el anillo
+            if succ_id == self.node_id:
+                # buscar si hay otro nodo en el anillo
+                if self.predecessor and self.predecessor[2] != self.node_id:
+                    # si hay otro nodo actualizar successor
+                    logger.info(f"Stabilize: Cambiando successor de mí mismo a {self.predecessor[2][:8]}...")
+                    self.successor = self.predecessor
+                    return
+                else:
+                    #cuado no haya nadie más
+                    logger.debug("Stabilize: Anillo de 1 nodo")
+                    return
                 
-                # Preguntar al successor: "¿Quién es tu predecessor?"
-                logger.debug(f"Stabilize: Preguntando predecessor a {succ_id[:8]}...")
+            # Preguntar al successor: "¿Quién es tu predecessor?"
+            logger.debug(f"Stabilize: Preguntando predecessor a {succ_id[:8]}...")
                 
-                if not self.send_callback: 
-                    logger.warning("No hay send_callback configurado")
-                    time.sleep(2)
-                    continue
+            if not self.send_callback: 
+                logger.warning("No hay send_callback configurado")
+                return
                 
-                # Envia el mensaje a "GET_PREDECESSOR"
-                message = {
-                    "type": "CHORD_GET_PREDECESSOR",
-                    "requester_id": self.node_id,
-                    "requester_ip": self.ip,
-                    "requester_port": self.port,
-                    "timestamp": time.time()
-                }
+            # Envia el mensaje a "GET_PREDECESSOR"
+            message = {
+                "type": "CHORD_GET_PREDECESSOR",
+                "requester_id": self.node_id,
+                "requester_ip": self.ip,
+                "requester_port": self.port,
+                "timestamp": time.time()
+            }
                 
-                try:
-                    response = None
-                    if self.request_callback:
+            try:
+                response = None
+                failed_ids = set()  # successors que no respondieron en esta ronda
+                while self.request_callback:
+                    # un successor sospechoso para el detector de fallas no se espera hasta el timeout
+                    if not self.is_suspected(succ_id):
                         try:
                             response = self.request_callback(succ_ip, succ_port, message)
                         except Exception as e:
                             logger.warning(f"Fallo comunicación en stabilize: {e}")
-                    if response:
-                        #Obtiene la información necesaria.
-                        pred_ip = response.get("predecessor_ip")
-                        pred_port = response.get("predecessor_port")
-                        pred_id = response.get("predecessor_id")
+                        if response:
+                            self._saw(succ_id)
+                            break
+                        if not self.is_suspected(succ_id):
+                            # hubo noticias suyas hace poco: un mensaje perdido no es una caída (sin flapping)
+                            logger.debug(f"Stabilize: {succ_id[:8]}... no respondió, se reintenta en la próxima ronda")
+                            break
+                    # el successor no responde y el detector lo sospecha: pasar al siguiente de la lista
+                    # en esta misma ronda
+                    failed_ids.add(succ_id)
+                    next_succ = self._fail_over_successor()
+                    if not next_succ:
+                        break
+                    succ_ip, succ_port, succ_id = next_succ
+                if response:
+                    # lista de successors: la del successor, corrida un lugar
+                    self._update_successor_list(response.get("successors"))
+                    #Obtiene la información necesaria.
+                    pred_ip = response.get("predecessor_ip")
+                    pred_port = response.get("predecessor_port")
+                    pred_id = response.get("predecessor_id")
                         
-                        if pred_ip and pred_port and pred_id:
-                            # Verificar si ese predecessor está entre yo y mi successor
-                            if self._is_between(pred_id, self.node_id, succ_id, inclusive=False):
-                                # Ese nodo debería ser mi successor
-                                old_succ = self.successor
-                                self.successor = (pred_ip, pred_port, pred_id)
-                                logger. info(f"Successor actualizado por stabilize correctamente: {old_succ[2][:8]}...  → {pred_id[:8]}...")
-                            else:
-                                logger.debug(f"Stabilize:  Predecessor {pred_id[:8]}... no está entre yo y successor")
+                    if pred_ip and pred_port and pred_id:
+                        # Verificar si ese predecessor está entre yo y mi successor (el nuevo successor
+                        # puede seguir informando como predecessor al que acaba de caer)
+                        if pred_id not in failed_ids and self._in_successor_interval(pred_id, inclusive=False):
+                            # Ese nodo debería ser mi successor (y el anterior pasa a ser el siguiente)
+                            old_succ = self.successor
+                            self.successor = (pred_ip, pred_port, pred_id)
+                            self._next_successors = [old_succ] + self._next_successors[:self.SUCCESSOR_LIST_SIZE - 2]
+                            logger. info(f"Successor actualizado por stabilize correctamente: {old_succ[2][:8]}...  → {pred_id[:8]}...")
                         else:
-                            # El successor no tiene predecessor (o es None)
-                            logger.debug("Stabilize: Successor no tiene predecessor")
+                            logger.debug(f"Stabilize:  Predecessor {pred_id[:8]}... no está entre yo y successor")
+                    else:
+                        # El successor no tiene predecessor (o es None)
+                        logger.debug("Stabilize: Successor no tiene predecessor")
                     
-                except Exception as e:
-                    logger.debug(f"Stabilize: Error preguntando a successor: {e}")
+            except Exception as e:
+                logger.debug(f"Stabilize: Error preguntando a successor: {e}")
                 
-                # Notificar al successor que existo (podría ser su nuevo predecessor)
-                notify_msg = {
-                    "type": "CHORD_NOTIFY",
-                    "node_id": self.node_id,
-                    "ip":  self.ip,
-                    "port": self.port,
-                    "timestamp": time.time(),
-                }
+            # Notificar al successor que existo (podría ser su nuevo predecessor)
+            notify_msg = {
+                "type": "CHORD_NOTIFY",
+                "node_id": self.node_id,
+                "ip":  self.ip,
+                "port": self.port,
+                "timestamp": time.time(),
+            }
                 
-                try:
-                    self. send_callback(succ_ip, succ_port, notify_msg)
-                    logger.debug(f"Stabilize:  NOTIFY enviado a {succ_id[:8]}...")
-                except Exception:
-                    pass
-            except Exception as e: 
-                logger.error(f"Error en stabilize loop: {e}")
-            
-            time.sleep(2)
+            try:
+                (self.control_callback or self.send_callback)(succ_ip, succ_port, notify_msg)
+                logger.debug(f"Stabilize:  NOTIFY enviado a {succ_id[:8]}...")
+            except Exception:
+                pass
+            # solo cuentan las rondas completas (las que hablaron con el successor)
+            self._stabilize_seconds.observe(time.perf_counter() - started)
+        except Exception as e: 
+            logger.error(f"Error en stabilize loop: {e}")
+
+
+    """_update_successor_list
+    descripcion: Arma los successors que siguen al successor a partir de la lista que él informó
+    (sin este nodo, sin repetidos y hasta SUCCESSOR_LIST_SIZE en total). También entran al índice de ruteo.
+    entrada: successors lista de [ip, port, node_id] del successor, empezando por el suyo
+    salida: -"""
+    def _update_successor_list(self, successors):
+        successor = self._successor
+        if not successor or not isinstance(successors, list):
+            return
+        seen = {self.node_id, successor[2]}
+        next_successors = []
+        for item in successors:
+            if len(next_successors) >= self.SUCCESSOR_LIST_SIZE - 1:
+                break
+            try:
+                ref = NodeRef(item[0], int(item[1]), item[2])
+            except (TypeError, ValueError, IndexError):
+                continue
+            if ref.id_int is None or ref[2] in seen:
+                continue
+            seen.add(ref[2])
+            next_successors.append(ref)
+            self._routing.add(ref)
+        self._next_successors = next_successors
+
+
+    """_fail_over_successor
+    descripcion: El successor no respondió: se olvida y pasa a ser successor el siguiente de la lista.
+    entrada: -
+    salida: el nuevo successor, o None si la lista no tiene otro (se conserva el actual)"""
+    def _fail_over_successor(self) -> Optional[NodeRef]:
+        if not self._next_successors:
+            return None
+        failed = self._successor
+        next_succ, self._next_successors = self._next_successors[0], self._next_successors[1:]
+        self.successor = next_succ
+        if failed:
+            logger.warning(f"Successor {failed[2][:8]}... no responde, failover a {next_succ[2][:8]}...")
+            self._forget_node(failed[2])
+        return next_succ
+
 
     """_ask_predecessor_of_successor
     descripcion: Pregunta al successor quién es su predecessor.
@@ -527,7 +1037,7 @@ class ChordNode:
                 pred_ip, pred_port, pred_id = pred_of_successor
                 
                 # verificar si el predecesor del sucesor está entre nosotros y nuestro sucesor
-                if self._is_between(pred_id, self.node_id, succ_id, inclusive=False):
+                if self._in_successor_interval(pred_id, inclusive=False):
                     # actualizar al sucesor
                     logger.info(f"Encontrado mejor successor: {pred_id[:8]}... "
                             f"(estaba: {succ_id[:8]}...)")
@@ -553,38 +1063,146 @@ class ChordNode:
     def _fix_fingers_loop(self):
         #verificamos si el nodo sigue corriendo y está unido al anillo
         while self.running and self.is_joined:
-            try:
-                # actualizamos la finger table
-                self._update_finger_table()
-            except Exception as e:
-                logger.error(f"Error actualizando finger table: {e}")
-            
-            time.sleep(30)
-    
+            self.fix_fingers_once()
+            time.sleep(self.FIX_FINGERS_INTERVAL)
+
+
+    """fix_fingers_once
+    descripcion: Refresca la finger table (midiendo cuánto tarda). Por defecto avanza en round-robin y hace
+    a lo sumo FINGERS_PER_TICK búsquedas remotas; con full=True la recalcula completa (unión, experimentos).
+    entrada: full True para recalcular los M fingers
+    salida: -"""
+    def fix_fingers_once(self, full: bool = False):
+        try:
+            # actualizamos la finger table
+            with self._finger_refresh_seconds.time():
+                if full:
+                    self._update_finger_table()
+                else:
+                    self._fix_next_fingers(self.FINGERS_PER_TICK)
+        except Exception as e:
+            logger.error(f"Error actualizando finger table: {e}")
+
 
 
     """_update_finger_table
-    descripcion: Actualiza la finger table del nodo.
+    descripcion: Recalcula los M fingers del nodo. Con callback asíncrono las búsquedas remotas van todas en
+    paralelo; sin él se resuelven en orden (ver _fix_next_fingers).
     entrada: -
     salida: -"""
     def _update_finger_table(self):
-        self.finger_table = []
-        m = 160  # bits de SHA-1
-        k = 16   # reducir tamaño para laboratorio
-        for i in range(1, k + 1):
+        if self.request_async_callback:
+            # los inicios que caen en (yo, successor] se resuelven sin red; el resto va en vuelo a la vez
+            targets = [to_hex(start) for start in self._finger_starts]
+            for i, succ in enumerate(self._find_successors_parallel(targets)):
+                self._fingers[i] = NodeRef.of(succ)
+            self._rebuild_finger_view()
+            return
+        self._next_finger = 0
+        self._fix_next_fingers(M)
+
+
+    """_fix_next_fingers
+    descripcion: Refresca fingers desde _next_finger en round-robin hasta hacer `lookups` búsquedas remotas
+    (o dar una vuelta completa). Los inicios que caen en (yo, successor] no cuestan una búsqueda, y el nodo
+    encontrado para finger[i] también es el de los fingers siguientes cuyo inicio no lo supera.
+    entrada: lookups máximo de búsquedas remotas en esta pasada
+    salida: -"""
+    def _fix_next_fingers(self, lookups: int):
+        successor = self._successor
+        if not successor or successor.id_int is None:
+            return
+        starts = self._finger_starts
+        succ_distance = distance(self.node_int, successor.id_int) or RING_SIZE
+        i, visited = self._next_finger, 0
+        while visited < M and lookups > 0:
+            start_distance = distance(self.node_int, starts[i])
+            if start_distance <= succ_distance:
+                node = successor
+            else:
+                lookups -= 1
+                node = NodeRef.of(self._lookup_finger(to_hex(starts[i])))
+                if node is None or node.id_int is None:
+                    i, visited = (i + 1) % M, visited + 1
+                    continue
+                self._remember_node(node[2], node[0], node[1])
+            # el nodo responsable de starts[i] también lo es de los inicios siguientes hasta él
+            node_distance = distance(self.node_int, node.id_int) or RING_SIZE
+            while True:
+                self._fingers[i] = node
+                i, visited = (i + 1) % M, visited + 1
+                if i == 0 or visited >= M or distance(self.node_int, starts[i]) > node_distance:
+                    break
+        self._next_finger = i
+        self._rebuild_finger_view()
+
+
+    """_lookup_finger
+    descripcion: Busca el successor de un inicio de finger (en paralelo si hay callback asíncrono).
+    entrada: target_id hex del inicio del finger
+    salida: (ip, port, node_id) o None"""
+    def _lookup_finger(self, target_id: str) -> Optional[Tuple[str, int, str]]:
+        if self.request_async_callback:
+            return self._find_successors_parallel([target_id])[0]
+        return self.find_successor(target_id)
+
+
+    """_rebuild_finger_view
+    descripcion: Arma finger_table (la lista que usa el ruteo) con los nodos distintos de los M fingers,
+    ordenados por distancia desde este nodo.
+    entrada: -
+    salida: -"""
+    def _rebuild_finger_view(self):
+        distinct = {}
+        for node in self._fingers:
+            if node is not None and node.id_int is not None:
+                distinct[node[2]] = node
+        self._finger_table = sorted(distinct.values(), key=lambda node: distance(self.node_int, node.id_int))
+        for node in self._finger_table:
+            self._routing.add(node)
+
+
+
+    """_find_successors_parallel
+    descripcion: Resuelve el successor de varias claves a la vez. Las que caen en nuestro segmento se resuelven
+    localmente; el resto se consulta al nodo más cercano con request_async_callback, todas en vuelo al mismo tiempo.
+    entrada: key_ids lista de hashes, timeout tiempo máximo de espera por consulta
+    salida: lista de (ip, port, node_id) en el mismo orden que key_ids (el successor actual si la consulta falla)"""
+    def _find_successors_parallel(self, key_ids: List[str], timeout: float = 5.0) -> List[Optional[Tuple[str, int, str]]]:
+        results: List[Optional[Tuple[str, int, str]]] = [None] * len(key_ids)
+        pending = []  # (indice, future)
+        successor = self._successor
+        key_ints = [to_int(key_id) for key_id in key_ids]
+        # todas las claves contra el segmento (yo, successor] de una vez
+        local = (between_many(key_ints, self.node_int, successor.id_int, inclusive=True)
+                 if successor else [True] * len(key_ids))
+        for i, key_id in enumerate(key_ids):
+            if local[i]:
+                results[i] = successor
+                continue
+            closest = self._routing.closest_preceding(key_ints[i]) or self._next_hop_fallback()
+            if not closest:
+                results[i] = self.successor
+                continue
+            message = {
+                "type": "CHORD_FIND_SUCCESSOR",
+                "key_id": key_id,
+                "requester_id": self.node_id,
+            }
             try:
-                offset = pow(2, i - 1)
-                target_id = (int(self.node_id, 16) + offset) % pow(2, m)
-                target_id_hex = format(target_id, '040x')
-                succ = self.find_successor(target_id_hex)
-                if succ:
-                    # evitar duplicados consecutivos
-                    if not self.finger_table or self.finger_table[-1][2] != succ[2]:
-                        self.finger_table.append(succ)
-                        self._remember_node(succ[2], succ[0], succ[1])
+                pending.append((i, closest[2], self.request_async_callback(closest[0], closest[1], message)))
             except Exception as e:
-                logger.debug(f"Error parcial actualizando finger[{i}]: {e}")
-    
+                logger.debug(f"Error enviando FIND_SUCCESSOR a {closest[0]}:{closest[1]}: {e}")
+                results[i] = self.successor
+
+        for i, target_id, future in pending:
+            try:
+                results[i] = self._parse_successor_response(future.result(timeout=timeout)) or self.successor
+            except Exception as e:
+                logger.debug(f"FIND_SUCCESSOR paralelo falló para {key_ids[i][:8]}: {e}")
+                self._forget_node(target_id)
+                results[i] = self.successor
+        return results
 
 
     """_check_predecessor_loop
@@ -592,49 +1210,44 @@ class ChordNode:
     entrada: -
     salida: -"""
     def _check_predecessor_loop(self):
-        # contador de fallos consecutivos
-        consecutive_failures = 0
-        max_failures = 3  # 3 fallos = nodo caído
-        
         while self.running and self.is_joined:
-            try:
-                if self.predecessor:
-                    pred_ip, pred_port, pred_id = self.predecessor
-                    
-                    logger.debug(f"Verificando predecesor {pred_id[:8]}...")
-                    
-                    # enviar heartbeat
-                    heartbeat_sent = self._send_heartbeat(pred_ip, pred_port)
-                    
-                    if heartbeat_sent:
-                        # esperar respuesta
-                        response_received = self._wait_for_heartbeat_ack(pred_id, timeout=5)
-                        
-                        if response_received:
-                            # resetear contador de fallos porque respondió
-                            consecutive_failures = 0 
-                            logger.debug(f"Predecesor {pred_id[:8]}... responde")
-                        else:
-                            # incrementar contador de fallos
-                            consecutive_failures += 1
-                            logger.warning(f"Predecesor {pred_id[:8]}... no respondió "
-                                        f"(fallo #{consecutive_failures})")
-                            
-                            # si se alcanzan los fallos máximos, marcar como caído
-                            if consecutive_failures >= max_failures:
-                                logger.error(f"Predecesor {pred_id[:8]}... CAÍDO "
-                                        f"({consecutive_failures} fallos)")
-                                self._handle_predecessor_failure()
-                                consecutive_failures = 0
-                    else:
-                        # error enviando heartbeat
-                        logger.warning(f"No se pudo enviar heartbeat a {pred_ip}:{pred_port}")
-                
-                time.sleep(2)
-                
-            except Exception as e:
-                logger.error(f"Error en _check_predecessor_loop: {e}")
-                time.sleep(2)  # esperar antes de reintentar  
+            self.check_predecessor_once()
+            time.sleep(self.CHECK_PREDECESSOR_INTERVAL)
+
+
+    """check_predecessor_once
+    descripcion: Envía un heartbeat al predecessor. Si no responde, lo da por caído y rearma el anillo cuando el
+    detector de fallas lo sospecha (phi sobre el umbral: lleva sin noticias mucho más que su intervalo habitual).
+    entrada: -
+    salida: booleano indicando si el predecessor respondió (True si no hay predecessor)"""
+    def check_predecessor_once(self) -> bool:
+        try:
+            if not self.predecessor:
+                return True
+            pred_ip, pred_port, pred_id = self.predecessor
+
+            logger.debug(f"Verificando predecesor {pred_id[:8]}...")
+
+            # enviar heartbeat y esperar respuesta
+            if self._send_heartbeat(pred_ip, pred_port) and self._wait_for_heartbeat_ack(pred_id, timeout=5):
+                self._saw(pred_id)
+                logger.debug(f"Predecesor {pred_id[:8]}... responde")
+                return True
+
+            # sin respuesta: decide el detector según el tiempo sin noticias del predecessor
+            self.failure_detector.watch(pred_id)
+            suspicion = self.suspicion(pred_id)
+            if not self.is_suspected(pred_id):
+                logger.warning(f"Predecesor {pred_id[:8]}... no respondió (sospecha {suspicion:.2f})")
+                return False
+
+            logger.error(f"Predecesor {pred_id[:8]}... CAÍDO (sospecha {suspicion:.2f})")
+            self._failures_detected.inc()
+            self._handle_predecessor_failure()
+            return False
+        except Exception as e:
+            logger.error(f"Error en _check_predecessor_loop: {e}")
+            return False
 
 
 
@@ -652,8 +1265,10 @@ class ChordNode:
             "port": self.port, #puerto del nodo
             "successor": self.successor[2] if self.successor else None, #id del successor
             "predecessor": self.predecessor[2] if self.predecessor else None, #id del predecessor
+            "successor_list": [node[2] for node in self.successor_list], #ids de la lista de successors
             "is_joined": self.is_joined, #si está unido al anillo
-            "finger_table_size": len(self.finger_table) #tamaño de la finger table
+            "finger_table_size": len(self.finger_table), #tamaño de la finger table
+            "suspected": self.failure_detector.suspected(), #vecinos que el detector de fallas da por caídos
         }
     
     """get_responsible_node
@@ -662,7 +1277,40 @@ class ChordNode:
     salida: (ip, port, node_id) del nodo responsable sino None"""
     def get_responsible_node(self, key: str) -> Optional[Tuple[str, int, str]]:
         key_hash = self._calculate_hash(key) #calcula el hash de la clave
-        return self.find_successor(key_hash) #busca el successor responsable de esa clave
+        key_int = to_int(key_hash)
+        predecessor = self._predecessor
+        if predecessor and predecessor.id_int is not None and between(key_int, predecessor.id_int, self.node_int):
+            return NodeRef(self.ip, self.port, self.node_id, self.node_int) #la clave es nuestra
+        cached = self._owner_cache.get(key_int)
+        if cached:
+            return cached
+        # el lookup también informa el rango del responsable: se guarda para las claves siguientes
+        epoch = self._owner_cache.epoch
+        succ = self.find_successor(key_hash) #busca el successor responsable de esa clave
+        range_start = getattr(self._lookup_state, "range_start", None)
+        if succ and range_start and self._owner_cache.epoch == epoch:
+            self._owner_cache.put(to_int(range_start), NodeRef.of(succ))
+        return succ
+
+
+    """invalidate_responsible_node
+    descripcion: Olvida el responsable cacheado de una clave, p. ej. porque ese nodo informó que ya no es responsable.
+    entrada: key clave
+    salida: -"""
+    def invalidate_responsible_node(self, key: str):
+        self._owner_cache.discard_key(to_int(self._calculate_hash(key)))
+
+
+    """owns_key
+    descripcion: Si este nodo es responsable de un hash: está en (predecessor, nodo]. Sin predecessor no se sabe y
+    se asume que sí.
+    entrada: key_hash hash de la clave
+    salida: bool"""
+    def owns_key(self, key_hash: str) -> bool:
+        predecessor = self._predecessor
+        if not predecessor or predecessor.id_int is None or predecessor.id_int == self.node_int:
+            return True
+        return between(to_int(key_hash), predecessor.id_int, self.node_int)
     
     """leave_network
     descripcion: Abandona el anillo de manera ordenada.
@@ -685,6 +1333,10 @@ class ChordNode:
         self.predecessor = None
         self.is_joined = False
         self.finger_table = []
+        self._next_successors = []
+        self._routing.clear()
+        for name in self._gauges:
+            self.metrics.remove(name, node=self.node_id[:8])
         
         logger.info("Nodo ha salido del anillo")
 
@@ -741,35 +1393,33 @@ class ChordNode:
     # FUNCIONES DE MANEJO DE MENSAJES
     
     """Procesa mensajes entrantes para el overlay.
-        entrada: message Diccionario con el mensaje recibido
+        El dict se envuelve en un Message (sin copiarlo) y se valida con el schema del tipo.
+        entrada: message Diccionario (o Message) con el mensaje recibido
         salida:  Diccionario con la respuesta o None"""
     def handle_message(self, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         msg_type = message.get("type")
-        
-        handlers = {
-            "CHORD_JOIN_REQUEST": self._handle_join_request,
-            "CHORD_FIND_SUCCESSOR": self._handle_find_successor,
-            "CHORD_NOTIFY": self._handle_notify, 
-            "CHORD_UPDATE_PREDECESSOR": self._handle_update_predecessor,
-            "CHORD_UPDATE_SUCCESSOR": self._handle_update_successor,
-            "CHORD_HEARTBEAT": self._handle_heartbeat,
-            "CHORD_GET_PREDECESSOR": self._handle_get_predecessor,
-           
-            "JOIN_REQUEST": self._handle_join_request,
-            "FIND_SUCCESSOR": self._handle_find_successor,
-            "UPDATE_PREDECESSOR": self._handle_update_predecessor,
-            "UPDATE_SUCCESSOR": self._handle_update_successor,
-            "HEARTBEAT": self._handle_heartbeat,
-            "GET_PREDECESSOR": self._handle_get_predecessor,
-        }
-        
-        handler = handlers.get(msg_type)
-        if handler:
-            return handler(message)
-        
-        logger.warning(f"Mensaje no manejado: {msg_type}")
-        return None
+        handler = self._handlers.get(msg_type)
+        if handler is None:
+            logger.warning(f"Mensaje no manejado: {msg_type}")
+            return None
+
+        if PROTOCOL_AVAILABLE:
+            try:
+                message = Message.from_dict(message, strict=True)
+            except ValueError as e:
+                logger.warning(f"Mensaje {msg_type} inválido: {e}")
+                return None
+        # cualquier mensaje de un vecino es una señal de vida para el detector de fallas
+        self._saw(message.get("node_id") or message.get("requester_id"))
+        return handler(message)
     
+    """_handle_batch
+    descripcion: Procesa en una pasada los mensajes Chord de un BATCH (p. ej. varios NOTIFY).
+    entrada: message Message con el BATCH
+    salida: Diccionario BATCH_RESPONSE con la respuesta de cada mensaje"""
+    def _handle_batch(self, message) -> Dict:
+        return run_batch(message, self.handle_message)
+
     """_handle_join_request
     descripcion: Maneja solicitud de unión de nuevo nodo.
     entrada: message Diccionario con el mensaje JOIN_REQUEST
@@ -812,7 +1462,9 @@ class ChordNode:
     salida: Diccionario con la respuesta SUCCESSOR_RESPONSE"""
     def _handle_find_successor(self, message: Dict) -> Dict:
         key_id = message.get("key_id") #id de la clave a buscar
-        succ = self.find_successor(key_id) #buscar el successor de la clave
+        # los hops se registran en el nodo que originó el lookup, aquí solo se informan
+        succ, hops = self._find_successor_hops(key_id) #buscar el successor de la clave
+        range_start = self._lookup_state.range_start
         if succ:
             self._remember_node(succ[2], succ[0], succ[1])
         
@@ -822,17 +1474,45 @@ class ChordNode:
             "successor_ip": succ[0] if succ else None, #ip del successor
             "successor_port": succ[1] if succ else None, #puerto del successor
             "successor_id": succ[2] if succ else None, #id del successor
+            "hops": hops, #saltos remotos que hizo este nodo
         }
+        if range_start:
+            response["range_start"] = range_start #el successor es responsable de (range_start, successor]
         
         return response
     
 
 
+    """_handle_next_hop
+    descripcion: Responde un paso del lookup iterativo: el successor si la clave cae en nuestro segmento
+    (final=True) o los nodos conocidos más cercanos que preceden a la clave (final=False).
+    entrada: message Diccionario con el mensaje CHORD_NEXT_HOP
+    salida: Diccionario con la respuesta NEXT_HOP_RESPONSE"""
+    def _handle_next_hop(self, message: Dict) -> Dict:
+        key_id = message.get("key_id")
+        key_int = to_int(key_id)
+        successor = self._successor or NodeRef(self.ip, self.port, self.node_id, self.node_int)
+        response = {"type": "NEXT_HOP_RESPONSE", "key_id": key_id}
+        if successor.id_int == self.node_int or between(key_int, self.node_int, successor.id_int):
+            response.update({
+                "final": True,
+                "successor_ip": successor[0],
+                "successor_port": successor[1],
+                "successor_id": successor[2],
+            })
+        else:
+            count = min(int(message.get("count") or self.LOOKUP_ALPHA), self.MAX_NEXT_HOP_NODES)
+            nodes = self._routing.preceding(key_int, count) or [successor]
+            response.update({"final": False, "nodes": [[ip, port, node_id] for ip, port, node_id in nodes]})
+        return response
+
+
     """_handle_update_predecessor
     descripcion: Actualiza el predecessor.
     entrada: message Diccionario con el mensaje UPDATE_PREDECESSOR
     salida: Diccionario con la respuesta ACK"""
     def _handle_update_predecessor(self, message: Dict) -> Dict:
+        self._owner_cache.invalidate() #un nodo salió del anillo: los rangos cacheados ya no valen
         new_pred_id = message.get("new_predecessor_id") or message.get("node_id") #id del nuevo predecessor
         new_pred_ip = message.get("new_predecessor_ip") or message.get("ip") #ip del nuevo predecessor
         new_pred_port = message.get("new_predecessor_port") or message.get("port") #puerto del nuevo predecessor
@@ -843,7 +1523,7 @@ class ChordNode:
             return {"type": "ACK", "error": "predecessor_cannot_be_self"}
 
         # validación ligera: si existe predecessor, comprobar intervalo (solo log)
-        if self.predecessor and not self._is_between(new_pred_id, self.predecessor[2], self.node_id, inclusive=True):
+        if self.predecessor and not self._in_predecessor_interval(new_pred_id, inclusive=True):
             logger.debug("UPDATE_PREDECESSOR fuera de intervalo esperado; aplicando de todas formas")
 
         # actualizar predecessor
@@ -859,6 +1539,7 @@ class ChordNode:
     salida: Diccionario con ACK
     """
     def _handle_update_successor(self, message: Dict) -> Dict:
+        self._owner_cache.invalidate()
         new_succ_id = message.get("new_successor_id") or message.get("node_id") #id del nuevo successor
         new_succ_ip = message.get("new_successor_ip") or message.get("ip") #ip del nuevo successor
         new_succ_port = message.get("new_successor_port") or message.get("port") #puerto del nuevo successor
@@ -869,7 +1550,7 @@ class ChordNode:
             return {"type": "ACK", "error": "successor_cannot_be_self"}
 
         # validación ligera: si existe successor, comprobar intervalo (solo log)
-        if self.successor and not self._is_between(new_succ_id, self.node_id, self.successor[2], inclusive=True):
+        if self.successor and not self._in_successor_interval(new_succ_id, inclusive=True):
             logger.debug("UPDATE_SUCCESSOR fuera de intervalo esperado; aplicando de todas formas")
 
         # actualizar successor
@@ -915,6 +1596,8 @@ class ChordNode:
             "predecessor_id": pred_id, #id del predecessor
             "node_id": self.node_id, #id del nodo que responde
             "timestamp": time.time(),
+            # la lista de successors viaja con la respuesta de stabilize (sin mensajes extra)
+            "successors": [[ip, port, node_id] for ip, port, node_id in self.successor_list],
         }
 
 
@@ -951,7 +1634,7 @@ class ChordNode:
             return None
         
         # ver si el nuevo nodo está entre el predecesor del nodo y el nodo mismo
-        if self._is_between(new_node_id, self. predecessor[2], self.node_id, inclusive=False):
+        if self._in_predecessor_interval(new_node_id, inclusive=False):
             old_pred = self.predecessor
             self. predecessor = (new_ip, new_port, new_node_id)
             logger.info(f"Predecessor actualizado: {old_pred[2][:8]}... → {new_node_id[:8]}...")
@@ -982,7 +1665,7 @@ class ChordNode:
         
         try:
             # enviar heartbeat
-            self.send_callback(target_ip, target_port, message)
+            (self.control_callback or self.send_callback)(target_ip, target_port, message)
             return True
         except Exception as e:
             logger.error(f"Error enviando heartbeat: {e}")
@@ -1018,8 +1701,9 @@ class ChordNode:
                 logger.debug("No se pudo resolver IP/puerto para heartbeat ACK")
                 return False
 
-            # enviar y esperar respuesta
-            response = self.request_callback(ip, port, message)
+            # enviar y esperar respuesta (por el canal de control si está configurado)
+            request = self.control_request_callback or self.request_callback
+            response = request(ip, port, message)
             return bool(response and response.get("type") == "HEARTBEAT_ACK")
         except Exception as e:
             logger.error(f"Error esperando HEARTBEAT_ACK de {target_id[:8]}...: {e}")
@@ -1037,8 +1721,10 @@ class ChordNode:
         else:
             logger.warning("Predecessor ya era None al detectar fallo")
 
-        # limpiar predecessor
+        # limpiar predecessor (y sacarlo del ruteo)
         self.predecessor = None
+        if old_pred:
+            self._forget_node(old_pred[2])
 
         # intentar recuperación consultando al successor por su predecessor
         try:
@@ -1076,24 +1762,4 @@ def calculate_hash(text: str) -> str:
 
 
 def _is_between(self, key: str, start: str, end: str, inclusive: bool = True) -> bool:
-    key_int = int(key, 16)
-    start_int = int(start, 16)
-    end_int = int(end, 16)
-    
-    #Caso en el que no damos la vuelta el anillo, no vamos a 0
-    if start_int < end_int:
-        #inclusive, end está incluido en el intervalo, valor necesario para evitar duplicados
-        if inclusive:
-            return start_int < key_int <= end_int
-        return start_int < key_int < end_int
-    
-    #Caso en el que damos la vuelta al anillo, Por ejemplo estamos en 50 y queremos llegar a 10, pasamos por el 0
-    elif start_int > end_int:
-        if inclusive:
-            return start_int < key_int or key_int <= end_int
-        return start_int < key_int or key_int < end_int
-    
-    else:  # start == end
-        if inclusive:
-            return key_int == start_int
-        return False
+    return between(to_int(key), to_int(start), to_int(end), inclusive)
@@ -0,0 +1,191 @@
+"""
+Pool de conexiones TCP salientes por peer (ip, port).
+
+Evita un connect/close completo por cada send_message/request_response:
+- Mantiene hasta max_size conexiones ociosas por peer para reutilizarlas.
+- Cierra conexiones que llevan más de idle_timeout segundos sin usarse.
+- Antes de reutilizar una conexión hace un health check no bloqueante: si el peer
+  la cerró se descarta, y si quedaron bytes sin leer (respuestas que nadie pidió)
+  se descartan para no desincronizar el siguiente request/response.
+- Si una conexión reutilizada falla al escribir, quien la usa puede reconectar
+  de forma transparente (ver TCPServer.send_message).
+- Las conexiones se separan por canal: las de envío fire-and-forget pueden recibir
+  respuestas que nadie lee, así que nunca se mezclan con las de request/response.
+"""
+import socket
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+Peer = Tuple[str, int]
+PoolKey = Tuple[str, int, str]  # (ip, port, canal)
+
+
+class PooledConnection:
+    """Socket conectado a un peer más la metadata que necesita el pool."""
+
+    def __init__(self, key: PoolKey, sock: socket.socket):
+        self.key = key
+        self.peer = key[:2]
+        self.sock = sock
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.reused = False  # True si salió del pool (no recién conectada)
+        self.reader = None   # FrameReader asociado (lo crea quien lee respuestas)
+        self.codec = None    # codec y framing negociados (los fija quien abre la conexión)
+        self.framing = None
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones persistentes por peer.
+    - max_size: conexiones ociosas que se guardan por peer; si hay más pedidos
+      concurrentes se abren conexiones extra que se cierran al liberarlas.
+    - idle_timeout: segundos máximos que una conexión puede quedar ociosa.
+    """
+
+    def __init__(self, max_size: int = 4, idle_timeout: float = 30.0):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self._idle: Dict[PoolKey, List[PooledConnection]] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self._last_sweep = time.monotonic()
+
+        # contadores para diagnóstico
+        self.opened = 0
+        self.reused = 0
+        self.evicted = 0
+        self.discarded = 0
+
+    def acquire(self, ip: str, port: int, timeout: float = 5.0, channel: str = "send") -> PooledConnection:
+        """
+        Retorna una conexión sana hacia (ip, port) en el canal indicado: reutiliza una
+        ociosa si pasa el health check, o abre una nueva. Propaga los errores de connect().
+        """
+        key = (ip, port, channel)
+        self._maybe_sweep()
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                conn = idle.pop() if idle else None
+            if conn is None:
+                break
+            if self._is_expired(conn) or not self._is_healthy(conn):
+                self.evicted += 1
+                conn.close()
+                continue
+            conn.sock.settimeout(timeout)
+            conn.reused = True
+            self.reused += 1
+            return conn
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect((ip, port))
+        except Exception:
+            sock.close()
+            raise
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.opened += 1
+        return PooledConnection(key, sock)
+
+    def release(self, conn: PooledConnection):
+        """Devuelve la conexión al pool (o la cierra si el pool del peer está lleno)."""
+        conn.last_used = time.monotonic()
+        with self._lock:
+            if not self._closed:
+                idle = self._idle.setdefault(conn.key, [])
+                if len(idle) < self.max_size:
+                    idle.append(conn)
+                    return
+        conn.close()
+
+    def discard(self, conn: PooledConnection):
+        """Cierra una conexión que falló; no vuelve al pool."""
+        self.discarded += 1
+        conn.close()
+
+    def evict_idle(self) -> int:
+        """Cierra las conexiones ociosas expiradas. Retorna cuántas se cerraron."""
+        expired = []
+        with self._lock:
+            for key, idle in list(self._idle.items()):
+                keep = [c for c in idle if not self._is_expired(c)]
+                expired.extend(c for c in idle if self._is_expired(c))
+                if keep:
+                    self._idle[key] = keep
+                else:
+                    del self._idle[key]
+        for conn in expired:
+            conn.close()
+        self.evicted += len(expired)
+        return len(expired)
+
+    def close_all(self):
+        """Cierra todas las conexiones ociosas y deja de aceptar devoluciones."""
+        with self._lock:
+            self._closed = True
+            conns = [c for idle in self._idle.values() for c in idle]
+            self._idle.clear()
+        for conn in conns:
+            conn.close()
+
+    def idle_count(self, peer: Optional[Peer] = None) -> int:
+        with self._lock:
+            if peer is not None:
+                return sum(len(idle) for key, idle in self._idle.items() if key[:2] == tuple(peer))
+            return sum(len(idle) for idle in self._idle.values())
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "opened": self.opened,
+            "reused": self.reused,
+            "evicted": self.evicted,
+            "discarded": self.discarded,
+            "idle": self.idle_count(),
+        }
+
+    # ---------------- internos ----------------
+
+    def _is_expired(self, conn: PooledConnection) -> bool:
+        return time.monotonic() - conn.last_used > self.idle_timeout
+
+    def _maybe_sweep(self):
+        """Desalojo perezoso: como mucho una pasada por segundo."""
+        now = time.monotonic()
+        if now - self._last_sweep >= 1.0:
+            self._last_sweep = now
+            self.evict_idle()
+
+    @staticmethod
+    def _is_healthy(conn: PooledConnection) -> bool:
+        """
+        Health check no bloqueante. Una conexión ociosa no debería tener nada para
+        leer: EOF significa que el peer la cerró; datos pendientes son respuestas
+        a send_message que nadie leyó y se descartan.
+        """
+        sock = conn.sock
+        try:
+            sock.setblocking(False)
+            while True:
+                try:
+                    data = sock.recv(65536)
+                except BlockingIOError:
+                    return True
+                if not data:
+                    return False
+        except OSError:
+            return False
+        finally:
+            try:
+                sock.setblocking(True)
+            except OSError:
+                pass
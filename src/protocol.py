@@ -1,4 +1,4 @@
-import json 
+import json
 import time
 from enum import Enum
 
@@ -10,76 +10,376 @@ class MessageType(Enum):
     GET = "GET"                 #Obtiene una respuesta
     RESULT = "RESULT"           #Respuesta a una solicitud
     HEARTBEAT = "HEARTBEAT"     #Señal de vida
+    STATS = "STATS"             #Pide las métricas del nodo
+
+    #Storage (src/storage.py)
+    REPLICATE = "REPLICATE"     #Guarda una réplica
+    LOOKUP = "LOOKUP"           #Busca una clave en el anillo
+    ACK = "ACK"                 #Confirmación genérica
+    ERROR = "ERROR"             #Respuesta de error
+
+    #Overlay Chord (src/overlay.py)
+    CHORD_JOIN_REQUEST = "CHORD_JOIN_REQUEST"
+    CHORD_FIND_SUCCESSOR = "CHORD_FIND_SUCCESSOR"
+    CHORD_NOTIFY = "CHORD_NOTIFY"
+    CHORD_UPDATE_PREDECESSOR = "CHORD_UPDATE_PREDECESSOR"
+    CHORD_UPDATE_SUCCESSOR = "CHORD_UPDATE_SUCCESSOR"
+    CHORD_HEARTBEAT = "CHORD_HEARTBEAT"
+    CHORD_GET_PREDECESSOR = "CHORD_GET_PREDECESSOR"
+    CHORD_NEXT_HOP = "CHORD_NEXT_HOP"           #Lookup iterativo: siguiente salto hacia una clave
+    JOIN_REQUEST = "JOIN_REQUEST"               #alias sin prefijo CHORD_
+    FIND_SUCCESSOR = "FIND_SUCCESSOR"
+    UPDATE_PREDECESSOR = "UPDATE_PREDECESSOR"
+    UPDATE_SUCCESSOR = "UPDATE_SUCCESSOR"
+    GET_PREDECESSOR = "GET_PREDECESSOR"
+    JOIN_RESPONSE = "JOIN_RESPONSE"
+    SUCCESSOR_RESPONSE = "SUCCESSOR_RESPONSE"
+    PREDECESSOR_RESPONSE = "PREDECESSOR_RESPONSE"
+    HEARTBEAT_ACK = "HEARTBEAT_ACK"
+    NEXT_HOP_RESPONSE = "NEXT_HOP_RESPONSE"
+
+    #Transporte (src/networking.py, src/datagram.py, src/metrics.py)
+    NO_REPLY = "NO_REPLY"       #El handler remoto no respondió
+    BUSY = "BUSY"               #Servidor sobrecargado
+    UDP_ACK = "UDP_ACK"         #Confirmación de un datagrama
+    STATS_RESPONSE = "STATS_RESPONSE"
+
+    #Lotes: varios mensajes en un solo frame (ver run_batch)
+    BATCH = "BATCH"
+    BATCH_RESPONSE = "BATCH_RESPONSE"
+
+
+#Tabla de búsqueda de tipos: valor o nombre -> MessageType
+#(se arma una sola vez; evita MessageType(...) y __members__ en cada mensaje)
+_TYPE_LOOKUP = {}
+for _t in MessageType:
+    _TYPE_LOOKUP[_t.name] = _t
+    _TYPE_LOOKUP[_t.value] = _t
+del _t
+
+"""
+    lookup_type
+    descripcion: Busca el MessageType de un valor sin lanzar excepciones.
+    entrada: MessageType, o su nombre o valor como string
+    salida: MessageType o None si no existe
+"""
+def lookup_type(value):
+    if value.__class__ is MessageType:
+        return value
+    try:
+        return _TYPE_LOOKUP.get(value)
+    except TypeError:  #valor no hasheable (lista, dict)
+        return None
+
+"""
+    message_type
+    descripcion: Igual que lookup_type pero lanza ValueError si el tipo no existe.
+    entrada: MessageType, o su nombre o valor como string
+    salida: MessageType
+"""
+def message_type(value):
+    msg_type = lookup_type(value)
+    if msg_type is None:
+        raise ValueError(f"Tipo de mensaje inválido: {value}")
+    return msg_type
+
+
+#Schemas por tipo: campo -> (tipos aceptados, obligatorio). "data.x" es un campo dentro de data.
+#Los obligatorios solo se exigen con strict=True (mensajes que llegan de la red).
+_STR = (str,)
+_OPT_STR = (str, type(None))
+_OPT_INT = (int, type(None))
+_OPT_BOOL = (bool, type(None))
+_OPT_PORT = (int, str, type(None))
+_NUM = (int, float)
+_DICT = (dict,)
+_LIST = (list,)
+_ANY = None
+
+_JOIN_REQUEST = {"node_id": (_STR, True), "ip": (_OPT_STR, False), "port": (_OPT_PORT, False)}
+_FIND_SUCCESSOR = {"key_id": (_STR, True), "requester_id": (_OPT_STR, False)}
+_GET_PREDECESSOR = {"requester_id": (_OPT_STR, False), "requester_ip": (_OPT_STR, False),
+                    "requester_port": (_OPT_PORT, False), "timestamp": (_NUM, False)}
+_HEARTBEAT = {"node_id": (_OPT_STR, False), "timestamp": (_NUM, False)}
+
+SCHEMAS = {
+    MessageType.PUT: {"request_id": (_STR, False), "sender_ip": (_OPT_STR, False), "sender_port": (_OPT_PORT, False),
+                      "data.key": (_STR, True), "data.value": (_ANY, True), "data.forwarded": (_OPT_BOOL, False)},
+    MessageType.REPLICATE: {"request_id": (_STR, False), "data.key": (_STR, True), "data.value": (_ANY, True)},
+    MessageType.GET: {"request_id": (_STR, False), "sender_ip": (_OPT_STR, False),
+                      "sender_port": (_OPT_PORT, False), "data.key": (_STR, True)},
+    MessageType.LOOKUP: {"request_id": (_STR, False), "data.key": (_STR, True), "data.hops": (_OPT_INT, False)},
+    MessageType.RESULT: {"request_id": (_OPT_STR, False)},
+    MessageType.ACK: {"request_id": (_OPT_STR, False), "error": (_OPT_STR, False)},
+    MessageType.ERROR: {"request_id": (_OPT_STR, False), "error": (_OPT_STR, False)},
+    MessageType.HEARTBEAT: _HEARTBEAT,
+    MessageType.CHORD_HEARTBEAT: _HEARTBEAT,
+    MessageType.CHORD_JOIN_REQUEST: _JOIN_REQUEST,
+    MessageType.JOIN_REQUEST: _JOIN_REQUEST,
+    MessageType.CHORD_FIND_SUCCESSOR: _FIND_SUCCESSOR,
+    MessageType.FIND_SUCCESSOR: _FIND_SUCCESSOR,
+    MessageType.CHORD_GET_PREDECESSOR: _GET_PREDECESSOR,
+    MessageType.GET_PREDECESSOR: _GET_PREDECESSOR,
+    MessageType.CHORD_NOTIFY: {"node_id": (_STR, True), "ip": (_OPT_STR, False), "port": (_OPT_PORT, False),
+                               "timestamp": (_NUM, False), "current_predecessor": (_OPT_STR, False)},
+    MessageType.CHORD_UPDATE_PREDECESSOR: {"new_predecessor_ip": (_OPT_STR, False),
+                                           "new_predecessor_port": (_OPT_PORT, False),
+                                           "new_predecessor_id": (_OPT_STR, False),
+                                           "leaving_node_id": (_OPT_STR, False), "timestamp": (_NUM, False)},
+    MessageType.CHORD_UPDATE_SUCCESSOR: {"new_successor_ip": (_OPT_STR, False),
+                                         "new_successor_port": (_OPT_PORT, False),
+                                         "new_successor_id": (_OPT_STR, False),
+                                         "leaving_node_id": (_OPT_STR, False), "timestamp": (_NUM, False)},
+    MessageType.JOIN_RESPONSE: {"successor_ip": (_OPT_STR, False), "successor_port": (_OPT_PORT, False),
+                                "successor_id": (_OPT_STR, False)},
+    MessageType.SUCCESSOR_RESPONSE: {"key_id": (_OPT_STR, False), "successor_ip": (_OPT_STR, False),
+                                     "successor_port": (_OPT_PORT, False), "successor_id": (_OPT_STR, False),
+                                     "hops": (_OPT_INT, False), "range_start": (_OPT_STR, False)},
+    MessageType.PREDECESSOR_RESPONSE: {"predecessor_ip": (_OPT_STR, False), "predecessor_port": (_OPT_PORT, False),
+                                       "predecessor_id": (_OPT_STR, False), "node_id": (_OPT_STR, False),
+                                       "timestamp": (_NUM, False), "successors": (_LIST, False)},
+    MessageType.HEARTBEAT_ACK: {"timestamp": (_NUM, False)},
+    MessageType.CHORD_NEXT_HOP: {"key_id": (_STR, True), "requester_id": (_OPT_STR, False),
+                                 "count": (_OPT_INT, False)},
+    MessageType.NEXT_HOP_RESPONSE: {"key_id": (_OPT_STR, False), "final": (_OPT_BOOL, False),
+                                    "successor_ip": (_OPT_STR, False), "successor_port": (_OPT_PORT, False),
+                                    "successor_id": (_OPT_STR, False), "nodes": (_LIST, False)},
+    MessageType.STATS_RESPONSE: {"node_id": (_OPT_STR, False), "metrics": (_DICT, False)},
+    MessageType.BATCH: {"messages": (_LIST, True)},
+    MessageType.BATCH_RESPONSE: {"results": (_LIST, False)},
+}
+SCHEMAS[MessageType.UPDATE_PREDECESSOR] = SCHEMAS[MessageType.CHORD_UPDATE_PREDECESSOR]
+SCHEMAS[MessageType.UPDATE_SUCCESSOR] = SCHEMAS[MessageType.CHORD_UPDATE_SUCCESSOR]
+
+_MISSING = object()
+
+
+"""
+    _compile_validator
+    descripcion: Genera y compila (una vez por tipo) el código de la función que valida
+    los campos del schema, sin recorrer el schema en cada mensaje.
+    entrada: msg_type MessageType, schema (campo -> (tipos, obligatorio))
+    salida: función validate(message, strict) que lanza ValueError
+"""
+def _compile_validator(msg_type, schema):
+    name = msg_type.value
+    env = {"_MISSING": _MISSING, "_invalid": _invalid}
+    lines = [
+        "def validate(message, strict):",
+        "    data = message.data",
+        "    if data is not None and data.__class__ is not dict and not isinstance(data, dict):",
+        f"        _invalid({name!r}, 'data debe ser un dict')",
+        "    sender_id = message.sender_id",
+        "    if sender_id is not None and sender_id.__class__ is not str and not isinstance(sender_id, str):",
+        f"        _invalid({name!r}, 'sender_id debe ser un string')",
+        "    fields = message.fields",
+    ]
+    for i, (path, (types, required)) in enumerate(schema.items()):
+        container, field = ("data", path[5:]) if path.startswith("data.") else ("fields", path)
+        env[f"_T{i}"] = types
+        lines.append(f"    value = {container}.get({field!r}, _MISSING) if {container} else _MISSING")
+        lines.append("    if value is _MISSING:")
+        if required:
+            lines.append("        if strict:")
+            lines.append(f"            _invalid({name!r}, 'falta el campo obligatorio {field}')")
+        else:
+            lines.append("        pass")
+        if types is not None:
+            lines.append(f"    elif not isinstance(value, _T{i}):")
+            lines.append(f"        _invalid({name!r}, 'el campo {field} tiene tipo ' + type(value).__name__)")
+    exec("\n".join(lines), env)
+    return env["validate"]
+
+
+def _invalid(msg_type, reason):
+    raise ValueError(f"{msg_type}: {reason}")
+
+
+#indexado por _name_ (atributo simple): indexar por el Enum pasaría por su __hash__, que es lento
+_VALIDATORS = {t._name_: _compile_validator(t, SCHEMAS.get(t, {})) for t in MessageType}
+
+#campos que Message guarda como atributos (el resto queda en fields)
+_ENVELOPE = ("sender_id", "data", "timestamp")
+
 
 #Mensaje dentro de la red P2P
 class Message:
+    __slots__ = ("type", "sender_id", "data", "timestamp", "fields")
+
     def __init__(self, msg_type, sender_id, data=None):
 
         #Validación de los elementos
-        if not isinstance(msg_type, MessageType) and msg_type not in MessageType.__members__:
+        #el hash de un Enum es lento: los MessageType no pasan por la tabla
+        resolved = msg_type if msg_type.__class__ is MessageType else lookup_type(msg_type)
+        if resolved is None:
             raise ValueError(f"Tipo de mensaje inválido: {msg_type}")
-        
-        self.type = msg_type                #Tipo de mensaje
+        self.type = resolved                #Tipo de mensaje (MessageType)
         self.sender_id = sender_id          #ID del remitente
         self.data = data if data else {}    #Datos adicionales
         self.timestamp = time.time()        #Marca de tiempo del mensaje
+        self.fields = None                  #Campos de primer nivel propios del tipo (solo en from_dict)
+        _VALIDATORS[resolved._name_](self, False)
+
+    """
+        from_dict
+        descripcion: Envuelve un dict recibido de la red sin copiarlo: type pasa por la
+        tabla de tipos, data y los campos propios del tipo (key_id, request_id, ...)
+        se leen del mismo dict. Con strict=True se exigen los campos obligatorios.
+        entrada: dict del mensaje (o un Message, que se retorna tal cual)
+        salida: objeto Message (ValueError si el tipo o los campos son inválidos)
+    """
+    @classmethod
+    def from_dict(cls, dict_msg, strict=False):
+        if dict_msg.__class__ is not dict:
+            if isinstance(dict_msg, Message):
+                return dict_msg
+            if not isinstance(dict_msg, dict):
+                raise ValueError(f"Mensaje mal formado: se esperaba un dict, no {type(dict_msg).__name__}")
+        msg_type = dict_msg.get("type")
+        resolved = _TYPE_LOOKUP.get(msg_type) if msg_type.__class__ is str else lookup_type(msg_type)
+        if resolved is None:
+            raise ValueError(f"Tipo de mensaje inválido: {msg_type}")
+        msg = cls.__new__(cls)
+        msg.type = resolved
+        msg.sender_id = dict_msg.get("sender_id")
+        msg.data = dict_msg.get("data")
+        msg.timestamp = dict_msg.get("timestamp")
+        msg.fields = dict_msg
+        _VALIDATORS[resolved._name_](msg, strict)
+        return msg
+
+    """
+        get
+        descripcion: Acceso estilo dict para los handlers que reciben dicts o Messages.
+        "type" retorna el valor string del tipo.
+        entrada: key nombre del campo, default valor si no existe
+        salida: valor del campo
+    """
+    def get(self, key, default=None):
+        if key == "type":
+            return self.type._value_
+        if key in _ENVELOPE:
+            value = getattr(self, key)
+            return default if value is None else value
+        if self.fields is None:
+            return default
+        return self.fields.get(key, default)
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __repr__(self):
+        return f"Message({self.type._value_}, sender_id={self.sender_id!r}, data={self.data!r})"
 
     """
-        to_dict 
-        descripcion: Convierte el mensaje a un diccionario python 
+        to_dict
+        descripcion: Convierte el mensaje a un diccionario python
         entrada: message
         salida: mensaje en diccionario python
     """
     def to_dict(self):
-        return{
-            "type": self.type.value,
-            "sender_id": self.sender_id,
-            "data": self.data,
-            "timestamp": self.timestamp
-        }
+        if self.fields is None:
+            return{
+                "type": self.type._value_,
+                "sender_id": self.sender_id,
+                "data": self.data,
+                "timestamp": self.timestamp
+            }
+        #mensaje recibido: mismos campos que el original con los atributos actuales
+        dict_msg = dict(self.fields)
+        dict_msg["type"] = self.type._value_
+        for name in _ENVELOPE:
+            value = getattr(self, name)
+            if value is not None or name in dict_msg:
+                dict_msg[name] = value
+        return dict_msg
+
+#Máximo de sub-mensajes por BATCH (acota el trabajo de un solo frame)
+MAX_BATCH_ITEMS = 1024
+
+"""
+    batch_message
+    descripcion: Arma un mensaje BATCH con varios mensajes (dicts o Messages).
+    entrada: messages lista de mensajes, sender_id opcional
+    salida: dict del BATCH listo para enviar
+"""
+def batch_message(messages, sender_id=None):
+    items = [m.to_dict() if isinstance(m, Message) else m for m in messages]
+    batch = {"type": MessageType.BATCH._value_, "messages": items}
+    if sender_id is not None:
+        batch["sender_id"] = sender_id
+    return batch
 
 """
-    serializeMessage 
-    descripcion: Convierte el mensaje en formato json. 
+    run_batch
+    descripcion: Procesa en una pasada los sub-mensajes de un BATCH con handle y arma
+    una sola respuesta: results[i] es la respuesta del mensaje i, None si no tuvo, o un
+    ERROR si el mensaje es inválido o el handler falló (un item no corta el lote).
+    entrada: batch dict o Message del BATCH, handle función mensaje -> respuesta o None
+    salida: dict BATCH_RESPONSE
+"""
+def run_batch(batch, handle):
+    messages = batch.get("messages")
+    if not isinstance(messages, list):
+        return _batch_error("BATCH: messages debe ser una lista")
+    if len(messages) > MAX_BATCH_ITEMS:
+        return _batch_error(f"BATCH: {len(messages)} mensajes (máximo {MAX_BATCH_ITEMS})")
+    results = []
+    for item in messages:
+        if not isinstance(item, dict):
+            results.append(_batch_error(f"mensaje mal formado: {type(item).__name__}"))
+        elif item.get("type") == MessageType.BATCH._value_:
+            results.append(_batch_error("BATCH anidado no permitido"))
+        else:
+            try:
+                results.append(handle(item))
+            except Exception as e:
+                results.append(_batch_error(f"{item.get('type')}: {e}"))
+    return {"type": MessageType.BATCH_RESPONSE._value_, "results": results}
+
+
+def _batch_error(error):
+    return {"type": MessageType.ERROR._value_, "error": error}
+
+"""
+    serializeMessage
+    descripcion: Convierte el mensaje en formato json.
     entrada: message
     salida: mensaje en formato json
 """
 def serializeMessage(message):
     if not isinstance(message, Message):
         raise ValueError("El objeto a serializar debe ser instancia de Message")
-    
+
     return json.dumps(message.to_dict())
 
 """
-    deserialize_message 
+    deserialize_message
     descripcion: Convierte un string JSON recibido desde la red a un objeto Message. Incluye validación de estructura.
     entrada: string JSON
     salida: objeto Message
 """
 def deserialize_message(json_str: str) -> Message:
+    # 1. Parsear el JSON
     try:
-        # 1. Parsear el JSON
         dict_msg = json.loads(json_str)
-        
-        # 2. Validar campos obligatorios
-        if "type" not in dict_msg or "sender_id" not in dict_msg:
-            raise ValueError("Mensaje mal formado: faltan campos obligatorios (type, sender_id)")
-            
-        # 3. Reconstruir el objeto Message
-        # Nota: Convertimos el string del tipo de vuelta al Enum MessageType
-        msg_type = MessageType(dict_msg["type"])
-        sender_id = dict_msg["sender_id"]
-        data = dict_msg.get("data", {}) # Si no trae data, usamos vacío
-        
-        msg_obj = Message(msg_type, sender_id, data)
-        
-        # Restauramos el timestamp original si viene en el mensaje
-        if "timestamp" in dict_msg:
-            msg_obj.timestamp = dict_msg["timestamp"]
-            
-        return msg_obj
-
     except json.JSONDecodeError:
         raise ValueError("Error al decodificar JSON: formato inválido")
-    except ValueError as e:
-        raise ValueError(f"Error de validación: {str(e)}")
\ No newline at end of file
+
+    # 2. Validar campos obligatorios
+    if not isinstance(dict_msg, dict) or "type" not in dict_msg or "sender_id" not in dict_msg:
+        raise ValueError("Mensaje mal formado: faltan campos obligatorios (type, sender_id)")
+
+    # 3. Envolver el dict (sin copiarlo) y validar con el schema del tipo
+    msg_obj = Message.from_dict(dict_msg, strict=True)
+    if msg_obj.data is None:
+        msg_obj.data = {}  # Si no trae data, usamos vacío
+    if msg_obj.timestamp is None:
+        msg_obj.timestamp = time.time()
+    return msg_obj
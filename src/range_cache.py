@@ -0,0 +1,117 @@
+"""
+Cache de nodos responsables por rango del anillo.
+
+Cada lookup que termina en el nodo X con la clave en (X, successor(X)] también
+dice quién es responsable de todo ese rango, no solo de la clave buscada.
+RangeCache guarda esos intervalos (start, end] -> nodo, así una sola entrada
+cubre todas las claves de un nodo y las operaciones siguientes sobre el rango no
+necesitan lookup:
+- Los intervalos no se solapan: al guardar uno nuevo se descartan los que lo
+  pisan (el anillo cambió y la información vieja ya no vale).
+- Buscar una clave es un bisect sobre los extremos ordenados.
+- Hay a lo sumo max_entries intervalos; se descartan los menos usados (LRU).
+- invalidate() vacía el cache y avanza epoch (p. ej. cuando cambia el successor
+  o el predecessor del nodo que lo usa).
+"""
+import bisect
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from src.ring import NodeRef, between
+
+
+class RangeCache:
+    """Intervalos (start, end] del anillo -> NodeRef responsable, con LRU."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.epoch = 0
+        self._ends: List[int] = []    # extremos end ordenados (para el bisect)
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()  # end -> (start, NodeRef), orden LRU
+        self._lock = threading.Lock()
+
+        # contadores para diagnóstico
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def get(self, key: int) -> Optional[NodeRef]:
+        """El nodo responsable de key si algún intervalo guardado lo cubre, si no None."""
+        with self._lock:
+            end = self._covering(key)
+            if end is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(end)
+            self.hits += 1
+            return self._entries[end][1]
+
+    def put(self, start: int, ref: NodeRef):
+        """Guarda que ref es responsable de (start, ref.id_int], descartando los intervalos que se solapan."""
+        end = ref.id_int
+        if end is None:
+            return
+        with self._lock:
+            for old in self._overlapping(start, end):
+                self._drop(old)
+            self._entries[end] = (start, ref)
+            bisect.insort(self._ends, end)
+            while len(self._entries) > self.max_entries:
+                old, _ = self._entries.popitem(last=False)
+                del self._ends[bisect.bisect_left(self._ends, old)]
+                self.evicted += 1
+
+    def discard(self, node_id: str) -> bool:
+        """Quita el intervalo de un nodo (p. ej. uno que dejó de responder). Retorna si estaba."""
+        end = int(node_id, 16)
+        with self._lock:
+            if end not in self._entries:
+                return False
+            self._drop(end)
+            return True
+
+    def discard_key(self, key: int) -> bool:
+        """Quita el intervalo que cubre key (su nodo informó que ya no es responsable)."""
+        with self._lock:
+            end = self._covering(key)
+            if end is None:
+                return False
+            self._drop(end)
+            return True
+
+    def invalidate(self):
+        """Vacía el cache y avanza la época."""
+        with self._lock:
+            self._ends = []
+            self._entries.clear()
+            self.epoch += 1
+
+    def _covering(self, key: int) -> Optional[int]:
+        """(con el lock tomado) extremo del intervalo que cubre key: el primer end desde key en sentido horario."""
+        ends = self._ends
+        if not ends:
+            return None
+        i = bisect.bisect_left(ends, key)
+        end = ends[i if i < len(ends) else 0]
+        start = self._entries[end][0]
+        # start == end: un solo nodo en el anillo, responsable de todo
+        return end if start == end or between(key, start, end) else None
+
+    def _overlapping(self, start: int, end: int) -> List[int]:
+        """(con el lock tomado) extremos de los intervalos que se solapan con (start, end]."""
+        if start == end:
+            return list(self._ends)  # el nuevo intervalo cubre todo el anillo
+        return [old for old, (old_start, _ref) in self._entries.items()
+                if old_start == old or between(old, start, end) or between(end, old_start, old)]
+
+    def _drop(self, end: int):
+        del self._entries[end]
+        del self._ends[bisect.bisect_left(self._ends, end)]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "epoch": self.epoch, "hits": self.hits, "misses": self.misses,
+                "evicted": self.evicted}
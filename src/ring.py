@@ -0,0 +1,199 @@
+"""
+Aritmética del anillo de identificadores de Chord (SHA-1, m = 160 bits).
+
+Los IDs viajan por la red como strings hex de 40 caracteres, pero comparar
+posiciones en el anillo con int(x, 16) en cada decisión de ruteo re-parsea el
+mismo string una y otra vez. Aquí los IDs se convierten a int una sola vez:
+- NodeRef es la tupla (ip, port, node_id) que ya usa ChordNode, con el ID como
+  int precalculado en .id_int; sigue comparándose y desempaquetándose como tupla.
+- between / between_many trabajan sobre ints; la conversión a hex (to_hex) queda
+  para el borde con la red.
+- Los intervalos se evalúan con la distancia en sentido horario desde start, así
+  el caso que da la vuelta por 0 no necesita una rama aparte.
+"""
+import bisect
+import threading
+from typing import Iterable, List, Optional, Sequence
+
+M = 160                # bits de SHA-1
+RING_SIZE = 1 << M
+_MASK = RING_SIZE - 1  # (x - y) & _MASK == (x - y) % RING_SIZE
+
+
+def to_int(node_id: str) -> int:
+    """ID hex (40 caracteres) -> posición en el anillo."""
+    return int(node_id, 16)
+
+
+def to_hex(value: int) -> str:
+    """Posición en el anillo -> ID hex de 40 caracteres (el formato del cable)."""
+    return format(value, "040x")
+
+
+def distance(start: int, end: int) -> int:
+    """Distancia en sentido horario de start a end."""
+    return (end - start) & _MASK
+
+
+def between(key: int, start: int, end: int, inclusive: bool = True) -> bool:
+    """
+    key en (start, end] (o (start, end) sin inclusive) recorriendo el anillo en
+    sentido horario. Con start == end el intervalo solo contiene a start si es inclusivo
+    (mismo criterio que ChordNode._is_between).
+    """
+    d_end = (end - start) & _MASK
+    if not d_end:
+        return inclusive and key == start
+    d_key = (key - start) & _MASK
+    if inclusive:
+        return 0 < d_key <= d_end
+    return 0 < d_key < d_end
+
+
+def between_many(keys: Iterable[int], start: int, end: int, inclusive: bool = True) -> List[bool]:
+    """between para muchas claves contra el mismo intervalo (la distancia a end se calcula una vez)."""
+    d_end = (end - start) & _MASK
+    if not d_end:
+        return [inclusive and key == start for key in keys]
+    if inclusive:
+        return [0 < ((key - start) & _MASK) <= d_end for key in keys]
+    return [0 < ((key - start) & _MASK) < d_end for key in keys]
+
+
+def finger_starts(node: int, count: int = M) -> List[int]:
+    """Inicio de cada finger: node + 2^(i-1) para i = 1..count."""
+    return [(node + (1 << i)) & _MASK for i in range(count)]
+
+
+class NodeRef(tuple):
+    """
+    Referencia a un nodo: tupla (ip, port, node_id) con el ID también como int.
+    Es igual a la tupla plana equivalente, así que el resto del código (y el cable,
+    que usa los campos por separado) no cambia.
+    """
+
+    def __new__(cls, ip: str, port: int, node_id: str, id_int: Optional[int] = None):
+        ref = tuple.__new__(cls, (ip, port, node_id))
+        if id_int is None and node_id:
+            try:
+                id_int = int(node_id, 16)
+            except (TypeError, ValueError):
+                id_int = None
+        ref.id_int = id_int
+        return ref
+
+    @classmethod
+    def of(cls, value) -> Optional["NodeRef"]:
+        """Convierte una tupla (ip, port, node_id) en NodeRef (None y NodeRef pasan tal cual)."""
+        if value is None or value.__class__ is cls:
+            return value
+        ip, port, node_id = value
+        return cls(ip, port, node_id)
+
+    @property
+    def ip(self) -> str:
+        return self[0]
+
+    @property
+    def port(self) -> int:
+        return self[1]
+
+    @property
+    def node_id(self) -> str:
+        return self[2]
+
+    def __reduce__(self):
+        # pickle (p. ej. entre procesos de src/sharding.py) como la tupla que es
+        return (NodeRef, (self[0], self[1], self[2], self.id_int))
+
+
+def closest_preceding(nodes: Sequence[NodeRef], start: int, key: int) -> Optional[NodeRef]:
+    """
+    El último nodo de nodes (ordenados por distancia creciente desde start, como la
+    finger table) que cae en (start, key). None si ninguno precede a key.
+    """
+    d_key = (key - start) & _MASK
+    if not d_key:
+        return None
+    for node in reversed(nodes):
+        node_int = node.id_int
+        if node_int is not None and 0 < ((node_int - start) & _MASK) < d_key:
+            return node
+    return None
+
+
+
+class RoutingIndex:
+    """
+    Nodos conocidos por un nodo (fingers, successor, predecessor, vecinos) ordenados
+    por distancia en sentido horario desde él: closest_preceding es un bisect, O(log n),
+    y puede elegir cualquier nodo conocido, no solo los fingers.
+    La lista es de pares (distancia, NodeRef): los lectores no toman lock (un solo
+    list que se reemplaza por posición); los cambios se serializan con _lock.
+    """
+
+    def __init__(self, owner: int):
+        self.owner = owner
+        self._entries: List[tuple] = []   # (distancia, NodeRef) ordenado por distancia
+        self._by_id: dict = {}            # node_id -> NodeRef
+        self._lock = threading.Lock()
+
+    def add(self, ref: Optional[NodeRef]):
+        """Agrega o actualiza un nodo (el propio dueño y los IDs inválidos se ignoran)."""
+        if ref is None or ref.id_int is None:
+            return
+        d = (ref.id_int - self.owner) & _MASK
+        if not d:
+            return
+        with self._lock:
+            old = self._by_id.get(ref[2])
+            if old is not None:
+                if old == ref:
+                    return
+                self._entries[bisect.bisect_left(self._entries, (d,))] = (d, ref)
+            else:
+                bisect.insort(self._entries, (d, ref), key=_entry_distance)
+            self._by_id[ref[2]] = ref
+
+    def remove(self, node_id: str) -> bool:
+        """Quita un nodo (p. ej. uno que dejó de responder). Retorna si estaba."""
+        with self._lock:
+            ref = self._by_id.pop(node_id, None)
+            if ref is None:
+                return False
+            del self._entries[bisect.bisect_left(self._entries, ((ref.id_int - self.owner) & _MASK,))]
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries = []
+            self._by_id = {}
+
+    def closest_preceding(self, key: int) -> Optional[NodeRef]:
+        """El nodo conocido más cercano a key que lo precede, en (owner, key). None si no hay."""
+        entries = self._entries
+        i = bisect.bisect_left(entries, ((key - self.owner) & _MASK,)) - 1
+        return entries[i][1] if i >= 0 else None
+
+    def preceding(self, key: int, count: int) -> List[NodeRef]:
+        """Hasta count nodos conocidos en (owner, key), del más cercano a key al más lejano."""
+        entries = self._entries
+        i = bisect.bisect_left(entries, ((key - self.owner) & _MASK,))
+        return [ref for _, ref in reversed(entries[max(0, i - count):i])]
+
+    def get(self, node_id: str) -> Optional[NodeRef]:
+        return self._by_id.get(node_id)
+
+    def nodes(self) -> List[NodeRef]:
+        """Los nodos conocidos, del más cercano al más lejano."""
+        return [ref for _, ref in self._entries]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, node_id: str) -> bool:
+        return node_id in self._by_id
+
+
+def _entry_distance(entry: tuple) -> int:
+    return entry[0]
@@ -0,0 +1,376 @@
+"""
+Sharding de un nodo en varios procesos con SO_REUSEPORT.
+
+Un solo proceso por nodo queda limitado por el GIL al parsear JSON y ejecutar
+handlers. ShardSupervisor hace fork de N procesos (shards) que escuchan el mismo
+puerto público con SO_REUSEPORT; el kernel reparte las conexiones entrantes.
+
+- El estado de routing de Chord (successor, predecessor, finger table) pertenece
+  al shard 0 (OWNER_SHARD), que lo publica en memoria compartida (RoutingSnapshot).
+  Los demás shards solo lo leen.
+- Los mensajes de control (CHORD_*, heartbeats) siempre los atiende el shard 0.
+- El storage se particiona por hash de la clave: shard_for_key(key, N) decide qué
+  shard guarda cada clave, así que GET/PUT escalan con los cores.
+- Cada shard escucha además un puerto interno (internal_base_port + índice) en
+  127.0.0.1. Un mensaje que llega al shard equivocado se reenvía por ese puerto
+  (ShardRouter) y la respuesta vuelve por la conexión original.
+
+Requiere fork y SO_REUSEPORT (Linux, BSD, macOS).
+"""
+import hashlib
+import json
+import logging
+import multiprocessing
+import socket
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.networking import TCPServer
+from src.ring import NodeRef, between, to_int
+from src.workers import LANE_CONTROL, classify_message
+
+# Shard dueño del estado de Chord
+OWNER_SHARD = 0
+# Marca de los mensajes reenviados entre shards (valor: shard de origen)
+SHARD_FIELD = "shard_from"
+# Mensajes de storage que se particionan por clave
+STORAGE_TYPES = frozenset({"PUT", "GET", "REPLICATE", "LOOKUP", "RESULT"})
+# Tamaño por defecto del bloque de memoria compartida del snapshot
+SNAPSHOT_SIZE = 256 * 1024
+
+# cabecera del snapshot: versión (u64, impar mientras se escribe) + largo del JSON (u32)
+_HEADER = struct.Struct("<QI")
+
+Peer = Tuple[str, int]
+
+
+def shard_for_key(key: str, num_shards: int) -> int:
+    """Shard dueño de una clave (mismo SHA-1 que DistributedStorage.hash_key)."""
+    return int(hashlib.sha1(key.encode()).hexdigest(), 16) % num_shards
+
+
+def routing_state(chord) -> Dict[str, Any]:
+    """
+    Lo que se publica de un ChordNode: id, successor, lista de successors, predecessor, finger table
+    y los vecinos que su detector de fallas sospecha caídos.
+    """
+    return {
+        "node_id": chord.node_id,
+        "successor": list(chord.successor) if chord.successor else None,
+        "successor_list": [list(s) for s in chord.successor_list],
+        "predecessor": list(chord.predecessor) if chord.predecessor else None,
+        "finger_table": [list(f) for f in chord.finger_table],
+        "suspected": chord.failure_detector.suspected(),
+    }
+
+
+class RoutingSnapshot:
+    """
+    Estado de routing en un bloque de shared_memory: un escritor, muchos lectores.
+    Usa un seqlock: el escritor deja la versión impar mientras escribe y los
+    lectores reintentan si la ven impar o si cambió durante la lectura.
+    """
+
+    def __init__(self, name: Optional[str] = None, size: int = SNAPSHOT_SIZE):
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+            _HEADER.pack_into(self._shm.buf, 0, 0, 0)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self.name = self._shm.name
+        self._cached_version = 0
+        self._cached: Optional[Dict[str, Any]] = None
+
+    def publish(self, state: Dict[str, Any]):
+        data = json.dumps(state).encode("utf-8")
+        buf = self._shm.buf
+        if _HEADER.size + len(data) > len(buf):
+            raise ValueError(f"Snapshot de {len(data)} bytes no cabe en {len(buf)} bytes")
+        version, _ = _HEADER.unpack_from(buf, 0)
+        _HEADER.pack_into(buf, 0, version + 1, 0)
+        buf[_HEADER.size:_HEADER.size + len(data)] = data
+        _HEADER.pack_into(buf, 0, version + 2, len(data))
+
+    def read(self) -> Optional[Dict[str, Any]]:
+        """Último estado publicado (None si todavía no hay ninguno)."""
+        buf = self._shm.buf
+        while True:
+            version, length = _HEADER.unpack_from(buf, 0)
+            if version == self._cached_version:
+                return self._cached
+            if version % 2:
+                time.sleep(0)
+                continue
+            data = bytes(buf[_HEADER.size:_HEADER.size + length])
+            if _HEADER.unpack_from(buf, 0)[0] != version:
+                continue
+            self._cached_version = version
+            self._cached = json.loads(data) if length else None
+            return self._cached
+
+    def close(self):
+        self._shm.close()
+
+    def unlink(self):
+        self._shm.unlink()
+
+
+class ShardRouter:
+    """
+    Decide qué shard atiende cada mensaje. Los mensajes de otro shard se reenvían
+    por su puerto interno con forward(ip, port, msg) -> respuesta.
+    """
+
+    def __init__(self, index: int, num_shards: int, internal_ports: List[int],
+                 forward: Callable[[str, int, Dict[str, Any]], Optional[Dict[str, Any]]],
+                 local_handler: Optional[Callable] = None):
+        self.index = index
+        self.num_shards = num_shards
+        self.internal_ports = internal_ports
+        self.forward = forward
+        self.local_handler = local_handler
+        self.forwarded = 0
+
+    def target(self, msg: Dict[str, Any]) -> int:
+        if classify_message(msg) == LANE_CONTROL:
+            return OWNER_SHARD
+        if msg.get("type") in STORAGE_TYPES:
+            data = msg.get("data")
+            key = data.get("key") if isinstance(data, dict) else None
+            if isinstance(key, str):
+                return shard_for_key(key, self.num_shards)
+        return self.index
+
+    def handle(self, msg: Dict[str, Any], addr: tuple) -> Optional[Dict[str, Any]]:
+        if msg.pop(SHARD_FIELD, None) is not None:
+            # ya fue reenviado: atender aquí sin volver a rutear
+            return self.local_handler(msg, addr)
+        target = self.target(msg)
+        if target == self.index:
+            return self.local_handler(msg, addr)
+        self.forwarded += 1
+        return self.forward("127.0.0.1", self.internal_ports[target], {**msg, SHARD_FIELD: self.index})
+
+
+class ShardContext:
+    """Lo que recibe el handler_factory dentro de cada shard."""
+
+    def __init__(self, index: int, num_shards: int, host: str, port: int,
+                 internal_ports: List[int], snapshot: RoutingSnapshot):
+        self.index = index
+        self.num_shards = num_shards
+        self.host = host
+        self.port = port
+        self.internal_ports = internal_ports
+        self.snapshot = snapshot
+        self.server: Optional[TCPServer] = None           # listener público (SO_REUSEPORT)
+        self.internal_server: Optional[TCPServer] = None  # 127.0.0.1:internal_ports[index]
+        self.router: Optional[ShardRouter] = None
+        self.running = True
+
+    @property
+    def is_owner(self) -> bool:
+        return self.index == OWNER_SHARD
+
+    def owns_key(self, key: str) -> bool:
+        return shard_for_key(key, self.num_shards) == self.index
+
+    def publish_from(self, chord, interval: float = 0.5) -> threading.Thread:
+        """Publica routing_state(chord) en el snapshot cada interval segundos (solo el dueño)."""
+        def _loop():
+            while self.running:
+                try:
+                    self.snapshot.publish(routing_state(chord))
+                except Exception as e:
+                    logging.error(f"Error publicando snapshot de routing: {e}")
+                time.sleep(interval)
+        thread = threading.Thread(target=_loop, name="routing-publisher", daemon=True)
+        thread.start()
+        return thread
+
+
+class RoutingView:
+    """
+    Vista de solo lectura del ChordNode del shard 0, para los demás shards.
+    Implementa lo que usa DistributedStorage (node_id, successor, successor_list,
+    get_responsible_node, owns_key, is_suspected, mi_ip/mi_puerto). Si la clave no cae entre el nodo y su
+    successor, la búsqueda se delega al shard 0 por su puerto interno.
+    """
+
+    def __init__(self, ctx: ShardContext, ip: str, port: int):
+        self.ctx = ctx
+        self.ip = self.mi_ip = ip
+        self.port = self.mi_puerto = port
+        self.node_id = hashlib.sha1(f"{ip}:{port}".encode()).hexdigest()
+        self.node_int = to_int(self.node_id)
+
+    def _state(self) -> Dict[str, Any]:
+        return self.ctx.snapshot.read() or {}
+
+    @property
+    def successor(self) -> Optional[Tuple[str, int, str]]:
+        succ = self._state().get("successor")
+        return NodeRef(*succ) if succ else None
+
+    @property
+    def successor_list(self) -> List[NodeRef]:
+        return [NodeRef(*s) for s in self._state().get("successor_list", [])]
+
+    @property
+    def predecessor(self) -> Optional[Tuple[str, int, str]]:
+        pred = self._state().get("predecessor")
+        return tuple(pred) if pred else None
+
+    @property
+    def finger_table(self) -> List[Tuple[str, int, str]]:
+        return [tuple(f) for f in self._state().get("finger_table", [])]
+
+    def get_responsible_node(self, key: str) -> Optional[Tuple[str, int, str]]:
+        key_id = hashlib.sha1(key.encode()).hexdigest()
+        succ = self.successor
+        if succ and between(to_int(key_id), self.node_int, succ.id_int):
+            return succ
+        response = self.ctx.server.request_response(
+            "127.0.0.1", self.ctx.internal_ports[OWNER_SHARD],
+            {"type": "CHORD_FIND_SUCCESSOR", "key_id": key_id, SHARD_FIELD: self.ctx.index},
+        )
+        if response and response.get("successor_id"):
+            return response["successor_ip"], response["successor_port"], response["successor_id"]
+        return succ
+
+    def owns_key(self, key_hash: str) -> bool:
+        pred = self.predecessor
+        if not pred or pred[2] == self.node_id:
+            return True
+        return between(to_int(key_hash), to_int(pred[2]), self.node_int)
+
+    def is_suspected(self, node_id: str) -> bool:
+        return node_id in self._state().get("suspected", ())
+
+    def invalidate_responsible_node(self, key: str):
+        """Sin cache de responsables en esta vista: cada búsqueda pregunta al shard 0."""
+
+
+class ShardSupervisor:
+    """
+    Lanza num_shards procesos con fork. En cada uno se crean los TCPServer público
+    e interno y se llama handler_factory(ctx) para obtener el handler local del shard.
+    server_kwargs se pasa a los TCPServer (workers, framing, ...).
+    """
+
+    def __init__(self, host: str, port: int, num_shards: int,
+                 handler_factory: Callable[[ShardContext], Callable],
+                 internal_base_port: Optional[int] = None,
+                 server_kwargs: Optional[Dict[str, Any]] = None):
+        if num_shards < 1:
+            raise ValueError("num_shards debe ser >= 1")
+        if not hasattr(socket, "SO_REUSEPORT"):
+            raise RuntimeError("SO_REUSEPORT no está disponible en esta plataforma")
+        server_kwargs = dict(server_kwargs or {})
+        if server_kwargs.get("udp"):
+            # el canal UDP no se puede compartir entre procesos
+            raise ValueError("udp no está soportado con sharding")
+        self.host = host
+        self.port = port
+        self.num_shards = num_shards
+        self.handler_factory = handler_factory
+        base = internal_base_port if internal_base_port is not None else port + 1000
+        self.internal_ports = [base + i for i in range(num_shards)]
+        self.server_kwargs = server_kwargs
+        self.snapshot: Optional[RoutingSnapshot] = None
+        self._ctx = multiprocessing.get_context("fork")
+        self._stop = self._ctx.Event()
+        self._processes = []
+
+    def start(self, ready_timeout: float = 10.0):
+        """Lanza los shards y espera a que todos estén escuchando."""
+        self.snapshot = RoutingSnapshot()
+        ready = self._ctx.Barrier(self.num_shards + 1)
+        for index in range(self.num_shards):
+            process = self._ctx.Process(
+                target=self._shard_main, args=(index, ready),
+                name=f"shard-{index}", daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+        ready.wait(timeout=ready_timeout)
+        logging.info(f"{self.num_shards} shards escuchando en {self.host}:{self.port}")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        for process in self._processes:
+            process.join(timeout=timeout)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        if self.snapshot is not None:
+            self.snapshot.close()
+            self.snapshot.unlink()
+            self.snapshot = None
+
+    def alive(self) -> int:
+        return sum(1 for p in self._processes if p.is_alive())
+
+    # ---------------- dentro de cada shard ----------------
+
+    def _shard_main(self, index: int, ready):
+        # el fork hereda el mapeo de la memoria compartida: no hace falta reabrirla
+        snapshot = self.snapshot
+        ctx = ShardContext(index, self.num_shards, self.host, self.port, self.internal_ports, snapshot)
+        ctx.server = TCPServer(self.host, self.port, lambda m, a: ctx.router.handle(m, a),
+                               reuse_port=True, **self.server_kwargs)
+        ctx.internal_server = TCPServer("127.0.0.1", self.internal_ports[index],
+                                        lambda m, a: ctx.router.handle(m, a), **self.server_kwargs)
+        ctx.router = ShardRouter(index, self.num_shards, self.internal_ports, ctx.server.request_response)
+        ctx.router.local_handler = self.handler_factory(ctx)
+        ctx.internal_server.start()
+        ctx.server.start()
+        ready.wait()
+        try:
+            self._stop.wait()
+        finally:
+            ctx.running = False
+            ctx.server.stop()
+            ctx.internal_server.stop()
+
+
+def chord_storage_factory(bootstrap: Optional[Peer] = None) -> Callable[[ShardContext], Callable]:
+    """
+    handler_factory que arma el nodo Chord + storage de main.py repartido en shards:
+    el shard 0 crea el ChordNode (y se une al anillo si hay bootstrap) y publica su
+    estado; todos los shards crean un DistributedStorage con su partición de claves.
+    """
+    from src.overlay import ChordNode
+    from src.storage import DistributedStorage
+
+    def factory(ctx: ShardContext):
+        chord = None
+        if ctx.is_owner:
+            chord = ChordNode(ctx.host, ctx.port)
+            chord.mi_ip, chord.mi_puerto = ctx.host, ctx.port
+            chord.set_send_callback(ctx.server.send_message)
+            chord.set_request_callback(ctx.server.request_response)
+            chord.set_request_async_callback(ctx.server.request_async)
+            if bootstrap:
+                chord.join_network(bootstrap)
+            ctx.publish_from(chord)
+            routing = chord
+        else:
+            routing = RoutingView(ctx, ctx.host, ctx.port)
+        storage = DistributedStorage(routing.node_id, ctx.server.send_message, routing)
+        storage.set_request_async_callback(ctx.server.request_async)
+
+        def handler(msg: Dict[str, Any], addr: tuple) -> Optional[Dict[str, Any]]:
+            msg_type = msg.get("type", "")
+            if chord is not None and classify_message(msg) == LANE_CONTROL:
+                return chord.handle_message(msg)
+            if msg_type in STORAGE_TYPES:
+                return storage.handle_storage_message(msg)
+            return None
+
+        return handler
+
+    return factory
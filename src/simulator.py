@@ -0,0 +1,271 @@
+"""
+Simulador de eventos discretos para estudios de escala del anillo y del storage.
+
+Usa el mismo código de ChordNode / DistributedStorage que un nodo real, sobre el
+transporte en memoria de src/loopback.py, pero con un reloj virtual:
+- Una cola de eventos ordenada por tiempo virtual. Cada nodo tiene timers para
+  stabilize_once, fix_fingers_once y check_predecessor_once con los períodos de
+  ChordNode y una fase aleatoria.
+- send_message se entrega como un evento a now + latencia.
+- request_response corre el handler destino en línea (el código de overlay es
+  síncrono) y suma la ida y vuelta al tiempo de la operación en curso; un
+  request perdido o a un nodo caído suma el timeout. Así un lookup recursivo
+  de h hops cuesta ~2h latencias, sin esperar tiempo real.
+- Toda la aleatoriedad (latencias, pérdidas, fases, carga, churn) sale de seed:
+  dos corridas con la misma seed dan el mismo reporte.
+
+Simplificaciones: un nodo no se bloquea mientras corre una operación (sus
+timers siguen), y los request_async en paralelo se cuentan en serie.
+
+report() entrega latencias de lookup y de GET (virtuales), hops, mensajes por
+nodo y el tiempo de convergencia después de cada evento de churn.
+"""
+import bisect
+import hashlib
+import heapq
+import itertools
+import math
+import random
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.loopback import LoopbackNetwork, LoopbackRing
+from src.metrics import MetricsRegistry
+from src.overlay import ChordNode
+from src.ring import to_int
+
+
+def _percentile(samples: List[float], p: float) -> float:
+    """Percentil nearest-rank (0 si no hay muestras)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[max(1, math.ceil(p / 100.0 * len(ordered))) - 1]
+
+
+def _distribution(samples: List[float], scale: float = 1.0, digits: int = 3) -> Dict[str, float]:
+    return {
+        "count": len(samples),
+        "mean": round(sum(samples) / len(samples) * scale, digits) if samples else 0.0,
+        "p50": round(_percentile(samples, 50) * scale, digits),
+        "p99": round(_percentile(samples, 99) * scale, digits),
+        "p999": round(_percentile(samples, 99.9) * scale, digits),
+        "max": round(max(samples) * scale, digits) if samples else 0.0,
+    }
+
+
+class SimNetwork(LoopbackNetwork):
+    """LoopbackNetwork cuyo paso del tiempo es el reloj virtual del Simulator."""
+
+    def __init__(self, sim: "Simulator", latency: float, jitter: float, loss: float, seed: int):
+        super().__init__(latency=latency, jitter=jitter, loss=loss, seed=seed)
+        self.sim = sim
+
+    def _wait(self, delay: float):
+        self.sim.op_time += delay
+
+    def _wait_timeout(self, timeout: float):
+        self.sim.op_time += timeout
+
+    def _concurrent_async(self) -> bool:
+        return False
+
+    def _schedule(self, delay: float, fn: Callable[[], None]):
+        self.sim.schedule(self.sim.op_time + delay, fn)
+
+
+class Simulator:
+    """
+    Anillo simulado. Uso típico:
+        sim = Simulator(seed=1)
+        sim.bootstrap(10000)
+        sim.add_lookups(1000, start=1, duration=10)
+        sim.add_churn(joins=20, failures=0, at=5)
+        sim.run(until=60)
+        sim.report()
+    """
+
+    def __init__(self, seed: int = 0, latency: float = 0.02, jitter: float = 0.01, loss: float = 0.0,
+                 storage: bool = True, request_timeout: float = 5.0, check_interval: float = 0.5):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.now = 0.0
+        self.op_time = 0.0  # tiempo virtual consumido por el evento en curso
+        self.request_timeout = request_timeout
+        self.check_interval = check_interval
+        self._events: List[Tuple[float, int, Callable[[], None]]] = []
+        self._seq = itertools.count()
+        self.events_run = 0
+
+        self.network = SimNetwork(self, latency, jitter, loss, seed)
+        # los detectores de fallas de los nodos ven el tiempo virtual del evento en curso
+        self.ring = LoopbackRing(self.network, storage=storage, metrics=MetricsRegistry(), clock=lambda: self.now)
+        self._sorted_ids: Optional[List[int]] = None
+        self._sorted_nodes: List[ChordNode] = []
+
+        # resultados
+        self.lookup_latency: List[float] = []
+        self.lookup_hops: List[int] = []
+        self.lookup_correct = 0
+        self.get_latency: List[float] = []
+        self.get_found = 0
+        self.convergence: List[Dict[str, Any]] = []
+        self._watching: Optional[Dict[str, Any]] = None
+
+    # ---------------- reloj y eventos ----------------
+
+    def schedule(self, delay: float, fn: Callable[[], None]):
+        """Agenda fn a now + delay (tiempo virtual)."""
+        heapq.heappush(self._events, (self.now + max(0.0, delay), next(self._seq), fn))
+
+    def run(self, until: float):
+        """Procesa eventos hasta el tiempo virtual until."""
+        while self._events and self._events[0][0] <= until:
+            when, _seq, fn = heapq.heappop(self._events)
+            self.now = when
+            self.op_time = 0.0
+            fn()
+            self.events_run += 1
+        self.now = max(self.now, until)
+
+    def _measure(self, fn: Callable[[], Any]) -> Tuple[Any, float]:
+        """Corre fn como parte del evento actual y retorna (resultado, tiempo virtual que consumió)."""
+        before = self.op_time
+        result = fn()
+        return result, self.op_time - before
+
+    # ---------------- anillo ----------------
+
+    def bootstrap(self, n: int):
+        """
+        Arma un anillo ya convergido de n nodos (successor/predecessor correctos y
+        finger tables calculadas por el protocolo) y arranca sus timers.
+        """
+        nodes = [self.ring.add_node(join=False) for _ in range(n)]
+        ordered = sorted(nodes, key=lambda node: node.node_int)
+        for i, node in enumerate(ordered):
+            succ, pred = ordered[(i + 1) % n], ordered[i - 1]
+            node.successor = (succ.ip, succ.port, succ.node_id)
+            node.predecessor = (pred.ip, pred.port, pred.node_id) if n > 1 else None
+        self._sorted_ids = None
+        for node in nodes:
+            node.fix_fingers_once(full=True)
+            self._start_timers(node)
+
+    def add_churn(self, joins: int = 0, failures: int = 0, at: float = 0.0):
+        """Agenda un evento de churn y mide cuánto tarda el anillo en volver a converger."""
+        self.schedule(at - self.now, lambda: self._churn(joins, failures))
+
+    def _churn(self, joins: int, failures: int):
+        live = self.ring.live_nodes()
+        for node in self.rng.sample(live, min(failures, max(0, len(live) - 1))):
+            self.ring.fail_node(node)
+        for _ in range(joins):
+            via = self.rng.choice(self.ring.live_nodes())
+            node = self.ring.add_node(via=via)
+            self._start_timers(node)
+        self._sorted_ids = None
+        self._watching = {"at": self.now, "joins": joins, "failures": failures, "time_to_converge": None}
+        self.convergence.append(self._watching)
+        self.schedule(self.check_interval, self._check_converged)
+
+    def _check_converged(self):
+        watching = self._watching
+        if watching is None or watching["time_to_converge"] is not None:
+            return
+        if self.ring.is_converged():
+            watching["time_to_converge"] = round(self.now - watching["at"], 3)
+            return
+        self.schedule(self.check_interval, self._check_converged)
+
+    def _start_timers(self, node: ChordNode):
+        for interval, step in ((ChordNode.STABILIZE_INTERVAL, node.stabilize_once),
+                               (ChordNode.FIX_FINGERS_INTERVAL, node.fix_fingers_once),
+                               (ChordNode.CHECK_PREDECESSOR_INTERVAL, node.check_predecessor_once)):
+            self.schedule(self.rng.uniform(0, interval), self._timer(node, interval, step))
+
+    def _timer(self, node: ChordNode, interval: float, step: Callable[[], Any]) -> Callable[[], None]:
+        def fire():
+            if not node.running:
+                return
+            step()
+            self.schedule(interval, fire)
+        return fire
+
+    def responsible_for(self, key_id: str) -> ChordNode:
+        """Responsable real de key_id según el anillo ordenado de nodos vivos."""
+        if self._sorted_ids is None:
+            self._sorted_nodes = sorted(self.ring.live_nodes(), key=lambda n: n.node_int)
+            self._sorted_ids = [n.node_int for n in self._sorted_nodes]
+        i = bisect.bisect_left(self._sorted_ids, to_int(key_id))
+        return self._sorted_nodes[i % len(self._sorted_nodes)]
+
+    # ---------------- carga ----------------
+
+    def add_lookups(self, count: int, start: float = 0.0, duration: float = 10.0):
+        """Agenda count lookups (find_successor desde un nodo vivo al azar) repartidos en la ventana."""
+        for i in range(count):
+            key_id = hashlib.sha1(f"lookup-{self.seed}-{i}".encode()).hexdigest()
+            self.schedule(start - self.now + self.rng.uniform(0, duration), lambda k=key_id: self._lookup(k))
+
+    def _lookup(self, key_id: str):
+        origin = self.rng.choice(self.ring.live_nodes())
+        (succ, hops), elapsed = self._measure(lambda: origin._find_successor_hops(key_id))
+        if succ is None:
+            return
+        origin._lookup_hops.observe(hops)
+        self.lookup_latency.append(elapsed)
+        self.lookup_hops.append(hops)
+        if succ[2] == self.responsible_for(key_id).node_id:
+            self.lookup_correct += 1
+
+    def add_storage_ops(self, puts: int, gets: int, start: float = 0.0, duration: float = 10.0):
+        """PUTs en la primera mitad de la ventana y GETs de esas claves en la segunda."""
+        keys = [f"clave-{self.seed}-{i}" for i in range(puts)]
+        half = duration / 2
+        for key in keys:
+            self.schedule(start - self.now + self.rng.uniform(0, half), lambda k=key: self._put(k))
+        for _ in range(gets):
+            key = self.rng.choice(keys) if keys else "vacia"
+            self.schedule(start - self.now + half + self.rng.uniform(0, half), lambda k=key: self._get(k))
+
+    def _storage(self):
+        node = self.rng.choice(self.ring.live_nodes())
+        return self.ring.storages[node.node_id]
+
+    def _put(self, key: str):
+        self._storage().put(key, f"valor-{key}")
+
+    def _get(self, key: str):
+        storage = self._storage()
+        future, elapsed = self._measure(lambda: storage.get_async(key, timeout=self.request_timeout))
+        result = future.result() if isinstance(future, Future) and future.done() else None
+        self.get_latency.append(elapsed)
+        if result and result.get("found"):
+            self.get_found += 1
+
+    # ---------------- reporte ----------------
+
+    def report(self) -> Dict[str, Any]:
+        stats = self.network.get_stats()
+        per_node = [e.sent + e.received for e in self.ring.endpoints.values()]
+        return {
+            "seed": self.seed,
+            "nodes": len(self.ring.nodes),
+            "live_nodes": len(self.ring.live_nodes()),
+            "virtual_time_s": round(self.now, 3),
+            "events": self.events_run,
+            "lookup_latency_ms": _distribution(self.lookup_latency, scale=1000),
+            "lookup_hops": _distribution(self.lookup_hops, digits=2),
+            "lookup_correct": self.lookup_correct,
+            "get_latency_ms": _distribution(self.get_latency, scale=1000),
+            "get_found": self.get_found,
+            "messages": {
+                "total": stats["sent"],
+                "lost": stats["lost"],
+                "unreachable": stats["unreachable"],
+                "by_type": stats["by_type"],
+                "per_node": _distribution(per_node, digits=1),
+            },
+            "convergence": self.convergence,
+        }
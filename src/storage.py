@@ -8,22 +8,71 @@ Módulo 4: Almacenamiento Distribuido y Búsqueda (DHT Chord)
 import hashlib
 import time
 import threading
-from typing import Dict, Optional, Tuple, Any
-from src.protocol import Message, MessageType
+import uuid
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple, Any
+from src.dedup import DedupCache
+from src.metrics import REGISTRY
+from src.protocol import Message, MessageType, batch_message, run_batch
+from src.tracing import get_tracer
+
+# Trazas por escritura/lookup (apagadas por defecto, ver src/tracing.py)
+_trace = get_tracer("storage")
+
+# Tipos que modifican el storage: un duplicado (mismo request_id) no se re-aplica
+IDEMPOTENT_TYPES = frozenset({MessageType.PUT.value, MessageType.REPLICATE.value})
 
 class DistributedStorage:
-    def __init__(self, node_id: str, send_callback, chord=None):
+    def __init__(self, node_id: str, send_callback, chord=None, metrics=None, timeout_checker=True,
+                 dedup_ttl: float = 60.0, dedup_size: int = 10000):
         self.node_id = node_id
         self.send_callback = send_callback
         self.chord = chord  # Para routing
+        self.request_async_callback = None  # (ip, port, msg) -> Future; GETs en paralelo
         self.local_storage: Dict[str, dict] = {}
         self.pending_requests: Dict[str, dict] = {}  # {req_id: {"future": future}}
         self.replication_factor = 2
         self.request_timeout = 5.0
+        # Respuestas de PUT/REPLICATE por request_id: los reintentos no se re-aplican
+        self.dedup = DedupCache(ttl=dedup_ttl, max_entries=dedup_size)
+
+        # Métricas: hits/misses de GET, claves y requests pendientes
+        self.metrics = metrics if metrics is not None else REGISTRY
+        self._hits = self.metrics.counter("storage.get_hits")
+        self._misses = self.metrics.counter("storage.get_misses")
+        self._puts = self.metrics.counter("storage.puts")
+        self._replicates = self.metrics.counter("storage.replicates")
+        # gauges con el ID corto del nodo como etiqueta; stop() los quita
+        self._gauges = {
+            "storage.keys": lambda: len(self.local_storage),
+            "storage.pending_requests": lambda: len(self.pending_requests),
+            "storage.dedup_entries": lambda: len(self.dedup),
+            "storage.dedup_hits": lambda: self.dedup.hits,
+        }
+        for name, fn in self._gauges.items():
+            self.metrics.gauge(name, fn=fn, node=self.node_id[:8])
         
-        # Hilo para timeouts
-        self.timeout_thread = threading.Thread(target=self._timeout_checker, daemon=True)
-        self.timeout_thread.start()
+        # Despacho de handle_storage_message por tipo
+        self._handlers = {
+            MessageType.PUT.value: self._handle_put,
+            MessageType.GET.value: self._handle_get,
+            MessageType.REPLICATE.value: self._handle_replicate,
+            MessageType.LOOKUP.value: self._handle_lookup,
+            MessageType.BATCH.value: self._handle_batch,
+            # respuestas a nuestros GET/PUT que llegan como mensaje aparte (a sender_ip/sender_port)
+            MessageType.RESULT.value: lambda msg, request_id: self._handle_result(msg),
+        }
+
+        # Hilo para timeouts (sin hilo, quien crea el storage llama expire_requests; ver src/loopback.py)
+        self.timeout_thread = None
+        self.running = True
+        if timeout_checker:
+            self.timeout_thread = threading.Thread(target=self._timeout_checker, daemon=True)
+            self.timeout_thread.start()
+
+    # Configura el callback asíncrono (ip, port, msg) -> Future para request/response
+    def set_request_async_callback(self, callback):
+        self.request_async_callback = callback
 
     # Utiliza algoritmo SHA-1 para hashing de claves 
     def hash_key(self, key: str) -> str:
@@ -45,7 +94,7 @@ class DistributedStorage:
             "is_replica": is_replica,
             "replicas": 1 if not is_replica else 0
         }
-        print(f"💾 [{self.node_id[:8]}] Almacenado: {key} (hash={key_hash[:8]}) {'[REPLICA]' if is_replica else '[PRIMARY]'}")
+        _trace.info("stored", node=self.node_id[:8], key=key, replica=is_replica)
         return True
     
     # Dado una clave, obtiene el valor localmente
@@ -53,21 +102,34 @@ class DistributedStorage:
         return self.local_storage.get(key)
     
     # Procesa mensajes de almacenamiento entrantes
+    # (el dict se envuelve en un Message sin copiarlo y se valida con el schema del tipo).
+    # Un PUT/REPLICATE repetido (mismo request_id dentro de la ventana del cache) no se
+    # vuelve a aplicar: recibe la respuesta del original.
     def handle_storage_message(self, msg: dict) -> Optional[dict]:
         msg_type = msg.get("type", "")
-        request_id = msg.get("request_id", f"{msg.get('sender_id', '')}_{int(time.time())}")
-        
-        if msg_type == "PUT":
-            return self._handle_put(msg, request_id)
-        elif msg_type == "GET":
-            return self._handle_get(msg, request_id)
-        elif msg_type == "REPLICATE":
-            return self._handle_replicate(msg, request_id)
-        elif msg_type == "LOOKUP":
-            return self._handle_lookup(msg, request_id)
-        
-        return None
+        handler = self._handlers.get(msg_type)
+        if handler is None:
+            return None
+        request_id = msg.get("request_id")
+        deduplicate = request_id is not None and msg_type in IDEMPOTENT_TYPES
+        if request_id is None:
+            request_id = self.new_request_id(msg_type)
+        try:
+            msg = Message.from_dict(msg, strict=True)
+        except ValueError as e:
+            return self._error_response(request_id, f"Mensaje inválido: {e}")
+        if deduplicate:
+            return self.dedup.run(f"{msg_type}:{request_id}", lambda: handler(msg, request_id))
+        return handler(msg, request_id)
+
+    # request_id único en todo el anillo (nodo + uuid4), no solo dentro del mismo segundo
+    def new_request_id(self, prefix: str) -> str:
+        return f"{prefix}_{self.node_id[:8]}_{uuid.uuid4().hex}"
     
+    # Maneja BATCH: cada PUT/GET/REPLICATE/LOOKUP del lote en una pasada, una sola respuesta
+    def _handle_batch(self, msg, request_id: str) -> dict:
+        return run_batch(msg, self.handle_storage_message)
+
     # Maneja PUT: almacena + replica en R-1 nodos sucesivos
     def _handle_put(self, msg: dict, request_id: str) -> Optional[dict]:
         """Maneja PUT: almacena + replica"""
@@ -77,7 +139,14 @@ class DistributedStorage:
         
         if not key or value is None:
             return self._error_response(request_id, "Key o value inválido")
-        
+
+        # el que envió tiene un responsable viejo cacheado: se reenvía al actual (una sola vez)
+        if self.chord is not None and not data.get("forwarded") and not self.chord.owns_key(self.hash_key(key)):
+            forwarded = self._forward_put(msg, request_id, key, value)
+            if forwarded is not None:
+                return forwarded
+
+        self._puts.inc()
         if self.store_local(key, value, is_replica=False):
             self._replicate_to_successors(key, value, request_id)
             return {
@@ -93,6 +162,32 @@ class DistributedStorage:
             }
         return self._error_response(request_id, "Error al almacenar")
     
+    # PUT que llegó a un nodo que ya no es responsable de la clave: se busca el responsable sin cache,
+    # se le reenvía el PUT (mismo request_id, misma dirección de respuesta) y se contesta owner False
+    # para que el que lo envió olvide su responsable cacheado. None si no hay a quién reenviarlo.
+    def _forward_put(self, msg, request_id: str, key: str, value: Any) -> Optional[dict]:
+        self.chord.invalidate_responsible_node(key)
+        responsible = self.chord.get_responsible_node(key)
+        if not responsible or responsible[2] == self.node_id or not self.send_callback:
+            return None
+        forward = {
+            "type": "PUT",
+            "request_id": request_id,
+            "sender_id": msg.get("sender_id", self.node_id[:8]),
+            "data": {"key": key, "value": value, "forwarded": True},
+        }
+        for field in ("sender_ip", "sender_port"):
+            if msg.get(field) is not None:
+                forward[field] = msg.get(field)
+        self.send_callback(responsible[0], responsible[1], forward)
+        _trace.info("put_forward", key=key, node=responsible[2][:8])
+        return {
+            "type": "RESULT",
+            "request_id": request_id,
+            "sender_id": self.node_id[:8],
+            "data": {"status": "forwarded", "key": key, "node": responsible[2][:8], "owner": False}
+        }
+
     # Maneja GET: devuelve valor si existe localmente
     def _handle_get(self, msg: dict, request_id: str) -> Optional[dict]:
         data = msg.get("data", {})
@@ -100,6 +195,7 @@ class DistributedStorage:
         
         result = self.get_local(key)
         if result:
+            self._hits.inc()
             return {
                 "type": "RESULT",
                 "request_id": request_id,
@@ -112,11 +208,15 @@ class DistributedStorage:
                     "timestamp": result["timestamp"]
                 }
             }
+        self._misses.inc()
+        data = {"key": key, "found": False, "node": self.node_id[:8]}
+        if self.chord is not None and not self.chord.owns_key(self.hash_key(key)):
+            data["owner"] = False  # el que preguntó tiene un responsable viejo cacheado
         return {
             "type": "RESULT",
             "request_id": request_id,
             "sender_id": self.node_id[:8],
-            "data": {"key": key, "found": False, "node": self.node_id[:8]}
+            "data": data
         }
     
     # Maneja REPLICATE: almacena como réplica
@@ -125,6 +225,7 @@ class DistributedStorage:
         key = data.get("key")
         value = data.get("value")
         
+        self._replicates.inc()
         if self.store_local(key, value, is_replica=True):
             return {
                 "type": "ACK",
@@ -142,7 +243,7 @@ class DistributedStorage:
         key_hash = self.hash_key(key)
         hops = data.get("hops", 0)
         
-        print(f"🔍 [{self.node_id[:8]}] Lookup {key} (hash={key_hash[:8]}, hops={hops+1})")
+        _trace.debug("lookup", node=self.node_id[:8], key=key, hops=hops + 1)
         
         if key in self.local_storage or self.is_responsible(key_hash):
             result = self.get_local(key)
@@ -163,7 +264,7 @@ class DistributedStorage:
         if hops > 10:
             return self._error_response(request_id, "Lookup timeout")
         
-        print(f"↪️ Forward lookup a successor (hops={hops})")
+        _trace.debug("lookup_forward", key=key, hops=hops)
         return None
     
     # Interfaz pública para PUT distribuido
@@ -171,17 +272,41 @@ class DistributedStorage:
         """PUT distribuido asíncrono"""
         from src.protocol import Message, MessageType
         
-        request_id = f"PUT_{self.node_id[:8]}_{int(time.time())}"
-        msg = Message(MessageType.PUT, self.node_id[:8], {"key": key, "value": value})
+        request_id = self.new_request_id("PUT")
+        msg = Message(MessageType.PUT, self.node_id[:8], {"key": key, "value": value}).to_dict()
+        msg["request_id"] = request_id  # reenviar el mismo msg no re-aplica el PUT
+        if getattr(self.chord, "mi_ip", None):
+            # dirección de respuesta: si el responsable cacheado ya no lo es, avisa con owner False
+            msg["sender_ip"], msg["sender_port"] = self.chord.mi_ip, self.chord.mi_puerto
         
         if self.chord:
             responsible = self.chord.get_responsible_node(key)
             if responsible:
-                self.send_callback(responsible[0], responsible[1], msg.to_dict())
-                print(f"📤 PUT {key} → {responsible[2][:8]}")
+                self.send_callback(responsible[0], responsible[1], msg)
+                _trace.info("put", key=key, node=responsible[2][:8])
         
-        return {"request_id": request_id, "status": "sent"}
+        return {"request_id": request_id, "status": "sent", "message": msg}
     
+    def put_many(self, items: Dict[str, Any]) -> dict:
+        """
+        PUT distribuido de varias claves: agrupa por nodo responsable y envía un solo
+        BATCH por nodo (una conexión/frame por nodo en vez de uno por clave).
+        """
+        request_id = self.new_request_id("PUT")
+        by_node: Dict[Tuple[str, int], List[dict]] = {}
+        if self.chord:
+            for i, (key, value) in enumerate(items.items()):
+                responsible = self.chord.get_responsible_node(key)
+                if responsible:
+                    msg = Message(MessageType.PUT, self.node_id[:8], {"key": key, "value": value}).to_dict()
+                    msg["request_id"] = f"{request_id}/{i}"
+                    by_node.setdefault((responsible[0], responsible[1]), []).append(msg)
+        for (ip, port), messages in by_node.items():
+            self.send_callback(ip, port, batch_message(messages, self.node_id[:8]))
+            _trace.info("put_batch", peer=(ip, port), keys=len(messages))
+
+        return {"request_id": request_id, "status": "sent", "keys": len(items), "batches": len(by_node)}
+
     def get(self, key: str, timeout: float = None) -> Optional[dict]:
         timeout = timeout or self.request_timeout
         
@@ -189,7 +314,7 @@ class DistributedStorage:
         sender_ip = getattr(self.chord, 'mi_ip', '192.168.0.14')  # ← FIX 1
         sender_port = getattr(self.chord, 'mi_puerto', 15000)      # ← FIX 2
         
-        request_id = f"GET_{self.node_id[:8]}_{int(time.time())}"
+        request_id = self.new_request_id("GET")
         msg = {
             "type": "GET",
             "request_id": request_id,
@@ -200,44 +325,136 @@ class DistributedStorage:
         }
         
         # Crear future
-        future = {"result": None, "error": None, "done": threading.Event()}
+        future = {"result": None, "error": None, "done": threading.Event(), "sent_time": time.time()}
         self.pending_requests[request_id] = future
         
         # Enviar si hay chord
         if self.chord:
             responsible = self.chord.get_responsible_node(key)
             if responsible:
-                print(f"🔍 GET {key} → {responsible[2][:8]} ({responsible[0]}:{responsible[1]})")
+                _trace.info("get", key=key, node=responsible[2][:8], peer=(responsible[0], responsible[1]))
                 self.send_callback(responsible[0], responsible[1], msg)  # ← SIN .to_dict()
             else:
                 future["error"] = "no_responsible"
                 future["done"].set()
+
+        return {"request_id": request_id, "status": "searching", "message": msg}
+
+    def get_async(self, key: str, timeout: float = None) -> Future:
+        """
+        GET con request/response multiplexado: retorna un Future que resuelve a los
+        datos del RESULT ({"key", "value", "found", ...}) o None si no hay respuesta.
+        Varios get_async pueden estar en vuelo a la vez sobre la misma conexión.
+        """
+        timeout = timeout or self.request_timeout
+        result: Future = Future()
+        self._send_get_async(key, timeout, result, retry=True)
+        return result
+
+    def _send_get_async(self, key: str, timeout: float, result: Future, retry: bool):
+        """
+        Un intento de get_async. Si el nodo contestado responde que ya no es responsable de
+        la clave (data.owner == False), se olvida el responsable cacheado y se reintenta una vez.
+        """
+        responsible = self.chord.get_responsible_node(key) if self.chord else None
+        if not responsible or not self.request_async_callback:
+            result.set_result(None)
+            return
+
+        msg = {
+            "type": "GET",
+            "request_id": self.new_request_id("GET"),
+            "sender_id": self.node_id[:8],
+            "data": {"key": key}
+        }
+
+        def _done(response_future: Future):
+            if result.done():
+                return
+            try:
+                response = response_future.result()
+                data = response.get("data") if response else None
+                if data and data.get("owner") is False:
+                    self.chord.invalidate_responsible_node(key)
+                    if retry:
+                        self._send_get_async(key, timeout, result, retry=False)
+                        return
+                result.set_result(data)
+            except Exception as e:
+                result.set_exception(e)
+
+        self.request_async_callback(responsible[0], responsible[1], msg, timeout).add_done_callback(_done)
+
+    def get_many(self, keys: List[str], timeout: float = None) -> Dict[str, Optional[dict]]:
+        """Lanza todos los GET en paralelo y espera las respuestas. Clave sin respuesta -> None"""
+        timeout = timeout or self.request_timeout
+        futures = {key: self.get_async(key, timeout) for key in keys}
+        results = {}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result(timeout=timeout)
+            except Exception:
+                results[key] = None
+        return results
     
     def _handle_result(self, msg: dict):
         """Procesa respuestas RESULT entrantes"""
         request_id = msg.get("request_id")
+        data = msg.get("data") or {}
+        if self.chord is not None and data.get("owner") is False and data.get("key"):
+            self.chord.invalidate_responsible_node(data["key"])
         if request_id and request_id in self.pending_requests:
             future = self.pending_requests[request_id]
             future["result"] = msg.get("data")
             future["done"].set()
             del self.pending_requests[request_id]
     
+    def stop(self):
+        """Detiene el hilo de timeouts y quita los gauges del registro"""
+        self.running = False
+        for name in self._gauges:
+            self.metrics.remove(name, node=self.node_id[:8])
+
     def _timeout_checker(self):
         """Limpia requests expirados"""
-        while True:
+        while self.running:
             time.sleep(1)
-            now = time.time()
-            expired = [rid for rid, req in self.pending_requests.items() 
-                      if now - req.get("sent_time", 0) > self.request_timeout]
-            for rid in expired:
-                self.pending_requests[rid]["error"] = "timeout"
-                self.pending_requests[rid]["done"].set()
-                del self.pending_requests[rid]
+            self.expire_requests()
+
+    def expire_requests(self, now: float = None):
+        """Marca como timeout los GET pendientes que superaron request_timeout"""
+        now = now if now is not None else time.time()
+        expired = [rid for rid, req in self.pending_requests.items() 
+                  if now - req.get("sent_time", 0) > self.request_timeout]
+        for rid in expired:
+            self.pending_requests[rid]["error"] = "timeout"
+            self.pending_requests[rid]["done"].set()
+            del self.pending_requests[rid]
     
+    def replica_nodes(self) -> List[Tuple[str, int, str]]:
+        """
+        Los R-1 nodos que guardan réplicas de nuestras claves: los primeros de la lista de successors,
+        salteando los que el detector de fallas del nodo sospecha caídos
+        """
+        if self.chord is None:
+            return []
+        return [node for node in self.chord.successor_list
+                if node[2] != self.node_id and not self.chord.is_suspected(node[2])][:self.replication_factor - 1]
+
     def _replicate_to_successors(self, key: str, value: Any, request_id: str):
-        """Replica en R-1 nodos sucesivos (usa main.py para enviar)"""
-        print(f"🔄 Réplicas para {key} preparadas (R={self.replication_factor-1})")
-        print(f"   → Usa chord.successor para enviar REPLICATE messages")
+        """Replica en R-1 nodos sucesivos (mismo request_id: un PUT reintentado no se re-replica)"""
+        replicas = self.replica_nodes()
+        if not replicas or not self.send_callback:
+            _trace.debug("replicas_pending", key=key, replicas=self.replication_factor - 1)
+            return
+        msg = Message(MessageType.REPLICATE, self.node_id[:8], {"key": key, "value": value}).to_dict()
+        msg["request_id"] = request_id
+        for ip, port, node_id in replicas:
+            try:
+                self.send_callback(ip, port, msg)
+                _trace.debug("replicate", key=key, node=node_id[:8])
+            except Exception as e:
+                _trace.warning("replicate_failed", key=key, node=node_id[:8], error=str(e))
     
     # Respuesta de error genérica
     def _error_response(self, request_id: str, error: str) -> dict:
@@ -0,0 +1,265 @@
+"""
+Trazas estructuradas para el camino caliente (mensajes TCP, storage).
+
+Reemplaza los logging.info(f"... {msg}") y print() por mensaje: formatear el
+dict completo y escribirlo a consola costaba más que procesar el mensaje.
+- Cada subsistema ("tcp", "storage", ...) tiene su Tracer con nivel propio. La
+  comprobación de nivel es una comparación de enteros; si el evento no pasa, no
+  se formatea nada.
+- Los eventos son estructurados: nombre + campos (trace.debug("msg_in", peer=addr,
+  msg=msg)). El texto se arma recién en el sink.
+- Muestreo por subsistema: con sample=0.01 solo se emite ~1% de los eventos que
+  pasan el nivel.
+- Sinks: LoggingSink (por defecto, loggers "trace.<subsistema>") o AsyncFileSink
+  (JSON por línea, escrito por un hilo aparte; si la cola se llena se descarta).
+
+"tcp" y "storage" quedan en WARNING por defecto. Se configuran con configure() o
+con variables de entorno (configure_from_env, ver main.py):
+    CHORD_TRACE="tcp=debug,storage=info"  CHORD_TRACE_SAMPLE="tcp=0.01"
+    CHORD_TRACE_FILE=/tmp/trazas.jsonl
+"""
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any, Dict, Optional, Union
+
+# Nivel más detallado que DEBUG (p. ej. cada frame)
+TRACE = 5
+logging.addLevelName(TRACE, "TRACE")
+
+DEFAULT_LEVEL = logging.INFO
+# Subsistemas del camino caliente: apagados salvo que se pidan
+DEFAULT_LEVELS = {"tcp": logging.WARNING, "storage": logging.WARNING}
+
+Level = Union[int, str]
+
+
+def parse_level(level: Level) -> int:
+    """Acepta un int o un nombre ("debug", "TRACE", ...). ValueError si no existe."""
+    if isinstance(level, int):
+        return level
+    value = logging.getLevelName(level.strip().upper())
+    if not isinstance(value, int):
+        raise ValueError(f"Nivel de traza desconocido: {level}")
+    return value
+
+
+class TraceEvent:
+    """Evento emitido; str() lo formatea como 'evento k=v ...' (solo cuando se imprime)."""
+    __slots__ = ("ts", "subsystem", "level", "event", "fields")
+
+    def __init__(self, ts: float, subsystem: str, level: int, event: str, fields: Dict[str, Any]):
+        self.ts = ts
+        self.subsystem = subsystem
+        self.level = level
+        self.event = event
+        self.fields = fields
+
+    def __str__(self):
+        if not self.fields:
+            return self.event
+        return self.event + " " + " ".join(f"{k}={v}" for k, v in self.fields.items())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"ts": self.ts, "subsystem": self.subsystem,
+                "level": logging.getLevelName(self.level), "event": self.event, **self.fields}
+
+
+class LoggingSink:
+    """Pasa los eventos al logger "trace.<subsistema>" de la librería estándar."""
+
+    def emit(self, event: TraceEvent):
+        # el TraceEvent se formatea recién cuando un handler arma el record
+        logging.getLogger(f"trace.{event.subsystem}").log(event.level, "%s", event)
+
+    def configure_level(self, subsystem: str, level: int):
+        logging.getLogger(f"trace.{subsystem}").setLevel(level)
+
+    def close(self):
+        pass
+
+
+class AsyncFileSink:
+    """
+    Escribe eventos como JSON por línea en un hilo aparte. El evento se serializa
+    en el hilo que lo emite (los dicts de mensajes se siguen modificando después),
+    pero la escritura a disco no bloquea. Con la cola llena el evento se descarta.
+    """
+
+    def __init__(self, path: str, max_queue: int = 10000, flush_interval: float = 0.5):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=max_queue)
+        self._file = open(path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._write_loop, name="trace-sink", daemon=True)
+        self._thread.start()
+
+    def emit(self, event: TraceEvent):
+        line = json.dumps(event.to_dict(), default=str)
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            self.dropped += 1
+
+    def configure_level(self, subsystem: str, level: int):
+        pass
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Espera a que la cola se vacíe. False si no alcanzó el timeout."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return not self._queue.unfinished_tasks
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+        self._file.close()
+
+    def _write_loop(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                line = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._file.flush()
+                last_flush = time.monotonic()
+                continue
+            if line is None:
+                self._queue.task_done()
+                self._file.flush()
+                return
+            self._file.write(line + "\n")
+            self.written += 1
+            # a disco cuando la cola se vacía o cada flush_interval durante ráfagas
+            if self._queue.empty() or time.monotonic() - last_flush >= self.flush_interval:
+                self._file.flush()
+                last_flush = time.monotonic()
+            self._queue.task_done()
+
+
+class Tracer:
+    """Trazas de un subsistema. Obtenerlo con get_tracer(nombre) y guardarlo a nivel de módulo."""
+    __slots__ = ("subsystem", "level", "sample", "emitted", "sampled_out")
+
+    def __init__(self, subsystem: str, level: int, sample: float = 1.0):
+        self.subsystem = subsystem
+        self.level = level
+        self.sample = sample
+        self.emitted = 0
+        self.sampled_out = 0
+
+    def enabled(self, level: int) -> bool:
+        """Para evitar armar campos caros cuando el nivel está apagado."""
+        return level >= self.level
+
+    def log(self, level: int, event: str, **fields):
+        if level < self.level:
+            return
+        if self.sample < 1.0 and random.random() >= self.sample:
+            self.sampled_out += 1
+            return
+        self.emitted += 1
+        _sink.emit(TraceEvent(time.time(), self.subsystem, level, event, fields))
+
+    def trace(self, event: str, **fields):
+        self.log(TRACE, event, **fields)
+
+    def debug(self, event: str, **fields):
+        self.log(logging.DEBUG, event, **fields)
+
+    def info(self, event: str, **fields):
+        self.log(logging.INFO, event, **fields)
+
+    def warning(self, event: str, **fields):
+        self.log(logging.WARNING, event, **fields)
+
+
+_tracers: Dict[str, Tracer] = {}
+_levels: Dict[str, int] = dict(DEFAULT_LEVELS)
+_samples: Dict[str, float] = {}
+_sink: Union[LoggingSink, AsyncFileSink] = LoggingSink()
+_lock = threading.Lock()
+
+
+def get_tracer(subsystem: str) -> Tracer:
+    with _lock:
+        tracer = _tracers.get(subsystem)
+        if tracer is None:
+            tracer = Tracer(subsystem, _levels.get(subsystem, DEFAULT_LEVEL), _samples.get(subsystem, 1.0))
+            _tracers[subsystem] = tracer
+            _sink.configure_level(subsystem, tracer.level)
+        return tracer
+
+
+def configure(levels: Optional[Dict[str, Level]] = None, sample: Optional[Dict[str, float]] = None,
+              sink: Optional[Union[LoggingSink, AsyncFileSink]] = None):
+    """
+    Cambia niveles y/o muestreo por subsistema y opcionalmente el sink. Aplica
+    también a los Tracer ya creados. Retorna el sink anterior (el llamador lo cierra).
+    """
+    global _sink
+    with _lock:
+        previous = _sink
+        if sink is not None:
+            _sink = sink
+        for name, level in (levels or {}).items():
+            _levels[name] = parse_level(level)
+        for name, rate in (sample or {}).items():
+            _samples[name] = max(0.0, min(1.0, float(rate)))
+        for name, tracer in _tracers.items():
+            tracer.level = _levels.get(name, DEFAULT_LEVEL)
+            tracer.sample = _samples.get(name, 1.0)
+            _sink.configure_level(name, tracer.level)
+        return previous
+
+
+def reset():
+    """Vuelve a los niveles por defecto, sin muestreo y con LoggingSink."""
+    global _sink
+    with _lock:
+        previous = _sink
+        _levels.clear()
+        _levels.update(DEFAULT_LEVELS)
+        _samples.clear()
+        _sink = LoggingSink()
+        for name, tracer in _tracers.items():
+            tracer.level = _levels.get(name, DEFAULT_LEVEL)
+            tracer.sample = 1.0
+            tracer.emitted = tracer.sampled_out = 0
+            _sink.configure_level(name, tracer.level)
+    if previous is not _sink:
+        previous.close()
+
+
+def get_stats() -> Dict[str, Dict[str, Any]]:
+    with _lock:
+        return {name: {"level": logging.getLevelName(t.level), "sample": t.sample,
+                       "emitted": t.emitted, "sampled_out": t.sampled_out}
+                for name, t in _tracers.items()}
+
+
+def _parse_pairs(spec: str) -> Dict[str, str]:
+    pairs = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            pairs[name.strip()] = value.strip()
+    return pairs
+
+
+def configure_from_env(environ: Optional[Dict[str, str]] = None):
+    """Lee CHORD_TRACE, CHORD_TRACE_SAMPLE y CHORD_TRACE_FILE."""
+    environ = os.environ if environ is None else environ
+    levels = _parse_pairs(environ.get("CHORD_TRACE", ""))
+    sample = {k: float(v) for k, v in _parse_pairs(environ.get("CHORD_TRACE_SAMPLE", "")).items()}
+    path = environ.get("CHORD_TRACE_FILE")
+    previous = configure(levels, sample, AsyncFileSink(path) if path else None)
+    if path:
+        previous.close()
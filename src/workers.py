@@ -0,0 +1,220 @@
+"""
+Pool de workers con cola acotada (admission control) para TCPServer.
+
+Los hilos que leen de los sockets solo encolan; un número fijo de workers ejecuta
+el message_handler. Si la cola está llena el trabajo se rechaza de inmediato
+(submit retorna None) y el servidor responde BUSY en vez de acumular memoria.
+
+PriorityWorkerPool separa los mensajes en carriles (lanes) con cola y workers
+propios: el tráfico de control de Chord (stabilize, heartbeats, lookups) nunca
+espera detrás de una ráfaga de PUT/REPLICATE.
+"""
+import math
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Tipo de respuesta que envía el servidor cuando rechaza un mensaje por sobrecarga
+BUSY = "BUSY"
+
+# Carriles de prioridad
+LANE_CONTROL = "control"  # mantenimiento del anillo: CHORD_*, heartbeats, join, lookups
+LANE_DATA = "data"        # storage y mensajes de aplicación
+CONTROL_MESSAGE_TYPES = frozenset({"HEARTBEAT", "HEARTBEAT_ACK", "JOIN_REQUEST", "FIND_SUCCESSOR"})
+
+# Muestras de latencia que se guardan por pool para los percentiles
+_LATENCY_SAMPLES = 1024
+
+
+def classify_message(msg: Dict[str, Any]) -> str:
+    """Carril por defecto: control para CHORD_* y heartbeats, data para todo lo demás."""
+    msg_type = msg.get("type", "") if isinstance(msg, dict) else ""
+    if not isinstance(msg_type, str):
+        return LANE_DATA
+    if msg_type.startswith("CHORD_") or msg_type in CONTROL_MESSAGE_TYPES:
+        return LANE_CONTROL
+    return LANE_DATA
+
+
+def _percentile_ms(samples, p: float) -> float:
+    """Percentil nearest-rank de muestras en segundos, en milisegundos."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(p / 100.0 * len(ordered)))
+    return round(ordered[rank - 1] * 1000, 3)
+
+
+class WorkerPool:
+    """
+    num_workers hilos que consumen de una cola de tamaño máximo queue_size.
+    Expone la profundidad de la cola, contadores de rechazados/procesados y
+    percentiles de la espera en cola y de la latencia total (cola + handler).
+    """
+
+    def __init__(self, num_workers: int = 8, queue_size: int = 1000, name: str = "tcp-worker"):
+        if num_workers < 1:
+            raise ValueError("num_workers debe ser >= 1")
+        self.num_workers = num_workers
+        self.queue_size = queue_size
+        self.name = name
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        self._running = False
+        self._lock = threading.Lock()
+
+        # contadores
+        self.submitted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self.active = 0
+        self._waits = deque(maxlen=_LATENCY_SAMPLES)
+        self._latencies = deque(maxlen=_LATENCY_SAMPLES)
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        for i in range(self.num_workers):
+            t = threading.Thread(target=self._worker_loop, name=f"{self.name}-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        """Detiene los workers; los trabajos que quedaron en cola fallan con RuntimeError."""
+        self._running = False
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+        for t in self._threads:
+            t.join(timeout=1)
+        self._threads = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and not item[0].done():
+                item[0].set_exception(RuntimeError("WorkerPool detenido"))
+
+    def submit(self, fn: Callable, *args: Any) -> Optional[Future]:
+        """Encola fn(*args). Retorna su Future, o None si la cola está llena (rechazado)."""
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((future, fn, args, time.monotonic()))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            return None
+        with self._lock:
+            self.submitted += 1
+        return future
+
+    def submit_message(self, msg: Dict[str, Any], fn: Callable, *args: Any) -> Optional[Future]:
+        """Como submit; el pool simple no distingue mensajes (ver PriorityWorkerPool)."""
+        return self.submit(fn, *args)
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.num_workers,
+                "queue_size": self.queue_size,
+                "queue_depth": self._queue.qsize(),
+                "active": self.active,
+                "submitted": self.submitted,
+                "processed": self.processed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "wait_p50_ms": _percentile_ms(self._waits, 50),
+                "wait_p99_ms": _percentile_ms(self._waits, 99),
+                "latency_p50_ms": _percentile_ms(self._latencies, 50),
+                "latency_p99_ms": _percentile_ms(self._latencies, 99),
+            }
+
+    def _worker_loop(self):
+        while self._running:
+            item = self._queue.get()
+            if item is None:
+                break
+            future, fn, args, enqueued = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            started = time.monotonic()
+            with self._lock:
+                self.active += 1
+            try:
+                result, error = fn(*args), None
+            except BaseException as e:
+                result, error = None, e
+            # contadores antes de resolver el future: su done-callback envía la respuesta, y quien la
+            # recibe ya ve este request contado en get_stats
+            with self._lock:
+                self.active -= 1
+                self._waits.append(started - enqueued)
+                self._latencies.append(time.monotonic() - enqueued)
+                if error is None:
+                    self.processed += 1
+                else:
+                    self.failed += 1
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+class PriorityWorkerPool:
+    """
+    Un WorkerPool por carril. classify(msg) elige el carril de cada mensaje; cada
+    carril tiene su propio presupuesto de workers y su cola acotada, así que una
+    cola de data llena (BUSY) no afecta al carril de control.
+    lanes: {carril: (num_workers, queue_size)}
+    """
+
+    def __init__(self, lanes: Dict[str, Tuple[int, int]],
+                 classify: Callable[[Dict[str, Any]], str] = classify_message,
+                 default_lane: str = LANE_DATA):
+        if default_lane not in lanes:
+            raise ValueError(f"El carril por defecto {default_lane} no está en lanes")
+        self.classify = classify
+        self.default_lane = default_lane
+        self.lanes: Dict[str, WorkerPool] = {
+            lane: WorkerPool(num_workers=n, queue_size=size, name=f"tcp-{lane}")
+            for lane, (n, size) in lanes.items()
+        }
+
+    def start(self):
+        for pool in self.lanes.values():
+            pool.start()
+
+    def stop(self):
+        for pool in self.lanes.values():
+            pool.stop()
+
+    def submit(self, fn: Callable, *args: Any, lane: Optional[str] = None) -> Optional[Future]:
+        """Encola fn(*args) en el carril indicado (o el por defecto)."""
+        return self.lanes.get(lane, self.lanes[self.default_lane]).submit(fn, *args)
+
+    def submit_message(self, msg: Dict[str, Any], fn: Callable, *args: Any) -> Optional[Future]:
+        """Encola fn(*args) en el carril que corresponde a msg."""
+        return self.submit(fn, *args, lane=self.classify(msg))
+
+    def queue_depth(self) -> int:
+        return sum(pool.queue_depth() for pool in self.lanes.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Totales de todos los carriles más las estadísticas de cada uno en "lanes"."""
+        per_lane = {lane: pool.get_stats() for lane, pool in self.lanes.items()}
+        totals = {key: sum(stats[key] for stats in per_lane.values())
+                  for key in ("workers", "queue_size", "queue_depth", "active",
+                              "submitted", "processed", "failed", "rejected")}
+        totals["lanes"] = per_lane
+        return totals
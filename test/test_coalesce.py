@@ -0,0 +1,89 @@
+"""
+Pruebas para el coalescing de escrituras salientes (src/coalesce.py)
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.coalesce import sendv
+from src.networking import TCPServer
+
+
+class _ChunkedSocket:
+    """Socket falso cuyo sendmsg escribe como mucho `chunk` bytes por llamada."""
+
+    def __init__(self, chunk):
+        self.chunk = chunk
+        self.data = b""
+
+    def sendmsg(self, buffers):
+        joined = b"".join(bytes(b) for b in buffers)[:self.chunk]
+        self.data += joined
+        return len(joined)
+
+
+class TestSendv:
+
+    def test_resumes_partial_writes(self):
+        frames = [b"uno\n", b"dos\n", b"tres\n"]
+        sock = _ChunkedSocket(chunk=3)
+        syscalls = sendv(sock, frames)
+        assert sock.data == b"".join(frames)
+        assert syscalls == 5
+
+    def test_single_syscall_for_small_batch(self):
+        sock = _ChunkedSocket(chunk=1 << 20)
+        assert sendv(sock, [b"a\n"] * 100) == 1
+
+
+class TestServerCoalescing:
+
+    def test_burst_is_coalesced_in_order(self):
+        """Una ráfaga de mensajes al mismo peer sale en pocos sendmsg y en orden"""
+        messages = []
+        receiver = TCPServer('127.0.0.1', 9640, lambda m, a: messages.append(m["n"]))
+        receiver.start()
+        sender = TCPServer('127.0.0.1', 9641, lambda m, a: None, coalesce_window=0.05)
+        time.sleep(0.2)
+
+        for n in range(50):
+            assert sender.send_message('127.0.0.1', 9640, {"type": "CHORD_NOTIFY", "n": n})
+        assert sender.flush(timeout=2)
+        time.sleep(0.3)
+
+        assert messages == list(range(50))
+        stats = sender.get_coalesce_stats()
+        assert stats["frames"] == 50
+        assert stats["syscalls"] < 50
+        assert stats["frames_per_syscall"] > 1
+
+        sender.stop()
+        receiver.stop()
+
+    def test_unreachable_peer_counts_dropped(self):
+        sender = TCPServer('127.0.0.1', 9642, lambda m, a: None, coalesce_window=0.01)
+        assert sender.send_message('127.0.0.1', 9643, {"type": "TEST"})
+        assert sender.flush(timeout=2)
+        assert sender.get_coalesce_stats()["dropped"] == 1
+        sender.stop()
+
+    def test_idle_writer_returns_connection_to_pool(self):
+        messages = []
+        receiver = TCPServer('127.0.0.1', 9644, lambda m, a: messages.append(m))
+        receiver.start()
+        sender = TCPServer('127.0.0.1', 9645, lambda m, a: None,
+                           coalesce_window=0.01, pool_idle_timeout=0.3)
+        time.sleep(0.2)
+
+        sender.send_message('127.0.0.1', 9644, {"type": "TEST"})
+        assert sender.flush(timeout=2)
+        time.sleep(0.6)
+
+        assert sender.get_coalesce_stats()["writers"] == 0
+        assert sender.pool.idle_count(('127.0.0.1', 9644)) == 1
+        assert len(messages) == 1
+
+        sender.stop()
+        receiver.stop()
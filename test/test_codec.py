@@ -0,0 +1,185 @@
+"""
+Pruebas para el codec binario y su negociación por conexión (src/codec.py)
+"""
+import sys
+import os
+import json
+import socket
+import threading
+import time
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.codec import (
+    BINARY, CODEC_BINARY, CODEC_VERSION, JSON, CodecError, CodecNegotiator, get_codec,
+)
+from src.framing import CODEC_HELLO_MAGIC, FRAME_LENGTH, FrameReader, encode_frame
+from src.networking import TCPServer
+
+NODE_A = "a3f1" * 10
+NODE_B = "0b9e" * 10
+
+
+def _chord_messages():
+    return [
+        {"type": "CHORD_FIND_SUCCESSOR", "key_id": NODE_A, "requester_id": NODE_B},
+        {"type": "SUCCESSOR_RESPONSE", "key_id": NODE_A, "successor_ip": "10.0.0.7",
+         "successor_port": 5000, "successor_id": NODE_B, "hops": 3},
+        {"type": "CHORD_UPDATE_PREDECESSOR", "new_predecessor_ip": "10.0.0.7", "new_predecessor_port": 5000,
+         "new_predecessor_id": NODE_A, "leaving_node_id": NODE_B, "timestamp": 1712345678.123456},
+        {"type": "CHORD_NOTIFY", "node_id": NODE_A, "ip": "10.0.0.1", "port": 5001,
+         "timestamp": 1712345678.5, "current_predecessor": None},
+        {"type": "JOIN_RESPONSE", "successor_ip": None, "successor_port": None, "successor_id": None},
+        {"type": "CHORD_NEXT_HOP", "key_id": NODE_A, "requester_id": NODE_B, "count": 3},
+        {"type": "NEXT_HOP_RESPONSE", "key_id": NODE_A, "final": False,
+         "nodes": [["10.0.0.7", 5000, NODE_B], ["10.0.0.8", 5000, NODE_A]]},
+        {"type": "RESULT", "request_id": "GET_a3f1a3f1_1712345678", "sender_id": NODE_A[:8],
+         "data": {"key": "clave", "value": "ñandú " * 10, "found": True, "node": NODE_A[:8]}},
+    ]
+
+
+class TestBinaryCodec:
+    """Codificación y decodificación sin red"""
+
+    @pytest.mark.parametrize("msg", _chord_messages())
+    def test_round_trip_chord_messages(self, msg):
+        assert BINARY.decode(BINARY.encode(msg)) == msg
+
+    def test_binary_is_smaller_than_json(self):
+        for msg in _chord_messages():
+            assert len(BINARY.encode(msg)) < len(JSON.encode(msg))
+        # dos IDs de 40 caracteres viajan como 20 bytes cada uno
+        msg = {"type": "CHORD_FIND_SUCCESSOR", "key_id": NODE_A, "requester_id": NODE_B}
+        assert len(BINARY.encode(msg)) <= 2 * 21 + 3
+
+    def test_generic_values_and_unknown_types(self):
+        msg = {
+            "type": "APP_CUSTOM", "n": -12345678901234567890, "small": 0, "neg": -1,
+            "f": -0.5, "flags": [True, False, None], "nested": {"a": {"b": [1, "x", {"c": 2.0}]}},
+            "upper_id": NODE_A.upper(), "tupla": (1, 2), "vacio": "",
+        }
+        decoded = BINARY.decode(BINARY.encode(msg))
+        assert decoded == json.loads(json.dumps(msg))
+        # un hex en mayúsculas no es un ID: se conserva tal cual
+        assert decoded["upper_id"] == NODE_A.upper()
+
+    def test_extra_fields_and_missing_type(self):
+        msg = {"type": "CHORD_HEARTBEAT", "node_id": NODE_A, "timestamp": 1.0, "corr_id": "ab-1", "extra": 7}
+        assert BINARY.decode(BINARY.encode(msg)) == msg
+        assert BINARY.decode(BINARY.encode({"sin_tipo": 1})) == {"sin_tipo": 1}
+
+    def test_errors(self):
+        with pytest.raises(TypeError):
+            BINARY.encode({"type": "PUT", "value": object()})
+        frame = BINARY.encode(_chord_messages()[1])
+        with pytest.raises(CodecError):
+            BINARY.decode(frame[:-3])
+        with pytest.raises(CodecError):
+            BINARY.decode(frame + b"\x00")
+        with pytest.raises(ValueError):
+            get_codec("xml")
+
+    def test_empty_frames(self):
+        assert BINARY.decode(b"") is None
+        assert JSON.decode(b"  ") is None
+
+
+class TestFrameReaderHello:
+    """El lector reconoce el hello del codec binario"""
+
+    def test_hello_switches_to_length_mode(self):
+        a, b = socket.socketpair()
+        versions = []
+        reader = FrameReader(b, on_hello=versions.append)
+        a.sendall(CODEC_HELLO_MAGIC)
+        a.sendall(bytes([CODEC_VERSION]) + encode_frame(b"payload", FRAME_LENGTH))
+        assert bytes(reader.read_frame()) == b"payload"
+        assert versions == [CODEC_VERSION]
+        assert reader.mode == FRAME_LENGTH
+        a.close()
+        b.close()
+
+
+class TestNegotiation:
+    """Negociación del codec entre TCPServer"""
+
+    @pytest.mark.parametrize("mode,port,multiplex", [
+        ("thread", 9700, True), ("asyncio", 9701, True), ("thread", 9702, False), ("asyncio", 9703, False),
+    ])
+    def test_binary_round_trip(self, mode, port, multiplex):
+        received = []
+
+        def handler(msg, addr):
+            received.append(msg)
+            if msg["type"] == "CHORD_FIND_SUCCESSOR":
+                return {"type": "SUCCESSOR_RESPONSE", "key_id": msg["key_id"], "successor_ip": "127.0.0.1",
+                        "successor_port": port, "successor_id": NODE_B, "hops": 0}
+            return None
+
+        server = TCPServer('127.0.0.1', port, handler, mode=mode)
+        client = TCPServer('127.0.0.1', port + 10, lambda m, a: None, codec=CODEC_BINARY, multiplex=multiplex)
+        server.start()
+        time.sleep(0.2)
+
+        request = {"type": "CHORD_FIND_SUCCESSOR", "key_id": NODE_A, "requester_id": NODE_B}
+        response = client.request_response('127.0.0.1', port, request)
+        assert response["successor_id"] == NODE_B
+        assert client.send_message('127.0.0.1', port, {"type": "CHORD_HEARTBEAT", "node_id": NODE_A,
+                                                       "timestamp": 1.5})
+        deadline = time.time() + 2
+        while len(received) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        assert received[0] == request
+        assert received[1]["node_id"] == NODE_A
+        assert client.negotiator.get_stats()["negotiated"] >= 1
+
+        client.stop()
+        server.stop()
+
+    def test_fallback_to_json_with_silent_peer(self):
+        """Un peer que no contesta el hello (nodo viejo) queda en JSON"""
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind(('127.0.0.1', 9704))
+        listener.listen()
+        lines = []
+
+        def old_node():
+            # responde por línea JSON e ignora cualquier hello
+            while True:
+                try:
+                    sock, _ = listener.accept()
+                except OSError:
+                    return
+                reader = FrameReader(sock)
+                frame = reader.read_frame()
+                if frame is not None:
+                    lines.append(bytes(frame))
+                    sock.sendall(b'{"type": "ACK"}\n')
+                sock.close()
+
+        t = threading.Thread(target=old_node, daemon=True)
+        t.start()
+        client = TCPServer('127.0.0.1', 9714, lambda m, a: None, codec=CODEC_BINARY,
+                           multiplex=False, codec_timeout=0.2)
+
+        assert client.request_response('127.0.0.1', 9704, {"type": "PING"}) == {"type": "ACK"}
+        assert lines == [b'{"type": "PING"}']
+        stats = client.negotiator.get_stats()
+        assert stats["fallbacks"] == 1 and stats["json_peers"] == 1
+        # la segunda conexión ya no intenta el hello
+        assert not client.negotiator.wants_binary(('127.0.0.1', 9704))
+
+        client.stop()
+        listener.close()
+
+    def test_unsupported_version_is_refused(self):
+        negotiator = CodecNegotiator(preferred=CODEC_BINARY)
+        a, b = socket.socketpair()
+        b.sendall(b"\x00")
+        assert negotiator.setup(a, ('127.0.0.1', 1), FRAME_LENGTH) is None
+        assert negotiator.get_stats()["refused"] == 1
+        assert negotiator.known_codec(('127.0.0.1', 1)) is JSON
+        a.close()
+        b.close()
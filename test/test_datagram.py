@@ -0,0 +1,177 @@
+"""
+Pruebas para el canal UDP de mensajes de control (src/datagram.py)
+"""
+import sys
+import os
+import json
+import socket
+import threading
+import time
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.datagram import UDP_ACK, UDP_SEQ, UDP_SRC, DatagramChannel
+from src.networking import TCPServer
+
+
+def _heartbeat_handler(received):
+    def handler(msg, addr):
+        received.append(msg)
+        if msg["type"] == "CHORD_HEARTBEAT":
+            return {"type": "HEARTBEAT_ACK"}
+        return None
+    return handler
+
+
+class TestDatagramChannel:
+
+    def test_lost_datagram_times_out(self):
+        """Sin ACK el Future falla con TimeoutError y se cuenta la pérdida"""
+        channel = DatagramChannel('127.0.0.1', 9630, lambda m, a: None)
+        channel.start()
+
+        future = channel.send('127.0.0.1', 9631, {"type": "CHORD_HEARTBEAT"}, timeout=0.2)
+        with pytest.raises(TimeoutError):
+            future.result(timeout=2)
+        assert channel.get_stats()["lost"] == 1
+        assert not channel.supports('127.0.0.1', 9631)
+
+        channel.stop()
+
+    def test_drops_duplicates_and_reordered(self):
+        received = []
+        channel = DatagramChannel('127.0.0.1', 9632, _heartbeat_handler(received))
+        channel.start()
+
+        raw = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        for seq in (2, 2, 1, 3):
+            datagram = {"type": "CHORD_NOTIFY", UDP_SRC: "abcd", UDP_SEQ: seq}
+            raw.sendto(json.dumps(datagram).encode(), ('127.0.0.1', 9632))
+        time.sleep(0.3)
+        raw.close()
+
+        assert len(received) == 2
+        assert channel.get_stats()["duplicates"] == 2
+
+        channel.stop()
+
+    def test_malformed_seq_does_not_stop_receiver(self):
+        received = []
+        channel = DatagramChannel('127.0.0.1', 9646, _heartbeat_handler(received))
+        channel.start()
+
+        raw = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        raw.settimeout(1.0)
+        for bad in ({UDP_SEQ: "x", UDP_SRC: "a"}, {UDP_SEQ: True, UDP_SRC: "a"},
+                    {UDP_SEQ: 1, UDP_SRC: ["a"]}, {UDP_ACK: [1]}):
+            raw.sendto(json.dumps({"type": "CHORD_HEARTBEAT", **bad}).encode(), ('127.0.0.1', 9646))
+        raw.sendto(json.dumps({"type": "CHORD_HEARTBEAT", UDP_SRC: "a", UDP_SEQ: 1}).encode(),
+                   ('127.0.0.1', 9646))
+        reply = json.loads(raw.recvfrom(65535)[0])
+        raw.close()
+
+        # los inválidos se descartan sin respuesta; el heartbeat válido recibe su ACK
+        assert reply == {"type": "HEARTBEAT_ACK", UDP_ACK: 1}
+        assert len(received) == 1
+        channel.stop()
+
+
+class TestServerControlChannel:
+
+    def test_heartbeat_over_udp(self):
+        received = []
+        receiver = TCPServer('127.0.0.1', 9633, _heartbeat_handler(received), udp=True)
+        receiver.start()
+        sender = TCPServer('127.0.0.1', 9634, lambda m, a: None, udp=True)
+        sender.start()
+        time.sleep(0.2)
+
+        for _ in range(3):
+            response = sender.request_control('127.0.0.1', 9633, {"type": "CHORD_HEARTBEAT"})
+            assert response["type"] == "HEARTBEAT_ACK"
+
+        assert sender.udp.supports('127.0.0.1', 9633)
+        assert sender.get_udp_stats()["acked"] == 3
+        # nada pasó por TCP
+        assert sender.get_multiplex_stats()["requests"] == 0
+
+        sender.stop()
+        receiver.stop()
+
+    def test_falls_back_to_tcp_for_peer_without_udp(self):
+        received = []
+        receiver = TCPServer('127.0.0.1', 9635, _heartbeat_handler(received))
+        receiver.start()
+        sender = TCPServer('127.0.0.1', 9636, lambda m, a: None, udp=True, udp_probe_timeout=0.2)
+        sender.start()
+        time.sleep(0.2)
+
+        assert sender.send_control('127.0.0.1', 9635, {"type": "CHORD_NOTIFY", "n": 1})
+        response = sender.request_control('127.0.0.1', 9635, {"type": "CHORD_HEARTBEAT"})
+        assert response["type"] == "HEARTBEAT_ACK"
+        time.sleep(0.5)
+
+        assert sorted(m["type"] for m in received) == ["CHORD_HEARTBEAT", "CHORD_NOTIFY"]
+        assert not sender.udp.supports('127.0.0.1', 9635)
+
+        sender.stop()
+        receiver.stop()
+
+    def test_storage_messages_stay_on_tcp(self):
+        received = []
+        receiver = TCPServer('127.0.0.1', 9637, _heartbeat_handler(received), udp=True)
+        receiver.start()
+        sender = TCPServer('127.0.0.1', 9638, lambda m, a: None, udp=True)
+        sender.start()
+        time.sleep(0.2)
+
+        assert sender.send_control('127.0.0.1', 9637, {"type": "PUT", "key": "k"})
+        time.sleep(0.3)
+
+        assert received[0]["type"] == "PUT"
+        assert sender.get_udp_stats()["sent"] == 0
+
+        sender.stop()
+        receiver.stop()
+
+    def test_non_control_datagram_is_rejected(self):
+        received = []
+        receiver = TCPServer('127.0.0.1', 9647, _heartbeat_handler(received), udp=True)
+        receiver.start()
+        time.sleep(0.2)
+
+        # un PUT por UDP saltearía workers y carriles: se descarta sin respuesta
+        raw = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        raw.settimeout(0.3)
+        raw.sendto(json.dumps({"type": "PUT", UDP_SRC: "a", UDP_SEQ: 1}).encode(), ('127.0.0.1', 9647))
+        with pytest.raises(socket.timeout):
+            raw.recvfrom(65535)
+        raw.close()
+
+        assert received == []
+        assert receiver.get_udp_stats()["rejected"] == 1
+        receiver.stop()
+
+    def test_control_datagram_runs_on_workers(self):
+        threads = []
+
+        def handler(msg, addr):
+            threads.append(threading.current_thread().name)
+            return {"type": "HEARTBEAT_ACK"}
+
+        receiver = TCPServer('127.0.0.1', 9648, handler, udp=True, workers=2, control_workers=1)
+        receiver.start()
+        sender = TCPServer('127.0.0.1', 9649, lambda m, a: None, udp=True)
+        sender.start()
+        time.sleep(0.2)
+
+        response = sender.request_control('127.0.0.1', 9648, {"type": "CHORD_HEARTBEAT"})
+        assert response["type"] == "HEARTBEAT_ACK"
+        assert sender.udp.supports('127.0.0.1', 9648)
+        # el handler corrió en el carril de control, no en el hilo receptor UDP
+        assert threads and not threads[0].startswith("udp-")
+        assert receiver.get_worker_stats()["lanes"]["control"]["processed"] == 1
+
+        sender.stop()
+        receiver.stop()
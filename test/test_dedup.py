@@ -0,0 +1,100 @@
+"""
+Pruebas para el cache de idempotencia (src/dedup.py) y su uso en DistributedStorage
+"""
+import sys
+import os
+import threading
+import time
+from unittest.mock import Mock
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.dedup import DedupCache
+from src.storage import DistributedStorage
+
+
+class TestDedupCache:
+    """Pruebas del cache sin red"""
+
+    def test_duplicate_returns_cached_response(self):
+        calls = []
+        cache = DedupCache()
+
+        def handler():
+            calls.append(1)
+            return {"n": len(calls)}
+
+        assert cache.run("PUT:1", handler) == {"n": 1}
+        assert cache.run("PUT:1", handler) == {"n": 1}
+        assert cache.run("PUT:2", handler) == {"n": 2}
+        assert len(calls) == 2
+        assert cache.get_stats()["hits"] == 1
+
+    def test_entries_expire_and_are_bounded(self):
+        cache = DedupCache(ttl=10.0, max_entries=3)
+        for i in range(5):
+            cache.run(str(i), lambda: i, now=100.0)
+        assert len(cache) == 3
+        # vencido: se vuelve a ejecutar
+        assert cache.run("4", lambda: "otra vez", now=111.0) == "otra vez"
+        assert cache.get_stats()["evicted"] >= 2
+
+    def test_failed_handler_is_not_cached(self):
+        cache = DedupCache()
+
+        def fails():
+            raise RuntimeError("falló")
+
+        with pytest.raises(RuntimeError):
+            cache.run("k", fails)
+        assert cache.run("k", lambda: "ok") == "ok"
+
+    def test_concurrent_duplicate_waits_for_original(self):
+        """Un duplicado que llega con el original en vuelo no ejecuta el handler"""
+        cache = DedupCache()
+        started = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return "respuesta"
+
+        results = []
+        t = threading.Thread(target=lambda: results.append(cache.run("k", slow)))
+        t.start()
+        started.wait(1)
+        results.append(cache.run("k", slow))
+        t.join()
+        assert results == ["respuesta", "respuesta"]
+        assert len(calls) == 1
+
+
+class TestStorageDedup:
+    """DistributedStorage no re-aplica PUT/REPLICATE repetidos"""
+
+    def test_retried_put_is_applied_once(self):
+        storage = DistributedStorage("a1b2c3d4e5f67890", Mock(), timeout_checker=False)
+        storage._replicate_to_successors = Mock()
+        msg = {"type": "PUT", "request_id": "PUT_x_1", "data": {"key": "k", "value": "v1"}}
+        first = storage.handle_storage_message(dict(msg))
+        storage.store_local("k", "cambiado")
+        second = storage.handle_storage_message(dict(msg))
+        assert second == first
+        assert storage.get_local("k")["value"] == "cambiado"
+        assert storage._replicate_to_successors.call_count == 1
+
+    def test_new_request_ids_are_unique(self):
+        storage = DistributedStorage("a1b2c3d4e5f67890", Mock(), timeout_checker=False)
+        ids = {storage.new_request_id("PUT") for _ in range(1000)}
+        assert len(ids) == 1000
+        assert all(rid.startswith("PUT_a1b2c3d4_") for rid in ids)
+
+    def test_messages_without_request_id_are_not_deduplicated(self):
+        storage = DistributedStorage("a1b2c3d4e5f67890", Mock(), timeout_checker=False)
+        msg = {"type": "PUT", "data": {"key": "k", "value": "v"}}
+        first = storage.handle_storage_message(dict(msg))
+        second = storage.handle_storage_message(dict(msg))
+        assert first["request_id"] != second["request_id"]
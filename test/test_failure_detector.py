@@ -0,0 +1,162 @@
+"""
+Pruebas para los detectores de fallas (src/failure_detector.py) y su uso en ChordNode
+"""
+import sys
+import os
+import math
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.failure_detector import FailureDetector, PhiAccrualDetector, TimeoutDetector, phi
+from src.loopback import LoopbackRing
+from src.overlay import ChordNode
+
+
+def _beats(detector, peer, interval, count, start=0.0):
+    """count llegadas de peer cada interval segundos; retorna el tiempo de la última."""
+    now = start
+    for i in range(count):
+        now = start + i * interval
+        detector.heartbeat(peer, now=now)
+    return now
+
+
+class TestPhiAccrualDetector:
+    """Detector phi accrual con tiempos explícitos"""
+
+    def test_phi_grows_with_silence(self):
+        assert phi(0.0, 1.0, 0.2) < phi(1.0, 1.0, 0.2) < phi(2.0, 1.0, 0.2)
+        assert abs(phi(1.0, 1.0, 0.2) - math.log10(2)) < 1e-6  # en la media: 50 %
+        assert phi(100.0, 1.0, 0.1) == math.inf
+
+    def test_regular_peer_is_detected_after_its_interval(self):
+        detector = PhiAccrualDetector(threshold=8.0, min_std=0.1)
+        last = _beats(detector, "a", 1.0, 50)
+        assert detector.is_available("a", now=last + 1.2)
+        assert not detector.is_available("a", now=last + 3.0)
+        assert detector.suspected(now=last + 3.0) == ["a"]
+
+    def test_slow_peer_learns_longer_intervals(self):
+        detector = PhiAccrualDetector(threshold=8.0, min_std=0.1)
+        _beats(detector, "rapido", 1.0, 50)
+        _beats(detector, "lento", 5.0, 50, start=-196.0)  # la última llegada también en t=49
+        now = 49.0 + 4.0
+        assert not detector.is_available("rapido", now=now)
+        assert detector.is_available("lento", now=now)
+
+    def test_acceptable_pause_tolerates_bursts(self):
+        # ráfaga de mensajes cada 0.2 s y después solo heartbeats cada 2 s: no es una caída
+        detector = PhiAccrualDetector(acceptable_pause=2.0, min_interval=0.1)
+        last = _beats(detector, "a", 0.2, 30)
+        assert detector.is_available("a", now=last + 2.0)
+        assert not detector.is_available("a", now=last + 10.0)
+
+    def test_close_arrivals_only_refresh(self):
+        detector = PhiAccrualDetector(min_interval=0.5)
+        detector.heartbeat("a", now=0.0)
+        detector.heartbeat("a", now=0.1)
+        detector.heartbeat("a", now=0.2)
+        assert detector.get_stats()["samples"] == 0
+        detector.heartbeat("a", now=1.2)
+        assert detector.get_stats()["samples"] == 1
+
+    def test_unknown_and_removed_peers(self):
+        detector = PhiAccrualDetector()
+        assert detector.suspicion("nadie", now=1e6) == 0.0 and detector.is_available("nadie", now=1e6)
+        detector.watch("a", now=0.0)
+        assert "a" in detector and not detector.is_available("a", now=60.0)
+        detector.watch("a", now=59.0)  # ya vigilado: no reinicia la historia
+        assert not detector.is_available("a", now=60.0)
+        assert detector.remove("a") and not detector.remove("a")
+        assert detector.is_available("a", now=60.0)
+
+    def test_window_slides(self):
+        detector = PhiAccrualDetector(window=10, min_std=0.01)
+        last = _beats(detector, "a", 5.0, 20)
+        last = _beats(detector, "a", 1.0, 11, start=last + 1.0)
+        # los intervalos de 5 s ya salieron de la ventana
+        assert not detector.is_available("a", now=last + 2.0)
+
+
+class TestTimeoutDetector:
+    def test_fixed_timeout(self):
+        detector = TimeoutDetector(timeout=5.0, clock=lambda: 0.0)
+        detector.heartbeat("a")
+        assert detector.suspicion("a", now=2.5) == 0.5
+        assert detector.is_available("a", now=4.9) and not detector.is_available("a", now=5.0)
+
+
+    def test_detector_without_suspicion_fails_at_construction(self):
+        class Incompleto(FailureDetector):
+            pass
+
+        with pytest.raises(TypeError):
+            Incompleto(1.0)
+
+
+class TestChordFailureDetection:
+    """El detector de fallas de ChordNode sobre un anillo en memoria (reloj virtual)"""
+
+    def _ring(self, n=10):
+        ring = LoopbackRing(storage=False).build(n)
+        ring.stabilize_until_converged()
+        ring.stabilize(ChordNode.SUCCESSOR_LIST_SIZE, fix_fingers=False)
+        return ring
+
+    def test_neighbors_are_watched(self):
+        ring = self._ring()
+        node = ring.nodes[3]
+        assert node.successor[2] in node.failure_detector
+        assert node.predecessor[2] in node.failure_detector
+        assert len(node.failure_detector) == 2
+
+    def test_predecessor_failure_detected_by_phi(self):
+        ring = self._ring()
+        failed = ring.nodes[5]
+        after = next(n for n in ring.nodes if n.predecessor and n.predecessor[2] == failed.node_id)
+        ring.fail_node(failed)
+
+        # el primer heartbeat sin ACK no alcanza: se espera a que phi pase el umbral
+        elapsed = 0.0
+        while after.predecessor and after.predecessor[2] == failed.node_id:
+            ring.advance(ChordNode.CHECK_PREDECESSOR_INTERVAL)
+            elapsed += ChordNode.CHECK_PREDECESSOR_INTERVAL
+            ring.stabilize(1, fix_fingers=False)
+            ring.check_predecessors()
+            assert elapsed <= 10.0
+        assert elapsed > ChordNode.CHECK_PREDECESSOR_INTERVAL
+        assert ring.metrics.counter("chord.failures_detected").value >= 1
+
+        # los vecinos vivos siguen hablando entre sí: nadie más sale del anillo
+        ring.stabilize_until_converged()
+        assert all(not n.failure_detector.suspected() for n in ring.live_nodes())
+
+    def test_quiet_live_neighbors_are_not_dropped(self):
+        ring = self._ring()
+        ring.advance(60.0)
+        # en silencio todos quedan sospechosos, pero los que contestan el heartbeat siguen
+        for node in ring.nodes:
+            assert node.check_predecessor_once()
+        assert ring.is_converged()
+
+    def test_suspected_successor_is_skipped(self):
+        ring = LoopbackRing().build(10)
+        ring.stabilize_until_converged()
+        ring.stabilize(ChordNode.SUCCESSOR_LIST_SIZE)
+        node = ring.nodes[2]
+        storage = ring.storages[node.node_id]
+        succ, following = node.successor_list[0], node.successor_list[1]
+        assert storage.replica_nodes() == [succ]
+
+        # el successor deja de responder: phi supera el umbral antes de un timeout
+        ring.fail_node(next(n for n in ring.nodes if n.node_id == succ[2]))
+        ring.advance(10.0)
+        assert node.is_suspected(succ[2])
+        assert storage.replica_nodes() == [following]
+        sent = ring.endpoints[node.node_id].sent
+        node.stabilize_once()
+        assert node.successor == following
+        # el failover no le preguntó al sospechoso: un GET_PREDECESSOR al nuevo y el NOTIFY
+        assert ring.endpoints[node.node_id].sent == sent + 2
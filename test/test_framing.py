@@ -0,0 +1,125 @@
+"""
+Pruebas para la capa de framing (src/framing.py)
+"""
+import sys
+import os
+import socket
+import threading
+import time
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.framing import (
+    FRAME_LENGTH, FRAME_NEWLINE, LENGTH_PREFIX_MAGIC, FrameReader, FrameTooLarge,
+    connection_preamble, encode_frame,
+)
+from src.networking import TCPServer
+
+
+def _feed(sock, chunks):
+    """Escribe los chunks uno a uno en otro hilo y cierra el socket"""
+    def run():
+        for chunk in chunks:
+            sock.sendall(chunk)
+            time.sleep(0.001)
+        sock.close()
+    t = threading.Thread(target=run)
+    t.start()
+    return t
+
+
+def _read_all(reader):
+    frames = []
+    while True:
+        frame = reader.read_frame()
+        if frame is None:
+            return frames
+        frames.append(bytes(frame))
+
+
+class TestFrameReader:
+    """Pruebas del lector de frames sobre socketpair"""
+
+    def test_newline_frames_split_across_chunks(self):
+        a, b = socket.socketpair()
+        data = b'{"n": 1}\n{"n": 2}\n\n{"n": 3}\n'
+        _feed(a, [data[i:i + 3] for i in range(0, len(data), 3)])
+        frames = _read_all(FrameReader(b, initial_size=8))
+        assert frames == [b'{"n": 1}', b'{"n": 2}', b'', b'{"n": 3}']
+
+    def test_length_prefixed_autodetect(self):
+        a, b = socket.socketpair()
+        payloads = [b"a", b"", b"x" * 100000, b"\n\n"]
+        data = connection_preamble(FRAME_LENGTH) + b"".join(encode_frame(p, FRAME_LENGTH) for p in payloads)
+        _feed(a, [data[i:i + 4096] for i in range(0, len(data), 4096)])
+        reader = FrameReader(b, initial_size=16)
+        assert _read_all(reader) == payloads
+        assert reader.mode == FRAME_LENGTH
+
+    def test_newline_autodetect(self):
+        a, b = socket.socketpair()
+        _feed(a, [b'{"a": 1}\n'])
+        reader = FrameReader(b)
+        assert _read_all(reader) == [b'{"a": 1}']
+        assert reader.mode == FRAME_NEWLINE
+
+    def test_large_newline_frame(self):
+        a, b = socket.socketpair()
+        big = b"y" * (3 * 1024 * 1024)
+        _feed(a, [big[i:i + 65536] for i in range(0, len(big), 65536)] + [b"\nz\n"])
+        assert _read_all(FrameReader(b)) == [big, b"z"]
+
+    def test_max_frame_size_length(self):
+        a, b = socket.socketpair()
+        _feed(a, [LENGTH_PREFIX_MAGIC + encode_frame(b"x" * 2000, FRAME_LENGTH)])
+        with pytest.raises(FrameTooLarge):
+            _read_all(FrameReader(b, max_frame_size=1000))
+
+    def test_max_frame_size_newline(self):
+        a, b = socket.socketpair()
+        _feed(a, [b"x" * 5000 + b"\n"])
+        with pytest.raises(FrameTooLarge):
+            _read_all(FrameReader(b, max_frame_size=1000, initial_size=512))
+
+
+class TestServerFraming:
+    """El servidor detecta el modo de cada conexión entrante"""
+
+    @pytest.mark.parametrize("mode,port", [("thread", 9650), ("asyncio", 9651)])
+    def test_length_prefixed_round_trip(self, mode, port):
+        def handler(msg, addr):
+            return {"type": "ECHO", "size": len(msg["value"])}
+
+        server = TCPServer('127.0.0.1', port, handler, mode=mode)
+        client = TCPServer('127.0.0.1', port + 10, lambda m, a: None, framing=FRAME_LENGTH)
+        server.start()
+        time.sleep(0.2)
+
+        value = "v\n" * 500000  # saltos de línea dentro del payload
+        assert client.request_response('127.0.0.1', port, {"type": "PUT", "value": value})["size"] == len(value)
+        # newline y length conviven en el mismo servidor
+        assert server.request_response('127.0.0.1', port, {"type": "PUT", "value": "abc"})["size"] == 3
+
+        client.stop()
+        server.stop()
+
+    @pytest.mark.parametrize("mode,port", [("thread", 9652), ("asyncio", 9653)])
+    def test_oversized_frame_closes_connection(self, mode, port):
+        messages = []
+        server = TCPServer('127.0.0.1', port, lambda m, a: messages.append(m), mode=mode, max_frame_size=1024)
+        server.start()
+        time.sleep(0.2)
+
+        server.send_message('127.0.0.1', port, {"type": "PUT", "value": "x" * 4096})
+        time.sleep(0.3)
+        server.send_message('127.0.0.1', port, {"type": "PUT", "value": "ok"})
+        time.sleep(0.3)
+
+        assert [m["value"] for m in messages] == ["ok"]
+
+        server.stop()
+
+    def test_invalid_framing(self):
+        with pytest.raises(ValueError):
+            TCPServer('127.0.0.1', 9654, lambda m, a: None, framing="xml")
@@ -0,0 +1,236 @@
+"""
+Pruebas para el transporte en memoria y el anillo de nodos (src/loopback.py)
+"""
+import sys
+import os
+import time
+from concurrent.futures import Future
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.loopback import LoopbackNetwork, LoopbackRing
+from src.overlay import ChordNode
+
+
+class TestLoopbackNetwork:
+
+    def test_request_response_copies_messages(self):
+        net = LoopbackNetwork()
+        received = []
+
+        def handler(msg, addr):
+            received.append((msg, addr))
+            msg["mutado"] = True
+            return {"type": "ACK", "n": msg["n"]}
+
+        net.register("10.0.0.1", 5000, handler)
+        client = net.register("10.0.0.2", 5000, lambda m, a: None)
+
+        msg = {"type": "PING", "n": 1}
+        assert client.request_response("10.0.0.1", 5000, msg) == {"type": "ACK", "n": 1}
+        assert "mutado" not in msg
+        assert received[0][1] == ("10.0.0.2", 5000)
+
+    def test_down_loss_and_latency(self):
+        net = LoopbackNetwork(latency=0.05, loss=0.0, seed=1)
+        received = []
+        net.register("10.0.0.1", 5000, lambda m, a: received.append(m))
+        client = net.register("10.0.0.2", 5000, lambda m, a: None)
+
+        assert client.send_message("10.0.0.1", 5000, {"type": "X"})
+        assert received == []  # todavía en vuelo
+        time.sleep(0.2)
+        assert len(received) == 1
+
+        net.set_down("10.0.0.1", 5000)
+        assert not client.send_message("10.0.0.1", 5000, {"type": "X"})
+        assert client.request_response("10.0.0.1", 5000, {"type": "X"}) is None
+        assert net.get_stats()["unreachable"] == 2
+
+        net.set_down("10.0.0.1", 5000, down=False)
+        net.latency, net.loss = 0.0, 1.0
+        assert client.request_response("10.0.0.1", 5000, {"type": "X"}) is None
+        assert net.get_stats()["lost"] == 1
+        net.close()
+
+
+class TestLoopbackRing:
+
+    def test_ring_converges_and_routes(self):
+        ring = LoopbackRing().build(40)
+        rounds = ring.stabilize_until_converged()
+        ring.fix_fingers()
+        assert rounds > 0 and ring.is_converged()
+
+        for i in range(50):
+            succ, hops = ring.lookup(f"clave-{i}")
+            assert succ[2] == ring.responsible_for(f"clave-{i}").node_id
+        assert ring.metrics.snapshot()["histograms"]["chord.lookup_hops"]["count"] == 50
+
+    def test_lookup_hops_are_logarithmic(self):
+        ring = LoopbackRing(storage=False).build(128)
+        ring.stabilize_until_converged()
+        ring.fix_fingers()
+
+        hops = []
+        for i in range(200):
+            succ, h = ring.lookup(f"clave-{i}")
+            assert succ[2] == ring.responsible_for(f"clave-{i}").node_id
+            hops.append(h)
+        # log2(128) = 7: Chord promedia ~log2(N)/2 saltos
+        assert sum(hops) / len(hops) <= 7
+        assert max(hops) <= 2 * 7
+
+    def test_incremental_fix_fingers(self):
+        ring = LoopbackRing(storage=False).build(32)
+        ring.stabilize_until_converged()
+        ring.fix_fingers()
+        node = ring.nodes[5]
+        expected = list(node.finger_table)
+        # los nodos de la tabla son distintos y están ordenados por distancia
+        assert len({f[2] for f in expected}) == len(expected)
+
+        node.finger_table = []
+        endpoint = ring.endpoints[node.node_id]
+        sent = endpoint.sent
+        node.fix_fingers_once()
+        # una pasada incremental hace a lo sumo FINGERS_PER_TICK búsquedas (cada una un request)
+        assert 0 < endpoint.sent - sent <= node.FINGERS_PER_TICK
+        for _ in range(20):
+            node.fix_fingers_once()
+        assert node.finger_table == expected
+
+    def test_lookup_skips_failed_hop(self):
+        ring = LoopbackRing(storage=False).build(24)
+        ring.stabilize_until_converged()
+        ring.stabilize(ChordNode.SUCCESSOR_LIST_SIZE)
+        origin = ring.nodes[0]
+        failed = origin.finger_table[-1]
+        ring.fail_node(next(n for n in ring.nodes if n.node_id == failed[2]))
+
+        # la primera consulta por ese salto falla y el nodo sale de los fingers; el lookup sigue por otro
+        key = format((failed.id_int + 1) % (1 << 160), "040x")
+        succ, _ = origin._find_successor_hops(key)
+        assert succ is not None
+        assert all(f[2] != failed[2] for f in origin.finger_table)
+
+        # con el anillo reparado el lookup llega al successor vivo del nodo caído
+        ring.advance(10.0)  # más que lo que tarda el detector de fallas en sospechar de un predecessor callado
+        ring.check_predecessors()
+        ring.stabilize_until_converged()
+        ordered = sorted(ring.live_nodes(), key=lambda n: n.node_int)
+        expected = next((n for n in ordered if n.node_int >= int(key, 16)), ordered[0])
+        assert origin._find_successor_hops(key)[0][2] == expected.node_id
+
+    def test_iterative_lookup(self):
+        ring = LoopbackRing(storage=False).build(40)
+        ring.stabilize_until_converged()
+        ring.fix_fingers()
+        forwarded = ring.network.get_stats()["by_type"].get("CHORD_FIND_SUCCESSOR", 0)
+        for i in range(100):
+            key = f"clave-{i}"
+            succ, hops = ring.lookup(key, ring.nodes[i % 40], iterative=True)
+            assert succ[2] == ring.responsible_for(key).node_id
+            assert hops <= 8
+        # el origen maneja los saltos: ningún nodo reenvía la consulta
+        stats = ring.network.get_stats()["by_type"]
+        assert stats.get("CHORD_FIND_SUCCESSOR", 0) == forwarded and stats["CHORD_NEXT_HOP"] > 0
+
+    def test_iterative_lookup_fails_over_slow_hop(self):
+        ring = LoopbackRing(storage=False).build(24)
+        ring.stabilize_until_converged()
+        ring.fix_fingers()
+        origin = ring.nodes[0]
+        slow = origin.finger_table[-1]
+        key = format((slow.id_int + 1) % (1 << 160), "040x")
+        expected = origin._find_successor_hops(key)[0]
+
+        # el mejor candidato no responde nunca: al vencer el timeout del salto se sigue con el siguiente
+        request_async = origin.request_async_callback
+        origin.set_request_async_callback(
+            lambda ip, port, msg: Future() if (ip, port) == slow[:2] else request_async(ip, port, msg))
+        failovers = ring.metrics.counter("chord.lookup_failovers").value
+        succ = origin.find_successor_iterative(key, alpha=1, hop_timeout=0.05)
+        assert succ == expected
+        assert ring.metrics.counter("chord.lookup_failovers").value == failovers + 1
+        assert slow[2] in origin._routing  # lento no es caído: sigue en el índice
+
+    def test_successor_list_converges(self):
+        ring = LoopbackRing(storage=False).build(12)
+        ring.stabilize_until_converged()
+        ring.stabilize(ChordNode.SUCCESSOR_LIST_SIZE, fix_fingers=False)
+        ordered = sorted(ring.nodes, key=lambda n: n.node_int)
+        r = ChordNode.SUCCESSOR_LIST_SIZE
+        for i, node in enumerate(ordered):
+            expected = [ordered[(i + j) % len(ordered)].node_id for j in range(1, r + 1)]
+            assert [s[2] for s in node.successor_list] == expected
+
+    def test_successor_failover(self):
+        ring = LoopbackRing(storage=False).build(12)
+        ring.stabilize_until_converged()
+        ring.stabilize(ChordNode.SUCCESSOR_LIST_SIZE, fix_fingers=False)
+        node = ring.nodes[4]
+        failed, following = node.successor_list[0], node.successor_list[1]
+        ring.fail_node(next(n for n in ring.nodes if n.node_id == failed[2]))
+
+        # un stabilize sin respuesta no alcanza (puede ser un mensaje perdido)
+        node.stabilize_once()
+        assert node.successor == failed
+
+        # cuando el detector de fallas lo sospecha, una sola ronda pasa al siguiente successor vivo
+        ring.advance(10.0)
+        node.stabilize_once()
+        assert node.successor == following
+        assert failed[2] not in [s[2] for s in node.successor_list]
+
+        # el resto del anillo se repara y los lookups vuelven a ser correctos
+        ring.advance(10.0)  # más que lo que tarda el detector de fallas en sospechar de un predecessor callado
+        ring.check_predecessors()
+        ring.stabilize_until_converged()
+        ring.fix_fingers()
+        for i in range(50):
+            key = f"clave-{i}"
+            succ, _ = ring.lookup(key, ring.live_nodes()[i % 11])
+            assert succ[2] == ring.responsible_for(key).node_id
+
+    def test_storage_over_loopback(self):
+        ring = LoopbackRing().build(10)
+        ring.stabilize_until_converged()
+        ring.fix_fingers()
+
+        writer = ring.storages[ring.nodes[3].node_id]
+        writer.put("usuario:1", "ana")
+        owner = ring.responsible_for("usuario:1")
+        assert ring.storages[owner.node_id].get_local("usuario:1")["value"] == "ana"
+
+        reader = ring.storages[ring.nodes[7].node_id]
+        assert reader.get_async("usuario:1").result(timeout=2)["value"] == "ana"
+
+        # la réplica queda en el primer nodo de la lista de successors del responsable
+        replica = owner.successor_list[0]
+        assert ring.storages[replica[2]].get_local("usuario:1")["is_replica"]
+
+    def test_batch_over_loopback(self):
+        ring = LoopbackRing().build(10)
+        ring.stabilize_until_converged()
+        ring.fix_fingers()
+
+        writer = ring.storages[ring.nodes[2].node_id]
+        items = {f"lote:{i}": i for i in range(30)}
+        result = writer.put_many(items)
+        assert result["batches"] <= len(ring.nodes)
+        for key, value in items.items():
+            owner = ring.responsible_for(key)
+            assert ring.storages[owner.node_id].get_local(key)["value"] == value
+
+    def test_failed_predecessor_is_detected(self):
+        ring = LoopbackRing().build(12)
+        ring.stabilize_until_converged()
+
+        failed = ring.nodes[5]
+        ring.fail_node(failed)
+        after = next(n for n in ring.live_nodes() if n.predecessor[2] == failed.node_id)
+        ring.advance(10.0)  # más que lo que tarda el detector de fallas en sospechar de un predecessor callado
+        ring.check_predecessors()
+        assert after.predecessor is None or after.predecessor[2] != failed.node_id
+        assert len(ring.live_nodes()) == 11
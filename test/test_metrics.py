@@ -0,0 +1,121 @@
+"""
+Pruebas para el registro de métricas (src/metrics.py) y su uso en los módulos
+"""
+import sys
+import os
+import json
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.metrics import MAX_LABEL_SETS, MetricsRegistry, stats_response
+from src.networking import TCPServer
+from src.overlay import ChordNode
+from src.storage import DistributedStorage
+
+
+class TestRegistry:
+
+    def test_counter_gauge_histogram(self):
+        registry = MetricsRegistry()
+        registry.counter("c").inc()
+        registry.counter("c").inc(2)
+        registry.gauge("g").set(7)
+        registry.gauge("g_fn", fn=lambda: 42)
+        h = registry.histogram("h")
+        for v in (0.001, 0.002, 0.2):
+            h.observe(v)
+
+        snap = registry.snapshot()
+        assert snap["counters"]["c"] == 3
+        assert snap["gauges"] == {"g": 7, "g_fn": 42}
+        assert snap["histograms"]["h"]["count"] == 3
+        assert snap["histograms"]["h"]["p50"] == 0.0025
+        assert snap["histograms"]["h"]["max"] == 0.2
+        json.dumps(snap)
+
+    def test_labels_are_bounded(self):
+        registry = MetricsRegistry()
+        for i in range(MAX_LABEL_SETS + 10):
+            registry.counter("msgs", type=f"T{i}").inc()
+        counters = registry.snapshot()["counters"]
+        assert len(counters) == MAX_LABEL_SETS + 1
+        assert counters["msgs{type=other}"] == 10
+
+    def test_remove_frees_label_set(self):
+        registry = MetricsRegistry()
+        for i in range(MAX_LABEL_SETS):
+            registry.gauge("g", node=f"n{i}")
+        assert registry.remove("g", node="n0") and not registry.remove("g", node="n0")
+        registry.gauge("g", fn=lambda: 1, node="nuevo")
+        assert registry.snapshot()["gauges"]["g{node=nuevo}"] == 1
+
+
+class TestComponentMetrics:
+
+    def test_server_records_bytes_and_handler_time(self):
+        registry = MetricsRegistry()
+
+        def handler(msg, addr):
+            if msg["type"] == "STATS":
+                return stats_response(registry, node_id="n1")
+            return {"type": "OK"}
+
+        server = TCPServer('127.0.0.1', 9610, handler, metrics=registry)
+        server.start()
+        time.sleep(0.2)
+
+        assert server.request_response('127.0.0.1', 9610, {"type": "PUT"})["type"] == "OK"
+        response = server.request_response('127.0.0.1', 9610, {"type": "STATS"})
+        server.stop()
+
+        assert response["type"] == "STATS_RESPONSE" and response["node_id"] == "n1"
+        metrics = response["metrics"]
+        assert metrics["counters"]["tcp.messages_in{type=PUT}"] == 1
+        assert metrics["counters"]["tcp.bytes_in"] > 0
+        assert metrics["counters"]["tcp.bytes_out"] > 0
+        assert metrics["counters"]["tcp.connections_accepted"] == 1
+        assert metrics["histograms"]["tcp.handler_seconds{type=PUT}"]["count"] == 1
+        assert metrics["gauges"]["tcp.multiplex{port=9610}"]["requests"] == 2
+
+    def test_storage_hits_and_misses(self):
+        registry = MetricsRegistry()
+        storage = DistributedStorage("a" * 40, lambda *a: None, metrics=registry)
+        storage.store_local("k", "v")
+        storage.handle_storage_message({"type": "GET", "data": {"key": "k"}})
+        storage.handle_storage_message({"type": "GET", "data": {"key": "x"}})
+
+        snap = registry.snapshot()
+        assert snap["counters"]["storage.get_hits"] == 1
+        assert snap["counters"]["storage.get_misses"] == 1
+        assert snap["gauges"]["storage.keys{node=aaaaaaaa}"] == 1
+
+    def test_lookup_hops(self):
+        registry = MetricsRegistry()
+        node = ChordNode('127.0.0.1', 9611, metrics=registry)
+        node.find_successor(node.node_id)
+        hops = registry.snapshot()["histograms"]["chord.lookup_hops"]
+        assert hops["count"] == 1 and hops["max"] == 0
+
+    def test_gauges_per_instance(self):
+        registry = MetricsRegistry()
+        a = DistributedStorage("a" * 40, lambda *args: None, metrics=registry, timeout_checker=False)
+        b = DistributedStorage("b" * 40, lambda *args: None, metrics=registry, timeout_checker=False)
+        a.store_local("k", "v")
+        gauges = registry.snapshot()["gauges"]
+        assert gauges["storage.keys{node=aaaaaaaa}"] == 1
+        assert gauges["storage.keys{node=bbbbbbbb}"] == 0
+
+        # al detenerse quita sus gauges (y deja de retener la instancia)
+        a.stop()
+        gauges = registry.snapshot()["gauges"]
+        assert "storage.keys{node=aaaaaaaa}" not in gauges
+        assert gauges["storage.keys{node=bbbbbbbb}"] == 0
+
+    def test_node_gauges_removed_on_leave(self):
+        registry = MetricsRegistry()
+        node = ChordNode('127.0.0.1', 9612, metrics=registry, maintenance=False)
+        key = f"chord.fingers{{node={node.node_id[:8]}}}"
+        assert key in registry.snapshot()["gauges"]
+        node.leave_network(graceful=False)
+        assert not any(name.startswith("chord.") for name in registry.snapshot()["gauges"])
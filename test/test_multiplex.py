@@ -0,0 +1,192 @@
+"""
+Pruebas para el transporte request/response multiplexado (src/multiplex.py)
+"""
+import sys
+import os
+import time
+import pytest
+from concurrent.futures import Future
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.networking import TCPServer
+from src.overlay import ChordNode
+from src.storage import DistributedStorage
+
+
+def _slow_echo(msg, addr):
+    """Responde después de msg["delay"] segundos"""
+    time.sleep(msg.get("delay", 0))
+    return {"type": "ECHO", "n": msg["n"]}
+
+
+class TestMultiplexedRequests:
+    """Pruebas de correlación, orden, timeouts y cancelación"""
+
+    @pytest.mark.parametrize("mode,port", [("thread", 9670), ("asyncio", 9671)])
+    def test_out_of_order_responses_share_one_connection(self, mode, port):
+        """Respuestas fuera de orden se entregan al future correcto"""
+        server = TCPServer('127.0.0.1', port, _slow_echo, mode=mode)
+        server.start()
+        time.sleep(0.2)
+
+        slow = server.request_async('127.0.0.1', port, {"type": "T", "n": 1, "delay": 0.5})
+        fast = server.request_async('127.0.0.1', port, {"type": "T", "n": 2, "delay": 0})
+
+        assert fast.result(timeout=2)["n"] == 2
+        assert not slow.done()
+        assert slow.result(timeout=2)["n"] == 1
+        assert server.get_multiplex_stats()["connections_opened"] == 1
+
+        server.stop()
+
+    def test_requests_overlap(self):
+        """Diez requests de 0.3s en paralelo tardan mucho menos que en serie"""
+        server = TCPServer('127.0.0.1', 9672, _slow_echo)
+        server.start()
+        time.sleep(0.2)
+
+        t0 = time.time()
+        futures = [server.request_async('127.0.0.1', 9672, {"type": "T", "n": i, "delay": 0.3})
+                   for i in range(10)]
+        assert [f.result(timeout=3)["n"] for f in futures] == list(range(10))
+        assert time.time() - t0 < 1.5
+
+        server.stop()
+
+    def test_per_request_timeout(self):
+        """Un request lento vence sin afectar a los demás"""
+        server = TCPServer('127.0.0.1', 9673, _slow_echo)
+        server.start()
+        time.sleep(0.2)
+
+        slow = server.request_async('127.0.0.1', 9673, {"type": "T", "n": 1, "delay": 1.0}, timeout=0.2)
+        with pytest.raises(TimeoutError):
+            slow.result(timeout=2)
+        assert server.request_response('127.0.0.1', 9673, {"type": "T", "n": 2})["n"] == 2
+        assert server.get_multiplex_stats()["timeouts"] == 1
+
+        server.stop()
+
+    def test_cancellation(self):
+        """Un request cancelado deja de estar pendiente"""
+        server = TCPServer('127.0.0.1', 9674, _slow_echo)
+        server.start()
+        time.sleep(0.2)
+
+        future = server.request_async('127.0.0.1', 9674, {"type": "T", "n": 1, "delay": 0.3})
+        assert future.cancel()
+        assert server.get_multiplex_stats()["pending"] == 0
+        time.sleep(0.5)
+        assert server.request_response('127.0.0.1', 9674, {"type": "T", "n": 2})["n"] == 2
+
+        server.stop()
+
+    def test_cancel_racing_with_response(self):
+        """Un cancel() que llega entre done() y set_result no mata al hilo lector"""
+        class RacyFuture(Future):
+            def done(self):
+                return False  # como si el cancel llegara justo después del chequeo
+
+        server = TCPServer('127.0.0.1', 9664, _slow_echo)
+        server.start()
+        time.sleep(0.2)
+
+        future = server.request_async('127.0.0.1', 9664, {"type": "T", "n": 1, "delay": 0.3})
+        conn = next(iter(server._mux_client._connections.values()))
+        corr_id = next(iter(conn.pending))
+        racy = RacyFuture()
+        racy.cancel()
+        conn.pending[corr_id] = racy
+        time.sleep(0.5)
+
+        # la misma conexión sigue entregando respuestas
+        assert server.request_response('127.0.0.1', 9664, {"type": "T", "n": 2})["n"] == 2
+        assert server.get_multiplex_stats()["connections_opened"] == 1
+        future.cancel()
+
+        server.stop()
+
+    def test_handler_without_response(self):
+        """Si el handler no responde, el future resuelve a None sin esperar el timeout"""
+        server = TCPServer('127.0.0.1', 9675, lambda m, a: None)
+        server.start()
+        time.sleep(0.2)
+
+        t0 = time.time()
+        assert server.request_response('127.0.0.1', 9675, {"type": "NOTIFY"}) is None
+        assert time.time() - t0 < 1
+
+        server.stop()
+
+    def test_connection_failure_fails_pending(self):
+        """Si el peer cae, los requests pendientes fallan con ConnectionError"""
+        server = TCPServer('127.0.0.1', 9676, _slow_echo)
+        server.start()
+        client = TCPServer('127.0.0.1', 9677, lambda m, a: None)
+        time.sleep(0.2)
+
+        future = client.request_async('127.0.0.1', 9676, {"type": "T", "n": 1, "delay": 1.0})
+        time.sleep(0.1)
+        server.stop()
+        with pytest.raises(ConnectionError):
+            future.result(timeout=2)
+
+        client.stop()
+
+
+class TestParallelOverlayAndStorage:
+    """Uso del transporte desde Chord y storage"""
+
+    def test_finger_table_with_async_callback(self):
+        """_update_finger_table resuelve los fingers remotos con consultas en paralelo"""
+        calls = []
+        answer = ('127.0.0.1', 9600, "f" * 40)
+
+        def handler(msg, addr):
+            calls.append(msg["key_id"])
+            time.sleep(0.2)
+            return {"type": "SUCCESSOR_RESPONSE", "successor_ip": answer[0],
+                    "successor_port": answer[1], "successor_id": answer[2]}
+
+        server = TCPServer('127.0.0.1', 9679, handler)
+        server.start()
+        time.sleep(0.2)
+
+        node = ChordNode('127.0.0.1', 9678)
+        base = int(node.node_id, 16)
+        # successor a distancia 2^150 (los fingers 0..150 se resuelven sin red) y un finger
+        # que precede a los inicios restantes
+        node.successor = ('127.0.0.1', 9601, format((base + 2 ** 150) % 2 ** 160, '040x'))
+        node.finger_table = [('127.0.0.1', 9679, format((base + 2 ** 150 + 1) % 2 ** 160, '040x'))]
+        node.set_request_async_callback(server.request_async)
+
+        t0 = time.time()
+        node._update_finger_table()
+
+        assert len(calls) == 9  # offsets 2^151 .. 2^159
+        assert time.time() - t0 < 9 * 0.2
+        assert node.finger_table[0] == node.successor
+        assert node.finger_table[-1] == answer
+
+        server.stop()
+
+    def test_storage_get_many(self):
+        """get_many lanza los GET en paralelo y junta los resultados"""
+        remote = DistributedStorage("b" * 40, lambda *a: None)
+        remote.store_local("k1", "v1")
+        server = TCPServer('127.0.0.1', 9669, lambda m, a: remote.handle_storage_message(m))
+        server.start()
+        time.sleep(0.2)
+
+        chord = ChordNode('127.0.0.1', 9668)
+        chord.successor = ('127.0.0.1', 9669, "b" * 40)
+        chord.get_responsible_node = lambda key: ('127.0.0.1', 9669, "b" * 40)
+        local = DistributedStorage(chord.node_id, lambda *a: None, chord)
+        local.set_request_async_callback(server.request_async)
+
+        results = local.get_many(["k1", "k2"])
+        assert results["k1"]["value"] == "v1"
+        assert results["k2"]["found"] is False
+
+        server.stop()
@@ -117,4 +117,92 @@ class TestTCPServer:
         
         assert len(messages) == 9  # 3 threads * 3 mensajes
         
-        server.stop()
\ No newline at end of file
+        server.stop()
+
+class TestAsyncioServer:
+    """Pruebas para TCPServer en modo asyncio"""
+
+    def test_invalid_mode(self):
+        """Un modo desconocido se rechaza al construir"""
+        with pytest.raises(ValueError):
+            TCPServer('127.0.0.1', 9690, lambda m, a: None, mode="fork")
+
+    def test_asyncio_send_and_receive(self):
+        """Handler síncrono ejecutado en el executor del event loop"""
+        messages = []
+
+        def handler(msg, addr):
+            messages.append(msg)
+
+        server = TCPServer('127.0.0.1', 9691, handler, mode="asyncio")
+        server.start()
+        time.sleep(0.2)
+
+        for i in range(3):
+            server.send_message('127.0.0.1', 9691, {"type": "TEST", "number": i})
+        time.sleep(0.5)
+
+        assert [m["number"] for m in messages] == [0, 1, 2]
+
+        server.stop()
+        assert server._running == False
+
+    def test_asyncio_async_handler_request_response(self):
+        """Handler async (corrutina) que responde por el mismo socket"""
+        async def handler(msg, addr):
+            return {"type": "ECHO", "value": msg["value"]}
+
+        server = TCPServer('127.0.0.1', 9692, handler, mode="asyncio")
+        server.start()
+        time.sleep(0.2)
+
+        response = server.request_response('127.0.0.1', 9692, {"type": "PING", "value": 42})
+        assert response == {"type": "ECHO", "value": 42}
+
+        server.stop()
+
+    def test_thread_mode_accepts_async_handler(self):
+        """El modo thread también acepta handlers async"""
+        async def handler(msg, addr):
+            return {"type": "ECHO", "value": msg["value"]}
+
+        server = TCPServer('127.0.0.1', 9693, handler)
+        server.start()
+        time.sleep(0.2)
+
+        response = server.request_response('127.0.0.1', 9693, {"type": "PING", "value": 7})
+        assert response["value"] == 7
+
+        server.stop()
+
+
+class TestBatch:
+    """Mensajes BATCH: el servidor desarma el lote y responde una sola vez"""
+
+    @pytest.mark.parametrize("mode,port", [("thread", 9730), ("asyncio", 9731)])
+    def test_request_batch(self, mode, port):
+        received = []
+
+        def handler(msg, addr):
+            received.append(msg["type"])
+            if msg["type"] == "PING":
+                return {"type": "PONG", "n": msg["n"]}
+            if msg["type"] == "FALLA":
+                raise RuntimeError("handler roto")
+            return None
+
+        server = TCPServer('127.0.0.1', port, handler, mode=mode)
+        server.start()
+        time.sleep(0.2)
+
+        results = server.request_batch('127.0.0.1', port, [
+            {"type": "PING", "n": 1}, {"type": "NOTA"}, {"type": "FALLA"}, {"type": "PING", "n": 2},
+        ])
+        assert results[0] == {"type": "PONG", "n": 1}
+        assert results[1] is None
+        assert results[2]["type"] == "ERROR"
+        assert results[3] == {"type": "PONG", "n": 2}
+        assert received == ["PING", "NOTA", "FALLA", "PING"]
+        assert server.metrics.histogram("tcp.batch_size").count >= 1
+
+        server.stop()
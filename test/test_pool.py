@@ -0,0 +1,121 @@
+"""
+Pruebas para el pool de conexiones salientes (src/pool.py) y su uso en TCPServer
+"""
+import sys
+import os
+import time
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.networking import TCPServer
+from src.pool import ConnectionPool
+
+
+class TestConnectionPool:
+    """Pruebas del pool sobre un servidor real"""
+
+    def test_reuses_connection_for_same_peer(self):
+        """Varios send_message al mismo peer usan una sola conexión"""
+        messages = []
+        server = TCPServer('127.0.0.1', 9680, lambda m, a: messages.append(m))
+        server.start()
+        time.sleep(0.2)
+
+        for i in range(5):
+            assert server.send_message('127.0.0.1', 9680, {"type": "TEST", "n": i})
+        time.sleep(0.5)
+
+        stats = server.get_pool_stats()
+        assert stats["opened"] == 1
+        assert stats["reused"] == 4
+        assert [m["n"] for m in messages] == list(range(5))
+
+        server.stop()
+
+    def test_request_channel_ignores_stale_send_responses(self):
+        """Las respuestas a send_message nunca se confunden con las de request_response"""
+        def handler(msg, addr):
+            return {"type": "ECHO", "n": msg["n"]}
+
+        server = TCPServer('127.0.0.1', 9681, handler)
+        server.start()
+        time.sleep(0.2)
+
+        server.send_message('127.0.0.1', 9681, {"type": "TEST", "n": 1})
+        for n in range(2, 5):
+            assert server.request_response('127.0.0.1', 9681, {"type": "TEST", "n": n})["n"] == n
+
+        server.stop()
+
+    def test_reconnects_after_peer_restart(self):
+        """Si el peer reinicia, la conexión ociosa se descarta y se reconecta"""
+        messages = []
+        receiver = TCPServer('127.0.0.1', 9682, lambda m, a: messages.append(m))
+        receiver.start()
+        sender = TCPServer('127.0.0.1', 9683, lambda m, a: None)
+        time.sleep(0.2)
+
+        assert sender.send_message('127.0.0.1', 9682, {"type": "A"})
+        time.sleep(0.2)
+        receiver.stop()
+        # cerrar también las conexiones aceptadas por el receptor
+        time.sleep(0.2)
+        receiver = TCPServer('127.0.0.1', 9682, lambda m, a: messages.append(m))
+        receiver.start()
+        time.sleep(0.2)
+
+        assert sender.send_message('127.0.0.1', 9682, {"type": "B"})
+        time.sleep(0.5)
+        assert [m["type"] for m in messages][-1] == "B"
+
+        receiver.stop()
+        sender.stop()
+
+    def test_idle_eviction(self):
+        """Las conexiones ociosas expiradas se cierran"""
+        server = TCPServer('127.0.0.1', 9684, lambda m, a: None, pool_idle_timeout=0.1)
+        server.start()
+        time.sleep(0.2)
+
+        server.send_message('127.0.0.1', 9684, {"type": "TEST"})
+        assert server.pool.idle_count(('127.0.0.1', 9684)) == 1
+        time.sleep(0.2)
+        assert server.pool.evict_idle() == 1
+        assert server.pool.idle_count() == 0
+
+        server.stop()
+
+    def test_max_size_bounds_idle_connections(self):
+        """Solo se guardan max_size conexiones ociosas por peer"""
+        pool = ConnectionPool(max_size=1)
+        server = TCPServer('127.0.0.1', 9685, lambda m, a: None)
+        server.start()
+        time.sleep(0.2)
+
+        c1 = pool.acquire('127.0.0.1', 9685)
+        c2 = pool.acquire('127.0.0.1', 9685)
+        pool.release(c1)
+        pool.release(c2)
+        assert pool.idle_count() == 1
+
+        pool.close_all()
+        server.stop()
+
+    def test_pool_disabled(self):
+        """pool_size=0 conserva una conexión por mensaje"""
+        server = TCPServer('127.0.0.1', 9686, lambda m, a: None, pool_size=0)
+        server.start()
+        time.sleep(0.2)
+
+        assert server.send_message('127.0.0.1', 9686, {"type": "TEST"})
+        assert server.pool is None
+        assert server.get_pool_stats() == {}
+
+        server.stop()
+
+    def test_unreachable_peer(self):
+        """Enviar a un puerto sin servidor retorna False"""
+        server = TCPServer('127.0.0.1', 9687, lambda m, a: None)
+        assert server.send_message('127.0.0.1', 9679, {"type": "TEST"}, timeout=1) is False
+        assert server.request_response('127.0.0.1', 9679, {"type": "TEST"}, timeout=1) is None
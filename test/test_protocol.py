@@ -9,7 +9,9 @@ import time
 
 sys.path.insert(0, os.path.abspath(os. path.join(os.path. dirname(__file__), '..')))
 
-from src.protocol import Message, MessageType, serializeMessage, deserialize_message
+from src.protocol import (
+    MAX_BATCH_ITEMS, Message, MessageType, batch_message, deserialize_message, run_batch, serializeMessage,
+)
 
 
 class TestMessage: 
@@ -227,4 +229,115 @@ class TestMessageTypes:
         reconstructed = deserialize_message(json_str)
         
         assert reconstructed.type == MessageType. HEARTBEAT
-        assert reconstructed.data["status"] == "alive"
\ No newline at end of file
+        assert reconstructed.data["status"] == "alive"
+
+class TestTypedMessages:
+    """Pruebas de Message con slots, tabla de tipos y validadores por tipo"""
+
+    def test_slots_without_dict(self):
+        """Message no tiene __dict__ por instancia"""
+        msg = Message(MessageType.PUT, "node1", {"key": "k", "value": "v"})
+        assert not hasattr(msg, "__dict__")
+        with pytest.raises(AttributeError):
+            msg.otro_campo = 1
+
+    def test_type_by_name_or_value(self):
+        """El tipo se acepta como enum, nombre o valor y siempre queda como MessageType"""
+        assert Message("CHORD_NOTIFY", "n1").type is MessageType.CHORD_NOTIFY
+        assert Message(MessageType.REPLICATE, "n1").type is MessageType.REPLICATE
+
+    def test_from_dict_wraps_without_copy(self):
+        """from_dict reutiliza el dict recibido y expone acceso estilo dict"""
+        wire = {"type": "CHORD_FIND_SUCCESSOR", "key_id": "ab" * 20, "requester_id": "cd" * 20}
+        msg = Message.from_dict(wire, strict=True)
+        assert msg.type is MessageType.CHORD_FIND_SUCCESSOR
+        assert msg.fields is wire
+        assert msg.get("type") == "CHORD_FIND_SUCCESSOR"
+        assert msg["key_id"] == "ab" * 20
+        assert "requester_id" in msg and "otro" not in msg
+        assert msg.get("otro", 5) == 5
+        assert msg.to_dict() == wire
+
+    def test_envelope_from_dict(self):
+        """Mensajes de storage: data es el mismo dict y los extras quedan en fields"""
+        data = {"key": "k"}
+        wire = {"type": "GET", "request_id": "GET_1", "sender_id": "n1", "sender_port": 5000, "data": data}
+        msg = Message.from_dict(wire, strict=True)
+        assert msg.data is data
+        assert msg.get("request_id") == "GET_1"
+        assert msg.to_dict() == wire
+
+    def test_strict_requires_fields(self):
+        """Con strict=True se exigen los campos obligatorios del tipo"""
+        with pytest.raises(ValueError):
+            Message.from_dict({"type": "CHORD_FIND_SUCCESSOR", "requester_id": "x"}, strict=True)
+        with pytest.raises(ValueError):
+            Message.from_dict({"type": "PUT", "data": {"value": 1}}, strict=True)
+        # sin strict solo se validan los tipos de los campos presentes
+        assert Message.from_dict({"type": "CHORD_FIND_SUCCESSOR"}).get("key_id") is None
+
+    def test_field_types_are_checked(self):
+        """Un campo con tipo incorrecto se rechaza"""
+        with pytest.raises(ValueError):
+            Message(MessageType.PUT, "n1", {"key": 123, "value": "v"})
+        with pytest.raises(ValueError):
+            Message.from_dict({"type": "CHORD_NOTIFY", "node_id": "a", "port": [1]})
+        with pytest.raises(ValueError):
+            Message.from_dict({"type": "GET", "data": "no es dict"})
+
+    def test_unknown_type_in_dict(self):
+        """Tipos desconocidos o no hasheables se rechazan con ValueError"""
+        with pytest.raises(ValueError):
+            Message.from_dict({"type": "NO_EXISTE"})
+        with pytest.raises(ValueError):
+            Message.from_dict({"type": ["PUT"]})
+        with pytest.raises(ValueError):
+            Message.from_dict(["PUT"])
+
+
+class TestBatch:
+    """Pruebas del envoltorio BATCH y de run_batch"""
+
+    def test_batch_message(self):
+        """batch_message acepta dicts y Messages y valida como BATCH"""
+        put = Message(MessageType.PUT, "n1", {"key": "k", "value": 1})
+        batch = batch_message([put, {"type": "GET", "data": {"key": "k"}}], sender_id="n1")
+        assert batch["type"] == "BATCH" and batch["sender_id"] == "n1"
+        assert batch["messages"][0]["data"] == {"key": "k", "value": 1}
+        assert Message.from_dict(batch, strict=True).type is MessageType.BATCH
+        with pytest.raises(ValueError):
+            Message.from_dict({"type": "BATCH"}, strict=True)
+
+    def test_results_in_order(self):
+        """Una respuesta por sub-mensaje, en orden; None si el handler no respondió"""
+        def handle(msg):
+            if msg["type"] == "PING":
+                return {"type": "PONG", "n": msg["n"]}
+            return None
+
+        response = run_batch(batch_message([{"type": "PING", "n": 1}, {"type": "NOTA"},
+                                            {"type": "PING", "n": 2}]), handle)
+        assert response["type"] == "BATCH_RESPONSE"
+        assert response["results"] == [{"type": "PONG", "n": 1}, None, {"type": "PONG", "n": 2}]
+
+    def test_item_errors_do_not_stop_batch(self):
+        """Un item inválido o que falla responde ERROR y el resto se procesa"""
+        handled = []
+
+        def handle(msg):
+            if msg.get("boom"):
+                raise RuntimeError("falló")
+            handled.append(msg["type"])
+            return {"type": "ACK"}
+
+        batch = batch_message([{"type": "A", "boom": True}, "texto", batch_message([]), {"type": "B"}])
+        results = run_batch(batch, handle)["results"]
+        assert [r["type"] for r in results] == ["ERROR", "ERROR", "ERROR", "ACK"]
+        assert "falló" in results[0]["error"] and "anidado" in results[2]["error"]
+        assert handled == ["B"]
+
+    def test_batch_limits(self):
+        """messages debe ser una lista de a lo sumo MAX_BATCH_ITEMS mensajes"""
+        assert run_batch({"type": "BATCH", "messages": "x"}, lambda m: None)["type"] == "ERROR"
+        too_many = batch_message([{"type": "PING"}] * (MAX_BATCH_ITEMS + 1))
+        assert run_batch(too_many, lambda m: None)["type"] == "ERROR"
@@ -0,0 +1,153 @@
+"""
+Pruebas para el cache de responsables por rango (src/range_cache.py) y su uso en ChordNode
+"""
+import sys
+import os
+import hashlib
+import random
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.loopback import LoopbackRing
+from src.range_cache import RangeCache
+from src.ring import RING_SIZE, NodeRef, to_hex
+
+
+def _ref(value: int, port: int = 5000) -> NodeRef:
+    return NodeRef("10.0.0.1", port, to_hex(value))
+
+
+class TestRangeCache:
+    """Pruebas del cache sin red"""
+
+    def test_interval_covers_range(self):
+        cache = RangeCache()
+        cache.put(100, _ref(200))
+        assert cache.get(150).id_int == 200
+        assert cache.get(200).id_int == 200
+        assert cache.get(100) is None and cache.get(201) is None
+        assert cache.get_stats()["hits"] == 2
+
+    def test_wraparound_and_whole_ring(self):
+        cache = RangeCache()
+        cache.put(RING_SIZE - 10, _ref(10))
+        assert cache.get(RING_SIZE - 1).id_int == 10 and cache.get(5).id_int == 10
+        assert cache.get(11) is None
+
+        # un solo nodo: (n, n] es todo el anillo y reemplaza lo anterior
+        cache.put(500, _ref(500))
+        assert len(cache) == 1 and cache.get(11).id_int == 500
+
+    def test_overlapping_intervals_are_replaced(self):
+        cache = RangeCache()
+        cache.put(100, _ref(200))
+        cache.put(200, _ref(300))
+        # entró un nodo en 150: los rangos viejos que lo pisan se descartan
+        cache.put(100, _ref(150))
+        assert cache.get(120).id_int == 150
+        assert cache.get(180) is None
+        assert cache.get(250).id_int == 300
+
+    def test_lru_bound(self):
+        cache = RangeCache(max_entries=2)
+        cache.put(0, _ref(10))
+        cache.put(10, _ref(20))
+        cache.get(5)                 # (0, 10] pasa a ser el más reciente
+        cache.put(20, _ref(30))
+        assert cache.get(15) is None and cache.get(5).id_int == 10
+        assert cache.get_stats()["evicted"] == 1
+
+    def test_discard_and_invalidate(self):
+        cache = RangeCache()
+        cache.put(0, _ref(10))
+        cache.put(10, _ref(20))
+        assert cache.discard(to_hex(10)) and not cache.discard(to_hex(10))
+        assert cache.discard_key(15) and cache.get(15) is None
+        cache.put(0, _ref(10))
+        cache.invalidate()
+        assert len(cache) == 0 and cache.epoch == 1
+
+    def test_matches_sorted_ring(self):
+        rng = random.Random(3)
+        nodes = sorted(rng.randrange(RING_SIZE) for _ in range(50))
+        cache = RangeCache()
+        for i, node in enumerate(nodes):
+            cache.put(nodes[i - 1], _ref(node))
+        for _ in range(500):
+            key = rng.randrange(RING_SIZE)
+            expected = next((n for n in nodes if n >= key), nodes[0])
+            assert cache.get(key).id_int == expected
+
+
+class TestChordOwnerCache:
+    """get_responsible_node sobre un anillo en memoria"""
+
+    def test_repeated_lookups_send_no_messages(self):
+        ring = LoopbackRing(storage=False).build(20)
+        ring.stabilize_until_converged()
+        ring.fix_fingers()
+        node = ring.nodes[3]
+        keys = [f"clave-{i}" for i in range(200)]
+        for key in keys:
+            assert node.get_responsible_node(key)[2] == ring.responsible_for(key).node_id
+
+        endpoint = ring.endpoints[node.node_id]
+        sent = endpoint.sent
+        for key in keys:
+            assert node.get_responsible_node(key)[2] == ring.responsible_for(key).node_id
+        assert endpoint.sent == sent
+        # una entrada por rango de nodo, no por clave
+        assert len(node._owner_cache) <= len(ring.nodes)
+
+    def test_neighbor_change_invalidates(self):
+        ring = LoopbackRing(storage=False).build(10)
+        ring.stabilize_until_converged()
+        node = ring.nodes[0]
+        node.get_responsible_node("clave")
+        epoch = node._owner_cache.epoch
+        node.successor = node.successor  # sin cambio: el cache sigue
+        assert node._owner_cache.epoch == epoch
+        node.predecessor = None
+        assert node._owner_cache.epoch == epoch + 1 and len(node._owner_cache) == 0
+
+    def test_stale_owner_is_reported_by_storage(self):
+        ring = LoopbackRing().build(10)
+        ring.stabilize_until_converged()
+        ring.fix_fingers()
+        reader = ring.nodes[0]
+        key = next(f"k{i}" for i in range(1000)
+                   if ring.responsible_for(f"k{i}") not in (reader, ring.nodes[1]))
+        owner = ring.responsible_for(key)
+        ring.storages[owner.node_id].store_local(key, "v")
+
+        # el cache apunta a un nodo que no es responsable de la clave
+        wrong = ring.nodes[1]
+        key_int = int(hashlib.sha1(key.encode()).hexdigest(), 16)
+        reader._owner_cache.put((key_int - 1) % RING_SIZE, NodeRef(wrong.ip, wrong.port, wrong.node_id))
+        assert reader.get_responsible_node(key)[2] == wrong.node_id
+
+        result = ring.storages[reader.node_id].get_async(key).result(timeout=2)
+        assert result["found"] and result["value"] == "v"
+        assert reader.get_responsible_node(key)[2] == owner.node_id
+
+    def test_stale_owner_forwards_put(self):
+        ring = LoopbackRing().build(10)
+        ring.stabilize_until_converged()
+        ring.fix_fingers()
+        writer = ring.nodes[0]
+        key = next(f"k{i}" for i in range(1000)
+                   if ring.responsible_for(f"k{i}") not in (writer, ring.nodes[1]))
+        owner = ring.responsible_for(key)
+
+        # el cache del que escribe apunta a un nodo que no es responsable de la clave
+        wrong = ring.nodes[1]
+        key_int = int(hashlib.sha1(key.encode()).hexdigest(), 16)
+        writer._owner_cache.put((key_int - 1) % RING_SIZE, NodeRef(wrong.ip, wrong.port, wrong.node_id))
+        assert writer.get_responsible_node(key)[2] == wrong.node_id
+
+        ring.storages[writer.node_id].put(key, "v")
+        assert ring.storages[owner.node_id].get_local(key)["value"] == "v"
+        assert ring.storages[wrong.node_id].get_local(key) is None or \
+            ring.storages[wrong.node_id].get_local(key)["is_replica"]
+        # el responsable viejo contestó owner False: el siguiente PUT ya va directo
+        assert writer.get_responsible_node(key)[2] == owner.node_id
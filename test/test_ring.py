@@ -0,0 +1,169 @@
+"""
+Pruebas para la aritmética del anillo (src/ring.py) y su uso en ChordNode
+"""
+import sys
+import os
+import pickle
+import random
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.overlay import ChordNode, _is_between
+from src.ring import (
+    RING_SIZE, NodeRef, RoutingIndex, between, between_many, closest_preceding, distance, finger_starts, to_hex,
+    to_int,
+)
+
+
+def _reference_between(key, start, end, inclusive):
+    """Definición directa por casos (la de la versión hex de _is_between)."""
+    if start < end:
+        return start < key <= end if inclusive else start < key < end
+    if start > end:
+        return (start < key or key <= end) if inclusive else (start < key or key < end)
+    return inclusive and key == start
+
+
+class TestRingArithmetic:
+    """Intervalos y conversiones sobre ints"""
+
+    @pytest.mark.parametrize("inclusive", [True, False])
+    def test_between_matches_reference(self, inclusive):
+        rng = random.Random(7)
+        small = [0, 1, 5, 10, 50, RING_SIZE - 1]
+        for _ in range(2000):
+            key, start, end = (rng.choice(small) if rng.random() < 0.5 else rng.randrange(RING_SIZE)
+                               for _ in range(3))
+            assert between(key, start, end, inclusive) == _reference_between(key, start, end, inclusive)
+
+    def test_wraparound(self):
+        assert between(5, 50, 10)
+        assert between(RING_SIZE - 1, 50, 10)
+        assert not between(30, 50, 10)
+        assert between(10, 50, 10) and not between(10, 50, 10, inclusive=False)
+        assert between(7, 7, 7) and not between(7, 7, 7, inclusive=False)
+
+    def test_between_many(self):
+        keys = [0, 5, 10, 11, 49, 50, 51]
+        assert between_many(keys, 50, 10) == [between(k, 50, 10) for k in keys]
+        assert between_many(keys, 10, 50, inclusive=False) == [between(k, 10, 50, False) for k in keys]
+        assert between_many([3, 4], 4, 4) == [False, True]
+
+    def test_hex_round_trip_and_fingers(self):
+        node_id = "ff" * 20
+        assert to_hex(to_int(node_id)) == node_id
+        assert to_hex(1) == "0" * 39 + "1"
+        starts = finger_starts(to_int(node_id), 3)
+        assert starts == [0, 1, 3]  # da la vuelta por 0
+        assert distance(RING_SIZE - 1, 2) == 3
+
+
+class TestNodeRef:
+    """NodeRef se comporta como la tupla (ip, port, node_id)"""
+
+    def test_tuple_compatibility(self):
+        ref = NodeRef("10.0.0.1", 5000, "0a" * 20)
+        ip, port, node_id = ref
+        assert ref == ("10.0.0.1", 5000, "0a" * 20)
+        assert (ip, port, node_id) == (ref.ip, ref.port, ref.node_id)
+        assert ref.id_int == int("0a" * 20, 16)
+        assert NodeRef.of(ref) is ref and NodeRef.of(None) is None
+        assert pickle.loads(pickle.dumps(ref)).id_int == ref.id_int
+
+    def test_invalid_id_has_no_int(self):
+        assert NodeRef("10.0.0.1", 5000, None).id_int is None
+        assert NodeRef("10.0.0.1", 5000, "no-hex").id_int is None
+
+    def test_closest_preceding(self):
+        refs = [NodeRef("h", i, to_hex(i * 10)) for i in range(1, 6)]  # 10..50
+        assert closest_preceding(refs, 0, 35).port == 3
+        assert closest_preceding(refs, 0, 10) is None
+        assert closest_preceding(refs, 0, 0) is None
+        assert closest_preceding(refs, 0, 1000).port == 5
+
+
+class TestRoutingIndex:
+    """Índice ordenado de nodos conocidos con closest_preceding por bisect"""
+
+    def test_add_replace_remove(self):
+        index = RoutingIndex(0)
+        for i in (3, 1, 2):
+            index.add(NodeRef("h", i, to_hex(i * 10)))
+        index.add(NodeRef("h", 0, to_hex(0)))  # el dueño no entra
+        index.add(None)
+        assert [ref.port for ref in index.nodes()] == [1, 2, 3]
+
+        index.add(NodeRef("otra", 9, to_hex(20)))  # mismo ID, nueva dirección
+        assert len(index) == 3 and index.get(to_hex(20)).ip == "otra"
+        assert index.remove(to_hex(20)) and not index.remove(to_hex(20))
+        assert to_hex(20) not in index and [ref.port for ref in index.nodes()] == [1, 3]
+
+    def test_wraparound(self):
+        owner = RING_SIZE - 100
+        index = RoutingIndex(owner)
+        for value in (RING_SIZE - 50, 10, 500):
+            index.add(NodeRef("h", value % 1000, to_hex(value)))
+        assert [ref.id_int for ref in index.nodes()] == [RING_SIZE - 50, 10, 500]
+        assert index.closest_preceding(200).id_int == 10
+        assert index.closest_preceding(RING_SIZE - 10).id_int == RING_SIZE - 50
+        assert index.closest_preceding(owner) is None
+
+    def test_preceding(self):
+        index = RoutingIndex(0)
+        for i in range(1, 6):
+            index.add(NodeRef("h", i, to_hex(i * 10)))  # 10..50
+        assert [ref.port for ref in index.preceding(35, 2)] == [3, 2]
+        assert [ref.port for ref in index.preceding(35, 10)] == [3, 2, 1]
+        assert index.preceding(10, 3) == []
+
+    def test_matches_linear_scan(self):
+        rng = random.Random(11)
+        owner = rng.randrange(RING_SIZE)
+        index = RoutingIndex(owner)
+        refs = [NodeRef("h", i, to_hex(rng.randrange(RING_SIZE))) for i in range(200)]
+        for ref in refs:
+            index.add(ref)
+        ordered = sorted(refs, key=lambda ref: distance(owner, ref.id_int))
+        for _ in range(500):
+            key = rng.randrange(RING_SIZE)
+            assert index.closest_preceding(key) == closest_preceding(ordered, owner, key)
+        for ref in ordered[::3]:
+            assert index.remove(ref.node_id)
+        ordered = [ref for ref in ordered if ref.node_id in index]
+        for _ in range(200):
+            key = rng.randrange(RING_SIZE)
+            assert index.closest_preceding(key) == closest_preceding(ordered, owner, key)
+
+
+class TestChordNodeIds:
+    """ChordNode guarda successor, predecessor y fingers como NodeRef"""
+
+    def test_assigned_tuples_become_refs(self):
+        node = ChordNode("127.0.0.1", 9990, maintenance=False)
+        node.successor = ("127.0.0.1", 9991, "ab" * 20)
+        node.predecessor = ("127.0.0.1", 9992, "cd" * 20)
+        node.finger_table = [("127.0.0.1", 9991, "ab" * 20)]
+        assert node.node_int == int(node.node_id, 16)
+        assert isinstance(node.successor, NodeRef) and node.successor.id_int == int("ab" * 20, 16)
+        assert isinstance(node.predecessor, NodeRef)
+        assert all(isinstance(f, NodeRef) for f in node.finger_table)
+
+    def test_routing_uses_every_known_node(self):
+        node = ChordNode("127.0.0.1", 9990, maintenance=False)
+        start = node.node_int
+        node.successor = ("127.0.0.1", 9991, to_hex(start + 10))
+        node.finger_table = [("127.0.0.1", 9992, to_hex(start + 1000))]
+        node._remember_node(to_hex(start + 5000), "127.0.0.1", 9993)
+        assert node._closest_preceding_node(to_hex(start + 6000)).port == 9993
+        assert node._closest_preceding_node(to_hex(start + 2000)).port == 9992
+
+        node._forget_node(to_hex(start + 5000))
+        assert node._closest_preceding_node(to_hex(start + 6000)).port == 9992
+        assert to_hex(start + 5000) not in node.neighbors
+
+    def test_is_between_keeps_hex_api(self):
+        node = ChordNode("127.0.0.1", 9990, maintenance=False)
+        a, b, c = to_hex(10), to_hex(20), to_hex(30)
+        assert node._is_between(b, a, c) and not node._is_between(a, b, c)
+        assert _is_between(None, c, b, a)
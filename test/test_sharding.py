@@ -0,0 +1,96 @@
+"""
+Pruebas para el sharding multi-proceso con SO_REUSEPORT (src/sharding.py)
+"""
+import sys
+import os
+import json
+import socket
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.sharding import (
+    OWNER_SHARD, SHARD_FIELD, RoutingSnapshot, ShardRouter, ShardSupervisor, shard_for_key,
+)
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "SO_REUSEPORT") or not hasattr(os, "fork"),
+                                reason="requiere fork y SO_REUSEPORT")
+
+
+def _request(port, msg):
+    """Una conexión nueva por request para que el kernel la reparta entre shards."""
+    with socket.create_connection(('127.0.0.1', port), timeout=5) as sock:
+        sock.sendall(json.dumps(msg).encode() + b"\n")
+        data = b""
+        while not data.endswith(b"\n"):
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            data += chunk
+    return json.loads(data)
+
+
+class TestRoutingSnapshot:
+
+    def test_publish_and_read(self):
+        snapshot = RoutingSnapshot(size=4096)
+        assert snapshot.read() is None
+        snapshot.publish({"successor": ["127.0.0.1", 5000, "ab"]})
+        reader = RoutingSnapshot(name=snapshot.name)
+        assert reader.read()["successor"] == ["127.0.0.1", 5000, "ab"]
+        snapshot.publish({"successor": None})
+        assert reader.read()["successor"] is None
+        reader.close()
+        snapshot.close()
+        snapshot.unlink()
+
+    def test_rejects_oversized_state(self):
+        snapshot = RoutingSnapshot(size=64)
+        with pytest.raises(ValueError):
+            snapshot.publish({"finger_table": ["x" * 100]})
+        snapshot.close()
+        snapshot.unlink()
+
+
+class TestShardRouter:
+
+    def test_routes_by_key_and_control_to_owner(self):
+        forwarded = []
+        router = ShardRouter(1, 4, [7000, 7001, 7002, 7003],
+                             forward=lambda ip, port, msg: forwarded.append((port, msg)) or {"ok": True},
+                             local_handler=lambda msg, addr: {"local": True})
+
+        key = next(k for k in (f"k{i}" for i in range(100)) if shard_for_key(k, 4) == 1)
+        assert router.handle({"type": "GET", "data": {"key": key}}, None) == {"local": True}
+
+        other = next(k for k in (f"k{i}" for i in range(100)) if shard_for_key(k, 4) == 3)
+        router.handle({"type": "PUT", "data": {"key": other, "value": 1}}, None)
+        router.handle({"type": "CHORD_NOTIFY"}, None)
+        assert [port for port, _ in forwarded] == [7003, 7000 + OWNER_SHARD]
+        assert forwarded[0][1][SHARD_FIELD] == 1
+
+        # un mensaje ya reenviado se atiende localmente
+        assert router.handle({"type": "CHORD_NOTIFY", SHARD_FIELD: 0}, None) == {"local": True}
+
+
+class TestShardSupervisor:
+
+    def test_requests_land_on_owning_shard(self):
+        def factory(ctx):
+            def handler(msg, addr):
+                if msg["type"] == "CHORD_HEARTBEAT":
+                    return {"type": "HEARTBEAT_ACK", "shard": ctx.index}
+                return {"type": "RESULT", "shard": ctx.index, "key": msg["data"]["key"]}
+            return handler
+
+        supervisor = ShardSupervisor('127.0.0.1', 9620, 3, factory, internal_base_port=9720)
+        supervisor.start()
+        try:
+            assert supervisor.alive() == 3
+            for i in range(30):
+                key = f"clave-{i}"
+                response = _request(9620, {"type": "GET", "data": {"key": key}})
+                assert response["shard"] == shard_for_key(key, 3)
+            assert _request(9620, {"type": "CHORD_HEARTBEAT"})["shard"] == OWNER_SHARD
+        finally:
+            supervisor.stop()
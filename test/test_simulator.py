@@ -0,0 +1,42 @@
+"""
+Pruebas para el simulador de eventos discretos (src/simulator.py)
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.simulator import Simulator
+
+
+def _run(seed):
+    sim = Simulator(seed=seed, latency=0.01, jitter=0.01)
+    sim.bootstrap(60)
+    sim.add_lookups(40, start=1, duration=4)
+    sim.add_storage_ops(10, 10, start=1, duration=4)
+    sim.add_churn(joins=3, at=2)
+    sim.run(until=20)
+    return sim
+
+
+class TestSimulator:
+
+    def test_same_seed_same_report(self):
+        a, b = _run(7).report(), _run(7).report()
+        assert a == b
+        assert _run(8).report() != a
+
+    def test_lookups_and_virtual_latency(self):
+        sim = _run(1)
+        report = sim.report()
+        assert report["virtual_time_s"] == 20
+        assert report["lookup_correct"] == 40
+        # cada hop remoto cuesta una ida y vuelta de al menos 2 * latency
+        hops = sum(sim.lookup_hops)
+        assert sum(sim.lookup_latency) >= hops * 2 * 0.01
+        assert report["messages"]["per_node"]["count"] == 63
+
+    def test_time_to_converge_after_joins(self):
+        convergence = _run(3).report()["convergence"]
+        assert convergence[0]["joins"] == 3
+        assert 0 < convergence[0]["time_to_converge"] < 18
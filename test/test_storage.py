@@ -40,6 +40,37 @@ def test_handle_get_missing(storage):
     response = storage.handle_storage_message(msg)
     assert response["data"]["found"] == False
 
+def test_handle_invalid_message(storage):
+    msg = {"type": "PUT", "data": {"key": 42, "value": "x"}}
+    response = storage.handle_storage_message(msg)
+    assert response["type"] == "ERROR"
+    assert "key" in response["data"]["error"]
+
+def test_handle_batch(storage):
+    storage.store_local("b_get", "v0")
+    msg = {"type": "BATCH", "messages": [
+        {"type": "PUT", "data": {"key": "b_put", "value": "v1"}},
+        {"type": "GET", "data": {"key": "b_get"}},
+        {"type": "PUT", "data": {"key": 7, "value": "x"}},
+    ]}
+    response = storage.handle_storage_message(msg)
+    assert response["type"] == "BATCH_RESPONSE"
+    put, get, invalid = response["results"]
+    assert put["data"]["status"] == "stored"
+    assert get["data"]["value"] == "v0"
+    assert invalid["type"] == "ERROR"
+    assert storage.get_local("b_put")["value"] == "v1"
+
+def test_put_many(storage):
+    storage.chord = Mock()
+    storage.chord.get_responsible_node.side_effect = (
+        lambda key: ("10.0.0.1", 5000, "n1") if key.startswith("a") else ("10.0.0.2", 5000, "n2"))
+    result = storage.put_many({"a1": 1, "a2": 2, "b1": 3})
+    assert result["keys"] == 3 and result["batches"] == 2
+    batches = {c.args[0]: c.args[2] for c in storage.send_callback.call_args_list}
+    assert [m["data"]["key"] for m in batches["10.0.0.1"]["messages"]] == ["a1", "a2"]
+    assert batches["10.0.0.2"]["type"] == "BATCH"
+
 def test_stats(storage):
     storage.store_local("p1", "v1")
     storage.store_local("r1", "v2", is_replica=True)
@@ -0,0 +1,66 @@
+"""
+Pruebas para las trazas estructuradas (src/tracing.py)
+"""
+import sys
+import os
+import json
+import logging
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import tracing
+
+
+class _Unformattable:
+    """Falla si alguien intenta formatearlo."""
+
+    def __str__(self):
+        raise AssertionError("no debería formatearse")
+
+    __repr__ = __str__
+
+
+class TestTracer:
+
+    def teardown_method(self):
+        tracing.reset()
+
+    def test_hot_path_subsystems_off_by_default(self):
+        tracer = tracing.get_tracer("tcp")
+        assert not tracer.enabled(logging.DEBUG)
+        tracer.debug("msg_in", msg=_Unformattable())
+        assert tracer.emitted == 0
+
+    def test_per_subsystem_levels(self, caplog):
+        tracing.configure(levels={"storage": "debug"})
+        with caplog.at_level(logging.DEBUG, logger="trace"):
+            tracing.get_tracer("storage").debug("stored", key="k1")
+            tracing.get_tracer("tcp").debug("msg_in", msg=_Unformattable())
+        assert [r.getMessage() for r in caplog.records] == ["stored key=k1"]
+
+    def test_sampling(self):
+        tracing.configure(levels={"tcp": "debug"}, sample={"tcp": 0.0})
+        tracer = tracing.get_tracer("tcp")
+        for _ in range(100):
+            tracer.debug("msg_in")
+        assert tracer.emitted == 0 and tracer.sampled_out == 100
+
+    def test_async_file_sink(self, tmp_path):
+        path = tmp_path / "trazas.jsonl"
+        sink = tracing.AsyncFileSink(str(path))
+        tracing.configure(levels={"tcp": "debug"}, sink=sink)
+        msg = {"type": "PUT", "key": "k"}
+        tracing.get_tracer("tcp").debug("msg_in", peer=("127.0.0.1", 1), msg=msg)
+        msg["type"] = "CAMBIADO"
+        assert sink.flush()
+
+        events = [json.loads(line) for line in path.read_text().splitlines()]
+        assert events[0]["event"] == "msg_in"
+        assert events[0]["subsystem"] == "tcp"
+        assert events[0]["msg"]["type"] == "PUT"
+
+    def test_configure_from_env(self):
+        tracing.configure_from_env({"CHORD_TRACE": "tcp=debug, chord=warning", "CHORD_TRACE_SAMPLE": "tcp=0.5"})
+        assert tracing.get_tracer("tcp").enabled(logging.DEBUG)
+        assert tracing.get_tracer("tcp").sample == 0.5
+        assert not tracing.get_tracer("chord").enabled(logging.INFO)
@@ -0,0 +1,166 @@
+"""
+Pruebas para el pool de workers con cola acotada (src/workers.py)
+"""
+import sys
+import os
+import threading
+import time
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.networking import TCPServer
+from src.workers import BUSY, LANE_CONTROL, LANE_DATA, PriorityWorkerPool, WorkerPool, classify_message
+
+
+class TestWorkerPool:
+    """Pruebas unitarias del WorkerPool"""
+
+    def test_executes_tasks(self):
+        pool = WorkerPool(num_workers=2, queue_size=10)
+        pool.start()
+        futures = [pool.submit(lambda x: x * 2, i) for i in range(5)]
+        assert [f.result(timeout=1) for f in futures] == [0, 2, 4, 6, 8]
+        assert pool.get_stats()["processed"] == 5
+        pool.stop()
+
+    def test_rejects_when_queue_full(self):
+        """Con la cola llena submit retorna None y cuenta el rechazo"""
+        gate = threading.Event()
+        pool = WorkerPool(num_workers=1, queue_size=1)
+        pool.start()
+
+        running = pool.submit(gate.wait)
+        time.sleep(0.1)  # el worker toma la primera tarea
+        queued = pool.submit(lambda: "ok")
+        assert pool.submit(lambda: "rechazada") is None
+
+        stats = pool.get_stats()
+        assert stats["queue_depth"] == 1
+        assert stats["rejected"] == 1
+
+        gate.set()
+        assert queued.result(timeout=1) == "ok"
+        pool.stop()
+
+    def test_invalid_size(self):
+        with pytest.raises(ValueError):
+            WorkerPool(num_workers=0)
+
+    def test_reports_latency_percentiles(self):
+        pool = WorkerPool(num_workers=1, queue_size=10)
+        pool.start()
+        for f in [pool.submit(time.sleep, 0.01) for _ in range(3)]:
+            f.result(timeout=1)
+        stats = pool.get_stats()
+        assert stats["latency_p99_ms"] >= 10
+        assert stats["wait_p99_ms"] >= 10  # el tercero esperó a los dos primeros
+        pool.stop()
+
+
+class TestPriorityWorkerPool:
+    """Carriles de prioridad: control y data con workers y colas separados"""
+
+    def test_classify(self):
+        assert classify_message({"type": "CHORD_NOTIFY"}) == LANE_CONTROL
+        assert classify_message({"type": "HEARTBEAT"}) == LANE_CONTROL
+        assert classify_message({"type": "PUT"}) == LANE_DATA
+        assert classify_message({"type": "JOIN"}) == LANE_DATA
+        assert classify_message({}) == LANE_DATA
+
+    def test_control_not_blocked_by_full_data_lane(self):
+        gate = threading.Event()
+        pool = PriorityWorkerPool({LANE_CONTROL: (1, 5), LANE_DATA: (1, 1)})
+        pool.start()
+
+        pool.submit_message({"type": "PUT"}, gate.wait)
+        time.sleep(0.1)
+        pool.submit_message({"type": "PUT"}, gate.wait)
+        assert pool.submit_message({"type": "REPLICATE"}, gate.wait) is None
+
+        control = pool.submit_message({"type": "CHORD_HEARTBEAT"}, lambda: "ack")
+        assert control.result(timeout=1) == "ack"
+
+        stats = pool.get_stats()
+        assert stats["rejected"] == 1
+        assert stats["lanes"][LANE_DATA]["rejected"] == 1
+        assert stats["lanes"][LANE_CONTROL]["processed"] == 1
+
+        gate.set()
+        pool.stop()
+
+
+class TestServerAdmissionControl:
+    """El servidor responde BUSY cuando la cola de workers está llena"""
+
+    @pytest.mark.parametrize("mode,port", [("thread", 9660), ("asyncio", 9661)])
+    def test_busy_response(self, mode, port):
+        gate = threading.Event()
+
+        def handler(msg, addr):
+            gate.wait(timeout=2)
+            return {"type": "OK", "n": msg["n"]}
+
+        server = TCPServer('127.0.0.1', port, handler, mode=mode, workers=1, queue_size=1)
+        server.start()
+        time.sleep(0.2)
+
+        first = server.request_async('127.0.0.1', port, {"type": "PUT", "n": 1})
+        time.sleep(0.1)
+        second = server.request_async('127.0.0.1', port, {"type": "PUT", "n": 2})
+        time.sleep(0.1)
+        third = server.request_async('127.0.0.1', port, {"type": "PUT", "n": 3})
+
+        assert third.result(timeout=1)["type"] == BUSY
+        gate.set()
+        assert first.result(timeout=2)["n"] == 1
+        assert second.result(timeout=2)["n"] == 2
+
+        stats = server.get_worker_stats()
+        assert stats["rejected"] == 1
+        assert stats["queue_depth"] == 0
+
+        server.stop()
+
+    def test_worker_pool_processes_plain_messages(self):
+        """Mensajes fire-and-forget también pasan por los workers"""
+        messages = []
+        server = TCPServer('127.0.0.1', 9662, lambda m, a: messages.append(m), workers=2)
+        server.start()
+        time.sleep(0.2)
+
+        for i in range(5):
+            server.send_message('127.0.0.1', 9662, {"type": "TEST", "n": i})
+        time.sleep(0.5)
+
+        assert sorted(m["n"] for m in messages) == list(range(5))
+        assert server.get_worker_stats()["processed"] == 5
+
+        server.stop()
+
+    def test_control_lane_served_during_storage_storm(self):
+        """Con control_workers un heartbeat se atiende aunque los workers de data estén ocupados"""
+        gate = threading.Event()
+
+        def handler(msg, addr):
+            if msg["type"] == "PUT":
+                gate.wait(timeout=3)
+                return {"type": "OK"}
+            return {"type": "HEARTBEAT_ACK"}
+
+        server = TCPServer('127.0.0.1', 9663, handler, workers=2, control_workers=1, queue_size=50)
+        server.start()
+        time.sleep(0.2)
+
+        puts = [server.request_async('127.0.0.1', 9663, {"type": "PUT", "n": i}) for i in range(10)]
+        time.sleep(0.1)
+        ack = server.request_async('127.0.0.1', 9663, {"type": "CHORD_HEARTBEAT"}, timeout=1)
+        assert ack.result(timeout=1)["type"] == "HEARTBEAT_ACK"
+
+        gate.set()
+        assert all(f.result(timeout=3)["type"] == "OK" for f in puts)
+        lanes = server.get_worker_stats()["lanes"]
+        assert lanes[LANE_CONTROL]["processed"] == 1
+        assert lanes[LANE_DATA]["processed"] == 10
+
+        server.stop()